@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Checkout - Benchmark
+Runs store checkouts against a throw-away database (full schema via the migrations) and reports
+commits per second for 1, 10 and 100 line carts, next to the old one-statement-per-line loop.
+Ends with an oversell check: a cart asking for more than is in stock must leave nothing behind.
+
+    python benchmark_checkout.py [seconds_per_case]
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from src.database.connection_pool import ConnectionPool
+from src.database.migrations import migrate
+from src.database.migrations.store import MIGRATIONS
+from src.database import checkout, sales_summary
+
+PRODUCTS = 1000
+
+
+def seed(conn):
+    conn.executemany("INSERT INTO products (id, barcode, name_en, sale_price, cost_price) VALUES (?, ?, ?, ?, ?)",
+                     [(i, f"BC{i:06d}", f"Product {i}", 10.0 + i % 50, 6.0 + i % 30) for i in range(1, PRODUCTS + 1)])
+    conn.executemany("INSERT INTO inventory (product_id, quantity) VALUES (?, ?)",
+                     [(i, 10_000_000) for i in range(1, PRODUCTS + 1)])
+    conn.execute("INSERT INTO products (id, barcode, name_en, sale_price) VALUES (?, 'SCARCE', 'Scarce item', 5)",
+                 (PRODUCTS + 1,))
+    conn.execute("INSERT INTO inventory (product_id, quantity) VALUES (?, 2)", (PRODUCTS + 1,))
+    conn.commit()
+
+
+def make_lines(n, offset):
+    return [checkout.CheckoutLine(pid, f"Product {pid}", 1, 10.0 + pid % 50, barcode=f"BC{pid:06d}")
+            for pid in ((offset + k) % PRODUCTS + 1 for k in range(n))]
+
+
+def legacy_checkout(conn, lines, invoice):
+    """What SalesView.run_checkout used to do: one INSERT and one UPDATE per line, no stock guard."""
+    with conn:
+        cursor = conn.cursor()
+        total = sum(l.total for l in lines)
+        cursor.execute("INSERT INTO sales (invoice_number, user_id, customer_id, total_amount, payment_type, uuid) "
+                       "VALUES (?, 1, 1, ?, 'CASH', ?)", (invoice, total, str(uuid.uuid4())))
+        sale_id = cursor.lastrowid
+        for l in lines:
+            cursor.execute("""
+                INSERT INTO sale_items (sale_id, product_id, barcode, product_name, quantity, unit_price, total_price, uuid)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (sale_id, l.product_id, l.barcode, l.name, l.qty, l.unit_price, l.total, str(uuid.uuid4())))
+            cursor.execute("UPDATE inventory SET quantity = quantity - ? WHERE product_id = ?", (l.qty, l.product_id))
+        sales_summary.record_sale(cursor, sales_summary.STORE, "CASH", total,
+                                  [(l.product_id, l.qty, l.total, None) for l in lines])
+
+
+def run_case(conn, n_lines, seconds, legacy):
+    count, offset, lock_ms, commit_ms = 0, 0, 0.0, 0.0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        lines = make_lines(n_lines, offset)
+        invoice = f"BENCH-{uuid.uuid4().hex}"
+        if legacy:
+            legacy_checkout(conn, lines, invoice)
+        else:
+            # Invoice number from the sales_invoice sequence, as the POS does
+            result = checkout.checkout(conn, checkout.STORE, lines, None, 1, 1, "CASH", sum(l.total for l in lines))
+            lock_ms += result.timings["lock_ms"]
+            commit_ms += result.timings["commit_ms"]
+        offset += n_lines
+        count += 1
+    elapsed = time.perf_counter() - start
+    return count / elapsed, (lock_ms / count, commit_ms / count) if not legacy else None
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    tmp = tempfile.mkdtemp(prefix="pos_checkout_bench_")
+    path = os.path.join(tmp, "store.db")
+    pool = ConnectionPool()
+    conn = pool.acquire(path)
+    migrate(conn, MIGRATIONS, label="bench")
+    seed(conn)
+
+    print(f"\n{'lines':>6}{'legacy/s':>12}{'service/s':>12}{'speedup':>10}{'lock ms':>10}{'commit ms':>11}")
+    for n_lines in (1, 10, 100):
+        # Alternate the two and keep the best of each, so WAL growth does not favour whichever ran first
+        legacy_rate = rate = 0.0
+        for _ in range(2):
+            legacy_rate = max(legacy_rate, run_case(conn, n_lines, seconds / 2, legacy=True)[0])
+            r, (lock, commit) = run_case(conn, n_lines, seconds / 2, legacy=False)
+            rate = max(rate, r)
+        print(f"{n_lines:>6}{legacy_rate:>12.1f}{rate:>12.1f}{rate / legacy_rate:>9.2f}x{lock:>10.2f}{commit:>11.2f}")
+
+    # Oversell: 3 requested, 2 in stock -> rejected, nothing written
+    sales_before = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+    lines = make_lines(2, 0) + [checkout.CheckoutLine(PRODUCTS + 1, "Scarce item", 3, 5.0)]
+    try:
+        checkout.checkout(conn, checkout.STORE, lines, "BENCH-OVERSELL", 1, 1, "CASH", 100)
+        print("\nOversell check: FAILED (sale was accepted)")
+    except checkout.InsufficientStockError as e:
+        sales_after = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+        stock = conn.execute("SELECT quantity FROM inventory WHERE product_id = ?", (PRODUCTS + 1,)).fetchone()[0]
+        ok = sales_after == sales_before and stock == 2
+        print(f"\nOversell check: {'OK' if ok else 'FAILED'} - {e}")
+
+    pool.close_all()
+    for name in os.listdir(tmp):
+        os.remove(os.path.join(tmp, name))
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
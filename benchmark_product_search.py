@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Product Search - Benchmark
+Builds the POS search index over synthetic products (no database needed) and times typical
+search-box queries. Target: sub-millisecond lookups at 100k products.
+
+    python benchmark_product_search.py [product_count]
+"""
+import random
+import sys
+import time
+
+from src.core.product_catalog import ProductRecord
+from src.core.product_search import ProductSearchIndex
+
+WORDS_EN = ["paracetamol", "rice", "sugar", "tea", "green", "black", "oil", "sunflower", "soap", "shampoo",
+            "biscuit", "chocolate", "milk", "powder", "juice", "orange", "apple", "water", "mineral", "flour",
+            "salt", "pepper", "chili", "beans", "lentil", "pasta", "tomato", "paste", "cream", "butter"]
+WORDS_PS = ["وريجي", "بوره", "چای", "شنه", "تور", "غوړي", "صابون", "شيدې", "اوبه", "اوړه"]
+WORDS_DR = ["برنج", "شکر", "چای", "سبز", "سیاه", "روغن", "صابون", "شیر", "آب", "آرد"]
+
+QUERIES = ["pa", "par", "paracet", "rice 5", "green tea", "ate", "olat", "6290", "62901234", "چای", "روغن سبز",
+           "zzz", "butter 999", "ream"]
+
+
+def make_records(count, seed=42):
+    rnd = random.Random(seed)
+    records = []
+    for i in range(1, count + 1):
+        name_en = " ".join(rnd.sample(WORDS_EN, 3)) + f" {rnd.randint(1, 999)}g"
+        name_ps = " ".join(rnd.sample(WORDS_PS, 2))
+        name_dr = " ".join(rnd.sample(WORDS_DR, 2))
+        records.append(ProductRecord(i, f"629{i:010d}", name_en, name_ps, name_dr, rnd.randint(10, 5000), 50, 0))
+    return records
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = make_records(count)
+
+    index = ProductSearchIndex()
+    t0 = time.perf_counter()
+    index.rebuild(records)
+    print(f"Indexed {len(index):,} products in {time.perf_counter() - t0:.2f}s\n")
+
+    print(f"{'query':<14}{'hits':>6}{'mean µs':>10}{'p95 µs':>10}{'max µs':>10}")
+    worst = 0.0
+    for q in QUERIES:
+        timings = []
+        for _ in range(200):
+            t = time.perf_counter()
+            hits = index.search(q, limit=20)
+            timings.append((time.perf_counter() - t) * 1e6)
+        timings.sort()
+        mean = sum(timings) / len(timings)
+        p95 = timings[int(len(timings) * 0.95)]
+        worst = max(worst, p95)
+        print(f"{q:<14}{len(hits):>6}{mean:>10.1f}{p95:>10.1f}{timings[-1]:>10.1f}")
+
+    # Incremental update: one product renamed
+    rec = records[0]
+    t = time.perf_counter()
+    index.apply([ProductRecord(rec.id, rec.barcode, "renamed widget", "", "", 1, 1, 0)], [], reset=False)
+    print(f"\nIncremental update: {(time.perf_counter() - t) * 1e3:.2f} ms")
+
+    print(f"\nWorst p95: {worst:.1f} µs -> {'OK' if worst < 1000 else 'SLOWER THAN 1ms'}")
+
+
+if __name__ == "__main__":
+    main()
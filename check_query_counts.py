@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Batched loaders - Query count check
+Seeds throw-away store and pharmacy databases (full schema via the migrations) and runs each
+screen's loading sequence for a small and a large result (5 and 400 parents), counting the
+SQL statements with batch_loader.QueryCounter. The loaders are the functions the views call
+(batch_loader's screen loading sequences, customer_ledger.statement), so a view that goes back
+to per-row queries fails here. Every screen must cost the same number of statements at both sizes.
+
+    python check_query_counts.py
+"""
+import os
+import sys
+import tempfile
+
+from src.database.connection_pool import ConnectionPool
+from src.database.date_ranges import DateRange
+from src.database.migrations import migrate
+from src.database.migrations import store, pharmacy
+from src.database import batch_loader, customer_ledger
+from src.database.batch_loader import QueryCounter
+
+SIZES = (5, 400)
+ITEMS_PER_SALE = 3
+
+
+def seed_store(conn, n):
+    conn.execute("INSERT INTO customers (id, name_en) VALUES (1, 'Customer')")
+    for s in range(1, n + 1):
+        conn.execute("INSERT INTO sales (id, invoice_number, customer_id, total_amount, payment_type) "
+                     "VALUES (?, ?, 1, 30, 'CREDIT')", (s, f"INV-{s}"))
+        conn.executemany("INSERT INTO sale_items (sale_id, product_name, quantity, unit_price, total_price) "
+                         "VALUES (?, ?, 1, 10, 10)", [(s, f"Item {k}") for k in range(ITEMS_PER_SALE)])
+        customer_ledger.post(conn.cursor(), customer_ledger.STORE, 1, customer_ledger.SALE, 30, s)
+    conn.commit()
+
+
+def seed_pharmacy(conn, n):
+    conn.execute("INSERT INTO pharmacy_products (id, barcode, name_en) VALUES (1, 'P1', 'Medicine')")
+    for s in range(1, n + 1):
+        conn.execute("INSERT INTO pharmacy_sales (id, invoice_number, total_amount) VALUES (?, ?, 100)",
+                     (s, f"PHARM-{s}"))
+    for i in range(1, n + 1):
+        conn.execute("INSERT INTO pharmacy_sale_items (id, sale_id, product_id, product_name, quantity, unit_price, "
+                     "total_price) VALUES (?, 1, 1, 'Medicine', 2, 5, 10)", (i,))
+        conn.execute("INSERT INTO pharmacy_returns (id, original_sale_id, refund_amount) VALUES (?, 1, 5)", (i,))
+        conn.execute("INSERT INTO pharmacy_return_items (id, return_id, sale_item_id, product_id, quantity, "
+                     "unit_price, action) VALUES (?, ?, ?, 1, 1, 5, 'REPLACEMENT')", (i, i, i))
+        conn.execute("INSERT INTO pharmacy_replacement_items (return_item_id, product_id, product_name, quantity, "
+                     "unit_price, total_price) VALUES (?, 1, 'Medicine', 1, 5, 5)", (i,))
+    conn.commit()
+
+
+# -- screens: the loaders the views call
+
+def pharmacy_report_page(index):
+    return lambda conn, n: batch_loader.pharmacy_report_queries(DateRange())[index].page(conn, None, n)
+
+
+SCREENS = [
+    ("ReportsView transactions", "store", lambda conn, n: batch_loader.recent_store_sales(conn, DateRange(), n)),
+    ("Customer statement (LoanView)", "store",
+     lambda conn, n: customer_ledger.statement(customer_ledger.STORE, 1).page(conn, None, n)),
+    ("PharmacyReturnsView.load_invoice", "pharmacy", lambda conn, n: batch_loader.pharmacy_invoice(conn, "PHARM-1")),
+    ("PharmacyReportsView sales page", "pharmacy", pharmacy_report_page(0)),
+    ("PharmacyReportsView returns page", "pharmacy", pharmacy_report_page(1)),
+]
+
+
+def loaded(result):
+    """Rows a loader returned (pharmacy_invoice returns (sale, items))."""
+    return len(result[1]) if isinstance(result, tuple) else len(result)
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="pos_query_counts_")
+    pool = ConnectionPool()
+    failed = False
+    print(f"\n{'screen':<36}" + "".join(f"{'N=' + str(n):>10}{'rows':>8}" for n in SIZES))
+    results = {}
+    for n in SIZES:
+        conns = {}
+        for name, migrations, seed in (("store", store.MIGRATIONS, seed_store),
+                                       ("pharmacy", pharmacy.MIGRATIONS, seed_pharmacy)):
+            conn = pool.acquire(os.path.join(tmp, f"{name}_{n}.db"))
+            migrate(conn, migrations, label=name)
+            seed(conn, n)
+            conns[name] = conn
+        for title, db, screen in SCREENS:
+            with QueryCounter(conns[db]) as qc:
+                rows = loaded(screen(conns[db], n))
+            results.setdefault(title, []).append((qc.count, rows))
+
+    for title, per_size in results.items():
+        line = f"{title:<36}" + "".join(f"{count:>10}{rows:>8}" for count, rows in per_size)
+        constant = len({count for count, _ in per_size}) == 1
+        failed |= not constant
+        print(line + ("" if constant else "   <- grows with N"))
+
+    pool.close_all()
+    for name in os.listdir(tmp):
+        os.remove(os.path.join(tmp, name))
+    os.rmdir(tmp)
+    print("\nOK: batched statement counts are constant" if not failed else "\nFAILED")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
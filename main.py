@@ -34,6 +34,7 @@ from src.ui.views.onboarding.create_account_stepper import CreateAccountWindow
 from src.ui.views.onboarding.login_window import LoginWindow
 from src.ui.views.onboarding.locked_window import LockedWindow
 from src.database.db_manager import db_manager
+from src.utils.print_spooler import print_spooler
 from src.ui.views.login_view import LoginView 
 from src.ui.theme_manager import theme_manager
 
@@ -397,6 +398,11 @@ def main():
 
         gate.connection_resolved.connect(debug_gate_resolved)
         gate.show()
+        # Receipts still queued from the last session print in the background
+        print_spooler.start()
+        app.aboutToQuit.connect(print_spooler.stop)
+        # Release pooled DB connections (checkpoints WAL) on exit
+        app.aboutToQuit.connect(db_manager.close_connections)
         sys.exit(app.exec())
         
     except Exception as e:
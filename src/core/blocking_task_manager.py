@@ -46,6 +46,9 @@ class BlockingTaskManager(QObject):
         self.pool = QThreadPool.globalInstance()
         # Ensure we don't saturate the CPU but have enough threads for I/O
         self.pool.setMaxThreadCount(max(4, QThread.idealThreadCount()))
+        # Workers keep their pooled DB connection (src/database/connection_pool.py) for good:
+        # an expired thread would strand its connection and make the next worker a pool miss
+        self.pool.setExpiryTimeout(-1)
         # Keep references to prevent GC
         self._active_workers = set()
 
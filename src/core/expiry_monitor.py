@@ -0,0 +1,75 @@
+"""
+Daily pharmacy expiry run and alert signals.
+
+Runs src.database.expiry.run_nightly() once per calendar day (first check after the pharmacy is
+opened, then hourly so a session left open past midnight rolls over) on a worker thread, and
+emits:
+
+  * buckets_updated(dict)     - today's bucket totals (expired / d30 / d60 / d90, value at risk)
+  * threshold_crossed(list)   - batches that moved into a nearer bucket since the last run
+"""
+from datetime import date
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+CHECK_INTERVAL_MS = 60 * 60 * 1000
+
+
+class ExpiryMonitor(QObject):
+    buckets_updated = pyqtSignal(dict)
+    threshold_crossed = pyqtSignal(list)
+
+    def __init__(self):
+        super().__init__()
+        self.buckets = {}
+        self.as_of = None
+        self._running = False
+        self._timer = None
+
+    def start(self):
+        if self._timer is None:
+            self._timer = QTimer(self)
+            self._timer.setInterval(CHECK_INTERVAL_MS)
+            self._timer.timeout.connect(self.check)
+            self._timer.start()
+        self.check()
+
+    def check(self, force=False):
+        """Runs today's snapshot if it is missing (or force), else re-emits the stored one."""
+        if self._running:
+            return
+        self._running = True
+        from src.core.blocking_task_manager import task_manager
+        task_manager.run_task(lambda: self._run(force), on_finished=self._on_finished, on_error=self._on_error)
+
+    @staticmethod
+    def _run(force):
+        from src.database.db_manager import db_manager
+        from src.database import expiry
+        today = date.today().isoformat()
+        conn = db_manager.get_pharmacy_connection()
+        if not force and expiry.last_run(conn) == today:
+            return today, expiry.snapshot(conn, today), []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            buckets, crossings = expiry.run_nightly(conn.cursor())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return today, buckets, crossings
+
+    def _on_finished(self, result):
+        self._running = False
+        self.as_of, self.buckets, crossings = result
+        self.buckets_updated.emit(self.buckets)
+        if crossings:
+            print(f"[INFO] Expiry: {len(crossings)} batches crossed a threshold")
+            self.threshold_crossed.emit(crossings)
+
+    def _on_error(self, error):
+        self._running = False
+        print(f"[WARNING] Expiry run failed: {error}")
+
+
+expiry_monitor = ExpiryMonitor()
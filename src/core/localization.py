@@ -173,6 +173,8 @@ class Localization(QObject):
                 "medicine_expiry_status": "Medicine Expiry Status",
                 "print_transactions": "🖨️ Print Transactions",
                 "print_loans": "🖨️ Print Loans",
+                "export": "📤 Export",
+                "exporting": "Exporting",
                 "print_stock_report": "🖨️ Print Stock Report",
                 "print_expiry_report": "🖨️ Print Expiry Report",
                 "print_returns": "🖨️ Print Returns Report",
@@ -517,6 +519,8 @@ class Localization(QObject):
                 "medicine_expiry_status": "د درملو د ختمېدو حالت",
                 "print_transactions": "🖨️ لیږدونه چاپول",
                 "print_loans": "🖨️ پورونه چاپول",
+                "export": "📤 صادرول",
+                "exporting": "صادرېږي",
                 "print_stock_report": "🖨️ سټاک راپور چاپول",
                 "print_expiry_report": "🖨️ د ختمیدو راپور",
                 "print_returns": "🖨️ د بېرته شوو راپور چاپول",
@@ -851,6 +855,8 @@ class Localization(QObject):
                 "medicine_expiry_status": "وضعیت انقضای دارو",
                 "print_transactions": "🖨️ چاپ تراکنش‌ها",
                 "print_loans": "🖨️ چاپ قرضه‌ها",
+                "export": "📤 صدور",
+                "exporting": "در حال صدور",
                 "print_stock_report": "🖨️ چاپ راپور موجودی",
                 "print_expiry_report": "🖨️ چاپ گزارش انقضا",
                 "print_returns": "🖨️ چاپ راپور مرجوعی",
@@ -0,0 +1,227 @@
+"""
+In-memory FEFO (first-expiry-first-out) stock allocator for the pharmacy POS.
+
+Holds the active pharmacy products and, per product, a heap of its batches ordered by
+expiry_date, so adding to the cart is a dict lookup plus a walk down one heap instead of a
+search query and a stock-check query (name searches go through src/database/pharmacy_search.py). A cart line is one product; its quantity is split across
+as many unexpired batches as needed, earliest expiry first.
+
+Open carts reserve what they allocated (keyed by the id open_cart() hands out), so two carts
+in this process never promise the same units. A cart's reservations go with it: the view
+releases them when it is destroyed, and carts whose owner has been garbage collected are
+dropped on the next reserve() / refresh().
+
+The database stays authoritative: checkout decrements every batch with a guarded UPDATE in its
+own transaction (src/database/checkout.py), and commit() then applies the same decrements here.
+Stock changed elsewhere (purchases, returns, product edits, deactivation, other terminals) is
+picked up by refresh(), which reloads only when pharmacy_stock_changes.seq moved: triggers bump
+it on every write to pharmacy_products or pharmacy_inventory (pharmacy migration 14).
+
+refresh() touches the database and must run off the UI thread; everything else is in memory.
+"""
+import heapq
+import threading
+import uuid
+import weakref
+from datetime import date
+
+
+class PharmacyProduct:
+    __slots__ = ("id", "barcode", "name_en", "generic_name", "brand", "size", "sale_price", "cost_price")
+
+    def __init__(self, id, barcode, name_en, generic_name, brand, size, sale_price, cost_price):
+        self.id = id
+        self.barcode = barcode
+        self.name_en = name_en
+        self.generic_name = generic_name
+        self.brand = brand
+        self.size = size
+        self.sale_price = sale_price
+        self.cost_price = cost_price
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row["id"], row["barcode"], row["name_en"] or "", row["generic_name"] or "", row["brand"] or "",
+                   row["size"] or "N/A", row["sale_price"] or 0, row["cost_price"] or 0)
+
+
+class Allocation:
+    """Result of an allocation: the batch split, or why it could not be met."""
+
+    def __init__(self, parts, available, expired_only=False):
+        self.parts = parts              # [(batch_number, expiry_date, qty)], earliest expiry first
+        self.available = available      # units this cart could still get for the product
+        self.expired_only = expired_only
+
+    @property
+    def ok(self):
+        return bool(self.parts)
+
+    @property
+    def quantity(self):
+        return sum(q for _, _, q in self.parts)
+
+
+class PharmacyStock:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._products = {}       # id -> PharmacyProduct
+        self._by_barcode = {}     # barcode -> PharmacyProduct
+        self._batches = {}        # product id -> heap of [expiry_date, batch_number, quantity]
+        self._reserved = {}       # (product id, batch) -> units held by open carts
+        self._carts = {}          # cart id -> {product id -> [(batch, expiry, qty)]}
+        self._owners = {}         # cart id -> weakref to the object holding the cart
+        self._fingerprint = None
+        self.loaded = False
+
+    # -- lookups
+
+    def get(self, barcode):
+        return self._by_barcode.get(barcode)
+
+    def product(self, product_id):
+        return self._products.get(product_id)
+
+    def products(self):
+        return list(self._products.values())
+
+    def available(self, product_id, today=None):
+        """Unexpired units not reserved by any open cart."""
+        today = today or date.today().isoformat()
+        with self._lock:
+            return sum(max(0, qty - self._reserved.get((product_id, batch), 0))
+                       for expiry, batch, qty in self._batches.get(product_id, ()) if expiry >= today)
+
+    # -- carts
+
+    def open_cart(self, owner):
+        """New cart id (a uuid, never reused) whose reservations live at most as long as `owner`."""
+        cart_id = uuid.uuid4().hex
+        with self._lock:
+            self._owners[cart_id] = weakref.ref(owner)
+        return cart_id
+
+    def _drop_dead_carts(self):
+        for cart_id in [c for c, ref in self._owners.items() if ref() is None]:
+            del self._owners[cart_id]
+            for pid, parts in self._carts.pop(cart_id, {}).items():
+                self._hold(pid, parts, -1)
+
+    # -- allocation
+
+    def _allocate(self, product_id, quantity, today):
+        heap = self._batches.get(product_id)
+        if not heap:
+            return Allocation([], 0)
+        # Drop exhausted batches sitting at the top of the heap
+        while heap and heap[0][2] <= 0:
+            heapq.heappop(heap)
+        parts, remaining, available, expired = [], quantity, 0, False
+        candidates = list(heap)  # heap order: pop from a copy to walk batches by expiry
+        while candidates:
+            expiry, batch, qty = heapq.heappop(candidates)
+            free = qty - self._reserved.get((product_id, batch), 0)
+            if free <= 0:
+                continue
+            if expiry < today:
+                expired = True
+                continue
+            available += free
+            if remaining > 0:
+                take = min(free, remaining)
+                parts.append((batch, expiry, take))
+                remaining -= take
+        if remaining > 0:
+            return Allocation([], available, expired_only=expired and available == 0)
+        return Allocation(parts, available)
+
+    def reserve(self, cart_id, product_id, quantity, today=None):
+        """
+        Sets the cart's quantity for a product: releases what the cart held for it, then allocates
+        `quantity` FEFO. On failure the previous reservation is kept and Allocation.ok is False.
+        """
+        today = today or date.today().isoformat()
+        with self._lock:
+            self._drop_dead_carts()
+            cart = self._carts.setdefault(cart_id, {})
+            previous = cart.pop(product_id, [])
+            self._hold(product_id, previous, -1)
+            alloc = self._allocate(product_id, quantity, today)
+            held = alloc.parts if alloc.ok else previous
+            if alloc.ok:
+                alloc.available -= alloc.quantity  # what is left for more after this reservation
+            if held:
+                cart[product_id] = held
+                self._hold(product_id, held, 1)
+            return alloc
+
+    def _hold(self, product_id, parts, sign):
+        for batch, _, qty in parts:
+            key = (product_id, batch)
+            left = self._reserved.get(key, 0) + sign * qty
+            if left > 0:
+                self._reserved[key] = left
+            else:
+                self._reserved.pop(key, None)
+
+    def reservation(self, cart_id, product_id):
+        with self._lock:
+            return list(self._carts.get(cart_id, {}).get(product_id, ()))
+
+    def release(self, cart_id, product_id=None):
+        """Gives back a cart's reservation for one product, or for the whole cart."""
+        with self._lock:
+            cart = self._carts.get(cart_id)
+            if not cart:
+                return
+            for pid in ([product_id] if product_id is not None else list(cart)):
+                self._hold(pid, cart.pop(pid, []), -1)
+            if not cart:
+                self._carts.pop(cart_id, None)
+
+    def commit(self, cart_id):
+        """After a successful checkout: the reserved units are gone from stock."""
+        with self._lock:
+            cart = self._carts.pop(cart_id, {})
+            for pid, parts in cart.items():
+                self._hold(pid, parts, -1)
+                heap = self._batches.get(pid, [])
+                taken = {batch: qty for batch, _, qty in parts}
+                for entry in heap:
+                    if entry[1] in taken:
+                        entry[2] -= taken[entry[1]]  # expiry/batch unchanged, so heap order holds
+
+    # -- loading (background threads only)
+
+    def refresh(self):
+        """Reloads products and batches if any product or batch changed since the last load. Returns True if it did."""
+        from src.database.db_manager import db_manager
+        with self._lock:
+            self._drop_dead_carts()
+        with db_manager.get_pharmacy_connection() as conn:
+            fingerprint = conn.execute("SELECT seq FROM pharmacy_stock_changes WHERE id = 1").fetchone()[0]
+            if self.loaded and fingerprint == self._fingerprint:
+                return False
+            products = {row["id"]: PharmacyProduct.from_row(row) for row in conn.execute("""
+                SELECT id, barcode, name_en, generic_name, brand, size, sale_price, cost_price
+                FROM pharmacy_products WHERE is_active = 1
+            """)}
+            batches = {}
+            for row in conn.execute("""
+                SELECT product_id, batch_number, expiry_date, quantity FROM pharmacy_inventory WHERE quantity > 0
+            """):
+                if row["product_id"] in products:
+                    batches.setdefault(row["product_id"], []).append(
+                        [row["expiry_date"] or "9999-12-31", row["batch_number"], row["quantity"]])
+        for heap in batches.values():
+            heapq.heapify(heap)
+        with self._lock:
+            self._products = products
+            self._by_barcode = {p.barcode: p for p in products.values()}
+            self._batches = batches
+            self._fingerprint = fingerprint
+            self.loaded = True
+        return True
+
+
+pharmacy_stock = PharmacyStock()
@@ -0,0 +1,181 @@
+"""
+Process-wide product catalog for the store POS.
+
+One compact record per active product (only what scanning and checkout need), shared by every
+SalesView instance instead of each view loading `SELECT p.*` into its own dict. After the first
+full load, refresh() only re-reads products that changed: triggers on products and inventory
+append their id to `catalog_changes` (store migration 4), and the catalog remembers the last
+change sequence it has applied.
+
+All methods that touch the database must run off the UI thread (task_manager.run_task);
+lookups (get / by_id / stock) are plain dict reads and safe anywhere.
+"""
+import threading
+
+FLAG_ALLOW_NEGATIVE_STOCK = 1
+FLAG_TRACK_INVENTORY = 2
+FLAG_RETURNABLE = 4
+FLAG_ALLOW_PRICE_CHANGE = 8
+FLAG_ALLOW_ZERO_PRICE = 16
+
+_FLAG_COLUMNS = (
+    ("allow_negative_stock", FLAG_ALLOW_NEGATIVE_STOCK),
+    ("track_inventory", FLAG_TRACK_INVENTORY),
+    ("returnable", FLAG_RETURNABLE),
+    ("allow_pos_price_change", FLAG_ALLOW_PRICE_CHANGE),
+    ("allow_zero_price", FLAG_ALLOW_ZERO_PRICE),
+)
+
+_SELECT = """
+    SELECT p.id, p.barcode, p.name_en, p.name_ps, p.name_dr, p.sale_price, p.is_active,
+           p.allow_negative_stock, p.track_inventory, p.returnable, p.allow_pos_price_change, p.allow_zero_price,
+           COALESCE(i.quantity, 0) AS stock
+    FROM products p LEFT JOIN inventory i ON p.id = i.product_id
+"""
+
+
+class ProductRecord:
+    """Checkout view of a product. __slots__ keeps it to a fraction of a row dict."""
+    __slots__ = ("id", "barcode", "name_en", "name_ps", "name_dr", "sale_price", "stock", "flags")
+
+    def __init__(self, id, barcode, name_en, name_ps, name_dr, sale_price, stock, flags):
+        self.id = id
+        self.barcode = barcode
+        self.name_en = name_en
+        self.name_ps = name_ps
+        self.name_dr = name_dr
+        self.sale_price = sale_price
+        self.stock = stock
+        self.flags = flags
+
+    @classmethod
+    def from_row(cls, row):
+        flags = 0
+        for column, bit in _FLAG_COLUMNS:
+            if row[column]:
+                flags |= bit
+        return cls(row["id"], row["barcode"], row["name_en"] or "", row["name_ps"] or "", row["name_dr"] or "",
+                   row["sale_price"] or 0, row["stock"] or 0, flags)
+
+    def has(self, flag):
+        return bool(self.flags & flag)
+
+    def __repr__(self):
+        return f"ProductRecord({self.id}, {self.barcode!r}, {self.name_en!r}, stock={self.stock})"
+
+
+class ProductCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_barcode = {}
+        self._by_id = {}
+        self._last_seq = 0
+        self.loaded = False
+        self._listeners = []
+
+    # -- lookups (no database access)
+
+    def get(self, barcode):
+        return self._by_barcode.get(barcode)
+
+    def by_id(self, product_id):
+        return self._by_id.get(product_id)
+
+    def stock(self, product_id):
+        rec = self._by_id.get(product_id)
+        return rec.stock if rec else 0
+
+    def records(self):
+        return list(self._by_id.values())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def add_listener(self, fn):
+        """
+        fn(upserted, removed, reset) is called on the refreshing thread after each load/refresh;
+        reset is True for a full load, where `upserted` is the whole catalog.
+        """
+        self._listeners.append(fn)
+
+    # -- loading (background threads only)
+
+    def refresh(self):
+        """Full load the first time (or after the change log was pruned past us), deltas afterwards."""
+        from src.database.db_manager import db_manager
+        with self._lock:
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                # Two subqueries so each is a single rowid-index probe
+                latest, oldest = cursor.execute(
+                    "SELECT (SELECT MAX(seq) FROM catalog_changes), (SELECT MIN(seq) FROM catalog_changes)").fetchone()
+                latest = latest or 0
+                if not self.loaded or (oldest and oldest > self._last_seq + 1):
+                    return self._full_load(cursor, latest)
+                if latest <= self._last_seq:
+                    return 0
+                return self._apply_changes(cursor, latest)
+
+    def reload(self):
+        """Drops everything and loads the whole catalog again."""
+        from src.database.db_manager import db_manager
+        with self._lock:
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                latest = cursor.execute("SELECT MAX(seq) FROM catalog_changes").fetchone()[0] or 0
+                return self._full_load(cursor, latest)
+
+    def _full_load(self, cursor, latest):
+        cursor.execute(_SELECT + " WHERE p.is_active = 1")
+        by_id = {}
+        for row in cursor:
+            rec = ProductRecord.from_row(row)
+            by_id[rec.id] = rec
+        removed = [rec for pid, rec in self._by_id.items() if pid not in by_id]
+        self._by_id = by_id
+        self._by_barcode = {rec.barcode: rec for rec in by_id.values()}
+        self._last_seq = latest
+        self.loaded = True
+        self._notify(list(by_id.values()), removed, reset=True)
+        return len(by_id)
+
+    def _apply_changes(self, cursor, latest):
+        ids = [r[0] for r in cursor.execute(
+            "SELECT DISTINCT product_id FROM catalog_changes WHERE seq > ? AND seq <= ?", (self._last_seq, latest))]
+        upserted, removed = [], []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ",".join("?" for _ in chunk)
+            rows = {row["id"]: row for row in cursor.execute(_SELECT + f" WHERE p.id IN ({marks})", chunk)}
+            for pid in chunk:
+                old = self._by_id.get(pid)
+                row = rows.get(pid)
+                if row is None or not row["is_active"]:
+                    if old:
+                        self._drop(old)
+                        removed.append(old)
+                    continue
+                rec = ProductRecord.from_row(row)
+                if old and old.barcode != rec.barcode:
+                    self._by_barcode.pop(old.barcode, None)
+                self._by_id[pid] = rec
+                self._by_barcode[rec.barcode] = rec
+                upserted.append(rec)
+        self._last_seq = latest
+        self._notify(upserted, removed, reset=False)
+        return len(ids)
+
+    def _drop(self, rec):
+        self._by_id.pop(rec.id, None)
+        if self._by_barcode.get(rec.barcode) is rec:
+            del self._by_barcode[rec.barcode]
+
+    def _notify(self, upserted, removed, reset):
+        for fn in self._listeners:
+            try:
+                fn(upserted, removed, reset)
+            except Exception as e:
+                print(f"[WARNING] Product catalog listener failed: {e}")
+
+
+product_catalog = ProductCatalog()
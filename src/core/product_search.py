@@ -0,0 +1,200 @@
+"""
+In-memory product search for the POS search box.
+
+Built from the shared product catalog (src/core/product_catalog.py) and kept current through its
+change listener. These answer a query without scanning the catalog:
+
+  * barcode / name prefixes - sorted barcode and full-name lists, bisect to the first match
+  * word prefixes           - sorted list of every word in name_en / name_ps / name_dr
+  * trigrams                - trigram -> product ids, for matches in the middle of a word
+
+Results are ranked (exact barcode, barcode prefix, name prefix, word prefix, substring) and
+capped, and candidate collection stops as soon as enough have been found. Updates append to the
+structures; superseded entries are skipped at query time (checked against the current text)
+and the whole index is rebuilt once they make up a fifth of it.
+
+See benchmark_product_search.py for lookup timings at 100k products.
+"""
+import re
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+
+from src.core.product_catalog import product_catalog
+
+_WORD_RE = re.compile(r"\w+")
+
+RANK_BARCODE_EXACT = 0
+RANK_BARCODE_PREFIX = 1
+RANK_NAME_PREFIX = 2
+RANK_WORD_PREFIX = 3
+RANK_SUBSTRING = 4
+
+
+def _text_of(rec):
+    return "\x00".join((rec.name_en, rec.name_ps, rec.name_dr)).lower()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2) if "\x00" not in text[i:i + 3] and " " not in text[i:i + 3]}
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._records = {}       # id -> ProductRecord
+        self._text = {}          # id -> lower-cased names joined by NUL
+        self._word_keys = []     # sorted words ...
+        self._word_ids = []      # ... and the product id for each
+        self._bc_keys = []       # sorted lower-cased barcodes ...
+        self._bc_ids = []        # ... and their product ids
+        self._name_keys = []     # sorted lower-cased names (all three languages) ...
+        self._name_ids = []      # ... and their product ids
+        self._trigram_ids = {}   # trigram -> [product ids] (may hold superseded ids)
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    # -- maintenance
+
+    def rebuild(self, records):
+        """Builds a fresh index off to the side, then swaps it in."""
+        fresh = ProductSearchIndex.__new__(ProductSearchIndex)
+        fresh._reset_state()
+        words, barcodes, names = [], [], []
+        for rec in records:
+            text = _text_of(rec)
+            fresh._records[rec.id] = rec
+            fresh._text[rec.id] = text
+            barcodes.append((rec.barcode.lower(), rec.id))
+            for name in set(text.split("\x00")):
+                if name:
+                    names.append((name, rec.id))
+            for word in set(_WORD_RE.findall(text)):
+                words.append((sys.intern(word), rec.id))
+            for tri in _trigrams(text):
+                fresh._trigram_ids.setdefault(tri, []).append(rec.id)
+        words.sort()
+        barcodes.sort()
+        names.sort()
+        fresh._word_keys = [w for w, _ in words]
+        fresh._word_ids = [i for _, i in words]
+        fresh._bc_keys = [b for b, _ in barcodes]
+        fresh._bc_ids = [i for _, i in barcodes]
+        fresh._name_keys = [n for n, _ in names]
+        fresh._name_ids = [i for _, i in names]
+        with self._lock:
+            self.__dict__.update({k: v for k, v in fresh.__dict__.items() if k != "_lock"})
+
+    def apply(self, upserted, removed, reset):
+        """Product catalog listener."""
+        if reset:
+            self.rebuild(upserted)
+            return
+        with self._lock:
+            for rec in removed:
+                if self._records.pop(rec.id, None) is not None:
+                    self._text.pop(rec.id, None)
+                    self._stale += 1
+            for rec in upserted:
+                old = self._records.get(rec.id)
+                self._records[rec.id] = rec
+                text = _text_of(rec)
+                if old is not None:
+                    if old.barcode == rec.barcode and self._text.get(rec.id) == text:
+                        continue  # stock/price-only change: nothing to re-index
+                    self._stale += 1
+                self._text[rec.id] = text
+                self._insert(self._bc_keys, self._bc_ids, rec.barcode.lower(), rec.id)
+                for name in set(text.split("\x00")):
+                    if name:
+                        self._insert(self._name_keys, self._name_ids, name, rec.id)
+                for word in set(_WORD_RE.findall(text)):
+                    self._insert(self._word_keys, self._word_ids, sys.intern(word), rec.id)
+                for tri in _trigrams(text):
+                    self._trigram_ids.setdefault(tri, []).append(rec.id)
+            needs_rebuild = self._stale > max(1000, len(self._records) // 5)
+        if needs_rebuild:
+            self.rebuild(product_catalog.records())
+
+    @staticmethod
+    def _insert(keys, ids, key, pid):
+        pos = bisect_right(keys, key)
+        keys.insert(pos, key)
+        ids.insert(pos, pid)
+
+    # -- queries
+
+    def search(self, query, limit=20):
+        """Up to `limit` ProductRecords matching every word of `query`, best matches first."""
+        q = query.strip().lower()
+        if not q:
+            return []
+        tokens = _WORD_RE.findall(q) or [q]
+        budget = limit * 3
+        found = {}
+
+        with self._lock:
+            records, texts = self._records, self._text
+
+            # 1. Barcode prefix / exact (the whole query, as typed or scanned)
+            keys, ids = self._bc_keys, self._bc_ids
+            for pos in range(bisect_left(keys, q), len(keys)):
+                if len(found) >= budget or not keys[pos].startswith(q):
+                    break
+                rec = records.get(ids[pos])
+                if rec is not None and rec.barcode.lower() == keys[pos]:
+                    found[rec.id] = RANK_BARCODE_EXACT if keys[pos] == q else RANK_BARCODE_PREFIX
+
+            # 2. A name (in any language) starting with the whole query
+            keys, ids = self._name_keys, self._name_ids
+            for pos in range(bisect_left(keys, q), len(keys)):
+                if len(found) >= budget or not keys[pos].startswith(q):
+                    break
+                pid = ids[pos]
+                text = texts.get(pid)
+                if text is not None and keys[pos] in text.split("\x00"):
+                    found.setdefault(pid, RANK_NAME_PREFIX)
+
+            # 3. Word prefix, walking the query word with the fewest prefix matches
+            if len(found) < budget:
+                keys, ids = self._word_keys, self._word_ids
+                lo, hi = min(((bisect_left(keys, t), bisect_left(keys, t + "\uffff")) for t in tokens),
+                             key=lambda r: r[1] - r[0])
+                self._collect((ids[i] for i in range(lo, hi)), tokens, texts, found, RANK_WORD_PREFIX, budget)
+
+            # 4. Substring inside a word, via the rarest trigram of any query word
+            if len(found) < limit:
+                postings = [self._trigram_ids.get(t[i:i + 3], ()) for t in tokens for i in range(len(t) - 2)]
+                if postings:
+                    self._collect(min(postings, key=len), tokens, texts, found, RANK_SUBSTRING, budget)
+
+            ranked = sorted(found, key=lambda pid: (found[pid], len(records[pid].name_en), records[pid].name_en))
+            return [records[pid] for pid in ranked[:limit]]
+
+    @staticmethod
+    def _collect(candidates, tokens, texts, found, rank, budget):
+        """Adds candidates whose current text contains every token (also weeds out superseded entries)."""
+        for pid in candidates:
+            if pid in found:
+                continue
+            text = texts.get(pid)
+            if text is None:
+                continue
+            for t in tokens:
+                if t not in text:
+                    break
+            else:
+                found[pid] = rank
+                if len(found) >= budget:
+                    return
+
+
+product_search = ProductSearchIndex()
+product_catalog.add_listener(product_search.apply)
+if product_catalog.loaded:
+    product_search.rebuild(product_catalog.records())
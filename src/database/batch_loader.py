@@ -0,0 +1,166 @@
+"""
+Batched loaders for per-row lookups.
+
+Screens that list N parents and need something per parent (item count per sale, returned
+quantity per sale item, replacement lines per return item) collect the parent keys, run one
+grouped `IN (...)` query for all of them and fan the results back out, instead of one query
+per row. Keys are sent in chunks of CHUNK so the bound-parameter limit is never reached; a
+screen showing up to CHUNK parents therefore costs a fixed number of statements.
+
+The screens' whole loading sequences (parent query plus batched lookups) live here too, so
+check_query_counts.py counts the statements of the exact code the views run; QueryCounter
+counts the statements a connection executes (sqlite3 trace callback).
+"""
+from src.database.paging import KeysetQuery
+
+CHUNK = 500
+
+
+def _chunks(keys):
+    keys = list(dict.fromkeys(k for k in keys if k is not None))
+    for i in range(0, len(keys), CHUNK):
+        yield keys[i:i + CHUNK]
+
+
+def fetch_map(conn, sql, keys, default=None):
+    """
+    {key: value} from `sql`, a query with a `{keys}` placeholder for the IN list that selects
+    (key, value) pairs. Keys without a row map to `default`.
+    """
+    result = {}
+    for chunk in _chunks(keys):
+        marks = ",".join("?" for _ in chunk)
+        result.update((row[0], row[1]) for row in conn.execute(sql.format(keys=marks), chunk))
+    if default is not None:
+        for k in keys:
+            result.setdefault(k, default)
+    return result
+
+
+def fetch_groups(conn, sql, keys, key_column):
+    """{key: [row dicts]} from `sql` (with a `{keys}` placeholder), grouped on `key_column`."""
+    result = {}
+    for chunk in _chunks(keys):
+        marks = ",".join("?" for _ in chunk)
+        for row in conn.execute(sql.format(keys=marks), chunk):
+            result.setdefault(row[key_column], []).append(dict(row))
+    return result
+
+
+# -- loaders used by the screens
+
+def sale_item_counts(conn, sale_ids, table="sale_items", column="quantity"):
+    """Per sale: SUM(quantity) (pharmacy reports) or COUNT(*) of lines (column=None)."""
+    agg = f"SUM({column})" if column else "COUNT(*)"
+    return fetch_map(conn, f"SELECT sale_id, {agg} FROM {table} WHERE sale_id IN ({{keys}}) GROUP BY sale_id",
+                     sale_ids, default=0)
+
+
+def pharmacy_returned_quantities(conn, sale_item_ids):
+    """Per pharmacy sale item: quantity already returned."""
+    return fetch_map(conn, """
+        SELECT sale_item_id, SUM(quantity) FROM pharmacy_return_items
+        WHERE sale_item_id IN ({keys}) GROUP BY sale_item_id
+    """, sale_item_ids, default=0)
+
+
+def pharmacy_replacements(conn, return_item_ids):
+    """Per pharmacy return item: its replacement lines."""
+    return fetch_groups(conn, """
+        SELECT return_item_id, product_name, quantity, unit_price, total_price
+        FROM pharmacy_replacement_items WHERE return_item_id IN ({keys})
+        ORDER BY id
+    """, return_item_ids, "return_item_id")
+
+
+# -- screen loading sequences
+
+def recent_store_sales(conn, date_range, limit=5):
+    """ReportsView transactions: [[invoice, created_at, customer, line count, total, payment type]], newest first."""
+    s_filter, s_params = date_range.where("s.created_at")
+    rows = conn.execute(f"""
+        SELECT s.id, s.invoice_number, s.created_at, IFNULL(c.name_en, 'Walk-in'), s.total_amount, s.payment_type
+        FROM sales s LEFT JOIN customers c ON s.customer_id = c.id
+        WHERE {s_filter} ORDER BY s.created_at DESC LIMIT ?
+    """, s_params + (limit,)).fetchall()
+    counts = sale_item_counts(conn, [r[0] for r in rows], column=None)
+    return [[r[1], r[2], r[3], counts.get(r[0], 0), r[4], r[5]] for r in rows]
+
+
+def pharmacy_invoice(conn, ref):
+    """PharmacyReturnsView.load_invoice: (sale, items with 'already_returned') for an invoice number or id, or (None, [])."""
+    sale = conn.execute("""
+        SELECT s.*, c.name as customer_name FROM pharmacy_sales s
+        LEFT JOIN pharmacy_customers c ON s.customer_id = c.id
+        WHERE s.invoice_number = ? OR s.id = ?
+    """, (ref, ref)).fetchone()
+    if not sale:
+        return None, []
+    items = [dict(item) for item in conn.execute("""
+        SELECT si.*, p.name_en FROM pharmacy_sale_items si
+        JOIN pharmacy_products p ON si.product_id = p.id WHERE si.sale_id = ?
+    """, (sale['id'],))]
+    returned = pharmacy_returned_quantities(conn, [item['id'] for item in items])
+    for item in items:
+        item['already_returned'] = returned.get(item['id']) or 0
+    return dict(sale), items
+
+
+def pharmacy_report_queries(date_range):
+    """PharmacyReportsView: keyset queries for the sales, returns and loans grids, newest first."""
+    def add_item_counts(conn, rows):
+        counts = sale_item_counts(conn, [r['id'] for r in rows], table="pharmacy_sale_items")
+        for r in rows:
+            r['total_items'] = counts.get(r['id']) or 0
+
+    def add_replacements(conn, rows):
+        reps = pharmacy_replacements(conn, [r['return_item_id'] for r in rows if r['action'] == 'REPLACEMENT'])
+        for r in rows:
+            r['replacements'] = reps.get(r['return_item_id'], [])
+
+    sales_q = KeysetQuery(
+        "s.id, s.invoice_number, s.total_amount, s.payment_type, c.name AS customer_name",
+        "pharmacy_sales s LEFT JOIN pharmacy_customers c ON s.customer_id = c.id",
+        date_range, created_at="s.created_at", id_column="s.id", after_page=add_item_counts)
+    returns_q = KeysetQuery(
+        """s.invoice_number, c.name AS customer_name, p.name_en AS item_name, ri.quantity AS qty_returned,
+           ri.action, r.refund_amount, r.refund_type, r.reason, ri.unit_price, ri.id AS return_item_id""",
+        """pharmacy_returns r
+           JOIN pharmacy_return_items ri ON r.id = ri.return_id
+           JOIN pharmacy_sales s ON r.original_sale_id = s.id
+           LEFT JOIN pharmacy_customers c ON s.customer_id = c.id
+           JOIN pharmacy_products p ON ri.product_id = p.id""",
+        date_range, created_at="r.created_at", id_column="ri.id", after_page=add_replacements)
+    loans_q = KeysetQuery(
+        "l.id, l.total_amount, l.balance, c.name AS customer_name, s.invoice_number",
+        """pharmacy_loans l
+           JOIN pharmacy_customers c ON l.customer_id = c.id
+           JOIN pharmacy_sales s ON l.sale_id = s.id""",
+        date_range, created_at="l.created_at", id_column="l.id")
+    return sales_q, returns_q, loans_q
+
+
+class QueryCounter:
+    """
+    Context manager counting the statements run on `conn`:
+
+        with QueryCounter(conn) as qc:
+            load_screen(conn)
+        assert qc.count == 3
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        self.conn.set_trace_callback(self.statements.append)
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.set_trace_callback(None)
+        return False
@@ -0,0 +1,266 @@
+"""
+Single-transaction checkout writer shared by the store and pharmacy POS screens.
+
+One checkout is one `BEGIN IMMEDIATE` transaction: sale header, every line (executemany; store
+lines are costed from the cost layers in src/database/costing.py), the inventory decrements,
+the loan and customer ledger entry for credit sales, the daily summary counters and (pharmacy)
+the finance ledger entry. Inventory is decremented with a guarded UPDATE (`... AND quantity >= ?`),
+so if another terminal sold the last units since the cart was built the update matches fewer
+rows than expected, the whole sale is rolled back and InsufficientStockError lists the short
+lines. Credit sales are checked against the loan limit inside the same transaction.
+
+Both run on a worker thread (task_manager.run_task). See benchmark_checkout.py for commit rates.
+"""
+import time
+import uuid
+
+from src.database import costing, customer_ledger, finance_ledger, sales_summary, sequences
+
+
+class CheckoutError(Exception):
+    """The sale was rejected; nothing was written."""
+
+
+class InsufficientStockError(CheckoutError):
+    def __init__(self, shortages):
+        # shortages: [(product_id, name, requested, available)]
+        self.shortages = shortages
+        super().__init__("Insufficient stock: " + ", ".join(
+            f"{name} ({requested:g} requested, {available:g} available)"
+            for _, name, requested, available in shortages))
+
+
+class CreditLimitError(CheckoutError):
+    def __init__(self, limit, balance, enabled=True):
+        self.limit = limit
+        self.balance = balance
+        self.enabled = enabled
+        if not enabled:
+            super().__init__("Credit sales are disabled for this customer.")
+        else:
+            super().__init__(f"Loan limit exceeded (limit {limit:,.2f}, balance {balance:,.2f})")
+
+
+class CheckoutLine:
+    """One cart line. `batch` / `expiry` are pharmacy only; the store fills `unit_cost` at checkout."""
+    __slots__ = ("product_id", "name", "qty", "unit_price", "barcode", "batch", "expiry", "unit_cost")
+
+    def __init__(self, product_id, name, qty, unit_price, barcode=None, batch=None, expiry=None, unit_cost=None):
+        self.product_id = product_id
+        self.name = name
+        self.qty = qty
+        self.unit_price = unit_price
+        self.barcode = barcode
+        self.batch = batch
+        self.expiry = expiry
+        self.unit_cost = unit_cost
+
+    @property
+    def total(self):
+        return self.unit_price * self.qty
+
+
+class CheckoutResult:
+    def __init__(self, sale_id, invoice_number, total_amount, timings, next_invoice=None):
+        self.sale_id = sale_id
+        self.invoice_number = invoice_number
+        self.total_amount = total_amount
+        self.next_invoice = next_invoice  # what this terminal's next sale will most likely get
+        # Milliseconds: lock (waiting for BEGIN IMMEDIATE), write, commit, total
+        self.timings = timings
+
+
+def _grouped(lines, key):
+    """Requested quantity per stock key, so a product on two lines is one guarded decrement."""
+    needed = {}
+    for line in lines:
+        k = key(line)
+        needed[k] = needed.get(k, 0) + line.qty
+    return needed
+
+
+class _Store:
+    tables = sales_summary.STORE
+    sequence = sequences.SALES_INVOICE
+
+    @staticmethod
+    def write_sale(cursor, invoice_number, user_id, customer_id, total_amount, payment_type, lines):
+        cursor.execute("""
+            INSERT INTO sales (invoice_number, user_id, customer_id, total_amount, payment_type, uuid)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (invoice_number, user_id, customer_id, total_amount, payment_type, str(uuid.uuid4())))
+        sale_id = cursor.lastrowid
+        # Cost the lines from the stock's cost layers; sets l.unit_cost for the summary as well
+        usage = costing.cost_lines(cursor, lines)
+        cursor.executemany("""
+            INSERT INTO sale_items
+            (sale_id, product_id, barcode, product_name, quantity, unit_price, total_price, uuid, cost_price_at_sale)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(sale_id, l.product_id, l.barcode, l.name, l.qty, l.unit_price, l.total, str(uuid.uuid4()), l.unit_cost)
+              for l in lines])
+        item_ids = [r[0] for r in cursor.execute("SELECT id FROM sale_items WHERE sale_id = ? ORDER BY id", (sale_id,))]
+        costing.record_usage(cursor, item_ids, usage)
+        return sale_id
+
+    @staticmethod
+    def decrement_stock(cursor, lines):
+        needed = _grouped(lines, lambda l: l.product_id)
+        # A product without an inventory row is treated as having 0 in stock
+        cursor.executemany("INSERT OR IGNORE INTO inventory (product_id, quantity) VALUES (?, 0)",
+                           [(pid,) for pid in needed])
+        cursor.executemany("""
+            UPDATE inventory SET quantity = quantity - ?
+            WHERE product_id = ?
+              AND (quantity >= ? OR EXISTS (
+                  SELECT 1 FROM products p WHERE p.id = inventory.product_id
+                  AND (p.allow_negative_stock = 1 OR p.track_inventory = 0)))
+        """, [(qty, pid, qty) for pid, qty in needed.items()])
+        return cursor.rowcount == len(needed)
+
+    @staticmethod
+    def shortages(cursor, lines):
+        needed = _grouped(lines, lambda l: l.product_id)
+        names = {l.product_id: l.name for l in lines}
+        marks = ",".join("?" for _ in needed)
+        rows = cursor.execute(f"""
+            SELECT p.id, COALESCE(i.quantity, 0) AS quantity, p.allow_negative_stock, p.track_inventory
+            FROM products p LEFT JOIN inventory i ON i.product_id = p.id
+            WHERE p.id IN ({marks})
+        """, list(needed)).fetchall()
+        found = {r["id"]: r for r in rows}
+        short = []
+        for pid, qty in needed.items():
+            r = found.get(pid)
+            if r is not None and (r["allow_negative_stock"] or not r["track_inventory"]):
+                continue
+            available = r["quantity"] if r is not None else 0
+            if available < qty:
+                short.append((pid, names[pid], qty, available))
+        return short
+
+    @staticmethod
+    def charge_credit(cursor, sale_id, customer_id, total_amount, note):
+        cust = cursor.execute("SELECT loan_enabled, loan_limit FROM customers WHERE id = ?", (customer_id,)).fetchone()
+        if cust is None:
+            raise CheckoutError("Customer not found.")
+        balance = customer_ledger.balance(cursor, customer_ledger.STORE, customer_id)
+        if cust["loan_enabled"] and balance + total_amount > (cust["loan_limit"] or 0):
+            raise CreditLimitError(cust["loan_limit"] or 0, balance)
+        customer_ledger.post(cursor, customer_ledger.STORE, customer_id, customer_ledger.SALE, total_amount, sale_id, note)
+        cursor.execute("INSERT INTO loans (customer_id, sale_id, loan_amount, status) VALUES (?, ?, ?, 'PENDING')",
+                       (customer_id, sale_id, total_amount))
+
+    @staticmethod
+    def post_ledger(cursor, sale_id, payment_type, total_amount, cogs):
+        pass   # the store reports from the daily summary alone
+
+
+class _Pharmacy:
+    tables = sales_summary.PHARMACY
+    sequence = sequences.PHARMACY_INVOICE
+
+    @staticmethod
+    def write_sale(cursor, invoice_number, user_id, customer_id, total_amount, payment_type, lines):
+        cursor.execute("""
+            INSERT INTO pharmacy_sales (invoice_number, user_id, total_amount, customer_id, payment_type)
+            VALUES (?, ?, ?, ?, ?)
+        """, (invoice_number, user_id, total_amount, customer_id, payment_type))
+        sale_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT INTO pharmacy_sale_items
+            (sale_id, product_id, product_name, batch_number, expiry_date, quantity, unit_price, total_price, cost_price_at_sale)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(sale_id, l.product_id, l.name, l.batch, l.expiry, l.qty, l.unit_price, l.total, l.unit_cost or 0)
+              for l in lines])
+        return sale_id
+
+    @staticmethod
+    def decrement_stock(cursor, lines):
+        needed = _grouped(lines, lambda l: (l.product_id, l.batch))
+        cursor.executemany("""
+            UPDATE pharmacy_inventory SET quantity = quantity - ?
+            WHERE product_id = ? AND batch_number = ? AND quantity >= ?
+        """, [(qty, pid, batch, qty) for (pid, batch), qty in needed.items()])
+        return cursor.rowcount == len(needed)
+
+    @staticmethod
+    def shortages(cursor, lines):
+        needed = _grouped(lines, lambda l: (l.product_id, l.batch))
+        names = {(l.product_id, l.batch): l.name for l in lines}
+        short = []
+        for (pid, batch), qty in needed.items():
+            row = cursor.execute("SELECT quantity FROM pharmacy_inventory WHERE product_id = ? AND batch_number = ?",
+                                 (pid, batch)).fetchone()
+            available = row["quantity"] if row else 0
+            if available < qty:
+                short.append((pid, names[(pid, batch)], qty, available))
+        return short
+
+    @staticmethod
+    def charge_credit(cursor, sale_id, customer_id, total_amount, note):
+        cust = cursor.execute("SELECT loan_enabled, loan_limit FROM pharmacy_customers WHERE id = ?",
+                              (customer_id,)).fetchone()
+        if cust is None:
+            raise CheckoutError("Customer not found")
+        balance = customer_ledger.balance(cursor, customer_ledger.PHARMACY, customer_id)
+        limit = cust["loan_limit"] or 0
+        if not cust["loan_enabled"] or (limit > 0 and balance + total_amount > limit):
+            raise CreditLimitError(limit, balance, enabled=bool(cust["loan_enabled"]))
+        customer_ledger.post(cursor, customer_ledger.PHARMACY, customer_id, customer_ledger.SALE, total_amount,
+                             sale_id, note)
+        cursor.execute("""
+            INSERT INTO pharmacy_loans (customer_id, sale_id, total_amount, balance)
+            VALUES (?, ?, ?, ?)
+        """, (customer_id, sale_id, total_amount, total_amount))
+
+    @staticmethod
+    def post_ledger(cursor, sale_id, payment_type, total_amount, cogs):
+        finance_ledger.post_sale(cursor, sale_id, payment_type, total_amount, cogs)
+
+
+STORE = _Store
+PHARMACY = _Pharmacy
+
+
+def checkout(conn, business, lines, invoice_number, user_id, customer_id, payment_type, total_amount, terminal=None):
+    """
+    Writes one sale atomically on `conn` (which must not be inside a transaction) and returns a
+    CheckoutResult. With invoice_number=None the number is taken from the business's invoice
+    sequence (src/database/sequences.py) inside the same transaction. Raises
+    InsufficientStockError / CreditLimitError / CheckoutError after rolling back; any other
+    exception is re-raised after the rollback as well.
+    """
+    if not lines:
+        raise CheckoutError("Cart is empty.")
+    t0 = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    t1 = time.perf_counter()
+    try:
+        cursor = conn.cursor()
+        next_invoice = None
+        if invoice_number is None:
+            _, invoice_number = sequences.allocate(cursor, business.sequence, terminal)
+            next_invoice = sequences.peek(cursor, business.sequence, terminal)
+        sale_id = business.write_sale(cursor, invoice_number, user_id, customer_id, total_amount, payment_type, lines)
+        if not business.decrement_stock(cursor, lines):
+            conn.rollback()
+            raise InsufficientStockError(business.shortages(conn.cursor(), lines))
+        if payment_type == "CREDIT":
+            business.charge_credit(cursor, sale_id, customer_id, total_amount, ", ".join(l.name for l in lines))
+        cogs = sales_summary.record_sale(cursor, business.tables, payment_type, total_amount,
+                                         [(l.product_id, l.qty, l.total, l.unit_cost) for l in lines])
+        business.post_ledger(cursor, sale_id, payment_type, total_amount, cogs)
+        t2 = time.perf_counter()
+        conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    t3 = time.perf_counter()
+    timings = {
+        "lock_ms": (t1 - t0) * 1000,
+        "write_ms": (t2 - t1) * 1000,
+        "commit_ms": (t3 - t2) * 1000,
+        "total_ms": (t3 - t0) * 1000,
+    }
+    return CheckoutResult(sale_id, invoice_number, total_amount, timings, next_invoice)
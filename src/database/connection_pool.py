@@ -0,0 +1,135 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Applied once when a pooled connection is opened (journal_mode is persistent per file,
+# the rest are per-connection settings that previously had to be re-applied every query).
+DEFAULT_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+
+class ConnectionPool:
+    """
+    Per-thread SQLite connection pool keyed by (thread, database path).
+
+    Each worker thread reuses its own connection for a given database, so the cost of
+    sqlite3.connect() and schema parsing is paid once per thread instead of once per query.
+    Callers keep using `with pool.acquire(path) as conn:` - the context manager only
+    commits/rolls back, it never closes the shared connection.
+
+    The pool never closes a connection another thread may be using: eviction (beyond max_open
+    pooled connections) and close_all() only drop the pool's reference to other threads'
+    connections, so a thread mid-query finishes on the connection it holds and gets a fresh one
+    on its next acquire(); CPython closes the old one once its last reference goes away.
+
+    Nesting: a thread gets the same connection from every acquire(), so a nested
+    `with pool.acquire(path)` shares the outer block's transaction and the inner block's exit
+    commits (or rolls back) the outer caller's work too. acquire() warns when it hands out a
+    connection with a transaction already open; pass the outer connection or cursor down
+    instead of acquiring again.
+
+    Connections belong to threads, so pooling pays off on long-lived threads: the task manager's
+    workers never expire (src/core/blocking_task_manager.py), and a short-lived thread should
+    call release_thread() before it exits.
+    """
+
+    def __init__(self, max_open=16, pragmas=DEFAULT_PRAGMAS):
+        self.max_open = max_open
+        self.pragmas = tuple(pragmas)
+        self._lock = threading.Lock()
+        self._conns = OrderedDict()  # (thread ident, db path) -> connection, LRU order
+
+        # Counters (read via stats())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.health_failures = 0
+
+    def acquire(self, db_path):
+        """Returns the calling thread's connection to db_path, opening one on a miss."""
+        key = (threading.get_ident(), db_path)
+        with self._lock:
+            conn = self._conns.get(key)
+            if conn is not None:
+                if self._is_healthy(conn):
+                    self._conns.move_to_end(key)
+                    self.hits += 1
+                    if conn.in_transaction:
+                        print(f"[WARNING] Connection pool: nested acquire() of {db_path} inside an open "
+                              f"transaction; the inner block will commit/roll back the outer work")
+                    return conn
+                del self._conns[key]
+                self.health_failures += 1
+            self.misses += 1
+
+        conn = self._open(db_path)
+
+        with self._lock:
+            self._conns[key] = conn
+            # Evicting only drops the pool's reference: a thread still using the connection
+            # keeps it alive and CPython closes it once that last reference goes away.
+            while len(self._conns) > self.max_open:
+                self._conns.popitem(last=False)
+                self.evictions += 1
+        return conn
+
+    def _open(self, db_path):
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error as e:
+                print(f"[WARNING] Connection pool could not apply '{pragma}': {e}")
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn):
+        """Cheap liveness check: closed connections raise on any attribute access to the db."""
+        try:
+            conn.total_changes
+            return True
+        except sqlite3.ProgrammingError:
+            return False
+
+    def release_thread(self):
+        """Drops the calling thread's connections (e.g. before a worker thread exits)."""
+        ident = threading.get_ident()
+        with self._lock:
+            for key in [k for k in self._conns if k[0] == ident]:
+                self._conns.pop(key).close()
+
+    def close_all(self, db_path=None):
+        """
+        Retires every pooled connection (optionally only those for db_path): the calling thread's
+        are closed now, other threads' are dropped from the pool and reopened on their next
+        acquire(), so a query running on another worker is never cut off.
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            keys = [k for k in self._conns if db_path is None or k[1] == db_path]
+            conns = [self._conns.pop(k) for k in keys if k[0] == ident]
+            for key in keys:
+                self._conns.pop(key, None)
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+                "health_failures": self.health_failures,
+                "open": len(self._conns),
+            }
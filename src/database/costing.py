@@ -0,0 +1,292 @@
+"""
+Store cost layers: what the units in stock cost, so every sale is costed when it happens.
+
+Each stock receipt adds a layer (product, quantity, remaining, unit_cost). Checkout consumes
+layers and stamps sale_items.cost_price_at_sale with the cost of the units it took; the units
+taken from each layer are kept in cost_layer_usage, so a return puts them back into the layer
+they came from and is costed at that layer's price (return_items.unit_cost). With the cost on
+the line itself, COGS is a single-table sum (SUM(quantity * cost_price_at_sale)) that stays
+right after a product's cost price changes.
+
+The method is a store setting (app_settings 'costing_method'):
+  FIFO     - layers are consumed oldest first, each receipt keeps its own price.
+  AVERAGE  - a product has one open layer; a receipt merges into it at the weighted average.
+Units sold beyond the layers (negative stock, untracked products) are costed at the product's
+cost_price. Stock changed outside these functions leaves the layers out of step with inventory;
+check / sync finds and fixes that:
+
+    python -m src.database.costing check
+    python -m src.database.costing sync
+    python -m src.database.costing method AVERAGE
+"""
+FIFO = "FIFO"
+AVERAGE = "AVERAGE"
+METHODS = (FIFO, AVERAGE)
+SETTING = "costing_method"
+EPSILON = 1e-9
+
+
+class CostingError(Exception):
+    pass
+
+
+def method(cursor):
+    row = cursor.execute("SELECT value FROM app_settings WHERE key = ?", (SETTING,)).fetchone()
+    return row[0] if row and row[0] in METHODS else FIFO
+
+
+def set_method(cursor, new_method):
+    """Switches the costing method. Going to AVERAGE merges each product's open layers into one."""
+    if new_method not in METHODS:
+        raise CostingError(f"Unknown costing method: {new_method}")
+    if new_method == AVERAGE and method(cursor) != AVERAGE:
+        rows = cursor.execute("""
+            SELECT product_id, SUM(remaining), SUM(remaining * unit_cost), COUNT(*) FROM cost_layers
+            WHERE remaining > 0 GROUP BY product_id HAVING COUNT(*) > 1
+        """).fetchall()
+        for product_id, remaining, value, _ in rows:
+            cursor.execute("UPDATE cost_layers SET remaining = 0 WHERE product_id = ? AND remaining > 0", (product_id,))
+            _insert_layer(cursor, product_id, remaining, value / remaining, "AVERAGE", None)
+    cursor.execute("INSERT OR REPLACE INTO app_settings (key, value) VALUES (?, ?)", (SETTING, new_method))
+
+
+def _product_costs(cursor, product_ids):
+    """products.cost_price for the given ids (the fallback cost)."""
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return {}
+    marks = ",".join("?" for _ in product_ids)
+    rows = cursor.execute(f"SELECT id, cost_price FROM products WHERE id IN ({marks})", product_ids).fetchall()
+    return {r[0]: r[1] or 0 for r in rows}
+
+
+def _insert_layer(cursor, product_id, quantity, unit_cost, source, ref_id):
+    cursor.execute("""
+        INSERT INTO cost_layers (product_id, quantity, remaining, unit_cost, source, ref_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (product_id, quantity, quantity, unit_cost, source, ref_id))
+    return cursor.lastrowid
+
+
+# ---------------------------------------------------------------- stock in
+
+def receive(cursor, product_id, quantity, unit_cost=None, source="RECEIPT", ref_id=None, costing=None):
+    """
+    Adds `quantity` units at `unit_cost` (the product's cost_price when None). Returns the layer id:
+    a new layer under FIFO, the product's open layer (re-averaged) under AVERAGE.
+    """
+    if quantity <= 0:
+        return None
+    if unit_cost is None:
+        unit_cost = _product_costs(cursor, [product_id]).get(product_id, 0)
+    if (costing or method(cursor)) == AVERAGE:
+        row = cursor.execute("""
+            SELECT id, remaining, unit_cost FROM cost_layers
+            WHERE product_id = ? AND remaining > 0 ORDER BY id DESC LIMIT 1
+        """, (product_id,)).fetchone()
+        if row is not None:
+            layer_id, remaining, cost = row
+            total = remaining + quantity
+            cursor.execute("""
+                UPDATE cost_layers SET quantity = quantity + ?, remaining = ?, unit_cost = ? WHERE id = ?
+            """, (quantity, total, (remaining * cost + quantity * unit_cost) / total, layer_id))
+            return layer_id
+    return _insert_layer(cursor, product_id, quantity, unit_cost, source, ref_id)
+
+
+# ---------------------------------------------------------------- stock out
+
+def _take(cursor, needed):
+    """
+    Consumes {product_id: quantity} from the open layers (oldest first) with one read and one
+    executemany. Returns {product_id: [(layer_id, quantity, unit_cost)]} and the units per product
+    the layers could not cover.
+    """
+    if not needed:
+        return {}, {}
+    marks = ",".join("?" for _ in needed)
+    rows = cursor.execute(f"""
+        SELECT id, product_id, remaining, unit_cost FROM cost_layers
+        WHERE product_id IN ({marks}) AND remaining > 0 ORDER BY product_id, id
+    """, list(needed)).fetchall()
+    left = dict(needed)
+    taken, updates = {}, []
+    for layer_id, product_id, remaining, unit_cost in rows:
+        want = left[product_id]
+        if want <= EPSILON:
+            continue
+        qty = min(want, remaining)
+        left[product_id] = want - qty
+        taken.setdefault(product_id, []).append((layer_id, qty, unit_cost))
+        updates.append((qty, layer_id))
+    cursor.executemany("UPDATE cost_layers SET remaining = MAX(0, ROUND(remaining - ?, 9)) WHERE id = ?", updates)
+    short = {pid: qty for pid, qty in left.items() if qty > EPSILON}
+    return taken, short
+
+
+def cost_lines(cursor, lines):
+    """
+    Costs checkout lines (objects with product_id / qty): consumes their units from the layers,
+    sets each line's unit_cost and returns the layer usage per line, in line order, for
+    record_usage() once the sale_items rows exist.
+    """
+    needed = {}
+    for line in lines:
+        if line.qty > 0:
+            needed[line.product_id] = needed.get(line.product_id, 0) + line.qty
+    taken, short = _take(cursor, needed)
+    fallback = _product_costs(cursor, short)
+
+    # Hand the consumed slices out to the lines in order; what is left over is the shortfall
+    slices = {pid: list(parts) for pid, parts in taken.items()}
+    usage = []
+    for line in lines:
+        want, cost, used = max(line.qty, 0), 0.0, []
+        parts = slices.get(line.product_id, [])
+        while want > EPSILON and parts:
+            layer_id, qty, unit_cost = parts[0]
+            use = min(want, qty)
+            used.append((layer_id, use, unit_cost))
+            cost += use * unit_cost
+            want -= use
+            if qty - use > EPSILON:
+                parts[0] = (layer_id, qty - use, unit_cost)
+            else:
+                parts.pop(0)
+        if want > EPSILON:
+            cost += want * fallback.get(line.product_id, 0)
+        line.unit_cost = cost / line.qty if line.qty else fallback.get(line.product_id, 0)
+        usage.append(used)
+    return usage
+
+
+def record_usage(cursor, sale_item_ids, usage):
+    """Stores which layers each sale line was taken from (ids and usage in the same order)."""
+    rows = {}
+    for item_id, used in zip(sale_item_ids, usage):
+        for layer_id, qty, unit_cost in used:
+            key = (item_id, layer_id)
+            if key in rows:
+                rows[key] = (rows[key][0] + qty, unit_cost)
+            else:
+                rows[key] = (qty, unit_cost)
+    cursor.executemany("INSERT INTO cost_layer_usage (sale_item_id, layer_id, quantity, unit_cost) VALUES (?, ?, ?, ?)",
+                       [(item_id, layer_id, qty, cost) for (item_id, layer_id), (qty, cost) in rows.items()])
+
+
+def restock_return(cursor, sale_item_id, quantity):
+    """
+    Puts `quantity` returned units of a sale line back into stock and returns their unit cost.
+    Units go back to the layers they were sold from (the most recently taken first) at the cost
+    they left at; under AVERAGE they are merged into the product's open layer instead. Units
+    with no usage record (sold short, or before costing existed) come back at the line's
+    cost_price_at_sale as a new layer.
+    """
+    item = cursor.execute("SELECT product_id, cost_price_at_sale FROM sale_items WHERE id = ?",
+                          (sale_item_id,)).fetchone()
+    if item is None:
+        raise CostingError(f"Sale line {sale_item_id} not found")
+    product_id, line_cost = item[0], item[1] or 0
+    costing = method(cursor)
+    rows = cursor.execute("""
+        SELECT layer_id, quantity - returned, unit_cost FROM cost_layer_usage
+        WHERE sale_item_id = ? AND quantity - returned > 0 ORDER BY layer_id DESC
+    """, (sale_item_id,)).fetchall()
+
+    want, cost = quantity, 0.0
+    for layer_id, open_qty, unit_cost in rows:
+        if want <= EPSILON:
+            break
+        qty = min(want, open_qty)
+        cursor.execute("UPDATE cost_layer_usage SET returned = returned + ? WHERE sale_item_id = ? AND layer_id = ?",
+                       (qty, sale_item_id, layer_id))
+        if costing == AVERAGE:
+            receive(cursor, product_id, qty, unit_cost, "RETURN", sale_item_id, costing)
+        else:
+            cursor.execute("UPDATE cost_layers SET remaining = remaining + ? WHERE id = ?", (qty, layer_id))
+        cost += qty * unit_cost
+        want -= qty
+    if want > EPSILON:
+        receive(cursor, product_id, want, line_cost, "RETURN", sale_item_id, costing)
+        cost += want * line_cost
+    return cost / quantity if quantity else line_cost
+
+
+# ---------------------------------------------------------------- counts
+
+def adjust_to(cursor, product_id, quantity, unit_cost=None, source="ADJUST"):
+    """
+    Brings a product's open layers to a counted `quantity`: a surplus is added as a layer at
+    `unit_cost` (cost_price when None), a loss is written off from the oldest layers.
+    """
+    row = cursor.execute("SELECT COALESCE(SUM(remaining), 0) FROM cost_layers WHERE product_id = ? AND remaining > 0",
+                         (product_id,)).fetchone()
+    diff = max(quantity or 0, 0) - row[0]
+    if diff > EPSILON:
+        receive(cursor, product_id, diff, unit_cost, source)
+    elif diff < -EPSILON:
+        _take(cursor, {product_id: -diff})
+    return diff
+
+
+def clear(cursor):
+    """Empties all layers and usage (system reset: sales deleted, stock zeroed)."""
+    cursor.execute("DELETE FROM cost_layer_usage")
+    cursor.execute("UPDATE cost_layers SET remaining = 0 WHERE remaining > 0")
+
+
+def stock_value(cursor, product_id=None):
+    """(units, value) held in the open layers, for one product or the whole store."""
+    sql = "SELECT COALESCE(SUM(remaining), 0), COALESCE(SUM(remaining * unit_cost), 0) FROM cost_layers WHERE remaining > 0"
+    if product_id is None:
+        return tuple(cursor.execute(sql).fetchone())
+    return tuple(cursor.execute(sql + " AND product_id = ?", (product_id,)).fetchone())
+
+
+def check(cursor):
+    """Products whose open layers do not add up to the inventory quantity: [(product_id, inventory, layers)]."""
+    rows = cursor.execute("""
+        SELECT p.id, MAX(COALESCE(i.quantity, 0), 0) AS stock,
+               COALESCE((SELECT SUM(remaining) FROM cost_layers l WHERE l.product_id = p.id AND l.remaining > 0), 0)
+        FROM products p LEFT JOIN inventory i ON i.product_id = p.id
+    """).fetchall()
+    return [(pid, stock, layers) for pid, stock, layers in rows if abs(stock - layers) > 1e-6]
+
+
+def sync(cursor):
+    """Adjusts every product's layers to its inventory quantity (new layers at cost_price). Returns the count."""
+    mismatched = check(cursor)
+    for product_id, stock, _ in mismatched:
+        adjust_to(cursor, product_id, stock)
+    return len(mismatched)
+
+
+def _run(action):
+    from src.database.db_manager import db_manager
+    conn = db_manager.get_store_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = action(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "check":
+        mismatched = _run(check)
+        for pid, stock, layers in mismatched:
+            print(f"product {pid}: inventory {stock:g}, cost layers {layers:g}")
+        print(f"[INFO] {len(mismatched)} product(s) out of step")
+    elif command == "sync":
+        print(f"[INFO] Adjusted cost layers of {_run(sync)} product(s) to inventory")
+    elif command == "method" and len(sys.argv) == 3:
+        _run(lambda cursor: set_method(cursor, sys.argv[2].upper()))
+        print(f"[INFO] Costing method set to {sys.argv[2].upper()}")
+    else:
+        print("usage: python -m src.database.costing check | sync | method FIFO|AVERAGE")
+        sys.exit(2)
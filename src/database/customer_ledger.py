@@ -0,0 +1,191 @@
+"""
+Per-customer account ledger with running balances.
+
+Every change to what a customer owes appends one row to the business's ledger table, in the
+same transaction as the document behind it, carrying the signed amount (+ owed, - settled)
+and the balance after it:
+
+    kind        written by                          amount
+    SALE        credit checkout                     + sale total (note: item names)
+    PAYMENT     loan / customer payment             - amount received
+    RETURN      refund of a credit sale to account  - refund
+    ADJUSTMENT  migration (opening balance)         stored balance - history
+
+The customer row's `balance` is a copy of the latest running balance, written by post() only,
+so list screens keep reading one column. A statement pages the ledger newest first on the
+(customer_id, created_at) index (src/database/paging.py) with the balance already on every
+row: the first page of a customer with ten years of credit costs the same as one with a week.
+
+reconcile() is the periodic job: one grouped pass recomputes each customer's balance from its
+last checkpoint plus the entries after it, flags customers whose ledger or stored balance
+disagrees, and checkpoints the others so the next run starts from there.
+
+    python -m src.database.customer_ledger reconcile [store|pharmacy]
+    python -m src.database.customer_ledger sync [store|pharmacy]
+"""
+from src.database.paging import KeysetQuery
+
+SALE = "SALE"
+PAYMENT = "PAYMENT"
+RETURN = "RETURN"
+ADJUSTMENT = "ADJUSTMENT"
+KINDS = (SALE, PAYMENT, RETURN, ADJUSTMENT)
+
+TOLERANCE = 0.005
+
+
+class LedgerTables:
+    """Table names for one business database (created and backfilled by store migration 9 / pharmacy 12)."""
+
+    def __init__(self, ledger, checkpoints, customers):
+        self.ledger = ledger
+        self.checkpoints = checkpoints
+        self.customers = customers
+
+
+STORE = LedgerTables("customer_ledger", "customer_balance_checkpoints", "customers")
+PHARMACY = LedgerTables("pharmacy_customer_ledger", "pharmacy_customer_balance_checkpoints", "pharmacy_customers")
+BUSINESSES = {"store": STORE, "pharmacy": PHARMACY}
+
+
+def balance(cursor, tables, customer_id):
+    """Running balance after the customer's latest entry (0 without any)."""
+    row = cursor.execute(f"""
+        SELECT balance FROM {tables.ledger} WHERE customer_id = ?
+        ORDER BY created_at DESC, id DESC LIMIT 1
+    """, (customer_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def post(cursor, tables, customer_id, kind, amount, ref_id=None, note=None):
+    """Appends an entry (amount > 0 raises what the customer owes) and returns the new balance."""
+    new_balance = balance(cursor, tables, customer_id) + amount
+    cursor.execute(f"""
+        INSERT INTO {tables.ledger} (customer_id, kind, ref_id, amount, balance, note)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (customer_id, kind, ref_id, amount, new_balance, note))
+    cursor.execute(f"UPDATE {tables.customers} SET balance = ? WHERE id = ?", (new_balance, customer_id))
+    return new_balance
+
+
+def post_many(cursor, tables, entries):
+    """post() for a batch of (customer_id, kind, amount, ref_id, note): executemany, one balance update per customer."""
+    balances = {}
+    rows = []
+    for customer_id, kind, amount, ref_id, note in entries:
+        if customer_id not in balances:
+            balances[customer_id] = balance(cursor, tables, customer_id)
+        balances[customer_id] += amount
+        rows.append((customer_id, kind, ref_id, amount, balances[customer_id], note))
+    cursor.executemany(f"""
+        INSERT INTO {tables.ledger} (customer_id, kind, ref_id, amount, balance, note)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    cursor.executemany(f"UPDATE {tables.customers} SET balance = ? WHERE id = ?",
+                       [(b, customer_id) for customer_id, b in balances.items()])
+    return balances
+
+
+def statement(tables, customer_id):
+    """KeysetQuery over a customer's entries, newest first (kind, ref_id, amount, balance, note, created_at)."""
+    return KeysetQuery("id, kind, ref_id, amount, balance, note, created_at", tables.ledger,
+                       where="customer_id = ?", params=(customer_id,))
+
+
+def clear(cursor, tables):
+    """Data reset: drops every entry and checkpoint and zeroes the stored balances."""
+    cursor.execute(f"DELETE FROM {tables.ledger}")
+    cursor.execute(f"DELETE FROM {tables.checkpoints}")
+    cursor.execute(f"UPDATE {tables.customers} SET balance = 0")
+
+
+# ---------------------------------------------------------------- reconcile
+
+def reconcile(cursor, tables, full=False):
+    """
+    Recomputes every customer's balance in one pass (from their last checkpoint, or from the
+    first entry with full=True) and returns the ones that drifted:
+    [(customer_id, {'ledger' | 'balance': (stored, expected)})] - 'ledger' is the running
+    balance on the latest entry, 'balance' the copy on the customer row. Customers that agree
+    get a checkpoint at their latest entry. Must run inside a write transaction.
+    """
+    base = "SELECT NULL AS customer_id, 0 AS entry_id, 0 AS balance WHERE 0" if full else f"""
+        SELECT k.customer_id, k.entry_id, k.balance FROM {tables.checkpoints} k
+        JOIN (SELECT customer_id, MAX(entry_id) AS entry_id FROM {tables.checkpoints} GROUP BY customer_id) last
+          ON last.customer_id = k.customer_id AND last.entry_id = k.entry_id"""
+    rows = cursor.execute(f"""
+        WITH base AS ({base}),
+        moves AS (
+            SELECT l.customer_id, SUM(l.amount) AS amount, MAX(l.id) AS last_id
+            FROM {tables.ledger} l LEFT JOIN base b ON b.customer_id = l.customer_id
+            WHERE l.id > COALESCE(b.entry_id, 0)
+            GROUP BY l.customer_id
+        )
+        SELECT c.id, COALESCE(c.balance, 0), COALESCE(b.balance, 0) + COALESCE(m.amount, 0),
+               (SELECT balance FROM {tables.ledger} WHERE customer_id = c.id
+                ORDER BY created_at DESC, id DESC LIMIT 1),
+               m.last_id
+        FROM {tables.customers} c
+        LEFT JOIN base b ON b.customer_id = c.id
+        LEFT JOIN moves m ON m.customer_id = c.id
+    """).fetchall()
+
+    drifted, checkpoints = [], []
+    for customer_id, stored, expected, ledger, last_id in rows:
+        ledger = ledger or 0
+        diff = {name: (have, expected) for name, have in (("ledger", ledger), ("balance", stored))
+                if abs(have - expected) > TOLERANCE}
+        if diff:
+            drifted.append((customer_id, diff))
+        elif last_id is not None:
+            checkpoints.append((customer_id, last_id, expected))
+    cursor.executemany(f"INSERT OR IGNORE INTO {tables.checkpoints} (customer_id, entry_id, balance) VALUES (?, ?, ?)",
+                       checkpoints)
+    return drifted
+
+
+def sync(cursor, tables):
+    """Copies the latest running balance onto every customer row that disagrees; returns how many."""
+    cursor.execute(f"""
+        UPDATE {tables.customers} SET balance = COALESCE((
+            SELECT balance FROM {tables.ledger} WHERE customer_id = {tables.customers}.id
+            ORDER BY created_at DESC, id DESC LIMIT 1), 0)
+        WHERE ABS(COALESCE(balance, 0) - COALESCE((
+            SELECT balance FROM {tables.ledger} WHERE customer_id = {tables.customers}.id
+            ORDER BY created_at DESC, id DESC LIMIT 1), 0)) > {TOLERANCE}
+    """)
+    return cursor.rowcount
+
+
+def _run(business, action):
+    from src.database.db_manager import db_manager
+    conn = db_manager.get_pharmacy_connection() if business == "pharmacy" else db_manager.get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = action(conn.cursor(), BUSINESSES[business])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    businesses = sys.argv[2:] or list(BUSINESSES)
+    if command not in ("reconcile", "sync") or any(b not in BUSINESSES for b in businesses):
+        print("usage: python -m src.database.customer_ledger reconcile | sync [store|pharmacy]")
+        sys.exit(2)
+    failed = False
+    for business in businesses:
+        if command == "sync":
+            print(f"[INFO] {business}: {_run(business, sync)} customer balance(s) updated from the ledger")
+            continue
+        drifted = _run(business, reconcile)
+        for customer_id, diff in drifted:
+            print(f"{business} customer {customer_id}: "
+                  + ", ".join(f"{name} {s:,.2f} (expected {e:,.2f})" for name, (s, e) in diff.items()))
+        print(f"[INFO] {business}: {len(drifted)} customer(s) with drifted balances")
+        failed = failed or bool(drifted)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,104 @@
+"""
+Index-friendly period filters for report queries.
+
+Timestamps are stored as UTC 'YYYY-MM-DD HH:MM:SS' (SQLite CURRENT_TIMESTAMP), so a local
+calendar period is turned into a half-open [start, end) pair of UTC timestamp strings and
+compared against the bare column. Unlike DATE(created_at, 'localtime') = '...', this lets
+SQLite use the created_at indexes instead of scanning the whole table.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+
+TIMESTAMP_FMT = "%Y-%m-%d %H:%M:%S"
+DATE_FMT = "%Y-%m-%d"
+
+
+def _to_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(value, DATE_FMT).date()
+
+
+def local_day_start_utc(day):
+    """UTC timestamp string for local midnight at the start of `day`."""
+    local_midnight = datetime.combine(day, time.min).astimezone()
+    return local_midnight.astimezone(timezone.utc).strftime(TIMESTAMP_FMT)
+
+
+class DateRange:
+    """Local calendar days [start_date, end_date). Either bound may be None (unbounded)."""
+
+    def __init__(self, start_date=None, end_date=None):
+        self.start_date = _to_date(start_date)
+        self.end_date = _to_date(end_date)
+
+    @property
+    def start(self):
+        return local_day_start_utc(self.start_date) if self.start_date else None
+
+    @property
+    def end(self):
+        return local_day_start_utc(self.end_date) if self.end_date else None
+
+    @property
+    def days(self):
+        if self.start_date and self.end_date:
+            return (self.end_date - self.start_date).days
+        return None
+
+    def where(self, column):
+        """(sql, params) filtering a UTC timestamp column such as s.created_at."""
+        return self._clause(column, self.start, self.end)
+
+    def where_date(self, column):
+        """(sql, params) filtering a local DATE column such as expense_date."""
+        start = self.start_date.strftime(DATE_FMT) if self.start_date else None
+        end = self.end_date.strftime(DATE_FMT) if self.end_date else None
+        return self._clause(column, start, end)
+
+    @staticmethod
+    def _clause(column, start, end):
+        parts, params = [], []
+        if start is not None:
+            parts.append(f"{column} >= ?")
+            params.append(start)
+        if end is not None:
+            parts.append(f"{column} < ?")
+            params.append(end)
+        return (" AND ".join(parts) or "1=1"), tuple(params)
+
+    def __eq__(self, other):
+        return isinstance(other, DateRange) and (self.start_date, self.end_date) == (other.start_date, other.end_date)
+
+    def __hash__(self):
+        return hash((self.start_date, self.end_date))
+
+    def __repr__(self):
+        return f"DateRange({self.start_date}, {self.end_date})"
+
+
+def period_range(period, date_from=None, date_to=None, today=None):
+    """
+    Maps a report period to a DateRange:
+      daily      - today
+      weekly     - the last 7 days plus today
+      monthly    - the last 30 days plus today
+      this_month - the 1st of this month up to today
+      custom     - date_from .. date_to, both inclusive; a missing bound is open-ended
+      all_time   - unbounded
+    """
+    today = _to_date(today) or datetime.now().date()
+    tomorrow = today + timedelta(days=1)
+    if period == "daily":
+        return DateRange(today, tomorrow)
+    if period == "weekly":
+        return DateRange(today - timedelta(days=7), tomorrow)
+    if period == "monthly":
+        return DateRange(today - timedelta(days=30), tomorrow)
+    if period == "this_month":
+        return DateRange(today.replace(day=1), tomorrow)
+    if period == "custom":
+        date_to = _to_date(date_to)
+        return DateRange(date_from, date_to + timedelta(days=1) if date_to else None)
+    if period == "all_time":
+        return DateRange()
+    raise ValueError(f"Unknown report period: {period}")
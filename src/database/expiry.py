@@ -0,0 +1,168 @@
+"""
+Pharmacy expiry tracking.
+
+Batches with stock are indexed by expiry_date (partial index, `WHERE quantity > 0`), so "what
+expires within N days" is a range scan over the batches in the window instead of a pass over
+every inventory row. Every query here repeats `quantity > 0` so SQLite can use that index.
+
+Once a day (src/core/expiry_monitor.py) run_nightly() writes a snapshot of the buckets below
+into pharmacy_expiry_buckets (batch count, units and value at cost and at sale price) and
+records each batch's bucket in pharmacy_expiry_state. A batch whose bucket changed since the
+previous run (e.g. from 60 to 30 days, or to expired) is returned as a crossing, which the
+monitor turns into a signal for the alerts.
+
+    bucket    days left
+    expired   < 0
+    d30       0 - 30
+    d60       31 - 60
+    d90       61 - 90
+
+    python -m src.database.expiry run
+"""
+from datetime import date, timedelta
+
+EXPIRED = "expired"
+D30 = "d30"
+D60 = "d60"
+D90 = "d90"
+# (bucket, last day-left in it), ascending; "expired" covers everything before today
+BUCKETS = ((EXPIRED, -1), (D30, 30), (D60, 60), (D90, 90))
+HORIZON_DAYS = BUCKETS[-1][1]
+
+_BUCKET_CASE = """
+    CASE WHEN days_left < 0 THEN 'expired' WHEN days_left <= 30 THEN 'd30'
+         WHEN days_left <= 60 THEN 'd60' ELSE 'd90' END
+"""
+
+
+def _day(today):
+    return today or date.today()
+
+
+def expiring_within(cursor, days, today=None):
+    """
+    Batches with stock expiring within `days` days, already-expired ones included, soonest first:
+    [{'inventory_id', 'product_id', 'name', 'batch', 'expiry', 'days_left', 'quantity'}].
+    """
+    today = _day(today)
+    rows = cursor.execute("""
+        SELECT i.id, i.product_id, p.name_en, i.batch_number, i.expiry_date, i.quantity,
+               CAST(julianday(i.expiry_date) - julianday(?) AS INTEGER) AS days_left
+        FROM pharmacy_inventory i
+        JOIN pharmacy_products p ON i.product_id = p.id
+        WHERE i.quantity > 0 AND i.expiry_date <= ?
+        ORDER BY i.expiry_date ASC
+    """, (today.isoformat(), (today + timedelta(days=days)).isoformat())).fetchall()
+    return [{
+        'inventory_id': r['id'],
+        'product_id': r['product_id'],
+        'name': r['name_en'],
+        'batch': r['batch_number'] or "N/A",
+        'expiry': r['expiry_date'],
+        'days_left': r['days_left'],
+        'quantity': r['quantity'],
+    } for r in rows if r['days_left'] is not None]  # unparseable dates are skipped, as before
+
+
+def _horizon_rows(cursor, today):
+    """(inventory_id, bucket, units, cost, sale) for every stocked batch inside the horizon."""
+    return cursor.execute(f"""
+        SELECT id, {_BUCKET_CASE} AS bucket, quantity, cost, sale FROM (
+            SELECT i.id, i.quantity, i.quantity * COALESCE(p.cost_price, 0) AS cost,
+                   i.quantity * COALESCE(p.sale_price, 0) AS sale,
+                   CAST(julianday(i.expiry_date) - julianday(?) AS INTEGER) AS days_left
+            FROM pharmacy_inventory i
+            JOIN pharmacy_products p ON i.product_id = p.id
+            WHERE i.quantity > 0 AND i.expiry_date <= ?
+        ) WHERE days_left IS NOT NULL
+    """, (today.isoformat(), (today + timedelta(days=HORIZON_DAYS)).isoformat())).fetchall()
+
+
+def compute_buckets(cursor, today=None):
+    """Current totals per bucket: {bucket: {'batches', 'units', 'cost_value', 'sale_value'}}."""
+    return _totals(_horizon_rows(cursor, _day(today)))
+
+
+def _totals(rows):
+    totals = {b: {'batches': 0, 'units': 0.0, 'cost_value': 0.0, 'sale_value': 0.0} for b, _ in BUCKETS}
+    for row in rows:
+        t = totals[row['bucket']]
+        t['batches'] += 1
+        t['units'] += row['quantity']
+        t['cost_value'] += row['cost']
+        t['sale_value'] += row['sale']
+    return totals
+
+
+def run_nightly(cursor, today=None):
+    """
+    Writes today's bucket snapshot and refreshes the per-batch state. Must run inside a write
+    transaction. Returns (buckets, crossings); crossings are
+    [{'inventory_id', 'name', 'batch', 'expiry', 'from', 'to'}] for batches that entered a
+    nearer bucket since the last run ('from' is None for batches new to the horizon).
+    """
+    today = _day(today)
+    as_of = today.isoformat()
+    rows = _horizon_rows(cursor, today)
+    buckets = _totals(rows)
+    cursor.executemany("""
+        INSERT OR REPLACE INTO pharmacy_expiry_buckets (as_of, bucket, batches, units, cost_value, sale_value)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(as_of, b, t['batches'], t['units'], t['cost_value'], t['sale_value']) for b, t in buckets.items()])
+
+    previous = {r[0]: r[1] for r in cursor.execute("SELECT inventory_id, bucket FROM pharmacy_expiry_state")}
+    current = {r['id']: r['bucket'] for r in rows}
+    changed = [iid for iid, b in current.items() if previous.get(iid) != b]
+
+    crossings = []
+    if changed:
+        marks = ",".join("?" for _ in changed)
+        for r in cursor.execute(f"""
+            SELECT i.id, p.name_en, i.batch_number, i.expiry_date FROM pharmacy_inventory i
+            JOIN pharmacy_products p ON i.product_id = p.id WHERE i.id IN ({marks})
+        """, changed):
+            crossings.append({'inventory_id': r['id'], 'name': r['name_en'], 'batch': r['batch_number'],
+                              'expiry': r['expiry_date'], 'from': previous.get(r['id']), 'to': current[r['id']]})
+        crossings.sort(key=lambda c: c['expiry'])
+
+    cursor.execute("DELETE FROM pharmacy_expiry_state")
+    cursor.executemany("INSERT INTO pharmacy_expiry_state (inventory_id, bucket, as_of) VALUES (?, ?, ?)",
+                       [(iid, b, as_of) for iid, b in current.items()])
+    return buckets, crossings
+
+
+def last_run(cursor):
+    row = cursor.execute("SELECT MAX(as_of) FROM pharmacy_expiry_buckets").fetchone()
+    return row[0] if row else None
+
+
+def snapshot(cursor, as_of=None):
+    """Stored bucket totals for a day (default: the latest run), same shape as compute_buckets()."""
+    as_of = as_of or last_run(cursor)
+    return {r['bucket']: {'batches': r['batches'], 'units': r['units'], 'cost_value': r['cost_value'],
+                          'sale_value': r['sale_value']}
+            for r in cursor.execute("SELECT * FROM pharmacy_expiry_buckets WHERE as_of = ?", (as_of,))}
+
+
+def run():
+    from src.database.db_manager import db_manager
+    conn = db_manager.get_pharmacy_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        buckets, crossings = run_nightly(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    for bucket, t in buckets.items():
+        print(f"[INFO] {bucket:>8}: {t['batches']} batches, {t['units']:g} units, "
+              f"cost {t['cost_value']:,.2f}, sale {t['sale_value']:,.2f}")
+    print(f"[INFO] {len(crossings)} batches crossed an expiry threshold")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2 or sys.argv[1] != "run":
+        print("usage: python -m src.database.expiry run")
+        sys.exit(2)
+    run()
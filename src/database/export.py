@@ -0,0 +1,271 @@
+"""
+Streaming CSV / XLSX export of store and pharmacy tables.
+
+An export runs one SELECT and pulls its rows with fetchmany(FETCH_CHUNK), handing them to the
+writer through a generator, so a year of sale lines is never held in memory: CSV rows go straight
+to the file and XLSX uses openpyxl's write-only workbook (rows are streamed to a temporary sheet
+file, not kept as cell objects). The single statement also gives the export one consistent
+snapshot of the database (WAL readers do not block the tills).
+
+Between chunks the export reports progress(done, total) and checks cancelled(); a cancelled
+export raises ExportCancelled and leaves nothing behind. Output goes to "<path>.part" first and is
+renamed only once complete.
+
+EXPORTS defines what can be exported (columns, joins, which column the period filters). Runs on
+a worker thread from src/ui/export_dialog.py, or from the command line:
+
+    python -m src.database.export <name> <file.csv|file.xlsx> [YYYY-MM-DD YYYY-MM-DD]
+"""
+import csv
+import os
+
+FETCH_CHUNK = 1000
+
+STORE = "store"
+PHARMACY = "pharmacy"
+
+
+class ExportError(Exception):
+    """The export could not be written."""
+
+
+class ExportCancelled(ExportError):
+    """The user cancelled the export; the partial file was removed."""
+
+
+class ExportDefinition:
+    """
+    One exportable dataset: `columns` are (header, sql expression) pairs over `from_`.
+    `created_at` (a UTC timestamp column) or `day_column` (a local DATE column) is what a
+    DateRange filters, and rows come out in that column's order when one is set.
+    """
+
+    def __init__(self, name, title, db, columns, from_, where="1=1", created_at=None, day_column=None,
+                 order_by=None):
+        self.name = name
+        self.title = title
+        self.db = db
+        self.columns = columns
+        self.from_ = from_
+        self.where = where
+        self.created_at = created_at
+        self.day_column = day_column
+        self.order_by = order_by or created_at or day_column
+
+    @property
+    def headers(self):
+        return [h for h, _ in self.columns]
+
+    def query(self, date_range=None):
+        """(sql, params) selecting the rows, filtered to `date_range` when the dataset has a period."""
+        parts, params = [f"({self.where})"], []
+        if date_range is not None and (self.created_at or self.day_column):
+            clause, clause_params = (date_range.where(self.created_at) if self.created_at
+                                     else date_range.where_date(self.day_column))
+            parts.append(clause)
+            params += clause_params
+        sql = f"SELECT {', '.join(expr for _, expr in self.columns)} FROM {self.from_} WHERE {' AND '.join(parts)}"
+        if self.order_by:
+            sql += f" ORDER BY {self.order_by}"
+        return sql, params
+
+    def count(self, conn, date_range=None):
+        sql, params = self.query(date_range)
+        return conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+
+def _defs(*definitions):
+    return {d.name: d for d in definitions}
+
+
+EXPORTS = _defs(
+    # -- store
+    ExportDefinition("inventory", "Inventory", STORE, [
+        ("ID", "p.id"), ("Barcode", "p.barcode"), ("Product Name", "p.name_en"), ("Brand", "COALESCE(p.brand, '')"),
+        ("Cost Price", "p.cost_price"), ("Sale Price", "p.sale_price"), ("Quantity", "COALESCE(i.quantity, 0)"),
+        ("Min Stock", "p.min_stock"), ("Unit", "COALESCE(p.unit, 'pcs')"),
+    ], "products p LEFT JOIN inventory i ON p.id = i.product_id", where="p.is_active = 1", order_by="p.name_en"),
+    ExportDefinition("customers", "Customers", STORE, [
+        ("ID", "c.id"), ("Name", "c.name_en"), ("Phone", "c.phone"), ("Balance", "c.balance"),
+        ("Loan Limit", "c.loan_limit"), ("Loan Enabled", "c.loan_enabled"), ("Active", "c.is_active"),
+    ], "customers c", order_by="c.id"),
+    ExportDefinition("sales", "Sales", STORE, [
+        ("ID", "s.id"), ("Invoice", "s.invoice_number"), ("Date", "s.created_at"),
+        ("Customer", "IFNULL(c.name_en, 'Walk-in')"), ("User", "u.username"), ("Payment", "s.payment_type"),
+        ("Total", "s.total_amount"),
+    ], """sales s LEFT JOIN customers c ON s.customer_id = c.id
+          LEFT JOIN users u ON s.user_id = u.id""", created_at="s.created_at", order_by="s.created_at, s.id"),
+    ExportDefinition("sale_items", "Sale Lines", STORE, [
+        ("Invoice", "s.invoice_number"), ("Date", "s.created_at"), ("Product ID", "si.product_id"),
+        ("Barcode", "si.barcode"), ("Product", "si.product_name"), ("Quantity", "si.quantity"),
+        ("Unit Price", "si.unit_price"), ("Total", "si.total_price"), ("Unit Cost", "si.cost_price_at_sale"),
+    ], "sales s JOIN sale_items si ON si.sale_id = s.id", created_at="s.created_at", order_by="s.created_at, si.id"),
+    ExportDefinition("returns", "Returns", STORE, [
+        ("Return ID", "sr.id"), ("Date", "sr.created_at"), ("Invoice", "s.invoice_number"),
+        ("Product", "p.name_en"), ("Quantity", "ri.quantity"), ("Refund Price", "ri.refund_price"),
+        ("Unit Cost", "ri.unit_cost"), ("Return Total", "sr.refund_amount"), ("Reason", "sr.reason"),
+    ], """sales_returns sr JOIN sales s ON sr.sale_id = s.id
+          JOIN return_items ri ON ri.return_id = sr.id
+          LEFT JOIN products p ON ri.product_id = p.id""", created_at="sr.created_at", order_by="sr.created_at, ri.id"),
+    ExportDefinition("loans", "Loans", STORE, [
+        ("ID", "l.id"), ("Date", "l.created_at"), ("Customer", "c.name_en"), ("Invoice", "s.invoice_number"),
+        ("Amount", "l.loan_amount"), ("Paid", "l.paid_amount"), ("Due Date", "l.due_date"), ("Status", "l.status"),
+    ], """loans l JOIN customers c ON l.customer_id = c.id
+          LEFT JOIN sales s ON l.sale_id = s.id""", created_at="l.created_at", order_by="l.created_at, l.id"),
+    ExportDefinition("customer_payments", "Customer Payments", STORE, [
+        ("ID", "cp.id"), ("Date", "cp.created_at"), ("Customer", "c.name_en"), ("Amount", "cp.amount"),
+        ("Method", "cp.payment_method"), ("Reference", "cp.reference_number"),
+    ], "customer_payments cp JOIN customers c ON cp.customer_id = c.id", created_at="cp.created_at",
+        order_by="cp.created_at, cp.id"),
+    ExportDefinition("expenses", "Expenses", STORE, [
+        ("Date", "e.expense_date"), ("Category", "e.category"), ("Amount", "e.amount"), ("User", "u.username"),
+        ("Description", "e.description"),
+    ], "expenses e LEFT JOIN users u ON e.user_id = u.id", day_column="e.expense_date", order_by="e.expense_date, e.id"),
+
+    # -- pharmacy
+    ExportDefinition("pharmacy_products", "Pharmacy Products", PHARMACY, [
+        ("ID", "p.id"), ("Barcode", "p.barcode"), ("Name", "p.name_en"), ("Generic Name", "p.generic_name"),
+        ("Brand", "p.brand"), ("Size", "p.size"), ("Cost Price", "p.cost_price"), ("Sale Price", "p.sale_price"),
+        ("Stock", "(SELECT COALESCE(SUM(i.quantity), 0) FROM pharmacy_inventory i WHERE i.product_id = p.id)"),
+        ("Min Stock", "p.min_stock"), ("UOM", "p.uom"), ("Active", "p.is_active"),
+    ], "pharmacy_products p", order_by="p.name_en"),
+    ExportDefinition("pharmacy_inventory", "Pharmacy Batches", PHARMACY, [
+        ("Product ID", "p.id"), ("Barcode", "p.barcode"), ("Name", "p.name_en"), ("Batch", "i.batch_number"),
+        ("Expiry", "i.expiry_date"), ("Quantity", "i.quantity"), ("Cost Price", "p.cost_price"),
+        ("Sale Price", "p.sale_price"),
+    ], "pharmacy_inventory i JOIN pharmacy_products p ON i.product_id = p.id", where="i.quantity > 0",
+        order_by="p.name_en, i.expiry_date"),
+    ExportDefinition("pharmacy_customers", "Pharmacy Customers", PHARMACY, [
+        ("ID", "c.id"), ("Name", "c.name"), ("Phone", "c.phone"), ("Balance", "c.balance"),
+        ("Loan Limit", "c.loan_limit"), ("Loan Enabled", "c.loan_enabled"), ("Active", "c.is_active"),
+    ], "pharmacy_customers c", order_by="c.id"),
+    ExportDefinition("pharmacy_sales", "Pharmacy Sales", PHARMACY, [
+        ("ID", "s.id"), ("Invoice", "s.invoice_number"), ("Date", "s.created_at"),
+        ("Customer", "IFNULL(c.name, 'Walk-in')"), ("Payment", "s.payment_type"), ("Gross", "s.gross_amount"),
+        ("Discount", "s.discount_amount"), ("Total", "s.total_amount"),
+    ], "pharmacy_sales s LEFT JOIN pharmacy_customers c ON s.customer_id = c.id", created_at="s.created_at",
+        order_by="s.created_at, s.id"),
+    ExportDefinition("pharmacy_sale_items", "Pharmacy Sale Lines", PHARMACY, [
+        ("Invoice", "s.invoice_number"), ("Date", "si.created_at"), ("Product ID", "si.product_id"),
+        ("Product", "si.product_name"), ("Batch", "si.batch_number"), ("Expiry", "si.expiry_date"),
+        ("Quantity", "si.quantity"), ("Unit Price", "si.unit_price"), ("Total", "si.total_price"),
+        ("Unit Cost", "si.cost_price_at_sale"),
+    ], "pharmacy_sale_items si JOIN pharmacy_sales s ON si.sale_id = s.id", created_at="si.created_at",
+        order_by="si.created_at, si.id"),
+    ExportDefinition("pharmacy_returns", "Pharmacy Returns", PHARMACY, [
+        ("Return ID", "r.id"), ("Date", "r.created_at"), ("Invoice", "s.invoice_number"), ("Product", "p.name_en"),
+        ("Quantity", "ri.quantity"), ("Unit Price", "ri.unit_price"), ("Action", "ri.action"),
+        ("Refund", "r.refund_amount"), ("Refund Type", "r.refund_type"), ("Reason", "r.reason"),
+    ], """pharmacy_returns r JOIN pharmacy_return_items ri ON ri.return_id = r.id
+          JOIN pharmacy_sales s ON r.original_sale_id = s.id
+          LEFT JOIN pharmacy_products p ON ri.product_id = p.id""", created_at="r.created_at",
+        order_by="r.created_at, ri.id"),
+    ExportDefinition("pharmacy_loans", "Pharmacy Loans", PHARMACY, [
+        ("ID", "l.id"), ("Date", "l.created_at"), ("Customer", "c.name"), ("Invoice", "s.invoice_number"),
+        ("Total", "l.total_amount"), ("Paid", "l.paid_amount"), ("Balance", "l.balance"), ("Due Date", "l.due_date"),
+        ("Status", "l.status"),
+    ], """pharmacy_loans l JOIN pharmacy_customers c ON l.customer_id = c.id
+          LEFT JOIN pharmacy_sales s ON l.sale_id = s.id""", created_at="l.created_at", order_by="l.created_at, l.id"),
+    ExportDefinition("pharmacy_payments", "Pharmacy Payments", PHARMACY, [
+        ("ID", "pp.id"), ("Date", "pp.created_at"), ("Customer", "c.name"), ("Invoice", "s.invoice_number"),
+        ("Amount", "pp.amount"), ("Method", "pp.payment_method"), ("Reference", "pp.transaction_ref"),
+    ], """pharmacy_payments pp LEFT JOIN pharmacy_customers c ON pp.customer_id = c.id
+          LEFT JOIN pharmacy_sales s ON pp.sale_id = s.id""", created_at="pp.created_at",
+        order_by="pp.created_at, pp.id"),
+    ExportDefinition("pharmacy_expenses", "Pharmacy Expenses", PHARMACY, [
+        ("Date", "e.expense_date"), ("Category", "e.category"), ("Amount", "e.amount"),
+        ("Description", "e.description"),
+    ], "pharmacy_expenses e", day_column="e.expense_date", order_by="e.expense_date, e.id"),
+)
+
+
+def iter_chunks(conn, sql, params=(), chunk=FETCH_CHUNK):
+    """Yields lists of up to `chunk` rows of one statement (fetchmany), never the whole result."""
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _write_csv(path, headers, chunks):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for rows in chunks:
+            writer.writerows(rows)
+
+
+def _write_xlsx(path, headers, chunks, title):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportError("XLSX export needs openpyxl (pip install openpyxl)")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title[:31])
+    ws.append(headers)
+    for rows in chunks:
+        for row in rows:
+            ws.append(tuple(row))
+    wb.save(path)
+
+
+def export(conn, definition, path, date_range=None, progress=None, cancelled=None, chunk=FETCH_CHUNK):
+    """
+    Writes `definition` (an ExportDefinition or its name) to `path`; the format follows the
+    extension (.xlsx, anything else is CSV). progress(done, total) is called after every chunk
+    and cancelled() checked before the next one. Returns the number of rows written.
+    """
+    if isinstance(definition, str):
+        definition = EXPORTS[definition]
+    total = definition.count(conn, date_range)
+    sql, params = definition.query(date_range)
+    done = 0
+
+    def chunks():
+        nonlocal done
+        for rows in iter_chunks(conn, sql, params, chunk):
+            if cancelled and cancelled():
+                raise ExportCancelled(f"Export of {definition.title} cancelled")
+            yield rows
+            done += len(rows)
+            if progress:
+                progress(done, total)
+
+    part = path + ".part"
+    try:
+        if path.lower().endswith(".xlsx"):
+            _write_xlsx(part, definition.headers, chunks(), definition.title)
+        else:
+            _write_csv(part, definition.headers, chunks())
+        os.replace(part, path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return done
+
+
+def run(name, path, date_from=None, date_to=None):
+    from src.database.db_manager import db_manager
+    from src.database.date_ranges import period_range
+    definition = EXPORTS[name]
+    connect = db_manager.get_pharmacy_connection if definition.db == PHARMACY else db_manager.get_connection
+    date_range = period_range("custom", date_from, date_to) if date_from else None
+    with connect() as conn:
+        rows = export(conn, definition, path, date_range,
+                      progress=lambda done, total: print(f"\r[INFO] {done}/{total} rows", end="", flush=True))
+    print(f"\n[INFO] Exported {rows} rows of {definition.title} to {path}")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) not in (3, 5) or sys.argv[1] not in EXPORTS:
+        print("usage: python -m src.database.export <name> <file.csv|file.xlsx> [YYYY-MM-DD YYYY-MM-DD]")
+        print("exports: " + ", ".join(EXPORTS))
+        sys.exit(2)
+    run(*sys.argv[1:])
@@ -0,0 +1,145 @@
+"""
+Append-only pharmacy finance ledger.
+
+Every event that moves money or recognises profit adds one row to pharmacy_finance_ledger, in
+the same transaction as the event, with its effect already split into revenue, cost of goods
+and expense. The split is cash basis, as the finance screen has always reported it:
+
+    kind      written by                       revenue           cogs               expense
+    SALE      checkout                         total (cash)      cost (cash)        -
+    PAYMENT   loan payment                     amount            cost share settled -
+    RETURN    return / replacement             -refund (cash)    -cost (cash)       -
+    EXPENSE   pharmacy_expenses (trigger)      -                 -                  amount
+    SALARY    salary posting (trigger)         -                 -                  amount
+
+Credit sales and refunds to the customer's account are recorded with their amount but no
+revenue / cost: those are recognised when the customer pays. Rows are never updated or deleted
+(triggers refuse it); an edited or deleted expense adds a reversing row. A period's figures are
+then one grouped sum over the covering (day, kind, ...) index, however many years of payments
+the database holds.
+
+    python -m src.database.finance_ledger verify
+"""
+from src.database import sales_summary
+
+SALE = "SALE"
+PAYMENT = "PAYMENT"
+RETURN = "RETURN"
+EXPENSE = "EXPENSE"
+SALARY = "SALARY"
+KINDS = (SALE, PAYMENT, RETURN, EXPENSE, SALARY)
+SALARY_CATEGORY = "Salary"
+
+_EXPENSE_DAY = "COALESCE({row}.expense_date, DATE('now', 'localtime'))"
+
+
+def post(cursor, kind, ref_id, amount, revenue=0, cogs=0, expense=0, day=None):
+    cursor.execute("""
+        INSERT INTO pharmacy_finance_ledger (day, kind, ref_id, amount, revenue, cogs, expense)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (day or sales_summary.today(), kind, ref_id, amount, revenue, cogs, expense))
+
+
+def post_sale(cursor, sale_id, payment_type, total_amount, cogs, day=None):
+    """A checkout; cash sales are revenue now, credit sales when paid (post_payment)."""
+    cash = payment_type == "CASH"
+    post(cursor, SALE, sale_id, total_amount, total_amount if cash else 0, cogs if cash else 0, day=day)
+
+
+def post_payment(cursor, payment_id, amount, cogs, day=None):
+    """A loan payment with the cost share of the sale it settles (sales_summary.sale_cost_share)."""
+    post(cursor, PAYMENT, payment_id, amount, amount, cogs, day=day)
+
+
+def post_return(cursor, return_id, refund_amount, cost, refund_type, day=None):
+    """A return; a cash refund reverses revenue and cost, an account refund only reduces the debt."""
+    cash = refund_type == "CASH"
+    post(cursor, RETURN, return_id, refund_amount, -refund_amount if cash else 0, -cost if cash else 0, day=day)
+
+
+def post_salaries(cursor, month, user_id=None):
+    """
+    Posts each active pharmacy salary for `month` ('YYYY-MM') as a Salary expense (which the
+    expense trigger enters in the ledger). Staff already posted for that month are skipped.
+    Returns the number posted.
+    """
+    rows = cursor.execute("""
+        SELECT s.id, s.amount, COALESCE(u.username, 'User ' || s.user_id) AS name
+        FROM pharmacy_employee_salary s LEFT JOIN pharmacy_users u ON u.id = s.user_id
+        WHERE s.is_active = 1 AND s.amount > 0
+    """).fetchall()
+    posted = 0
+    for salary_id, amount, name in rows:
+        description = f"Salary {month}: {name}"
+        exists = cursor.execute("SELECT 1 FROM pharmacy_expenses WHERE category = ? AND description = ?",
+                                (SALARY_CATEGORY, description)).fetchone()
+        if exists:
+            continue
+        cursor.execute("""
+            INSERT INTO pharmacy_expenses (category, amount, description, expense_date, created_by)
+            VALUES (?, ?, ?, DATE('now', 'localtime'), ?)
+        """, (SALARY_CATEGORY, amount, description, user_id))
+        posted += 1
+    return posted
+
+
+def totals(cursor, date_range):
+    """{kind: {'amount', 'revenue', 'cogs', 'expense', 'entries'}} over a DateRange (every kind present)."""
+    where, params = date_range.where_date("day")
+    result = {k: {"amount": 0, "revenue": 0, "cogs": 0, "expense": 0, "entries": 0} for k in KINDS}
+    for kind, amount, revenue, cogs, expense, entries in cursor.execute(f"""
+        SELECT kind, SUM(amount), SUM(revenue), SUM(cogs), SUM(expense), COUNT(*)
+        FROM pharmacy_finance_ledger WHERE {where} GROUP BY kind
+    """, params):
+        result[kind] = {"amount": amount, "revenue": revenue, "cogs": cogs, "expense": expense, "entries": entries}
+    return result
+
+
+# ---------------------------------------------------------------- verify
+
+def verify(cursor):
+    """
+    Days on which the ledger disagrees with the daily sales summary or the expense table:
+    [(day, {figure: (ledger, expected)})].
+    """
+    ledger = {}
+    for day, kind, revenue, cogs, expense in cursor.execute("""
+        SELECT day, kind, SUM(revenue), SUM(cogs), SUM(expense) FROM pharmacy_finance_ledger GROUP BY day, kind
+    """):
+        ledger.setdefault(day, {})[kind] = (revenue or 0, cogs or 0, expense or 0)
+
+    expected = {}
+    for row in cursor.execute(f"""
+        SELECT day, cash_revenue + payments_received - cash_returns_amount,
+               cash_cogs + payments_cogs - cash_returns_cogs
+        FROM {sales_summary.PHARMACY.daily}
+    """):
+        expected[row[0]] = [row[1] or 0, row[2] or 0, 0]
+    for day, total in cursor.execute(f"""
+        SELECT {_EXPENSE_DAY.format(row="e")}, SUM(e.amount) FROM pharmacy_expenses e GROUP BY 1
+    """):
+        expected.setdefault(day, [0, 0, 0])[2] = total or 0
+
+    mismatched = []
+    for day in sorted(set(ledger) | set(expected)):
+        kinds = ledger.get(day, {})
+        have = [sum(v[i] for v in kinds.values()) for i in range(3)]
+        want = expected.get(day, [0, 0, 0])
+        diff = {name: (h, w) for name, h, w in zip(("revenue", "cogs", "expense"), have, want) if abs(h - w) > 0.005}
+        if diff:
+            mismatched.append((day, diff))
+    return mismatched
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2 or sys.argv[1] != "verify":
+        print("usage: python -m src.database.finance_ledger verify")
+        sys.exit(2)
+    from src.database.db_manager import db_manager
+    with db_manager.get_pharmacy_connection() as conn:
+        mismatched = verify(conn.cursor())
+    for day, diff in mismatched:
+        print(f"{day}: " + ", ".join(f"{name} {h:,.2f} (expected {w:,.2f})" for name, (h, w) in diff.items()))
+    print(f"[INFO] {len(mismatched)} day(s) where the ledger differs")
+    sys.exit(1 if mismatched else 0)
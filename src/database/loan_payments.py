@@ -0,0 +1,251 @@
+"""
+Loan payment allocation shared by the store and pharmacy loan screens.
+
+A payment is applied across the customer's open loans in one `BEGIN IMMEDIATE` transaction:
+the open loans are read once in allocation order, the plan (which loan gets how much) is
+computed from that read, and the loan updates and allocation rows are written with
+executemany. Each allocation row (loan_payment_allocations / pharmacy_loan_payment_allocations)
+records the payment, the loan, the amount applied and what the loan still owed after it, so
+every loan's settlement history can be audited. The same transaction writes the payment row,
+the customer ledger entry (src/database/customer_ledger.py), the daily summary and (pharmacy)
+the finance ledger entry with the cost share of the sales it settles.
+
+Allocation order is OLDEST (loan creation order, the default) or DUE_DATE (earliest due date
+first, undated loans last). A pharmacy payment taken against one loan settles that loan first.
+Whatever exceeds the open loans stays on the customer ledger as credit.
+
+receive() records one payment; receive_many() a batch (end-of-day collections) in a single
+transaction, reading the open loans of every customer in the batch at once:
+
+    python -m src.database.loan_payments import store|pharmacy collections.csv [--due-date]
+
+The CSV has customer_id, amount and optionally method and reference columns.
+"""
+from src.database import batch_loader, customer_ledger, finance_ledger, sales_summary
+
+OLDEST = "oldest"
+DUE_DATE = "due_date"
+ORDERS = {
+    OLDEST: "l.created_at, l.id",
+    DUE_DATE: "l.due_date IS NULL, l.due_date, l.created_at, l.id",
+}
+
+TOLERANCE = 0.005
+
+
+class PaymentError(Exception):
+    """The payment was rejected; nothing was written."""
+
+
+class _Store:
+    loans = "loans"
+    payments = "customer_payments"
+    allocations = "loan_payment_allocations"
+    ledger = customer_ledger.STORE
+    summary = sales_summary.STORE
+    outstanding = "l.loan_amount - COALESCE(l.paid_amount, 0)"
+    open = "l.status = 'PENDING'"
+
+    @staticmethod
+    def write_payments(cursor, rows):
+        # rows: (payment_id, customer_id, amount, method, reference, first_loan_id)
+        cursor.executemany("""
+            INSERT INTO customer_payments (id, customer_id, amount, payment_method, reference_number)
+            VALUES (?, ?, ?, ?, ?)
+        """, [r[:5] for r in rows])
+
+    @staticmethod
+    def update_loans(cursor, settled):
+        # settled: {loan_id: (applied, outstanding_after)}
+        cursor.executemany("UPDATE loans SET paid_amount = COALESCE(paid_amount, 0) + ?, status = ? WHERE id = ?",
+                           [(applied, 'PAID' if after <= TOLERANCE else 'PENDING', loan_id)
+                            for loan_id, (applied, after) in settled.items()])
+
+    @staticmethod
+    def cost_ratios(cursor, sale_ids):
+        return {}   # the store recognises no cost on payments
+
+    @staticmethod
+    def post_finance(cursor, payment_id, amount, cogs):
+        pass
+
+
+class _Pharmacy:
+    loans = "pharmacy_loans"
+    payments = "pharmacy_payments"
+    allocations = "pharmacy_loan_payment_allocations"
+    ledger = customer_ledger.PHARMACY
+    summary = sales_summary.PHARMACY
+    outstanding = "COALESCE(l.balance, 0)"
+    open = "l.status != 'COMPLETED'"
+
+    @staticmethod
+    def write_payments(cursor, rows):
+        cursor.executemany("""
+            INSERT INTO pharmacy_payments (id, customer_id, amount, payment_method, transaction_ref, loan_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    @staticmethod
+    def update_loans(cursor, settled):
+        cursor.executemany("""
+            UPDATE pharmacy_loans SET paid_amount = COALESCE(paid_amount, 0) + ?, balance = COALESCE(balance, 0) - ?,
+                   status = ?
+            WHERE id = ?
+        """, [(applied, applied, 'COMPLETED' if after <= TOLERANCE else 'PARTIAL', loan_id)
+              for loan_id, (applied, after) in settled.items()])
+
+    @staticmethod
+    def cost_ratios(cursor, sale_ids):
+        """Per sale: cost of goods per unit of money paid against it (sales_summary.sale_cost_share)."""
+        return {sale_id: sales_summary.sale_cost_share(cursor, sale_id, 1.0) for sale_id in set(sale_ids)}
+
+    @staticmethod
+    def post_finance(cursor, payment_id, amount, cogs):
+        finance_ledger.post_payment(cursor, payment_id, amount, cogs)
+
+
+STORE = _Store
+PHARMACY = _Pharmacy
+BUSINESSES = {"store": STORE, "pharmacy": PHARMACY}
+
+
+def open_loans(cursor, business, customer_ids, order=OLDEST, first_loan_id=None):
+    """{customer_id: [[loan_id, sale_id, outstanding], ...]} in allocation order, one query per CHUNK customers."""
+    first = f"CASE WHEN l.id = {int(first_loan_id)} THEN 0 ELSE 1 END, " if first_loan_id is not None else ""
+    groups = batch_loader.fetch_groups(cursor, f"""
+        SELECT l.customer_id, l.id, l.sale_id, {business.outstanding} AS outstanding
+        FROM {business.loans} l
+        WHERE l.customer_id IN ({{keys}}) AND {business.open} AND {business.outstanding} > {TOLERANCE}
+        ORDER BY l.customer_id, {first}{ORDERS[order]}
+    """, customer_ids, "customer_id")
+    return {customer_id: [[r["id"], r["sale_id"], r["outstanding"]] for r in rows]
+            for customer_id, rows in groups.items()}
+
+
+def allocate(loans, amount):
+    """
+    The plan for `amount` over `loans` (open_loans() entries, whose outstanding is reduced in
+    place): [(loan_id, sale_id, applied, outstanding_after)] and the unapplied remainder.
+    """
+    plan = []
+    remaining = amount
+    for loan in loans:
+        if remaining <= TOLERANCE:
+            break
+        loan_id, sale_id, outstanding = loan
+        if outstanding <= TOLERANCE:
+            continue
+        applied = min(remaining, outstanding)
+        loan[2] = outstanding - applied
+        remaining -= applied
+        plan.append((loan_id, sale_id, applied, loan[2]))
+    return plan, max(remaining, 0)
+
+
+def _next_id(cursor, table):
+    row = cursor.execute(f"""
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{table}'), 0),
+                   COALESCE((SELECT MAX(id) FROM {table}), 0))
+    """).fetchone()
+    return row[0] + 1
+
+
+def _record(cursor, business, payments, order, first_loan_id=None):
+    """Writes payments [(customer_id, amount, method, reference)]; returns [(payment_id, plan)]."""
+    known = batch_loader.fetch_map(cursor, f"SELECT id, 1 FROM {business.ledger.customers} WHERE id IN ({{keys}})",
+                                   [p[0] for p in payments])
+    for customer_id, amount, _, _ in payments:
+        if customer_id not in known:
+            raise PaymentError(f"Customer {customer_id} not found")
+        if not amount or amount <= 0:
+            raise PaymentError(f"Invalid payment amount {amount} for customer {customer_id}")
+    loans = open_loans(cursor, business, [p[0] for p in payments], order, first_loan_id)
+    payment_id = _next_id(cursor, business.payments)
+
+    results, payment_rows, ledger_entries, allocation_rows, settled = [], [], [], [], {}
+    for customer_id, amount, method, reference in payments:
+        plan, _ = allocate(loans.get(customer_id, []), amount)
+        payment_rows.append((payment_id, customer_id, amount, method, reference, plan[0][0] if plan else None))
+        ledger_entries.append((customer_id, customer_ledger.PAYMENT, -amount, payment_id, reference or method))
+        for loan_id, _, applied, after in plan:
+            allocation_rows.append((payment_id, loan_id, applied, after))
+            total = settled.get(loan_id, (0, after))[0] + applied
+            settled[loan_id] = (total, after)
+        results.append((payment_id, plan))
+        payment_id += 1
+
+    business.write_payments(cursor, payment_rows)
+    business.update_loans(cursor, settled)
+    cursor.executemany(f"""
+        INSERT INTO {business.allocations} (payment_id, loan_id, amount, outstanding_after) VALUES (?, ?, ?, ?)
+    """, allocation_rows)
+    customer_ledger.post_many(cursor, business.ledger, ledger_entries)
+
+    ratios = business.cost_ratios(cursor, [a[1] for _, plan in results for a in plan if a[1]])
+    total_cogs = 0
+    for (pid, plan), (_, amount, _, _) in zip(results, payments):
+        cogs = sum(applied * ratios.get(sale_id, 0) for _, sale_id, applied, _ in plan)
+        business.post_finance(cursor, pid, amount, cogs)
+        total_cogs += cogs
+    sales_summary.record_payment(cursor, business.summary, sum(p[1] for p in payments), total_cogs)
+    return results
+
+
+def _in_transaction(conn, write):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = write(conn.cursor())
+        conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    return result
+
+
+def receive(conn, business, customer_id, amount, method="CASH", reference=None, order=OLDEST, first_loan_id=None):
+    """
+    Records one payment atomically on `conn` (which must not be inside a transaction) and returns
+    (payment_id, plan), plan being [(loan_id, sale_id, applied, outstanding_after)].
+    Raises PaymentError for a missing customer or a non-positive amount.
+    """
+    return _in_transaction(conn, lambda cursor: _record(
+        cursor, business, [(customer_id, amount, method, reference)], order, first_loan_id)[0])
+
+
+def receive_many(conn, business, payments, order=OLDEST):
+    """
+    Records a batch of payments [(customer_id, amount, method, reference)] in one transaction,
+    in the order given (a customer's second payment settles what the first left open). Returns
+    [(payment_id, plan)]; an invalid payment rejects the whole batch.
+    """
+    payments = list(payments)
+    if not payments:
+        return []
+    return _in_transaction(conn, lambda cursor: _record(cursor, business, payments, order))
+
+
+def read_csv(path):
+    """Payments from a collections CSV (customer_id, amount[, method][, reference] columns, with a header)."""
+    import csv
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return [(int(r["customer_id"]), float(r["amount"]), r.get("method") or "CASH", r.get("reference") or None)
+                for r in csv.DictReader(f)]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) != 3 or args[0] != "import" or args[1] not in BUSINESSES:
+        print("usage: python -m src.database.loan_payments import store|pharmacy collections.csv [--due-date]")
+        sys.exit(2)
+    from src.database.db_manager import db_manager
+    conn = db_manager.get_pharmacy_connection() if args[1] == "pharmacy" else db_manager.get_connection()
+    rows = read_csv(args[2])
+    t0 = time.perf_counter()
+    results = receive_many(conn, BUSINESSES[args[1]], rows, DUE_DATE if "--due-date" in sys.argv else OLDEST)
+    elapsed = time.perf_counter() - t0
+    allocations = sum(len(plan) for _, plan in results)
+    print(f"[INFO] Imported {len(results)} payments ({allocations} loan allocations) in {elapsed:.2f}s")
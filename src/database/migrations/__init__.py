@@ -0,0 +1,68 @@
+"""
+Versioned schema migrations.
+
+Each database keeps its schema version in `PRAGMA user_version` (the fast path: one
+PRAGMA read at startup when nothing is pending) and an audit trail of applied
+migrations in the `schema_version` table.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+Migration = namedtuple("Migration", ["version", "description", "apply"])
+
+
+def table_columns(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def add_column_if_missing(cursor, table, column, definition):
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+    if column not in table_columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version(migrations):
+    return max((m.version for m in migrations), default=0)
+
+
+def migrate(conn, migrations, label="db"):
+    """
+    Applies pending migrations in version order, each in its own transaction.
+    Returns the list of versions applied (empty on the fast path).
+    """
+    target = latest_version(migrations)
+    if current_version(conn) >= target:
+        return []
+
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock: another process may have migrated meanwhile
+            version = current_version(conn)
+            if migration.version <= version:
+                conn.rollback()
+                continue
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY, description TEXT, applied_at TIMESTAMP
+                )
+            """)
+            migration.apply(cursor)
+            cursor.execute(
+                "INSERT OR REPLACE INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.description, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            cursor.execute(f"PRAGMA user_version = {int(migration.version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+        print(f"[INFO] {label}: applied schema migration {migration.version} ({migration.description})")
+    return applied
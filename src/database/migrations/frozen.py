@@ -0,0 +1,254 @@
+"""
+Schema and backfill code shared by store and pharmacy migrations, frozen as it shipped.
+
+Migrations never call the live modules (sales_summary, customer_ledger, ...): a later change
+there would silently change what an already-applied migration does on a fresh install. What a
+migration needs is copied here (or into the migration itself) with the column lists and SQL
+of its schema version. Never edit a function once a shipped migration calls it; a changed
+version gets a new function and a new migration.
+"""
+from datetime import datetime, timedelta
+
+from src.database.migrations import add_column_if_missing
+
+# ---------------------------------------------------------------- daily sales summary (v1)
+
+SUMMARY_DAILY_COLUMNS_V1 = (
+    "sales_count", "revenue", "line_revenue", "items_sold", "cogs",
+    "cash_revenue", "cash_cogs", "credit_revenue",
+    "returns_count", "returns_amount", "returns_cogs", "items_returned",
+    "cash_returns_amount", "cash_returns_cogs",
+    "payments_received", "payments_cogs",
+)
+SUMMARY_PRODUCT_COLUMNS_V1 = ("quantity", "revenue", "cogs", "returned_qty", "returned_amount", "returns_cogs")
+
+
+def summary_tables_v1(cursor, daily, products):
+    daily_cols = ", ".join(f"{c} REAL DEFAULT 0" for c in SUMMARY_DAILY_COLUMNS_V1)
+    product_cols = ", ".join(f"{c} REAL DEFAULT 0" for c in SUMMARY_PRODUCT_COLUMNS_V1)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {daily} (
+            day TEXT PRIMARY KEY, {daily_cols}, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {products} (
+            day TEXT NOT NULL, product_id INTEGER NOT NULL, {product_cols},
+            PRIMARY KEY (day, product_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{products}_pid ON {products}(product_id, day)")
+
+
+def summary_rebuild_v1(cursor, daily, products, daily_sources, product_sources):
+    """Refills the summaries from (columns, SELECT ... GROUP BY) sources, added onto one row per key."""
+    cursor.execute(f"DELETE FROM {daily}")
+    cursor.execute(f"DELETE FROM {products}")
+    for table, keys, sources in ((daily, ["day"], daily_sources), (products, ["day", "product_id"], product_sources)):
+        for columns, select in sources:
+            updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in columns)
+            cursor.execute(f"INSERT INTO {table} ({', '.join(keys + list(columns))}) {select} "
+                           f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}")
+
+
+# ---------------------------------------------------------------- invoice sequences (v1)
+
+def sequences_v1(cursor, name, fmt):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT NOT NULL, period TEXT NOT NULL, value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, period)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sequence_formats (
+            name TEXT PRIMARY KEY, format TEXT NOT NULL, reset TEXT NOT NULL DEFAULT 'day',
+            block_size INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sequence_blocks (
+            name TEXT NOT NULL, period TEXT NOT NULL, terminal TEXT NOT NULL,
+            first_value INTEGER NOT NULL, next_value INTEGER NOT NULL, last_value INTEGER NOT NULL,
+            PRIMARY KEY (name, period, terminal, first_value)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("INSERT OR IGNORE INTO sequence_formats (name, format, reset, block_size) VALUES (?, ?, 'day', 0)",
+                   (name, fmt))
+
+
+# ---------------------------------------------------------------- month-end close (v1)
+
+_CLOSE_EXPENSE_COLUMNS_V1 = ("expenses", "salaries", "petty_cash", "other_expenses")
+_CLOSE_FIGURE_COLUMNS_V1 = SUMMARY_DAILY_COLUMNS_V1 + _CLOSE_EXPENSE_COLUMNS_V1
+_CLOSE_STOCK_COLUMNS_V1 = ("stock_units", "stock_value")
+_CLOSE_LEGACY_COLUMNS_V1 = ("total_sold_items", "total_sales", "total_profit", "total_petty_cash",
+                            "total_salaries", "net_profit")
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _close_values_v1(cursor, daily, expenses, month):
+    """Snapshot columns of `month` ('YYYY-MM') from the daily summary and the expense table."""
+    start = datetime.strptime(month, "%Y-%m").date()
+    bounds = (start.strftime("%Y-%m-%d"), _next_month(start).strftime("%Y-%m-%d"))
+    sums = ", ".join(f"COALESCE(SUM({c}), 0)" for c in SUMMARY_DAILY_COLUMNS_V1)
+    f = dict(zip(SUMMARY_DAILY_COLUMNS_V1,
+                 cursor.execute(f"SELECT {sums} FROM {daily} WHERE day >= ? AND day < ?", bounds).fetchone()))
+    f.update(dict.fromkeys(_CLOSE_EXPENSE_COLUMNS_V1, 0))
+    for category, amount in cursor.execute(f"""
+        SELECT category, COALESCE(SUM(amount), 0) FROM {expenses}
+        WHERE expense_date >= ? AND expense_date < ? GROUP BY category
+    """, bounds):
+        f["expenses"] += amount
+        if category and "Salary" in category:
+            f["salaries"] += amount
+        elif category == "Petty Cash":
+            f["petty_cash"] += amount
+        else:
+            f["other_expenses"] += amount
+    net_sales = f["revenue"] - f["returns_amount"]
+    gross_profit = net_sales - (f["cogs"] - f["returns_cogs"])
+    values = {c: f[c] for c in _CLOSE_FIGURE_COLUMNS_V1}
+    values.update(total_sold_items=f["items_sold"], total_sales=net_sales, total_profit=gross_profit,
+                  total_petty_cash=f["petty_cash"], total_salaries=f["salaries"],
+                  net_profit=gross_profit - f["expenses"])
+    return values
+
+
+def month_close_v1(cursor, table, daily, expenses):
+    """
+    Close table (created, or the first pharmacy_month_close extended), refill of months closed
+    before the figures were stored plus a snapshot of every month skipped before the latest one,
+    then the immutability and closed-month expense triggers.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, month_str TEXT UNIQUE,
+            closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, closed_by INTEGER
+        )
+    """)
+    for column in _CLOSE_FIGURE_COLUMNS_V1 + _CLOSE_STOCK_COLUMNS_V1 + _CLOSE_LEGACY_COLUMNS_V1:
+        add_column_if_missing(cursor, table, column, "REAL")
+
+    legacy = [r[0] for r in cursor.execute(f"SELECT month_str FROM {table} ORDER BY month_str")]
+    for month in legacy:
+        values = _close_values_v1(cursor, daily, expenses, month)
+        cursor.execute(f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in values)} WHERE month_str = ?",
+                       list(values.values()) + [month])
+    if legacy:
+        target = datetime.strptime(legacy[-1], "%Y-%m").date()
+        first = cursor.execute(f"""
+            SELECT MIN(d) FROM (SELECT MIN(day) AS d FROM {daily} UNION ALL SELECT MIN(expense_date) FROM {expenses})
+        """).fetchone()[0]
+        first = datetime.strptime(first[:10], "%Y-%m-%d").date() if first else target
+        day = min(first, target).replace(day=1)
+        while day <= target:
+            month = day.strftime("%Y-%m")
+            if not cursor.execute(f"SELECT 1 FROM {table} WHERE month_str = ?", (month,)).fetchone():
+                values = _close_values_v1(cursor, daily, expenses, month)
+                values.update(month_str=month, closed_by=None)
+                cursor.execute(f"INSERT INTO {table} ({', '.join(values)}) "
+                               f"VALUES ({', '.join('?' for _ in values)})", list(values.values()))
+            day = _next_month(day)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_no_update BEFORE UPDATE ON {table}
+        BEGIN SELECT RAISE(ABORT, 'closed month snapshots cannot be changed'); END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_no_delete BEFORE DELETE ON {table}
+        BEGIN SELECT RAISE(ABORT, 'closed month snapshots cannot be deleted'); END
+    """)
+    closed = (f"EXISTS (SELECT 1 FROM {table} "
+              f"WHERE month_str = substr(COALESCE({{row}}.expense_date, DATE('now', 'localtime')), 1, 7))")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{expenses}_closed_insert BEFORE INSERT ON {expenses}
+        WHEN {closed.format(row="NEW")}
+        BEGIN SELECT RAISE(ABORT, 'expense date is in a closed month'); END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{expenses}_closed_update BEFORE UPDATE ON {expenses}
+        WHEN {closed.format(row="OLD")} OR {closed.format(row="NEW")}
+        BEGIN SELECT RAISE(ABORT, 'expense date is in a closed month'); END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{expenses}_closed_delete BEFORE DELETE ON {expenses}
+        WHEN {closed.format(row="OLD")}
+        BEGIN SELECT RAISE(ABORT, 'expense date is in a closed month'); END
+    """)
+
+
+# ---------------------------------------------------------------- customer ledger (v1)
+
+_LEDGER_TOLERANCE_V1 = 0.005
+
+
+def customer_ledger_v1(cursor, ledger, checkpoints, customers, index, sources):
+    """
+    Ledger and checkpoint tables, the history from `sources` (customer_id, kind, ref_id, amount,
+    note, created_at, seq) with running balances, an opening ADJUSTMENT per customer whose stored
+    balance the history does not explain, and a first checkpoint for every customer that agrees.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ledger} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, customer_id INTEGER NOT NULL,
+            kind TEXT NOT NULL CHECK(kind IN ('SALE', 'PAYMENT', 'RETURN', 'ADJUSTMENT')), ref_id INTEGER, amount REAL NOT NULL,
+            balance REAL NOT NULL, note TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {ledger}(customer_id, created_at)")
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {checkpoints} (
+            customer_id INTEGER NOT NULL, entry_id INTEGER NOT NULL, balance REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (customer_id, entry_id)
+        ) WITHOUT ROWID
+    """)
+    if cursor.execute(f"SELECT 1 FROM {ledger} LIMIT 1").fetchone():
+        return
+    cursor.execute(f"""
+        INSERT INTO {ledger} (customer_id, kind, ref_id, amount, balance, note, created_at)
+        SELECT customer_id, kind, ref_id, amount,
+               SUM(amount) OVER (PARTITION BY customer_id ORDER BY created_at, seq, ref_id ROWS UNBOUNDED PRECEDING),
+               note, created_at
+        FROM (SELECT customer_id, kind, ref_id, COALESCE(amount, 0) AS amount, note, created_at, seq
+              FROM ({sources}))
+        ORDER BY created_at, seq, ref_id
+    """)
+    cursor.execute(f"""
+        INSERT INTO {ledger} (customer_id, kind, amount, balance, note)
+        SELECT c.id, 'ADJUSTMENT', COALESCE(c.balance, 0) - COALESCE(t.total, 0), COALESCE(c.balance, 0),
+               'Opening balance'
+        FROM {customers} c
+        LEFT JOIN (SELECT customer_id, SUM(amount) AS total FROM {ledger} GROUP BY customer_id) t
+               ON t.customer_id = c.id
+        WHERE ABS(COALESCE(c.balance, 0) - COALESCE(t.total, 0)) > {_LEDGER_TOLERANCE_V1}
+    """)
+    rows = cursor.execute(f"""
+        SELECT c.id, COALESCE(c.balance, 0), COALESCE(m.amount, 0),
+               (SELECT balance FROM {ledger} WHERE customer_id = c.id ORDER BY created_at DESC, id DESC LIMIT 1),
+               m.last_id
+        FROM {customers} c
+        LEFT JOIN (SELECT customer_id, SUM(amount) AS amount, MAX(id) AS last_id FROM {ledger} GROUP BY customer_id) m
+               ON m.customer_id = c.id
+    """).fetchall()
+    cursor.executemany(f"INSERT OR IGNORE INTO {checkpoints} (customer_id, entry_id, balance) VALUES (?, ?, ?)",
+                       [(customer_id, last_id, expected) for customer_id, stored, expected, latest, last_id in rows
+                        if last_id is not None and abs((latest or 0) - expected) <= _LEDGER_TOLERANCE_V1
+                        and abs(stored - expected) <= _LEDGER_TOLERANCE_V1])
+
+
+# ---------------------------------------------------------------- loan payment allocations (v1)
+
+def loan_allocations_v1(cursor, table, index):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, payment_id INTEGER NOT NULL, loan_id INTEGER NOT NULL,
+            amount REAL NOT NULL, outstanding_after REAL NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {index}_payment ON {table}(payment_id)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {index}_loan ON {table}(loan_id)")
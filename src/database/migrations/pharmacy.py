@@ -0,0 +1,538 @@
+"""
+Ordered schema migrations for the isolated Pharmacy database (faqiritech_pharmacy.db).
+
+Append new migrations to MIGRATIONS with the next version number; never edit or
+reorder one that has shipped. A migration only runs its own SQL and the frozen helpers in
+src/database/migrations/frozen.py, never the live modules whose tables it creates.
+"""
+from src.database.migrations import Migration, add_column_if_missing, frozen
+
+
+def m001_baseline(cursor):
+    """Initial pharmacy schema (what _create_pharmacy_tables used to build on every launch)."""
+    # Pharmacy specific tables
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password_hash TEXT NOT NULL,
+            title TEXT, role TEXT DEFAULT 'Pharmacist', permissions TEXT, is_active INTEGER DEFAULT 1,
+            is_super_admin INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, barcode TEXT UNIQUE NOT NULL, name_en TEXT NOT NULL,
+            generic_name TEXT, brand TEXT, size TEXT, cost_price REAL DEFAULT 0, sale_price REAL DEFAULT 0,
+            min_stock REAL DEFAULT 10, shelf_location TEXT, supplier_id INTEGER, description TEXT,
+            uom TEXT DEFAULT 'Box', is_active INTEGER DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_inventory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER, batch_number TEXT NOT NULL,
+            expiry_date DATE NOT NULL, quantity REAL DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES pharmacy_products(id), UNIQUE(product_id, batch_number)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, invoice_number TEXT UNIQUE NOT NULL, user_id INTEGER,
+            customer_id INTEGER, total_amount REAL NOT NULL, gross_amount REAL DEFAULT 0,
+            discount_amount REAL DEFAULT 0, net_amount REAL DEFAULT 0, payment_type TEXT DEFAULT 'CASH',
+            is_synced INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_sale_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, sale_id INTEGER, product_id INTEGER, product_name TEXT,
+            batch_number TEXT, expiry_date DATE, quantity REAL NOT NULL, unit_price REAL NOT NULL,
+            total_price REAL NOT NULL, cost_price_at_sale REAL DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_id) REFERENCES pharmacy_sales(id), FOREIGN KEY (product_id) REFERENCES pharmacy_products(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, phone TEXT, loan_enabled INTEGER DEFAULT 0,
+            loan_limit REAL DEFAULT 0, balance REAL DEFAULT 0, is_active INTEGER DEFAULT 1,
+            address TEXT, kyc_photo TEXT, kyc_id_card TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, contact TEXT, balance REAL DEFAULT 0,
+            company_name TEXT, address TEXT, is_active INTEGER DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_loans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, customer_id INTEGER, sale_id INTEGER, loan_amount REAL,
+            total_amount REAL DEFAULT 0, paid_amount REAL DEFAULT 0, balance REAL DEFAULT 0,
+            due_date DATE, status TEXT DEFAULT 'PENDING', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES pharmacy_customers(id), FOREIGN KEY (sale_id) REFERENCES pharmacy_sales(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, category TEXT CHECK(category IN ('Salary', 'Petty Cash', 'Other')),
+            amount REAL NOT NULL, description TEXT, expense_date DATE DEFAULT CURRENT_DATE,
+            created_by INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, sale_id INTEGER, customer_id INTEGER, loan_id INTEGER,
+            payment_method TEXT, amount REAL, transaction_ref TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_employee_salary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, amount REAL NOT NULL,
+            salary_type TEXT, is_active INTEGER DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_returns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, original_sale_id INTEGER, refund_amount REAL,
+            refund_type TEXT DEFAULT 'ACCOUNT',
+            reason TEXT, user_id INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (original_sale_id) REFERENCES pharmacy_sales(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_return_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, return_id INTEGER,
+            sale_item_id INTEGER, product_id INTEGER,
+            quantity REAL NOT NULL, unit_price REAL NOT NULL, action TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (return_id) REFERENCES pharmacy_returns(id),
+            FOREIGN KEY (product_id) REFERENCES pharmacy_products(id)
+        )
+    ''')
+
+    # Table to track replacement items when action is REPLACEMENT
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_replacement_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            return_item_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            product_name TEXT,
+            quantity REAL NOT NULL,
+            unit_price REAL NOT NULL,
+            total_price REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (return_item_id) REFERENCES pharmacy_return_items(id),
+            FOREIGN KEY (product_id) REFERENCES pharmacy_products(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_month_close (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, month_str TEXT UNIQUE, total_sold_items REAL,
+            total_sales REAL, total_profit REAL, total_petty_cash REAL, total_salaries REAL,
+            net_profit REAL, closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, closed_by INTEGER
+        )
+    ''')
+
+    # Duplicated app/system settings for Pharmacy logic independence
+    cursor.execute('CREATE TABLE IF NOT EXISTS app_settings (key TEXT PRIMARY KEY, value TEXT)')
+    cursor.execute("CREATE TABLE IF NOT EXISTS system_settings (id INTEGER PRIMARY KEY DEFAULT 1, is_active INTEGER DEFAULT 1, activation_key TEXT, mode TEXT DEFAULT 'OFFLINE', valid_until TIMESTAMP)")
+
+    back_date = "2023-01-01"
+    cursor.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES ('contract_end', ?)", (back_date,))
+    cursor.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES ('whatsapp_number', '')")
+
+    cursor.execute('CREATE TABLE IF NOT EXISTS pharmacy_info (id INTEGER PRIMARY KEY DEFAULT 1, name TEXT, address TEXT, phone TEXT, email TEXT)')
+    cursor.execute("INSERT OR IGNORE INTO pharmacy_info (id, name, address, phone, email) VALUES (1, 'FaqiriTech Pharmacy', 'Main Road, Kabul', '0700000000', 'pharmacy@faqiritech.com')")
+    cursor.execute("INSERT OR IGNORE INTO system_settings (id, is_active, mode, valid_until) VALUES (1, 1, 'OFFLINE', ?)", (back_date,))
+
+    # Performance Indexes for Pharmacy
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_prod_bc ON pharmacy_products(barcode)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_inv_pid ON pharmacy_inventory(product_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_sales_date ON pharmacy_sales(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_sale_items_sid ON pharmacy_sale_items(sale_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_payments_sid ON pharmacy_payments(sale_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_payments_date ON pharmacy_payments(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_returns_date ON pharmacy_returns(created_at)")
+
+
+def m002_backfill_columns(cursor):
+    """Columns added after the first pharmacy release (previously ALTERs in bare try/except)."""
+    add_column_if_missing(cursor, "pharmacy_users", "created_by", "INTEGER")
+    add_column_if_missing(cursor, "pharmacy_suppliers", "address", "TEXT")
+    add_column_if_missing(cursor, "pharmacy_returns", "refund_type", "TEXT DEFAULT 'ACCOUNT'")
+    add_column_if_missing(cursor, "pharmacy_return_items", "sale_item_id", "INTEGER")
+
+
+def m003_created_at_indexes(cursor):
+    """Range indexes for report period filters (sales, payments and returns already had one)."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_loans_date ON pharmacy_loans(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_expenses_date ON pharmacy_expenses(expense_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_sale_items_date ON pharmacy_sale_items(created_at)")
+
+
+def m004_daily_sales_summary(cursor):
+    """Incrementally maintained daily aggregates (src/database/sales_summary.py), backfilled from history."""
+    frozen.summary_tables_v1(cursor, "pharmacy_daily_summary", "pharmacy_daily_product_sales")
+    item_cost = "si.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price, 0)"
+    ret_cost = "ri.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price, 0)"
+    ret_amount = "CASE WHEN ri.action = 'RETURN' THEN ri.quantity * ri.unit_price ELSE 0 END"
+    # A payment carries the cost share of the sale it settles
+    payment_cogs = f"""pay.amount * CASE WHEN s.total_amount > 0 THEN (
+                       SELECT SUM({item_cost}) FROM pharmacy_sale_items si
+                       LEFT JOIN pharmacy_products p ON si.product_id = p.id WHERE si.sale_id = s.id
+                   ) / CAST(s.total_amount AS REAL) ELSE 0 END"""
+    frozen.summary_rebuild_v1(cursor, "pharmacy_daily_summary", "pharmacy_daily_product_sales", daily_sources=[
+        (("sales_count", "revenue", "cash_revenue", "credit_revenue"), """
+            SELECT DATE(created_at, 'localtime'), COUNT(*), SUM(total_amount),
+                   SUM(CASE WHEN payment_type = 'CASH' THEN total_amount ELSE 0 END),
+                   SUM(CASE WHEN payment_type = 'CREDIT' THEN total_amount ELSE 0 END)
+            FROM pharmacy_sales GROUP BY 1"""),
+        (("line_revenue", "items_sold", "cogs", "cash_cogs"), f"""
+            SELECT DATE(s.created_at, 'localtime'), SUM(si.total_price), SUM(si.quantity), SUM({item_cost}),
+                   SUM(CASE WHEN s.payment_type = 'CASH' THEN {item_cost} ELSE 0 END)
+            FROM pharmacy_sale_items si JOIN pharmacy_sales s ON si.sale_id = s.id
+            LEFT JOIN pharmacy_products p ON si.product_id = p.id
+            GROUP BY 1"""),
+        (("returns_count", "returns_amount", "cash_returns_amount"), """
+            SELECT DATE(created_at, 'localtime'), COUNT(*), SUM(refund_amount),
+                   SUM(CASE WHEN refund_type = 'CASH' THEN refund_amount ELSE 0 END)
+            FROM pharmacy_returns GROUP BY 1"""),
+        (("items_returned", "returns_cogs", "cash_returns_cogs"), f"""
+            SELECT DATE(r.created_at, 'localtime'), SUM(ri.quantity), SUM({ret_cost}),
+                   SUM(CASE WHEN r.refund_type = 'CASH' THEN {ret_cost} ELSE 0 END)
+            FROM pharmacy_return_items ri JOIN pharmacy_returns r ON ri.return_id = r.id
+            LEFT JOIN pharmacy_sale_items si ON ri.sale_item_id = si.id
+            LEFT JOIN pharmacy_products p ON ri.product_id = p.id
+            GROUP BY 1"""),
+        (("payments_received", "payments_cogs"), f"""
+            SELECT DATE(pay.created_at, 'localtime'), SUM(pay.amount), SUM({payment_cogs})
+            FROM pharmacy_payments pay
+            LEFT JOIN pharmacy_loans l ON pay.loan_id = l.id
+            LEFT JOIN pharmacy_sales s ON s.id = COALESCE(pay.sale_id, l.sale_id)
+            GROUP BY 1"""),
+    ], product_sources=[
+        (("quantity", "revenue", "cogs"), f"""
+            SELECT DATE(s.created_at, 'localtime'), si.product_id, SUM(si.quantity), SUM(si.total_price), SUM({item_cost})
+            FROM pharmacy_sale_items si JOIN pharmacy_sales s ON si.sale_id = s.id
+            LEFT JOIN pharmacy_products p ON si.product_id = p.id
+            GROUP BY 1, 2"""),
+        (("returned_qty", "returned_amount", "returns_cogs"), f"""
+            SELECT DATE(r.created_at, 'localtime'), ri.product_id, SUM(ri.quantity), SUM({ret_amount}), SUM({ret_cost})
+            FROM pharmacy_return_items ri JOIN pharmacy_returns r ON ri.return_id = r.id
+            LEFT JOIN pharmacy_sale_items si ON ri.sale_item_id = si.id
+            LEFT JOIN pharmacy_products p ON ri.product_id = p.id
+            GROUP BY 1, 2"""),
+    ])
+
+
+def m005_sequences(cursor):
+    """Invoice number sequences allocated inside the checkout transaction (src/database/sequences.py)."""
+    frozen.sequences_v1(cursor, "pharmacy_invoice", "PHARM-{date:%Y%m%d}-{n:04d}")
+
+
+def m006_product_search(cursor):
+    """FTS5 index over product name / generic name / brand / barcode (src/database/pharmacy_search.py)."""
+    cols = "name_en, generic_name, brand, barcode"
+    new_cols = "new.name_en, new.generic_name, new.brand, new.barcode"
+    old_cols = "old.name_en, old.generic_name, old.brand, old.barcode"
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS pharmacy_products_fts USING fts5(
+            {cols}, content='pharmacy_products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ph_products_fts_ai AFTER INSERT ON pharmacy_products BEGIN
+            INSERT INTO pharmacy_products_fts (rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ph_products_fts_ad AFTER DELETE ON pharmacy_products BEGIN
+            INSERT INTO pharmacy_products_fts (pharmacy_products_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ph_products_fts_au AFTER UPDATE OF {cols} ON pharmacy_products BEGIN
+            INSERT INTO pharmacy_products_fts (pharmacy_products_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO pharmacy_products_fts (rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    cursor.execute("INSERT INTO pharmacy_products_fts (pharmacy_products_fts) VALUES ('rebuild')")
+
+
+def m007_expiry_tracking(cursor):
+    """Partial expiry index and daily expiry bucket tables (src/database/expiry.py)."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_inv_expiry ON pharmacy_inventory(expiry_date) WHERE quantity > 0")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pharmacy_expiry_buckets (
+            as_of TEXT NOT NULL, bucket TEXT NOT NULL, batches INTEGER DEFAULT 0, units REAL DEFAULT 0,
+            cost_value REAL DEFAULT 0, sale_value REAL DEFAULT 0,
+            PRIMARY KEY (as_of, bucket)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pharmacy_expiry_state (
+            inventory_id INTEGER PRIMARY KEY, bucket TEXT NOT NULL, as_of TEXT NOT NULL
+        )
+    """)
+
+
+def m008_lookup_indexes(cursor):
+    """Indexes behind the batched per-row loaders (src/database/batch_loader.py)."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_return_items_sale_item ON pharmacy_return_items(sale_item_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_return_items_rid ON pharmacy_return_items(return_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_replacement_items_riid ON pharmacy_replacement_items(return_item_id)")
+
+
+def m009_month_close(cursor):
+    """Immutable month-end snapshots and closed-month expense guard (src/database/period_close.py)."""
+    frozen.month_close_v1(cursor, "pharmacy_month_close", "pharmacy_daily_summary", "pharmacy_expenses")
+
+
+def m010_product_stats(cursor):
+    """Trigger-maintained per-product sold / on-hand counters (src/database/product_stats.py)."""
+    month = "strftime('%Y-%m', 'now', 'localtime')"
+
+    def bump(product, **deltas):
+        cols = list(deltas)
+        values = ", ".join(deltas[c] for c in cols)
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in cols)
+        return f"""
+        INSERT INTO pharmacy_product_stats (product_id, {', '.join(cols)}) VALUES ({product}, {values})
+        ON CONFLICT (product_id) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP;"""
+
+    sold = f"""
+        INSERT INTO pharmacy_product_stats (product_id, sold_qty, period_sold, period_key)
+        VALUES (NEW.product_id, NEW.quantity, NEW.quantity, {month})
+        ON CONFLICT (product_id) DO UPDATE SET
+            sold_qty = sold_qty + excluded.sold_qty,
+            period_sold = CASE WHEN period_key = excluded.period_key THEN period_sold + excluded.period_sold
+                               ELSE excluded.period_sold END,
+            period_key = excluded.period_key, updated_at = CURRENT_TIMESTAMP;"""
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pharmacy_product_stats (
+            product_id INTEGER PRIMARY KEY, sold_qty REAL DEFAULT 0, returned_qty REAL DEFAULT 0,
+            period_key TEXT, period_sold REAL DEFAULT 0, on_hand REAL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    triggers = {
+        "sale_items_ai": ("AFTER INSERT ON pharmacy_sale_items", sold),
+        "sale_items_ad": ("AFTER DELETE ON pharmacy_sale_items", bump("OLD.product_id", sold_qty="-OLD.quantity")),
+        "sale_items_au": ("AFTER UPDATE OF product_id, quantity ON pharmacy_sale_items",
+                          bump("OLD.product_id", sold_qty="-OLD.quantity")
+                          + bump("NEW.product_id", sold_qty="NEW.quantity")),
+        "return_items_ai": ("AFTER INSERT ON pharmacy_return_items WHEN NEW.action = 'RETURN'",
+                            bump("NEW.product_id", returned_qty="NEW.quantity")),
+        "return_items_ad": ("AFTER DELETE ON pharmacy_return_items WHEN OLD.action = 'RETURN'",
+                            bump("OLD.product_id", returned_qty="-OLD.quantity")),
+        "inventory_ai": ("AFTER INSERT ON pharmacy_inventory", bump("NEW.product_id", on_hand="NEW.quantity")),
+        "inventory_ad": ("AFTER DELETE ON pharmacy_inventory", bump("OLD.product_id", on_hand="-OLD.quantity")),
+        "inventory_au": ("AFTER UPDATE OF product_id, quantity ON pharmacy_inventory",
+                         bump("OLD.product_id", on_hand="-OLD.quantity")
+                         + bump("NEW.product_id", on_hand="NEW.quantity")),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_ph_stats_{name} {event} BEGIN {body} END")
+
+    cursor.execute(f"""
+        INSERT INTO pharmacy_product_stats (product_id, sold_qty, returned_qty, period_sold, on_hand, period_key)
+        SELECT p.id,
+               COALESCE((SELECT SUM(quantity) FROM pharmacy_sale_items WHERE product_id = p.id), 0),
+               COALESCE((SELECT SUM(quantity) FROM pharmacy_return_items WHERE product_id = p.id AND action = 'RETURN'), 0),
+               COALESCE((SELECT SUM(quantity) FROM pharmacy_sale_items WHERE product_id = p.id
+                         AND strftime('%Y-%m', created_at, 'localtime') = {month}), 0),
+               COALESCE((SELECT SUM(quantity) FROM pharmacy_inventory WHERE product_id = p.id), 0),
+               {month}
+        FROM pharmacy_products p
+    """)
+
+
+def m011_finance_ledger(cursor):
+    """Append-only finance ledger with revenue / COGS split, backfilled (src/database/finance_ledger.py)."""
+    # Expense rows whose category mentions salary are salary postings
+    expense_kind = "CASE WHEN {row}.category LIKE '%Salary%' THEN 'SALARY' ELSE 'EXPENSE' END"
+    expense_day = "COALESCE({row}.expense_date, DATE('now', 'localtime'))"
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pharmacy_finance_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, day TEXT NOT NULL, kind TEXT NOT NULL CHECK(kind IN ('SALE', 'PAYMENT', 'RETURN', 'EXPENSE', 'SALARY')),
+            ref_id INTEGER, amount REAL DEFAULT 0, revenue REAL DEFAULT 0, cogs REAL DEFAULT 0,
+            expense REAL DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Covering index: period sums never touch the table rows
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_ph_ledger_day ON pharmacy_finance_ledger(day, kind, amount, revenue, cogs, expense)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ph_ledger_ref ON pharmacy_finance_ledger(kind, ref_id)")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_ph_ledger_no_update BEFORE UPDATE ON pharmacy_finance_ledger
+        BEGIN SELECT RAISE(ABORT, 'finance ledger entries cannot be changed'); END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_ph_ledger_no_delete BEFORE DELETE ON pharmacy_finance_ledger
+        BEGIN SELECT RAISE(ABORT, 'finance ledger entries cannot be deleted'); END
+    """)
+
+    def expense_entry(row, sign):
+        return f"""
+            INSERT INTO pharmacy_finance_ledger (day, kind, ref_id, amount, expense)
+            VALUES ({expense_day.format(row=row)}, {expense_kind.format(row=row)}, {row}.id,
+                    {sign}{row}.amount, {sign}{row}.amount);"""
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ph_ledger_expense_ai AFTER INSERT ON pharmacy_expenses
+        BEGIN {expense_entry("NEW", "")} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ph_ledger_expense_au AFTER UPDATE OF amount, category, expense_date
+        ON pharmacy_expenses BEGIN {expense_entry("OLD", "-")} {expense_entry("NEW", "")} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ph_ledger_expense_ad AFTER DELETE ON pharmacy_expenses
+        BEGIN {expense_entry("OLD", "-")} END
+    """)
+
+    # History: sales, payments, returns and expenses, cash basis
+    item_cost = "si.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price, 0)"
+    sale_cost = f"""(SELECT SUM({item_cost}) FROM pharmacy_sale_items si
+                     LEFT JOIN pharmacy_products p ON si.product_id = p.id WHERE si.sale_id = s.id)"""
+    cursor.execute(f"""
+        INSERT INTO pharmacy_finance_ledger (day, kind, ref_id, amount, revenue, cogs, created_at)
+        SELECT DATE(s.created_at, 'localtime'), 'SALE', s.id, s.total_amount,
+               CASE WHEN s.payment_type = 'CASH' THEN s.total_amount ELSE 0 END,
+               CASE WHEN s.payment_type = 'CASH' THEN COALESCE({sale_cost}, 0) ELSE 0 END, s.created_at
+        FROM pharmacy_sales s ORDER BY s.id
+    """)
+    cursor.execute(f"""
+        INSERT INTO pharmacy_finance_ledger (day, kind, ref_id, amount, revenue, cogs, created_at)
+        SELECT DATE(pay.created_at, 'localtime'), 'PAYMENT', pay.id, pay.amount, pay.amount,
+               CASE WHEN s.total_amount > 0 THEN pay.amount * COALESCE({sale_cost}, 0) / CAST(s.total_amount AS REAL)
+                    ELSE 0 END, pay.created_at
+        FROM pharmacy_payments pay
+        LEFT JOIN pharmacy_loans l ON pay.loan_id = l.id
+        LEFT JOIN pharmacy_sales s ON s.id = COALESCE(pay.sale_id, l.sale_id)
+        ORDER BY pay.id
+    """)
+    cursor.execute("""
+        INSERT INTO pharmacy_finance_ledger (day, kind, ref_id, amount, revenue, cogs, created_at)
+        SELECT DATE(r.created_at, 'localtime'), 'RETURN', r.id, r.refund_amount,
+               CASE WHEN r.refund_type = 'CASH' THEN -r.refund_amount ELSE 0 END,
+               CASE WHEN r.refund_type = 'CASH' THEN -COALESCE((
+                   SELECT SUM(ri.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price, 0))
+                   FROM pharmacy_return_items ri
+                   LEFT JOIN pharmacy_sale_items si ON ri.sale_item_id = si.id
+                   LEFT JOIN pharmacy_products p ON ri.product_id = p.id
+                   WHERE ri.return_id = r.id), 0) ELSE 0 END, r.created_at
+        FROM pharmacy_returns r ORDER BY r.id
+    """)
+    cursor.execute(f"""
+        INSERT INTO pharmacy_finance_ledger (day, kind, ref_id, amount, expense, created_at)
+        SELECT {expense_day.format(row="e")}, {expense_kind.format(row="e")}, e.id, e.amount, e.amount, e.created_at
+        FROM pharmacy_expenses e ORDER BY e.id
+    """)
+
+
+def m012_customer_ledger(cursor):
+    """Customer account ledger with running balances and checkpoints, backfilled (src/database/customer_ledger.py)."""
+    frozen.customer_ledger_v1(cursor, "pharmacy_customer_ledger", "pharmacy_customer_balance_checkpoints",
+                              "pharmacy_customers", "idx_ph_cust_ledger_customer", """
+        SELECT s.customer_id, 'SALE' AS kind, s.id AS ref_id, s.total_amount AS amount,
+               (SELECT GROUP_CONCAT(product_name, ', ') FROM pharmacy_sale_items WHERE sale_id = s.id) AS note,
+               s.created_at, 0 AS seq
+        FROM pharmacy_sales s WHERE s.payment_type = 'CREDIT' AND s.customer_id IS NOT NULL
+        UNION ALL
+        SELECT s.customer_id, 'RETURN', r.id, -r.refund_amount, r.reason, r.created_at, 1
+        FROM pharmacy_returns r JOIN pharmacy_sales s ON r.original_sale_id = s.id
+        WHERE s.payment_type = 'CREDIT' AND s.customer_id IS NOT NULL AND r.refund_type = 'ACCOUNT' AND r.refund_amount > 0
+        UNION ALL
+        SELECT customer_id, 'PAYMENT', id, -amount, payment_method, created_at, 2
+        FROM pharmacy_payments WHERE customer_id IS NOT NULL
+    """)
+
+
+def m013_loan_allocations(cursor):
+    """Per-loan allocation rows for loan payments (src/database/loan_payments.py)."""
+    frozen.loan_allocations_v1(cursor, "pharmacy_loan_payment_allocations", "idx_ph_loan_alloc")
+
+
+def m014_stock_changes(cursor):
+    """Change counter bumped by every product / batch write, read by the POS stock allocator (src/core/pharmacy_stock.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pharmacy_stock_changes (
+            id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO pharmacy_stock_changes (id, seq) VALUES (1, 0)")
+    for table in ("pharmacy_products", "pharmacy_inventory"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_stock_seq AFTER {event} ON {table}
+                BEGIN UPDATE pharmacy_stock_changes SET seq = seq + 1 WHERE id = 1; END
+            """)
+
+
+def m015_product_stats_month_fix(cursor):
+    """
+    Deleting or editing a sale line now also corrects the month counter when the line falls in
+    the month it counts (migration 10 only adjusted sold_qty), and existing counters are recounted.
+    """
+    month = "strftime('%Y-%m', 'now', 'localtime')"
+
+    def move(row, sign):
+        line_month = f"strftime('%Y-%m', {row}.created_at, 'localtime')"
+        return f"""
+        INSERT INTO pharmacy_product_stats (product_id, sold_qty) VALUES ({row}.product_id, {sign}{row}.quantity)
+        ON CONFLICT (product_id) DO UPDATE SET
+            sold_qty = sold_qty + excluded.sold_qty,
+            period_sold = CASE WHEN period_key = {line_month} THEN period_sold + excluded.sold_qty
+                               ELSE period_sold END,
+            updated_at = CURRENT_TIMESTAMP;"""
+
+    cursor.execute("DROP TRIGGER IF EXISTS trg_ph_stats_sale_items_ad")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_ph_stats_sale_items_au")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_ph_stats_sale_items_ad AFTER DELETE ON pharmacy_sale_items
+        BEGIN {move("OLD", "-")} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_ph_stats_sale_items_au AFTER UPDATE OF product_id, quantity ON pharmacy_sale_items
+        BEGIN {move("OLD", "-")} {move("NEW", "")} END
+    """)
+    cursor.execute(f"""
+        UPDATE pharmacy_product_stats SET period_key = {month}, period_sold = COALESCE((
+            SELECT SUM(quantity) FROM pharmacy_sale_items WHERE product_id = pharmacy_product_stats.product_id
+            AND strftime('%Y-%m', created_at, 'localtime') = {month}), 0)
+    """)
+
+
+MIGRATIONS = [
+    Migration(1, "baseline pharmacy schema", m001_baseline),
+    Migration(2, "backfill late-added columns", m002_backfill_columns),
+    Migration(3, "created_at range indexes", m003_created_at_indexes),
+    Migration(4, "daily sales summary tables", m004_daily_sales_summary),
+    Migration(5, "invoice number sequences", m005_sequences),
+    Migration(6, "product full-text search", m006_product_search),
+    Migration(7, "expiry tracking", m007_expiry_tracking),
+    Migration(8, "return item lookup indexes", m008_lookup_indexes),
+    Migration(9, "month-end close snapshots", m009_month_close),
+    Migration(10, "per-product sales counters", m010_product_stats),
+    Migration(11, "finance ledger", m011_finance_ledger),
+    Migration(12, "customer account ledger", m012_customer_ledger),
+    Migration(13, "loan payment allocations", m013_loan_allocations),
+    Migration(14, "stock change counter", m014_stock_changes),
+    Migration(15, "month counter on sale line edits", m015_product_stats_month_fix),
+]
@@ -0,0 +1,328 @@
+"""
+Ordered schema migrations for the General Store database (faqiritech_store.db).
+
+Append new migrations to MIGRATIONS with the next version number; never edit or
+reorder one that has shipped. A migration only runs its own SQL and the frozen helpers in
+src/database/migrations/frozen.py, never the live modules whose tables it creates.
+"""
+from src.database.migrations import Migration, add_column_if_missing, frozen
+
+
+def m001_baseline(cursor):
+    """Initial store schema (what _create_store_tables used to build on every launch)."""
+    # Common / Core Tables
+    cursor.execute('CREATE TABLE IF NOT EXISTS roles (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, description TEXT)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password_hash TEXT NOT NULL,
+            role_id INTEGER, is_active INTEGER DEFAULT 1, profile_picture TEXT, is_super_admin INTEGER DEFAULT 0,
+            valid_until TIMESTAMP, title TEXT, permissions TEXT, base_salary REAL DEFAULT 0,
+            FOREIGN KEY (role_id) REFERENCES roles(id)
+        )
+    ''')
+
+    cursor.execute('CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name_en TEXT, name_ps TEXT, name_dr TEXT, parent_id INTEGER, FOREIGN KEY (parent_id) REFERENCES categories(id))')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, barcode TEXT UNIQUE NOT NULL, sku TEXT, name_en TEXT NOT NULL,
+            name_ps TEXT, name_dr TEXT, brand TEXT, category_id INTEGER, sub_category TEXT,
+            product_type TEXT DEFAULT 'Simple', cost_price REAL DEFAULT 0, sale_price REAL DEFAULT 0,
+            wholesale_price REAL DEFAULT 0, tax_rate REAL DEFAULT 0, unit TEXT, min_stock REAL DEFAULT 5,
+            max_stock REAL DEFAULT 100, expiry_date DATE, mfg_date DATE, batch_number TEXT, serial_number TEXT,
+            supplier_id INTEGER, supplier_sku TEXT, shelf_location TEXT, allow_negative_stock INTEGER DEFAULT 0,
+            returnable INTEGER DEFAULT 1, track_inventory INTEGER DEFAULT 1, allow_pos_price_change INTEGER DEFAULT 0,
+            allow_zero_price INTEGER DEFAULT 0, image_path TEXT, internal_notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER, last_updated_by INTEGER, is_active INTEGER DEFAULT 1, scope TEXT DEFAULT 'SHOP',
+            FOREIGN KEY (category_id) REFERENCES categories(id),
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(id)
+        )
+    ''')
+
+    cursor.execute('CREATE TABLE IF NOT EXISTS inventory (product_id INTEGER PRIMARY KEY, quantity REAL DEFAULT 0, last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (product_id) REFERENCES products(id))')
+    cursor.execute('CREATE TABLE IF NOT EXISTS suppliers (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, contact TEXT, balance REAL DEFAULT 0, company_name TEXT)')
+    cursor.execute("CREATE TABLE IF NOT EXISTS customers (id INTEGER PRIMARY KEY AUTOINCREMENT, name_en TEXT NOT NULL, name_ps TEXT, name_dr TEXT, phone TEXT, loan_enabled INTEGER DEFAULT 0, loan_limit REAL DEFAULT 0, balance REAL DEFAULT 0, is_active INTEGER DEFAULT 1, home_address TEXT, photo TEXT, id_card_photo TEXT, scope TEXT DEFAULT 'SHOP')")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, invoice_number TEXT UNIQUE NOT NULL, user_id INTEGER,
+            customer_id INTEGER, total_amount REAL NOT NULL, payment_type TEXT DEFAULT 'CASH',
+            sync_status INTEGER DEFAULT 0, uuid TEXT UNIQUE, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, scope TEXT DEFAULT 'SHOP',
+            FOREIGN KEY (user_id) REFERENCES users(id), FOREIGN KEY (customer_id) REFERENCES customers(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sale_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, sale_id INTEGER, product_id INTEGER, barcode TEXT,
+            product_name TEXT, quantity REAL NOT NULL, unit_price REAL NOT NULL, total_price REAL NOT NULL,
+            sync_status INTEGER DEFAULT 0, uuid TEXT UNIQUE, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scope TEXT DEFAULT 'SHOP', FOREIGN KEY (sale_id) REFERENCES sales(id), FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS loans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, customer_id INTEGER, sale_id INTEGER, loan_amount REAL,
+            paid_amount REAL DEFAULT 0, due_date DATE, status TEXT DEFAULT 'PENDING', customer_phone TEXT,
+            customer_photo TEXT, id_photo TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scope TEXT DEFAULT 'SHOP', FOREIGN KEY (customer_id) REFERENCES customers(id), FOREIGN KEY (sale_id) REFERENCES sales(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_returns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, sale_id INTEGER, user_id INTEGER, reason TEXT,
+            refund_amount REAL DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scope TEXT DEFAULT 'SHOP', FOREIGN KEY (sale_id) REFERENCES sales(id), FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS return_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, return_id INTEGER, product_id INTEGER,
+            quantity REAL NOT NULL, refund_price REAL NOT NULL, FOREIGN KEY (return_id) REFERENCES sales_returns(id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shifts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, opening_cash REAL NOT NULL,
+            closing_cash REAL, started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, ended_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cash_transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, shift_id INTEGER, type TEXT CHECK(type IN ('IN', 'OUT')),
+            amount REAL NOT NULL, reason TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (shift_id) REFERENCES shifts(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, action TEXT NOT NULL,
+            table_name TEXT, record_id INTEGER, details TEXT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    cursor.execute('CREATE TABLE IF NOT EXISTS app_settings (key TEXT PRIMARY KEY, value TEXT)')
+    # Set to 2023 for reactivation as requested (Point 4: Reactivation Date)
+    back_date = "2023-01-01"
+    cursor.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES ('contract_end', ?)", (back_date,))
+    cursor.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES ('security_key', 'faqiri2026')")
+    cursor.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES ('whatsapp_number', '')")
+
+    cursor.execute('CREATE TABLE IF NOT EXISTS company_info (id INTEGER PRIMARY KEY DEFAULT 1, name TEXT, address TEXT, phone TEXT, email TEXT)')
+    cursor.execute("INSERT OR IGNORE INTO company_info (id, name, address, phone, email) VALUES (1, 'Kabul City Center', 'Main Road, Kabul', '0700000000', 'info@mall.af')")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS system_settings (
+            id INTEGER PRIMARY KEY DEFAULT 1, is_active INTEGER DEFAULT 1, activation_key TEXT,
+            mode TEXT DEFAULT 'OFFLINE', server_url TEXT, valid_until TIMESTAMP, last_sync TIMESTAMP
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO system_settings (id, is_active, mode, valid_until) VALUES (1, 1, 'OFFLINE', ?)", (back_date,))
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, category TEXT NOT NULL CHECK(category IN ('Salary', 'Petty Cash', 'Other')),
+            amount REAL NOT NULL, description TEXT, expense_date DATE DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, scope TEXT DEFAULT 'SHOP',
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customer_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, customer_id INTEGER, amount REAL NOT NULL,
+            payment_method TEXT DEFAULT 'CASH', reference_number TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(id)
+        )
+    ''')
+
+    # Performance Indexes
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_barcode ON products(barcode)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_pid ON inventory(product_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_cust ON sales(customer_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(expense_date)")
+
+
+def m002_created_at_indexes(cursor):
+    """Range indexes for report period filters (see src/database/date_ranges.py)."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_created ON sales(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_returns_created ON sales_returns(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_created ON loans(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cust_payments_created ON customer_payments(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cash_tx_created ON cash_transactions(created_at)")
+
+
+def m003_daily_sales_summary(cursor):
+    """Incrementally maintained daily aggregates (src/database/sales_summary.py), backfilled from history."""
+    frozen.summary_tables_v1(cursor, "daily_sales_summary", "daily_product_sales")
+    # Lines carry no cost yet (migration 8): the current cost price is all there is
+    item_cost = "si.quantity * COALESCE((SELECT cost_price FROM products p WHERE p.id = si.product_id), 0)"
+    ret_cost = "ri.quantity * COALESCE((SELECT cost_price FROM products p WHERE p.id = ri.product_id), 0)"
+    ret_cash = "COALESCE(s.payment_type, 'CASH') != 'CREDIT'"
+    frozen.summary_rebuild_v1(cursor, "daily_sales_summary", "daily_product_sales", daily_sources=[
+        (("sales_count", "revenue", "cash_revenue", "credit_revenue"), """
+            SELECT DATE(created_at, 'localtime'), COUNT(*), SUM(total_amount),
+                   SUM(CASE WHEN payment_type = 'CASH' THEN total_amount ELSE 0 END),
+                   SUM(CASE WHEN payment_type = 'CREDIT' THEN total_amount ELSE 0 END)
+            FROM sales GROUP BY 1"""),
+        (("line_revenue", "items_sold", "cogs", "cash_cogs"), f"""
+            SELECT DATE(s.created_at, 'localtime'), SUM(si.total_price), SUM(si.quantity), SUM({item_cost}),
+                   SUM(CASE WHEN s.payment_type = 'CASH' THEN {item_cost} ELSE 0 END)
+            FROM sale_items si JOIN sales s ON si.sale_id = s.id
+            GROUP BY 1"""),
+        (("returns_count", "returns_amount", "cash_returns_amount"), f"""
+            SELECT DATE(sr.created_at, 'localtime'), COUNT(*), SUM(sr.refund_amount),
+                   SUM(CASE WHEN {ret_cash} THEN sr.refund_amount ELSE 0 END)
+            FROM sales_returns sr LEFT JOIN sales s ON sr.sale_id = s.id GROUP BY 1"""),
+        (("items_returned", "returns_cogs", "cash_returns_cogs"), f"""
+            SELECT DATE(sr.created_at, 'localtime'), SUM(ri.quantity), SUM({ret_cost}),
+                   SUM(CASE WHEN {ret_cash} THEN {ret_cost} ELSE 0 END)
+            FROM return_items ri JOIN sales_returns sr ON ri.return_id = sr.id
+            LEFT JOIN sales s ON sr.sale_id = s.id
+            GROUP BY 1"""),
+        (("payments_received",), """
+            SELECT DATE(created_at, 'localtime'), SUM(amount) FROM customer_payments GROUP BY 1"""),
+    ], product_sources=[
+        (("quantity", "revenue", "cogs"), f"""
+            SELECT DATE(s.created_at, 'localtime'), si.product_id, SUM(si.quantity), SUM(si.total_price), SUM({item_cost})
+            FROM sale_items si JOIN sales s ON si.sale_id = s.id
+            GROUP BY 1, 2"""),
+        (("returned_qty", "returned_amount", "returns_cogs"), f"""
+            SELECT DATE(sr.created_at, 'localtime'), ri.product_id, SUM(ri.quantity), SUM(ri.refund_price), SUM({ret_cost})
+            FROM return_items ri JOIN sales_returns sr ON ri.return_id = sr.id
+            GROUP BY 1, 2"""),
+    ])
+
+
+def m004_catalog_changes(cursor):
+    """Change log feeding the incremental product catalog refresh (src/core/product_catalog.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for table, event, ref in (("products", "INSERT", "NEW.id"), ("products", "UPDATE", "NEW.id"),
+                              ("products", "DELETE", "OLD.id"), ("inventory", "INSERT", "NEW.product_id"),
+                              ("inventory", "UPDATE", "NEW.product_id"), ("inventory", "DELETE", "OLD.product_id")):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_{table}_{event.lower()} AFTER {event} ON {table}
+            BEGIN INSERT INTO catalog_changes (product_id) VALUES ({ref}); END
+        """)
+
+
+def m005_sequences(cursor):
+    """Invoice number sequences allocated inside the checkout transaction (src/database/sequences.py)."""
+    frozen.sequences_v1(cursor, "sales_invoice", "INV-{date:%Y%m%d}-{n:04d}")
+
+
+def m006_lookup_indexes(cursor):
+    """Foreign-key indexes behind the batched per-row loaders (src/database/batch_loader.py)."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_sid ON sale_items(sale_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_return_items_rid ON return_items(return_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_cust ON loans(customer_id)")
+
+
+def m007_month_close(cursor):
+    """Immutable month-end snapshots and closed-month expense guard (src/database/period_close.py)."""
+    frozen.month_close_v1(cursor, "month_close", "daily_sales_summary", "expenses")
+
+
+def m008_cost_layers(cursor):
+    """Cost at sale on sale / return lines and FIFO / weighted-average cost layers (src/database/costing.py)."""
+    add_column_if_missing(cursor, "sale_items", "cost_price_at_sale", "REAL")
+    add_column_if_missing(cursor, "return_items", "sale_item_id", "INTEGER")
+    add_column_if_missing(cursor, "return_items", "unit_cost", "REAL")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cost_layers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER NOT NULL, quantity REAL NOT NULL,
+            remaining REAL NOT NULL, unit_cost REAL NOT NULL, source TEXT DEFAULT 'RECEIPT', ref_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    """)
+    # Consumption only ever looks at a product's open layers
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cost_layers_open ON cost_layers(product_id, id) WHERE remaining > 0")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cost_layer_usage (
+            sale_item_id INTEGER NOT NULL, layer_id INTEGER NOT NULL, quantity REAL NOT NULL,
+            unit_cost REAL NOT NULL, returned REAL DEFAULT 0,
+            PRIMARY KEY (sale_item_id, layer_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES ('costing_method', 'FIFO')")
+
+    # Opening state: lines without a cost get the product's current cost_price (the best figure
+    # left for them), a return is costed like the line it came back from, and the stock on hand
+    # opens one layer per product
+    cursor.execute("""
+        UPDATE sale_items SET cost_price_at_sale = COALESCE((SELECT cost_price FROM products p WHERE p.id = sale_items.product_id), 0)
+        WHERE cost_price_at_sale IS NULL
+    """)
+    cursor.execute("""
+        UPDATE return_items SET
+            sale_item_id = (SELECT si.id FROM sale_items si JOIN sales_returns sr ON sr.sale_id = si.sale_id
+                            WHERE sr.id = return_items.return_id AND si.product_id = return_items.product_id
+                            ORDER BY si.id LIMIT 1)
+        WHERE sale_item_id IS NULL
+    """)
+    cursor.execute("""
+        UPDATE return_items SET unit_cost = COALESCE(
+            (SELECT si.cost_price_at_sale FROM sale_items si WHERE si.id = return_items.sale_item_id),
+            (SELECT cost_price FROM products p WHERE p.id = return_items.product_id), 0)
+        WHERE unit_cost IS NULL
+    """)
+    cursor.execute("""
+        INSERT INTO cost_layers (product_id, quantity, remaining, unit_cost, source)
+        SELECT i.product_id, i.quantity, i.quantity, COALESCE(p.cost_price, 0), 'OPENING'
+        FROM inventory i JOIN products p ON p.id = i.product_id
+        WHERE i.quantity > 0 AND NOT EXISTS (SELECT 1 FROM cost_layers l WHERE l.product_id = i.product_id)
+    """)
+
+
+def m009_customer_ledger(cursor):
+    """Customer account ledger with running balances and checkpoints, backfilled (src/database/customer_ledger.py)."""
+    frozen.customer_ledger_v1(cursor, "customer_ledger", "customer_balance_checkpoints", "customers",
+                              "idx_cust_ledger_customer", """
+        SELECT s.customer_id, 'SALE' AS kind, s.id AS ref_id, s.total_amount AS amount,
+               (SELECT GROUP_CONCAT(product_name, ', ') FROM sale_items WHERE sale_id = s.id) AS note,
+               s.created_at, 0 AS seq
+        FROM sales s WHERE s.payment_type = 'CREDIT' AND s.customer_id IS NOT NULL
+        UNION ALL
+        SELECT s.customer_id, 'RETURN', r.id, -r.refund_amount, r.reason, r.created_at, 1
+        FROM sales_returns r JOIN sales s ON r.sale_id = s.id
+        WHERE s.payment_type = 'CREDIT' AND s.customer_id IS NOT NULL
+        UNION ALL
+        SELECT customer_id, 'PAYMENT', id, -amount, reference_number, created_at, 2
+        FROM customer_payments WHERE customer_id IS NOT NULL
+    """)
+
+
+def m010_loan_allocations(cursor):
+    """Per-loan allocation rows for loan payments (src/database/loan_payments.py)."""
+    frozen.loan_allocations_v1(cursor, "loan_payment_allocations", "idx_loan_alloc")
+
+
+MIGRATIONS = [
+    Migration(1, "baseline store schema", m001_baseline),
+    Migration(2, "created_at range indexes", m002_created_at_indexes),
+    Migration(3, "daily sales summary tables", m003_daily_sales_summary),
+    Migration(4, "product catalog change log", m004_catalog_changes),
+    Migration(5, "invoice number sequences", m005_sequences),
+    Migration(6, "lookup indexes", m006_lookup_indexes),
+    Migration(7, "month-end close snapshots", m007_month_close),
+    Migration(8, "cost at sale and cost layers", m008_cost_layers),
+    Migration(9, "customer account ledger", m009_customer_ledger),
+    Migration(10, "loan payment allocations", m010_loan_allocations),
+]
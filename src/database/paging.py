@@ -0,0 +1,86 @@
+"""
+Keyset pagination for report grids.
+
+A KeysetQuery lists rows newest first by (created_at, id) and fetches one page at a time,
+continuing strictly after the last row already shown:
+
+    WHERE <filters> AND (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC LIMIT :page_size
+
+Each page is a range scan on the created_at index from where the previous one stopped, so page
+50 of a year costs the same as page 1 (OFFSET would re-read every skipped row). The period comes
+in as a DateRange rather than inside `where`: after the first page the key replaces the period's
+end as the upper bound, since SQLite would otherwise range-scan from the period end and skip
+every row already shown. Totals are not derived from the pages: the caller runs its own
+aggregate query (or reads sales_summary).
+
+`after_page(conn, rows)` may enrich a page with one batched query (e.g. item counts for the
+sale ids on that page) instead of a correlated subquery per row.
+"""
+
+PAGE_SIZE = 200
+
+
+class KeysetQuery:
+    def __init__(self, select, from_, date_range=None, where="1=1", params=(), created_at="created_at",
+                 id_column="id", after_page=None):
+        self.select = select
+        self.from_ = from_
+        self.date_range = date_range
+        self.where = where
+        self.params = tuple(params)
+        self.created_at = created_at
+        self.id_column = id_column
+        self.after_page = after_page
+
+    def page(self, conn, after=None, limit=PAGE_SIZE):
+        """
+        Up to `limit` rows (dicts) after the key `after` ((created_at, id) of the last row shown,
+        None for the first page). Every row carries its key in '_key'.
+        """
+        where, params = self._filters(upper=after is None)
+        if after is not None:
+            where += f" AND ({self.created_at}, {self.id_column}) < (?, ?)"
+            params += list(after)
+        rows = conn.execute(f"""
+            SELECT {self.select}, {self.created_at} AS _key_created_at, {self.id_column} AS _key_id
+            FROM {self.from_}
+            WHERE {where}
+            ORDER BY {self.created_at} DESC, {self.id_column} DESC
+            LIMIT ?
+        """, params + [limit]).fetchall()
+        page = []
+        for r in rows:
+            d = dict(r)
+            d['_key'] = (d.pop('_key_created_at'), d.pop('_key_id'))
+            page.append(d)
+        if page and self.after_page:
+            self.after_page(conn, page)
+        return page
+
+    def _filters(self, upper=True):
+        parts, params = [f"({self.where})"], list(self.params)
+        if self.date_range is not None:
+            if self.date_range.start:
+                parts.append(f"{self.created_at} >= ?")
+                params.append(self.date_range.start)
+            if upper and self.date_range.end:
+                parts.append(f"{self.created_at} < ?")
+                params.append(self.date_range.end)
+        return " AND ".join(parts), params
+
+    def iter_rows(self, conn, page_size=1000):
+        """Every row, page by page (printing / export)."""
+        after = None
+        while True:
+            page = self.page(conn, after, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1]['_key']
+
+    def aggregate(self, conn, exprs):
+        """One row of aggregates (e.g. "COUNT(*) AS n") over the same filters, as a dict."""
+        where, params = self._filters()
+        row = conn.execute(f"SELECT {exprs} FROM {self.from_} WHERE {where}", params).fetchone()
+        return dict(row) if row else {}
@@ -0,0 +1,298 @@
+"""
+Month-end close: immutable monthly snapshots and historical reports assembled from them.
+
+Closing a month writes one row to the business's close table with that month's sales, COGS,
+returns, payments and expenses (from the daily summaries in src/database/sales_summary.py and
+the expense table) plus the stock valuation at the time of closing. Triggers make closed rows
+read-only and reject expenses dated into a closed month, so a snapshot never drifts from the
+data behind it.
+
+Months close in order: closing a month also snapshots every earlier month since the first
+activity that has no row yet. Every month up to the latest close is
+therefore covered, and a report over any range - year to date, year over year, several years -
+sums the snapshot rows of its whole closed months and aggregates only the partial months at
+its edges and the open period after the latest close. That is a fixed handful of queries over
+at most a few months of summary rows, however long the range.
+
+    python -m src.database.period_close close store 2026-09
+    python -m src.database.period_close report pharmacy 2026-01-01 2026-10-16
+"""
+from datetime import date, datetime, timedelta
+
+from src.database import sales_summary
+from src.database.date_ranges import DateRange, period_range
+
+EXPENSE_COLUMNS = ("expenses", "salaries", "petty_cash", "other_expenses")
+FIGURE_COLUMNS = sales_summary.DAILY_COLUMNS + EXPENSE_COLUMNS
+STOCK_COLUMNS = ("stock_units", "stock_value")   # point in time: stored per close, never summed
+# Columns of the first pharmacy_month_close version, still filled for anything reading them
+LEGACY_COLUMNS = ("total_sold_items", "total_sales", "total_profit", "total_petty_cash", "total_salaries",
+                  "net_profit")
+
+
+class PeriodCloseError(Exception):
+    pass
+
+
+class CloseTables:
+    """Close table, daily summaries, expense table and stock valuation query of one business."""
+
+    def __init__(self, table, summary, expenses, stock_sql):
+        self.table = table
+        self.summary = summary
+        self.expenses = expenses
+        self.stock_sql = stock_sql
+
+
+# Store stock is valued at what its open cost layers cost (src/database/costing.py)
+STORE = CloseTables("month_close", sales_summary.STORE, "expenses", """
+    SELECT COALESCE(SUM(remaining), 0), COALESCE(SUM(remaining * unit_cost), 0) FROM cost_layers WHERE remaining > 0
+""")
+PHARMACY = CloseTables("pharmacy_month_close", sales_summary.PHARMACY, "pharmacy_expenses", """
+    SELECT COALESCE(SUM(i.quantity), 0), COALESCE(SUM(i.quantity * COALESCE(p.cost_price, 0)), 0)
+    FROM pharmacy_inventory i JOIN pharmacy_products p ON p.id = i.product_id WHERE i.quantity > 0
+""")
+BUSINESSES = {"store": STORE, "pharmacy": PHARMACY}
+
+
+# ---------------------------------------------------------------- months
+
+def month_start(month):
+    """date of the 1st of 'YYYY-MM'."""
+    return datetime.strptime(month, "%Y-%m").date()
+
+
+def next_month(day):
+    """1st of the month after `day`."""
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def month_key(day):
+    return day.strftime("%Y-%m")
+
+
+def month_range(month):
+    start = month_start(month)
+    return DateRange(start, next_month(start))
+
+
+def current_month():
+    return month_key(date.today())
+
+
+def shift_year(day, years):
+    """Same calendar day `years` later (Feb 29 becomes Feb 28)."""
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        return day.replace(year=day.year + years, day=28)
+
+
+# ---------------------------------------------------------------- figures
+
+def expense_totals(cursor, tables, date_range):
+    where, params = date_range.where_date("expense_date")
+    totals = dict.fromkeys(EXPENSE_COLUMNS, 0)
+    for category, amount in cursor.execute(
+            f"SELECT category, COALESCE(SUM(amount), 0) FROM {tables.expenses} WHERE {where} GROUP BY category",
+            params):
+        totals["expenses"] += amount
+        if category and "Salary" in category:   # 'Salary' and payroll's 'Advance Salary'
+            totals["salaries"] += amount
+        elif category == "Petty Cash":
+            totals["petty_cash"] += amount
+        else:
+            totals["other_expenses"] += amount
+    return totals
+
+
+def figures(cursor, tables, date_range):
+    """Every FIGURE_COLUMNS total over `date_range`, from the live summaries and expenses."""
+    result = sales_summary.period_totals(cursor, tables.summary, date_range)
+    result.update(expense_totals(cursor, tables, date_range))
+    return result
+
+
+def profit(f):
+    """Net sales, net COGS, gross and net profit of a figures dict (sales after discount, net of returns)."""
+    net_sales = f["revenue"] - f["returns_amount"]
+    net_cogs = f["cogs"] - f["returns_cogs"]
+    gross_profit = net_sales - net_cogs
+    return {"net_sales": net_sales, "net_cogs": net_cogs, "gross_profit": gross_profit,
+            "net_profit": gross_profit - f["expenses"]}
+
+
+def _snapshot_values(f, stock=None):
+    values = {c: f[c] for c in FIGURE_COLUMNS}
+    p = profit(f)
+    values.update(total_sold_items=f["items_sold"], total_sales=p["net_sales"], total_profit=p["gross_profit"],
+                  total_petty_cash=f["petty_cash"], total_salaries=f["salaries"], net_profit=p["net_profit"])
+    if stock is not None:
+        values.update(stock_units=stock[0], stock_value=stock[1])
+    return values
+
+
+# ---------------------------------------------------------------- closing
+
+def last_closed(cursor, tables):
+    """'YYYY-MM' of the latest closed month, or None."""
+    return cursor.execute(f"SELECT MAX(month_str) FROM {tables.table}").fetchone()[0]
+
+
+def first_activity(cursor, tables):
+    """Earliest day with sales or expenses, or None."""
+    row = cursor.execute(f"""
+        SELECT MIN(d) FROM (SELECT MIN(day) AS d FROM {tables.summary.daily}
+                            UNION ALL SELECT MIN(expense_date) FROM {tables.expenses})
+    """).fetchone()
+    return datetime.strptime(row[0][:10], "%Y-%m-%d").date() if row and row[0] else None
+
+
+def _close_through(cursor, tables, month, stock, closed_by):
+    """Snapshots every month without a row from the first activity through `month`."""
+    target = month_start(month)
+    day = min(first_activity(cursor, tables) or target, target).replace(day=1)
+    closed = []
+    while day <= target:
+        key = month_key(day)
+        if not cursor.execute(f"SELECT 1 FROM {tables.table} WHERE month_str = ?", (key,)).fetchone():
+            values = _snapshot_values(figures(cursor, tables, month_range(key)), stock if key == month else None)
+            values.update(month_str=key, closed_by=closed_by)
+            cursor.execute(f"INSERT INTO {tables.table} ({', '.join(values)}) "
+                           f"VALUES ({', '.join('?' for _ in values)})", list(values.values()))
+            closed.append(key)
+        day = next_month(day)
+    return closed
+
+
+def close_month(conn, tables, month, closed_by=None):
+    """
+    Closes `month` ('YYYY-MM', which must have ended) in one write transaction, together with
+    any earlier month still open. Returns the months closed.
+    """
+    if month >= current_month():
+        raise PeriodCloseError(f"{month} has not ended yet")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.cursor()
+        if cursor.execute(f"SELECT 1 FROM {tables.table} WHERE month_str = ?", (month,)).fetchone():
+            raise PeriodCloseError(f"{month} is already closed")
+        stock = cursor.execute(tables.stock_sql).fetchone()
+        closed = _close_through(cursor, tables, month, stock, closed_by)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print(f"[INFO] Closed {tables.table} month(s): {', '.join(closed)}")
+    return closed
+
+
+def clear(cursor, tables):
+    """
+    Data reset: deletes every snapshot. The no-delete trigger is the only thing that may stand in
+    the way, so it is dropped for the DELETE and recreated from its own sqlite_master text in the
+    same transaction; a failure rolls both back. Nothing else may bypass it.
+    """
+    trigger = f"trg_{tables.table}_no_delete"
+    row = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (trigger,)).fetchone()
+    if row:
+        cursor.execute(f"DROP TRIGGER {trigger}")
+    cursor.execute(f"DELETE FROM {tables.table}")
+    if row:
+        cursor.execute(row[0])
+
+
+def snapshot(cursor, tables, month):
+    """The closed row of `month` as a dict, or None while it is open."""
+    cursor.execute(f"SELECT * FROM {tables.table} WHERE month_str = ?", (month,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {d[0]: v for d, v in zip(cursor.description, row)}
+
+
+def month_figures(cursor, tables, month):
+    """Figures of one month: its snapshot when closed, else live. 'closed_at' is None while open."""
+    snap = snapshot(cursor, tables, month)
+    if snap is not None:
+        result = {c: snap[c] or 0 for c in FIGURE_COLUMNS}
+        result.update({c: snap[c] for c in STOCK_COLUMNS}, closed_at=snap["closed_at"])
+        return result
+    result = figures(cursor, tables, month_range(month))
+    result.update(dict.fromkeys(STOCK_COLUMNS), closed_at=None)
+    return result
+
+
+# ---------------------------------------------------------------- reports
+
+def report(cursor, tables, date_range):
+    """
+    FIGURE_COLUMNS summed over `date_range` (open ends mean from the first activity / through today).
+    Whole months up to the latest close come from their snapshots in one query; the partial
+    months at either edge and the open period are aggregated live. Adds 'closed_months'.
+    """
+    end = date_range.end_date or date.today() + timedelta(days=1)
+    start = date_range.start_date or min(first_activity(cursor, tables) or end, end)
+    last = last_closed(cursor, tables)
+    closed_end = next_month(month_start(last)) if last else None
+
+    # Whole months inside [start, end) that are closed
+    snap_from = start if start.day == 1 else next_month(start)
+    snap_to = min(end.replace(day=1), closed_end) if closed_end else snap_from
+    live = [(start, end)]
+    totals = dict.fromkeys(FIGURE_COLUMNS, 0)
+    closed_months = 0
+    if snap_from < snap_to:
+        sums = ", ".join(f"COALESCE(SUM({c}), 0)" for c in FIGURE_COLUMNS)
+        row = cursor.execute(f"SELECT COUNT(*), {sums} FROM {tables.table} WHERE month_str >= ? AND month_str < ?",
+                             (month_key(snap_from), month_key(snap_to))).fetchone()
+        closed_months = row[0]
+        totals = dict(zip(FIGURE_COLUMNS, row[1:]))
+        live = [(start, snap_from), (snap_to, end)]
+
+    for a, b in live:
+        if a < b:
+            for column, value in figures(cursor, tables, DateRange(a, b)).items():
+                totals[column] += value
+    totals["closed_months"] = closed_months
+    return totals
+
+
+def year_to_date(cursor, tables, through=None):
+    """
+    {'current': year to date through `through` (default today), 'previous': the same span one
+    year earlier} for year-over-year comparison.
+    """
+    through = through or date.today()
+    start = through.replace(month=1, day=1)
+    end = through + timedelta(days=1)
+    return {
+        "current": report(cursor, tables, DateRange(start, end)),
+        "previous": report(cursor, tables, DateRange(shift_year(start, -1), shift_year(end, -1))),
+    }
+
+
+def _connect(business):
+    from src.database.db_manager import db_manager
+    if business == "store":
+        return db_manager.get_store_connection()
+    if business == "pharmacy":
+        return db_manager.get_pharmacy_connection()
+    raise ValueError(f"Unknown business: {business}")
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    if len(args) == 3 and args[0] == "close":
+        print(close_month(_connect(args[1]), BUSINESSES[args[1]], args[2]))
+    elif len(args) in (3, 4) and args[0] == "report":
+        conn = _connect(args[1])
+        to = args[3] if len(args) > 3 else date.today().strftime("%Y-%m-%d")
+        result = report(conn.cursor(), BUSINESSES[args[1]], period_range("custom", args[2], to))
+        for key, value in result.items():
+            print(f"{key:>22}: {value:,.2f}")
+    else:
+        print("usage: python -m src.database.period_close close store|pharmacy YYYY-MM\n"
+              "       python -m src.database.period_close report store|pharmacy FROM [TO]")
+        sys.exit(2)
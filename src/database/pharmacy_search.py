@@ -0,0 +1,106 @@
+"""
+Full-text product search for the pharmacy.
+
+`pharmacy_products_fts` is an FTS5 index over pharmacy_products (name_en, generic_name, brand,
+barcode), external-content so the text is not stored twice, and kept in sync by triggers on
+insert / delete / update of those columns. Every word of the query is matched as a prefix
+("amox 500" finds "Amoxicillin 500mg"), in any of the four columns, so a generic molecule or a
+brand finds the product as well as its name does.
+
+Ranking: exact barcode, then name starting with the query, then bm25 with the name weighted
+above generic name, brand and barcode. The sales, inventory, price check and returns screens
+all go through search() / where_match() here.
+
+    python -m src.database.pharmacy_search rebuild
+"""
+import re
+
+FTS_TABLE = "pharmacy_products_fts"
+FTS_COLUMNS = ("name_en", "generic_name", "brand", "barcode")
+# bm25 column weights, same order as FTS_COLUMNS
+WEIGHTS = (10.0, 8.0, 3.0, 5.0)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def rebuild_index(cursor):
+    """Re-reads every product into the index (after the triggers were bypassed)."""
+    cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(term):
+    """FTS5 query for `term`: every word as a quoted prefix, all required. None if it has no words."""
+    tokens = _TOKEN_RE.findall(term.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def where_match(term, alias="p"):
+    """
+    SQL condition (and params) restricting `alias` (a pharmacy_products row) to products matching
+    term, for queries that add their own joins, filters and ordering.
+    """
+    match = match_expression(term)
+    if match is None:
+        return f"{alias}.barcode = ?", [term]
+    return (f"({alias}.barcode = ? OR {alias}.id IN "
+            f"(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?))"), [term, match]
+
+
+def search(cursor, term, limit=50, active_only=True, in_stock=False):
+    """
+    Best matches first: [Row(id, barcode, name_en, generic_name, brand, size, sale_price,
+    cost_price, stock)], stock being the quantity over all batches.
+    """
+    term = term.strip()
+    if not term:
+        return []
+    filters = []
+    if active_only:
+        filters.append("p.is_active = 1")
+    if in_stock:
+        filters.append("EXISTS (SELECT 1 FROM pharmacy_inventory i WHERE i.product_id = p.id AND i.quantity > 0)")
+    extra = "".join(f" AND {f}" for f in filters)
+    columns = """p.id, p.barcode, p.name_en, p.generic_name, p.brand, p.size, p.sale_price, p.cost_price,
+                 (SELECT TOTAL(quantity) FROM pharmacy_inventory i WHERE i.product_id = p.id) AS stock"""
+
+    # Exact barcode first (also covers barcodes the tokenizer would split, e.g. with dashes)
+    rows = cursor.execute(f"SELECT {columns} FROM pharmacy_products p WHERE p.barcode = ?{extra}", (term,)).fetchall()
+    match = match_expression(term)
+    if match is None or len(rows) >= limit:
+        return rows[:limit]
+    weights = ", ".join(str(w) for w in WEIGHTS)
+    rows += cursor.execute(f"""
+        SELECT {columns}
+        FROM {FTS_TABLE} f JOIN pharmacy_products p ON p.id = f.rowid
+        WHERE {FTS_TABLE} MATCH ? AND p.barcode <> ?{extra}
+        ORDER BY (p.name_en LIKE ? ESCAPE '\\') DESC, bm25({FTS_TABLE}, {weights}), length(p.name_en)
+        LIMIT ?
+    """, (match, term, _like_prefix(term), limit - len(rows))).fetchall()
+    return rows
+
+
+def _like_prefix(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def rebuild():
+    from src.database.db_manager import db_manager
+    conn = db_manager.get_pharmacy_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rebuild_index(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print("[INFO] Rebuilt pharmacy product search index")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("usage: python -m src.database.pharmacy_search rebuild")
+        sys.exit(2)
+    rebuild()
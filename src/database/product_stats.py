@@ -0,0 +1,100 @@
+"""
+Running per-product counters for the pharmacy dashboard.
+
+pharmacy_product_stats holds one row per product: units sold over its lifetime, units returned,
+units sold in the current month and units on hand. Triggers on pharmacy_sale_items,
+pharmacy_return_items and pharmacy_inventory keep it current, so every checkout, return,
+stock receipt, adjustment or write-off updates it in the same transaction whichever screen made
+it. The dashboard reads the counters by primary key instead of grouping the whole sales history.
+
+The month counter carries the month it counts (period_key); the first sale of a new month
+restarts it, and a stale row reads as 0 sold this month.
+
+    python -m src.database.product_stats verify
+    python -m src.database.product_stats rebuild
+"""
+COUNTERS = ("sold_qty", "returned_qty", "period_sold", "on_hand")
+
+_MONTH = "strftime('%Y-%m', 'now', 'localtime')"
+
+
+# Counters recomputed from the raw tables: [(product_id, sold, returned, sold this month, on hand)]
+_EXPECTED_SQL = f"""
+    SELECT p.id,
+           COALESCE((SELECT SUM(quantity) FROM pharmacy_sale_items WHERE product_id = p.id), 0),
+           COALESCE((SELECT SUM(quantity) FROM pharmacy_return_items WHERE product_id = p.id AND action = 'RETURN'), 0),
+           COALESCE((SELECT SUM(quantity) FROM pharmacy_sale_items WHERE product_id = p.id
+                     AND strftime('%Y-%m', created_at, 'localtime') = {_MONTH}), 0),
+           COALESCE((SELECT SUM(quantity) FROM pharmacy_inventory WHERE product_id = p.id), 0)
+    FROM pharmacy_products p
+"""
+
+
+def rebuild(cursor):
+    """Recomputes every product's counters from sales, returns and inventory."""
+    cursor.execute("DELETE FROM pharmacy_product_stats")
+    cursor.execute(f"""
+        INSERT INTO pharmacy_product_stats (product_id, sold_qty, returned_qty, period_sold, on_hand, period_key)
+        SELECT *, {_MONTH} FROM ({_EXPECTED_SQL})
+    """)
+
+
+def verify(cursor):
+    """Products whose counters differ from the raw tables: [(product_id, {counter: (stored, expected)})]."""
+    stored = {r[0]: r[1:] for r in cursor.execute(f"""
+        SELECT product_id, sold_qty, returned_qty,
+               CASE WHEN period_key = {_MONTH} THEN period_sold ELSE 0 END, on_hand
+        FROM pharmacy_product_stats
+    """)}
+    mismatched = []
+    for row in cursor.execute(_EXPECTED_SQL).fetchall():
+        have = stored.get(row[0], (0, 0, 0, 0))
+        diff = {c: (h or 0, e) for c, h, e in zip(COUNTERS, have, row[1:]) if abs((h or 0) - e) > 1e-6}
+        if diff:
+            mismatched.append((row[0], diff))
+    return mismatched
+
+
+def load(cursor):
+    """Active products with their counters, by name: [{'id', 'name_en', 'sold_qty', 'period_sold', 'current_qty'}]."""
+    rows = cursor.execute(f"""
+        SELECT p.id, p.name_en,
+               COALESCE(s.sold_qty, 0) - COALESCE(s.returned_qty, 0) AS sold_qty,
+               CASE WHEN s.period_key = {_MONTH} THEN s.period_sold ELSE 0 END AS period_sold,
+               COALESCE(s.on_hand, 0) AS current_qty
+        FROM pharmacy_products p
+        LEFT JOIN pharmacy_product_stats s ON s.product_id = p.id
+        WHERE p.is_active = 1
+        ORDER BY p.name_en ASC
+    """).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _run(action):
+    from src.database.db_manager import db_manager
+    conn = db_manager.get_pharmacy_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = action(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "verify":
+        mismatched = _run(verify)
+        for product_id, diff in mismatched:
+            print(f"product {product_id}: " + ", ".join(f"{c} {s:g} (expected {e:g})" for c, (s, e) in diff.items()))
+        print(f"[INFO] {len(mismatched)} product(s) with drifted counters")
+        sys.exit(1 if mismatched else 0)
+    elif command == "rebuild":
+        _run(rebuild)
+        print("[INFO] Rebuilt pharmacy product counters")
+    else:
+        print("usage: python -m src.database.product_stats verify | rebuild")
+        sys.exit(2)
@@ -0,0 +1,172 @@
+"""
+Result cache for report screens.
+
+Report screens re-run the same aggregates again and again (ReportsView every 15 seconds,
+PharmacyReportsView on every show and filter change, the finance summaries on every show)
+although the data rarely changed in between. A report's result is cached under
+(database, report name, parameters) together with the database's token() - its change counter
+paired with the watcher's session id - and a lookup whose token has moved recomputes it.
+
+The change counter is PRAGMA data_version, read on a dedicated read-only "watcher" connection per
+database file. data_version only moves when *another* connection commits, so it cannot be read on
+the pooled connections (a worker thread would never see its own checkouts); the watcher never
+writes, so a commit from any pooled connection - or from another process - moves it. Reading it
+checks the WAL index header and touches no table pages.
+
+`params` must be hashable and describe the result completely: pass the DateRange (and today's
+date for anything measured against "now", e.g. expiry windows), not the label shown for it.
+Cached values are shared between callers and must be treated as read-only.
+
+Entries are evicted least recently used once there are more than max_entries or their
+approximate size passes max_bytes.
+"""
+import sqlite3
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+
+MAX_ENTRIES = 64
+MAX_BYTES = 16 * 1024 * 1024
+
+
+def approx_size(obj, _depth=0):
+    """Rough deep size in bytes of a result (dicts, lists, tuples, rows and scalars)."""
+    size = sys.getsizeof(obj)
+    if _depth > 6:
+        return size
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, sqlite3.Row)):
+        size += sum(approx_size(v, _depth + 1) for v in obj)
+    return size
+
+
+class ReportCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (db path, report, params) -> (token, value, size), LRU order
+        self._watchers = {}             # db path -> read-only connection
+        self._sessions = {}             # db path -> id of the watcher's lifetime (see token())
+        self._bytes = 0
+
+        # Counters (read via stats())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -- change counter
+
+    def token(self, db_path):
+        """
+        The database's data-state key, or None when it cannot be read (results are then not cached).
+        data_version restarts whenever the watcher is reopened (app restart, a watcher dropped
+        after an error, close() before a restore), so it is paired with a random id minted for
+        each watcher's lifetime: anything keyed in an earlier lifetime - in memory or in an
+        on-disk cache - never matches again.
+        """
+        with self._lock:
+            try:
+                conn = self._watchers.get(db_path)
+                if conn is None:
+                    conn = sqlite3.connect(db_path, check_same_thread=False)
+                    conn.execute("PRAGMA query_only=1")
+                    self._watchers[db_path] = conn
+                    self._sessions[db_path] = uuid.uuid4().hex
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                return f"{self._sessions[db_path]}:{version}"
+            except sqlite3.Error as e:
+                print(f"[WARNING] Report cache could not read data_version of {db_path}: {e}")
+                self._drop_watcher(db_path)
+                return None
+
+    def _drop_watcher(self, db_path):
+        """Forgets a failed watcher and every result stored under it (caller holds the lock)."""
+        conn = self._watchers.pop(db_path, None)
+        self._sessions.pop(db_path, None)
+        for key in [k for k in self._entries if k[0] == db_path]:
+            self._bytes -= self._entries.pop(key)[2]
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    # -- API
+
+    def get_or_compute(self, db_path, report, params, compute):
+        """
+        The cached result of `report` for `params`, or compute() when the database changed since
+        it was stored (or it was never stored). compute() runs outside the lock, on the caller's
+        thread, and should read through its own pooled connection.
+        """
+        key = (db_path, report, params)
+        # Read the token before computing: a commit racing with compute() then only costs
+        # one extra recompute on the next lookup, never a stale hit.
+        token = self.token(db_path)
+        if token is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == token:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+
+        value = compute()
+        if token is not None:
+            self._store(key, token, value)
+        return value
+
+    def _store(self, key, token, value):
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (token, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, db_path=None, report=None):
+        """Drops cached results (all, one database's, or one report's)."""
+        with self._lock:
+            for key in [k for k in self._entries
+                        if (db_path is None or k[0] == db_path) and (report is None or k[1] == report)]:
+                self._bytes -= self._entries.pop(key)[2]
+
+    def close(self):
+        """Drops every result and watcher connection (shutdown / before replacing DB files)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            watchers, self._watchers = list(self._watchers.values()), {}
+            self._sessions = {}
+        for conn in watchers:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+report_cache = ReportCache()
+
@@ -0,0 +1,301 @@
+"""
+Incrementally maintained daily sales aggregates.
+
+Checkout, returns and payments bump one row per local calendar day (plus one row per day and
+product) inside their own transaction, so dashboard and finance KPIs read a few hundred
+summary rows instead of re-aggregating sale_items for every refresh. rebuild_store() /
+rebuild_pharmacy() recompute everything from the raw tables (after a manual fix):
+
+    python -m src.database.sales_summary rebuild [store|pharmacy]
+"""
+from datetime import datetime
+
+# Per-day counters. Revenue is the sale total (after discount), line_revenue the sum of item lines.
+DAILY_COLUMNS = (
+    "sales_count", "revenue", "line_revenue", "items_sold", "cogs",
+    "cash_revenue", "cash_cogs", "credit_revenue",
+    "returns_count", "returns_amount", "returns_cogs", "items_returned",
+    "cash_returns_amount", "cash_returns_cogs",
+    "payments_received", "payments_cogs",
+)
+PRODUCT_COLUMNS = ("quantity", "revenue", "cogs", "returned_qty", "returned_amount", "returns_cogs")
+
+
+class SummaryTables:
+    """Table names for one business database."""
+
+    def __init__(self, daily, products, product_source):
+        self.daily = daily
+        self.products = products
+        self.product_source = product_source  # catalog table holding cost_price
+
+
+STORE = SummaryTables("daily_sales_summary", "daily_product_sales", "products")
+PHARMACY = SummaryTables("pharmacy_daily_summary", "pharmacy_daily_product_sales", "pharmacy_products")
+
+
+def today():
+    """Local calendar day key, the same one DATE(created_at, 'localtime') produces."""
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _upsert_sql(table, keys, columns, source="VALUES", touch=False):
+    """INSERT ... ON CONFLICT DO UPDATE that adds the new values onto the existing counters."""
+    names = ", ".join(keys + columns)
+    if source == "VALUES":
+        source = "VALUES (" + ", ".join("?" for _ in keys + columns) + ")"
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in columns)
+    if touch:
+        updates += ", updated_at = CURRENT_TIMESTAMP"
+    return f"INSERT INTO {table} ({names}) {source} ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+
+
+def _bump_daily(cursor, tables, day, deltas):
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    cols = list(deltas)
+    cursor.execute(_upsert_sql(tables.daily, ["day"], cols, touch=True), [day] + [deltas[c] for c in cols])
+
+
+def _bump_products(cursor, tables, day, columns, per_product):
+    if per_product:
+        cursor.executemany(_upsert_sql(tables.products, ["day", "product_id"], list(columns)),
+                           [(day, pid) + tuple(vals) for pid, vals in per_product.items()])
+
+
+def _fill_costs(cursor, tables, lines):
+    """Lines are (product_id, quantity, amount, unit_cost); a missing/zero cost falls back to cost_price."""
+    missing = {pid for pid, _, _, cost in lines if not cost}
+    costs = {}
+    if missing:
+        marks = ",".join("?" for _ in missing)
+        rows = cursor.execute(f"SELECT id, cost_price FROM {tables.product_source} WHERE id IN ({marks})",
+                              tuple(missing)).fetchall()
+        costs = {r[0]: r[1] or 0 for r in rows}
+    return [(pid, qty or 0, amount or 0, cost or costs.get(pid, 0)) for pid, qty, amount, cost in lines]
+
+
+def _per_product(lines):
+    totals = {}
+    for pid, qty, amount, cost in lines:
+        q, a, c = totals.get(pid, (0, 0, 0))
+        totals[pid] = (q + qty, a + amount, c + qty * cost)
+    return totals
+
+
+def record_sale(cursor, tables, payment_type, total_amount, lines, day=None):
+    """Adds one sale and returns its cost of goods. lines: (product_id, quantity, line_total, unit_cost or None)."""
+    day = day or today()
+    lines = _fill_costs(cursor, tables, lines)
+    per_product = _per_product(lines)
+    cogs = sum(c for _, _, c in per_product.values())
+    _bump_daily(cursor, tables, day, {
+        "sales_count": 1,
+        "revenue": total_amount,
+        "line_revenue": sum(a for _, a, _ in per_product.values()),
+        "items_sold": sum(q for q, _, _ in per_product.values()),
+        "cogs": cogs,
+        "cash_revenue": total_amount if payment_type == "CASH" else 0,
+        "cash_cogs": cogs if payment_type == "CASH" else 0,
+        "credit_revenue": total_amount if payment_type == "CREDIT" else 0,
+    })
+    _bump_products(cursor, tables, day, ("quantity", "revenue", "cogs"), per_product)
+    return cogs
+
+
+def record_return(cursor, tables, refund_amount, lines, refund_type="CASH", day=None):
+    """
+    Adds one return and returns the cost of the returned goods.
+    lines: (product_id, quantity, refunded_amount, unit_cost or None).
+    refund_type is 'CASH' (money paid out) or 'ACCOUNT' (credited to the customer's balance).
+    """
+    day = day or today()
+    lines = _fill_costs(cursor, tables, lines)
+    per_product = _per_product(lines)
+    cost = sum(c for _, _, c in per_product.values())
+    is_cash = refund_type == "CASH"
+    _bump_daily(cursor, tables, day, {
+        "returns_count": 1,
+        "returns_amount": refund_amount,
+        "returns_cogs": cost,
+        "items_returned": sum(q for q, _, _ in per_product.values()),
+        "cash_returns_amount": refund_amount if is_cash else 0,
+        "cash_returns_cogs": cost if is_cash else 0,
+    })
+    _bump_products(cursor, tables, day, ("returned_qty", "returned_amount", "returns_cogs"), per_product)
+    return cost
+
+
+def record_payment(cursor, tables, amount, cogs=0, day=None):
+    """Adds a received credit/loan payment; cogs is the share of the original sale's cost it settles."""
+    _bump_daily(cursor, tables, day or today(), {"payments_received": amount, "payments_cogs": cogs})
+
+
+def sale_cost_share(cursor, sale_id, amount):
+    """Pharmacy: cost of goods carried by `amount` paid against sale_id (proportional to its total)."""
+    row = cursor.execute("""
+        SELECT s.total_amount, SUM(si.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price, 0))
+        FROM pharmacy_sales s
+        JOIN pharmacy_sale_items si ON si.sale_id = s.id
+        LEFT JOIN pharmacy_products p ON si.product_id = p.id
+        WHERE s.id = ?
+    """, (sale_id,)).fetchone()
+    if not row or not row[0]:
+        return 0
+    return amount * (row[1] or 0) / float(row[0])
+
+
+# ---------------------------------------------------------------- rebuild
+
+def clear(cursor, tables):
+    """Data reset: empties the daily and per-product summaries."""
+    cursor.execute(f"DELETE FROM {tables.daily}")
+    cursor.execute(f"DELETE FROM {tables.products}")
+
+
+def _rebuild(cursor, tables, daily_sources, product_sources):
+    clear(cursor, tables)
+    # Every source SELECT ends in GROUP BY, which keeps "... JOIN x ON ... ON CONFLICT" unambiguous.
+    for columns, select in daily_sources:
+        cursor.execute(_upsert_sql(tables.daily, ["day"], list(columns), source=select))
+    for columns, select in product_sources:
+        cursor.execute(_upsert_sql(tables.products, ["day", "product_id"], list(columns), source=select))
+
+
+def rebuild_store(cursor):
+    """Recomputes the store summaries from sales, sale_items, returns and customer payments."""
+    # Lines carry their own cost (src/database/costing.py)
+    item_cost = "si.quantity * COALESCE(si.cost_price_at_sale, 0)"
+    ret_cost = "ri.quantity * COALESCE(ri.unit_cost, 0)"
+    ret_cash = "COALESCE(s.payment_type, 'CASH') != 'CREDIT'"
+    _rebuild(cursor, STORE, daily_sources=[
+        (("sales_count", "revenue", "cash_revenue", "credit_revenue"), """
+            SELECT DATE(created_at, 'localtime'), COUNT(*), SUM(total_amount),
+                   SUM(CASE WHEN payment_type = 'CASH' THEN total_amount ELSE 0 END),
+                   SUM(CASE WHEN payment_type = 'CREDIT' THEN total_amount ELSE 0 END)
+            FROM sales GROUP BY 1"""),
+        (("line_revenue", "items_sold", "cogs", "cash_cogs"), f"""
+            SELECT DATE(s.created_at, 'localtime'), SUM(si.total_price), SUM(si.quantity), SUM({item_cost}),
+                   SUM(CASE WHEN s.payment_type = 'CASH' THEN {item_cost} ELSE 0 END)
+            FROM sale_items si JOIN sales s ON si.sale_id = s.id
+            GROUP BY 1"""),
+        (("returns_count", "returns_amount", "cash_returns_amount"), f"""
+            SELECT DATE(sr.created_at, 'localtime'), COUNT(*), SUM(sr.refund_amount),
+                   SUM(CASE WHEN {ret_cash} THEN sr.refund_amount ELSE 0 END)
+            FROM sales_returns sr LEFT JOIN sales s ON sr.sale_id = s.id GROUP BY 1"""),
+        (("items_returned", "returns_cogs", "cash_returns_cogs"), f"""
+            SELECT DATE(sr.created_at, 'localtime'), SUM(ri.quantity), SUM({ret_cost}),
+                   SUM(CASE WHEN {ret_cash} THEN {ret_cost} ELSE 0 END)
+            FROM return_items ri JOIN sales_returns sr ON ri.return_id = sr.id
+            LEFT JOIN sales s ON sr.sale_id = s.id
+            GROUP BY 1"""),
+        (("payments_received",), """
+            SELECT DATE(created_at, 'localtime'), SUM(amount) FROM customer_payments GROUP BY 1"""),
+    ], product_sources=[
+        (("quantity", "revenue", "cogs"), f"""
+            SELECT DATE(s.created_at, 'localtime'), si.product_id, SUM(si.quantity), SUM(si.total_price), SUM({item_cost})
+            FROM sale_items si JOIN sales s ON si.sale_id = s.id
+            GROUP BY 1, 2"""),
+        (("returned_qty", "returned_amount", "returns_cogs"), f"""
+            SELECT DATE(sr.created_at, 'localtime'), ri.product_id, SUM(ri.quantity), SUM(ri.refund_price), SUM({ret_cost})
+            FROM return_items ri JOIN sales_returns sr ON ri.return_id = sr.id
+            GROUP BY 1, 2"""),
+    ])
+
+
+def rebuild_pharmacy(cursor):
+    """Recomputes the pharmacy summaries from sales, sale items, returns and loan payments."""
+    item_cost = "si.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price, 0)"
+    ret_cost = "ri.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price, 0)"
+    ret_amount = "CASE WHEN ri.action = 'RETURN' THEN ri.quantity * ri.unit_price ELSE 0 END"
+
+    def cost_ratio(sale):
+        return f"""CASE WHEN {sale}.total_amount > 0 THEN (
+                       SELECT SUM({item_cost}) FROM pharmacy_sale_items si
+                       LEFT JOIN pharmacy_products p ON si.product_id = p.id WHERE si.sale_id = {sale}.id
+                   ) / CAST({sale}.total_amount AS REAL) ELSE 0 END"""
+
+    # Payments split across loans (src/database/loan_payments.py) carry the cost of each loan's sale
+    payment_cogs = f"""COALESCE((
+               SELECT SUM(a.amount * {cost_ratio('als')}) FROM pharmacy_loan_payment_allocations a
+               JOIN pharmacy_loans al ON a.loan_id = al.id JOIN pharmacy_sales als ON als.id = al.sale_id
+               WHERE a.payment_id = pay.id), pay.amount * {cost_ratio('s')})"""
+    _rebuild(cursor, PHARMACY, daily_sources=[
+        (("sales_count", "revenue", "cash_revenue", "credit_revenue"), """
+            SELECT DATE(created_at, 'localtime'), COUNT(*), SUM(total_amount),
+                   SUM(CASE WHEN payment_type = 'CASH' THEN total_amount ELSE 0 END),
+                   SUM(CASE WHEN payment_type = 'CREDIT' THEN total_amount ELSE 0 END)
+            FROM pharmacy_sales GROUP BY 1"""),
+        (("line_revenue", "items_sold", "cogs", "cash_cogs"), f"""
+            SELECT DATE(s.created_at, 'localtime'), SUM(si.total_price), SUM(si.quantity), SUM({item_cost}),
+                   SUM(CASE WHEN s.payment_type = 'CASH' THEN {item_cost} ELSE 0 END)
+            FROM pharmacy_sale_items si JOIN pharmacy_sales s ON si.sale_id = s.id
+            LEFT JOIN pharmacy_products p ON si.product_id = p.id
+            GROUP BY 1"""),
+        (("returns_count", "returns_amount", "cash_returns_amount"), """
+            SELECT DATE(created_at, 'localtime'), COUNT(*), SUM(refund_amount),
+                   SUM(CASE WHEN refund_type = 'CASH' THEN refund_amount ELSE 0 END)
+            FROM pharmacy_returns GROUP BY 1"""),
+        (("items_returned", "returns_cogs", "cash_returns_cogs"), f"""
+            SELECT DATE(r.created_at, 'localtime'), SUM(ri.quantity), SUM({ret_cost}),
+                   SUM(CASE WHEN r.refund_type = 'CASH' THEN {ret_cost} ELSE 0 END)
+            FROM pharmacy_return_items ri JOIN pharmacy_returns r ON ri.return_id = r.id
+            LEFT JOIN pharmacy_sale_items si ON ri.sale_item_id = si.id
+            LEFT JOIN pharmacy_products p ON ri.product_id = p.id
+            GROUP BY 1"""),
+        (("payments_received", "payments_cogs"), f"""
+            SELECT DATE(pay.created_at, 'localtime'), SUM(pay.amount), SUM({payment_cogs})
+            FROM pharmacy_payments pay
+            LEFT JOIN pharmacy_loans l ON pay.loan_id = l.id
+            LEFT JOIN pharmacy_sales s ON s.id = COALESCE(pay.sale_id, l.sale_id)
+            GROUP BY 1"""),
+    ], product_sources=[
+        (("quantity", "revenue", "cogs"), f"""
+            SELECT DATE(s.created_at, 'localtime'), si.product_id, SUM(si.quantity), SUM(si.total_price), SUM({item_cost})
+            FROM pharmacy_sale_items si JOIN pharmacy_sales s ON si.sale_id = s.id
+            LEFT JOIN pharmacy_products p ON si.product_id = p.id
+            GROUP BY 1, 2"""),
+        (("returned_qty", "returned_amount", "returns_cogs"), f"""
+            SELECT DATE(r.created_at, 'localtime'), ri.product_id, SUM(ri.quantity), SUM({ret_amount}), SUM({ret_cost})
+            FROM pharmacy_return_items ri JOIN pharmacy_returns r ON ri.return_id = r.id
+            LEFT JOIN pharmacy_sale_items si ON ri.sale_item_id = si.id
+            LEFT JOIN pharmacy_products p ON ri.product_id = p.id
+            GROUP BY 1, 2"""),
+    ])
+
+
+def period_totals(cursor, tables, date_range):
+    """Sums every daily counter over a DateRange. Returns a dict (zeros when there are no rows)."""
+    where, params = date_range.where_date("day")
+    sums = ", ".join(f"COALESCE(SUM({c}), 0)" for c in DAILY_COLUMNS)
+    row = cursor.execute(f"SELECT {sums} FROM {tables.daily} WHERE {where}", params).fetchone()
+    return dict(zip(DAILY_COLUMNS, row))
+
+
+def rebuild(business):
+    """Rebuilds one business's summaries in a single write transaction."""
+    from src.database.db_manager import db_manager
+    if business == "store":
+        conn, fn = db_manager.get_store_connection(), rebuild_store
+    elif business == "pharmacy":
+        conn, fn = db_manager.get_pharmacy_connection(), rebuild_pharmacy
+    else:
+        raise ValueError(f"Unknown business: {business}")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        fn(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print(f"[INFO] Rebuilt {business} daily sales summaries")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("usage: python -m src.database.sales_summary rebuild [store|pharmacy]")
+        sys.exit(2)
+    for name in (sys.argv[2:] or ["store", "pharmacy"]):
+        rebuild(name)
@@ -0,0 +1,156 @@
+"""
+Invoice number sequences.
+
+Numbers come from a `sequences` row (one per sequence name and period) bumped inside the
+checkout transaction, so they are unique under concurrent checkouts and a rolled-back sale
+gives its number back instead of leaving a hole. Formats live in `sequence_formats`
+(seeded per database by the migrations, editable without a release):
+
+    name              format                              reset  block_size
+    sales_invoice     INV-{date:%Y%m%d}-{n:04d}           day    0
+    pharmacy_invoice  PHARM-{date:%Y%m%d}-{n:04d}         day    0
+
+Placeholders: {date:...} (local time, strftime codes), {n} (the number) and {terminal}.
+reset is 'day', 'month' or 'never'; the format must include enough of the date to tell periods
+apart, since invoice_number is UNIQUE. With block_size > 0 each terminal takes that many numbers
+at a time from the shared counter (recorded in `sequence_blocks`) and issues them in order, so
+a terminal's invoices stay contiguous; numbers left in a block at the end of a period are the
+only possible gaps and gaps() lists them.
+"""
+from datetime import datetime
+
+SALES_INVOICE = "sales_invoice"
+PHARMACY_INVOICE = "pharmacy_invoice"
+
+DEFAULT_FORMATS = {
+    SALES_INVOICE: ("INV-{date:%Y%m%d}-{n:04d}", "day", 0),
+    PHARMACY_INVOICE: ("PHARM-{date:%Y%m%d}-{n:04d}", "day", 0),
+}
+
+_PERIOD_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "never": ""}
+
+
+class SequenceFormat:
+    def __init__(self, name, fmt, reset="day", block_size=0):
+        if reset not in _PERIOD_FORMATS:
+            raise ValueError(f"Unknown sequence reset '{reset}' for {name}")
+        self.name = name
+        self.fmt = fmt
+        self.reset = reset
+        self.block_size = int(block_size or 0)
+
+    def period(self, now):
+        return now.strftime(_PERIOD_FORMATS[self.reset])
+
+    def render(self, value, now, terminal=None):
+        return self.fmt.format(date=now, n=value, terminal=terminal or "")
+
+
+_formats = {}  # name -> SequenceFormat (each name lives in one database)
+
+
+def terminal_name():
+    """This machine's terminal id for per-terminal blocks (the PC name recorded at install)."""
+    from src.core.local_config import local_config
+    return local_config.get("pc_name") or ""
+
+
+def get_format(cursor, name):
+    """The configured format (cached; call reload_formats() after editing the table)."""
+    fmt = _formats.get(name)
+    if fmt is None:
+        row = cursor.execute("SELECT format, reset, block_size FROM sequence_formats WHERE name = ?", (name,)).fetchone()
+        fmt = SequenceFormat(name, *row) if row else SequenceFormat(name, *DEFAULT_FORMATS[name])
+        _formats[name] = fmt
+    return fmt
+
+
+def reload_formats():
+    _formats.clear()
+
+
+def _bump(cursor, name, period, count):
+    """Advances the shared counter by `count` and returns its new value."""
+    cursor.execute("""
+        INSERT INTO sequences (name, period, value) VALUES (?, ?, ?)
+        ON CONFLICT (name, period) DO UPDATE SET value = value + excluded.value
+    """, (name, period, count))
+    return cursor.execute("SELECT value FROM sequences WHERE name = ? AND period = ?", (name, period)).fetchone()[0]
+
+
+def allocate(cursor, name, terminal=None, now=None):
+    """
+    Takes the next number. Must run inside the caller's write transaction (BEGIN IMMEDIATE),
+    which is what makes it collision-free. Returns (value, formatted).
+    """
+    now = now or datetime.now()
+    fmt = get_format(cursor, name)
+    period = fmt.period(now)
+    if fmt.block_size > 0 and terminal:
+        row = cursor.execute("""
+            SELECT first_value, next_value FROM sequence_blocks
+            WHERE name = ? AND period = ? AND terminal = ? AND next_value <= last_value
+        """, (name, period, terminal)).fetchone()
+        if row is not None:
+            value = row[1]
+            cursor.execute("""
+                UPDATE sequence_blocks SET next_value = next_value + 1
+                WHERE name = ? AND period = ? AND terminal = ? AND first_value = ?
+            """, (name, period, terminal, row[0]))
+        else:
+            last = _bump(cursor, name, period, fmt.block_size)
+            value = last - fmt.block_size + 1
+            cursor.execute("""
+                INSERT INTO sequence_blocks (name, period, terminal, first_value, next_value, last_value)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (name, period, terminal, value, value + 1, last))
+    else:
+        value = _bump(cursor, name, period, 1)
+    return value, fmt.render(value, now, terminal)
+
+
+def peek(cursor, name, terminal=None, now=None):
+    """The number allocate() would hand out next on this terminal (display only, reserves nothing)."""
+    now = now or datetime.now()
+    fmt = get_format(cursor, name)
+    period = fmt.period(now)
+    if fmt.block_size > 0 and terminal:
+        row = cursor.execute("""
+            SELECT next_value FROM sequence_blocks
+            WHERE name = ? AND period = ? AND terminal = ? AND next_value <= last_value
+        """, (name, period, terminal)).fetchone()
+        if row is not None:
+            return fmt.render(row[0], now, terminal)
+    row = cursor.execute("SELECT value FROM sequences WHERE name = ? AND period = ?", (name, period)).fetchone()
+    return fmt.render((row[0] if row else 0) + 1, now, terminal)
+
+
+def last_issued(cursor, name, terminal=None, now=None):
+    """The last number issued in the current period (on this terminal when blocks are used), or None."""
+    now = now or datetime.now()
+    fmt = get_format(cursor, name)
+    period = fmt.period(now)
+    if fmt.block_size > 0 and terminal:
+        row = cursor.execute("""
+            SELECT MAX(next_value - 1) FROM sequence_blocks
+            WHERE name = ? AND period = ? AND terminal = ? AND next_value > first_value
+        """, (name, period, terminal)).fetchone()
+        value = row[0] if row else None
+    else:
+        row = cursor.execute("SELECT value FROM sequences WHERE name = ? AND period = ?", (name, period)).fetchone()
+        value = row[0] if row and row[0] > 0 else None
+    return fmt.render(value, now, terminal) if value else None
+
+
+def gaps(cursor, name, before_period=None):
+    """
+    Numbers reserved in terminal blocks but never issued, for periods before `before_period`
+    (default: the current one): [(period, terminal, first_unused, last_unused)].
+    """
+    fmt = get_format(cursor, name)
+    before_period = before_period or fmt.period(datetime.now())
+    return [tuple(r) for r in cursor.execute("""
+        SELECT period, terminal, next_value, last_value FROM sequence_blocks
+        WHERE name = ? AND period < ? AND next_value <= last_value
+        ORDER BY period, first_value
+    """, (name, before_period))]
@@ -0,0 +1,187 @@
+"""
+Model/view cart for the POS sales screen.
+
+CartTableModel keeps the cart lines (the same dicts checkout consumes) and only signals the rows
+that actually change: a repeat scan is one dataChanged on one row, a new product is one row
+insert. Stock comes from the shared product catalog, so painting a row never queries SQLite.
+RemoveButtonDelegate paints the per-row remove button instead of creating a widget per row.
+"""
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QRectF, QPointF, pyqtSignal, QEvent
+from PyQt6.QtGui import QColor, QPainter, QPen
+from PyQt6.QtWidgets import QStyledItemDelegate
+
+from src.core.localization import lang_manager
+from src.core.product_catalog import product_catalog
+
+COL_ID, COL_BARCODE, COL_NAME, COL_PRICE, COL_QTY, COL_STOCK, COL_TOTAL, COL_ACTION = range(8)
+HEADERS = ["ID", "Barcode", "Product Name", "Price", "Qty", "Stock", "Total", "Action"]
+
+
+class CartTableModel(QAbstractTableModel):
+    # Emitted when an edited quantity is rejected: (title, message)
+    qty_rejected = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+        self._rows = {}  # product id -> row, so a repeat scan does not walk the cart
+
+    # -- Qt model API
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def flags(self, index):
+        base = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == COL_QTY:
+            base |= Qt.ItemFlag.ItemIsEditable
+        return base
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        col = index.column()
+
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if col == COL_ID:
+                return str(item['id'])
+            if col == COL_BARCODE:
+                return item['barcode']
+            if col == COL_NAME:
+                return item['name']
+            if col == COL_PRICE:
+                return lang_manager.localize_digits(f"{item['price']:.2f}")
+            if col == COL_QTY:
+                return str(item['qty']) if role == Qt.ItemDataRole.EditRole else lang_manager.localize_digits(str(item['qty']))
+            if col == COL_STOCK:
+                return lang_manager.localize_digits(str(int(self.stock(item))))
+            if col == COL_TOTAL:
+                return lang_manager.localize_digits(f"{(item['price'] * item['qty']):.2f}")
+            return None
+
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if col in (COL_QTY, COL_STOCK):
+                return Qt.AlignmentFlag.AlignCenter
+            if col == COL_TOTAL:
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+            return None
+
+        if role == Qt.ItemDataRole.ForegroundRole and col == COL_STOCK:
+            stock = self.stock(item)
+            if stock > 10:
+                return QColor(Qt.GlobalColor.darkGreen)
+            if stock > 5:
+                return QColor(255, 140, 0)  # Orange
+            return QColor(Qt.GlobalColor.red)
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != COL_QTY:
+            return False
+        item = self.items[index.row()]
+        try:
+            new_qty = float(value)
+        except (TypeError, ValueError):
+            return False
+        if new_qty < 0:
+            self.qty_rejected.emit(lang_manager.get("invalid_qty"), lang_manager.get("qty_cannot_be_negative"))
+            return False
+        if new_qty > item['max_qty']:
+            self.qty_rejected.emit(lang_manager.get("insufficient_stock"),
+                                   f"{lang_manager.get('remaining')}: {lang_manager.localize_digits(item['max_qty'])}")
+            return False
+        item['qty'] = new_qty
+        self._row_changed(index.row())
+        return True
+
+    # -- cart operations
+
+    @staticmethod
+    def stock(item):
+        rec = product_catalog.by_id(item['id'])
+        return rec.stock if rec else item.get('max_qty', 0)
+
+    def find_row(self, product_id):
+        return self._rows.get(product_id, -1)
+
+    def add_line(self, item):
+        row = len(self.items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.items.append(item)
+        self._rows[item['id']] = row
+        self.endInsertRows()
+        return row
+
+    def increment(self, row, by=1):
+        self.items[row]['qty'] += by
+        self._row_changed(row)
+
+    def remove_row(self, row):
+        if 0 <= row < len(self.items):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.items.pop(row)
+            self._reindex()
+            self.endRemoveRows()
+
+    def set_items(self, items):
+        self.beginResetModel()
+        self.items = items
+        self._reindex()
+        self.endResetModel()
+
+    def _reindex(self):
+        self._rows = {item['id']: row for row, item in enumerate(self.items)}
+
+    def refresh_stock(self):
+        """Repaints the stock column after a catalog refresh."""
+        if self.items:
+            self.dataChanged.emit(self.index(0, COL_STOCK), self.index(len(self.items) - 1, COL_STOCK))
+
+    def subtotal(self):
+        return sum(item['price'] * item['qty'] for item in self.items)
+
+    def _row_changed(self, row):
+        self.dataChanged.emit(self.index(row, COL_QTY), self.index(row, COL_TOTAL))
+
+
+class RemoveButtonDelegate(QStyledItemDelegate):
+    """Paints a red 'x' button in the action column and reports clicks by row."""
+    remove_clicked = pyqtSignal(int)
+
+    SIZE = 32
+
+    def _button_rect(self, option):
+        r = option.rect
+        return QRectF(r.center().x() - self.SIZE / 2, r.center().y() - self.SIZE / 2, self.SIZE, self.SIZE)
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)  # row background / selection
+        rect = self._button_rect(option)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor("#ee5d50"))
+        painter.drawRoundedRect(rect, 6, 6)
+        pen = QPen(QColor("white"), 2.5)
+        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+        painter.setPen(pen)
+        m = self.SIZE * 0.32
+        left, top, right, bottom = rect.left() + m, rect.top() + m, rect.right() - m, rect.bottom() - m
+        painter.drawLine(QPointF(left, top), QPointF(right, bottom))
+        painter.drawLine(QPointF(right, top), QPointF(left, bottom))
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonRelease and self._button_rect(option).contains(event.position()):
+            self.remove_clicked.emit(index.row())
+            return True
+        return False
@@ -0,0 +1,75 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView, QHeaderView
+from PyQt6.QtCore import Qt
+from src.core.localization import lang_manager
+from src.database import customer_ledger
+from src.database.db_manager import db_manager
+from src.ui.paged_table_model import PagedTableModel
+from src.ui.table_styles import style_table
+
+
+def _money(value):
+    return lang_manager.localize_digits(f"{value:,.2f}")
+
+
+class _StatementModel(PagedTableModel):
+    BALANCE_COLUMN = 5
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.ForegroundRole and index.isValid() and index.column() == self.BALANCE_COLUMN:
+            return Qt.GlobalColor.red if self.rows[index.row()]['balance'] > 0 else Qt.GlobalColor.darkGreen
+        return super().data(index, role)
+
+
+class CustomerLedgerDialog(QDialog):
+    """
+    A customer's account statement ("store" or "pharmacy"), newest entry first, paged from the
+    customer ledger (src/database/customer_ledger.py) as the list is scrolled.
+    """
+
+    def __init__(self, business, customer_id, name, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Financial Ledger: {name}")
+        self.setFixedSize(850, 550)
+        self.tables = customer_ledger.BUSINESSES[business]
+        self.connect = db_manager.get_pharmacy_connection if business == "pharmacy" else db_manager.get_connection
+        self.customer_id = customer_id
+        self.init_ui()
+        self.model.set_query(customer_ledger.statement(self.tables, customer_id))
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.model = _StatementModel([
+            ("Date", lambda r: lang_manager.localize_digits(str(r['created_at']))),
+            ("Action", lambda r: r['kind']),
+            ("Details", lambda r: r['note'] or ""),
+            ("Debit (+)", lambda r: _money(r['amount']) if r['amount'] > 0 else ""),
+            ("Credit (-)", lambda r: _money(-r['amount']) if r['amount'] < 0 else ""),
+            ("Balance", lambda r: _money(r['balance'])),
+        ], self.connect, parent=self)
+        self.model.page_loaded.connect(self.on_page_loaded)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        style_table(self.table)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        footer = QHBoxLayout()
+        self.balance_lbl = QLabel("")
+        self.balance_lbl.setStyleSheet("font-weight: bold;")
+        self.count_lbl = QLabel("")
+        footer.addWidget(self.balance_lbl)
+        footer.addStretch()
+        footer.addWidget(self.count_lbl)
+        layout.addLayout(footer)
+
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+        layout.addWidget(close_btn)
+
+    def on_page_loaded(self, loaded, more):
+        first = self.model.row(0)
+        self.balance_lbl.setText(f"Balance: {_money(first['balance'] if first else 0)}")
+        self.count_lbl.setText(f"{loaded} entries" + (" (scroll for older)" if more else ""))
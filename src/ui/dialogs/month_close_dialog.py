@@ -0,0 +1,201 @@
+from datetime import date, timedelta
+
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QDateEdit, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QGroupBox)
+from PyQt6.QtCore import Qt, QDate
+from src.database import period_close
+from src.database.db_manager import db_manager
+from src.database.report_cache import report_cache
+from src.ui.button_styles import style_button
+from src.ui.table_styles import style_table
+
+
+class MonthCloseDialog(QDialog):
+    """
+    Month-end close for one business ("store" or "pharmacy", see src/database/period_close.py):
+    the selected month next to year to date and the same span last year, and closing it.
+    """
+
+    def __init__(self, business, parent=None, title="Month-End Close"):
+        super().__init__(parent)
+        self.business = business
+        self.tables = period_close.BUSINESSES[business]
+        if business == "pharmacy":
+            self.db_path, self.connect = db_manager.pharmacy_db, db_manager.get_pharmacy_connection
+        else:
+            self.db_path, self.connect = db_manager.store_db, db_manager.get_connection
+        self.setWindowTitle(title)
+        self.setFixedWidth(800)
+        self.setFixedHeight(700)
+        self.current_data = None
+        self.init_ui()
+        self.generate_report()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        # 1. Month Selection (defaults to last month, the usual one to close)
+        date_group = QGroupBox("Select Month")
+        date_layout = QHBoxLayout(date_group)
+
+        self.month_edit = QDateEdit()
+        self.month_edit.setCalendarPopup(True)
+        self.month_edit.setDisplayFormat("yyyy-MM")
+        today = QDate.currentDate()
+        self.month_edit.setDate(today.addDays(-today.day() + 1).addMonths(-1))
+        self.month_edit.dateChanged.connect(self.generate_report)
+
+        gen_btn = QPushButton("Generate Report")
+        style_button(gen_btn, variant="primary")
+        gen_btn.clicked.connect(self.generate_report)
+
+        self.status_lbl = QLabel("")
+        self.status_lbl.setStyleSheet("font-weight: bold;")
+
+        date_layout.addWidget(QLabel("Month:"))
+        date_layout.addWidget(self.month_edit)
+        date_layout.addWidget(gen_btn)
+        date_layout.addStretch()
+        date_layout.addWidget(self.status_lbl)
+
+        layout.addWidget(date_group)
+
+        # 2. Results Area
+        res_group = QGroupBox("Month-End Summary")
+        res_layout = QVBoxLayout(res_group)
+
+        self.summary_table = QTableWidget(0, 4)
+        self.summary_table.setHorizontalHeaderLabels(["Metric", "Month", "Year to Date", "Last Year to Date"])
+        self.summary_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.summary_table.verticalHeader().setVisible(False)
+        style_table(self.summary_table)
+
+        res_layout.addWidget(self.summary_table)
+        layout.addWidget(res_group)
+
+        # 3. Actions
+        action_layout = QHBoxLayout()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+
+        self.close_month_btn = QPushButton("Confirm & Close Month")
+        style_button(self.close_month_btn, variant="danger")
+        self.close_month_btn.setEnabled(False)
+        self.close_month_btn.clicked.connect(self.finalize_month_close)
+
+        action_layout.addStretch()
+        action_layout.addWidget(close_btn)
+        action_layout.addWidget(self.close_month_btn)
+
+        layout.addLayout(action_layout)
+
+    def selected_month(self):
+        return self.month_edit.date().toString("yyyy-MM")
+
+    def compute(self, month):
+        """The month's figures (snapshot when closed), year to date through it and the same span last year."""
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            figures = period_close.month_figures(cursor, self.tables, month)
+            month_end = period_close.next_month(period_close.month_start(month)) - timedelta(days=1)
+            ytd = period_close.year_to_date(cursor, self.tables, min(month_end, date.today()))
+            return {"month": figures, "ytd": ytd["current"], "last_ytd": ytd["previous"]}
+
+    def generate_report(self):
+        from src.core.blocking_task_manager import task_manager
+        month = self.selected_month()
+        self.close_month_btn.setEnabled(False)
+
+        def run():
+            # Cached until the DB changes; today is part of the key for the open month / YTD end
+            return report_cache.get_or_compute(self.db_path, f"{self.business}_month_close", (month, date.today()),
+                                               lambda: self.compute(month))
+
+        def on_finished(result):
+            if month != self.selected_month():
+                return  # superseded by another selection
+            self.show_report(month, result)
+
+        def on_error(error):
+            QMessageBox.critical(self, "Error", f"Report Error: {error.strip().splitlines()[-1]}")
+
+        task_manager.run_task(run, on_finished=on_finished, on_error=on_error)
+
+    def show_report(self, month, result):
+        columns = [result["month"], result["ytd"], result["last_ytd"]]
+        profits = [period_close.profit(f) for f in columns]
+
+        def money(key, source="figures"):
+            values = columns if source == "figures" else profits
+            return [f"{v[key] or 0:,.2f}" for v in values]
+
+        stock = result["month"]["stock_value"]
+        data = [
+            ("Total Invoices", [f"{int(f['sales_count'])}" for f in columns]),
+            ("Total Items Sold", [f"{f['items_sold'] or 0:,.2f}" for f in columns]),
+            ("Sales", money("revenue")),
+            ("Less: Returns", money("returns_amount")),
+            ("Net Sales", money("net_sales", "profit")),
+            ("Cost of Goods Sold (Net)", money("net_cogs", "profit")),
+            ("---", ["", "", ""]),
+            ("Gross Profit (Sales - COGS)", money("gross_profit", "profit")),
+            ("Less: Salaries", money("salaries")),
+            ("Less: Petty Cash", money("petty_cash")),
+            ("Less: Other Expenses", money("other_expenses")),
+            ("Total Expenses", money("expenses")),
+            ("---", ["", "", ""]),
+            ("FINAL NET PROFIT", money("net_profit", "profit")),
+            ("Stock Value at Close", [f"{stock:,.2f}" if stock is not None else "-", "", ""]),
+        ]
+
+        self.summary_table.setRowCount(len(data))
+        for i, (label, values) in enumerate(data):
+            self.summary_table.setItem(i, 0, QTableWidgetItem(label))
+            for j, value in enumerate(values):
+                self.summary_table.setItem(i, j + 1, QTableWidgetItem(value))
+
+            if "FINAL" in label:
+                for j in range(4):
+                    item = self.summary_table.item(i, j)
+                    font = item.font()
+                    font.setBold(True)
+                    item.setFont(font)
+                    if j:
+                        color = Qt.GlobalColor.green if profits[j - 1]["net_profit"] >= 0 else Qt.GlobalColor.red
+                        item.setForeground(color)
+
+        closed_at = result["month"]["closed_at"]
+        if closed_at:
+            self.status_lbl.setText(f"Closed on {closed_at}")
+        elif month >= period_close.current_month():
+            self.status_lbl.setText("Open (month not ended)")
+        else:
+            self.status_lbl.setText("Open")
+        self.current_data = {"month": month, **profits[0]}
+        self.close_month_btn.setEnabled(not closed_at and month < period_close.current_month())
+
+    def finalize_month_close(self):
+        if not self.current_data: return
+        month = self.current_data["month"]
+
+        reply = QMessageBox.question(self, "Confirm Close",
+                                     f"Are you sure you want to close {month}?\n"
+                                     "This saves a snapshot (and closes any earlier open month). It cannot be undone.",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+
+        if reply == QMessageBox.StandardButton.Yes:
+            try:
+                with self.connect() as conn:
+                    closed = period_close.close_month(conn, self.tables, month, closed_by=self.current_user_id())
+                QMessageBox.information(self, "Success", f"Closed: {', '.join(closed)}")
+                self.accept()
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Wait! {e}")
+
+    def current_user_id(self):
+        if self.business == "pharmacy":
+            from src.core.pharmacy_auth import PharmacyAuth as auth
+        else:
+            from src.core.auth import Auth as auth
+        user = auth.get_current_user()
+        return user.get("id") if user else None
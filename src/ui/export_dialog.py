@@ -0,0 +1,113 @@
+"""
+Background CSV / XLSX export with a progress dialog (src/database/export.py does the writing).
+
+    export_menu(self, ["sales", "sale_items"], self.selected_range)   # QMenu for an "Export" button
+    start_export(self, "inventory")                                   # ask for a file, then export
+
+The export runs on a worker thread through task_manager; ExportJob relays its progress to the UI
+thread and the dialog's Cancel button stops it after the current chunk.
+"""
+import threading
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtWidgets import QFileDialog, QMenu, QMessageBox, QProgressDialog
+
+from src.core.localization import lang_manager
+from src.database import export
+from src.database.db_manager import db_manager
+
+
+class ExportJob(QObject):
+    progress = pyqtSignal(int, int)     # rows written, total rows
+    finished = pyqtSignal(int, str)     # rows written, path
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, name, path, date_range=None, parent=None):
+        super().__init__(parent)
+        self.definition = export.EXPORTS[name]
+        self.path = path
+        self.date_range = date_range
+        self._cancel = threading.Event()
+
+    def start(self):
+        from src.core.blocking_task_manager import task_manager
+        task_manager.run_task(self._run, on_finished=self._on_finished, on_error=self.failed.emit)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        connect = (db_manager.get_pharmacy_connection if self.definition.db == export.PHARMACY
+                   else db_manager.get_connection)
+        try:
+            with connect() as conn:
+                return export.export(conn, self.definition, self.path, self.date_range,
+                                     progress=self.progress.emit, cancelled=self._cancel.is_set)
+        except export.ExportCancelled:
+            return None
+
+    def _on_finished(self, rows):
+        if rows is None:
+            print(f"[INFO] Export of {self.definition.title} cancelled")
+            self.cancelled.emit()
+        else:
+            print(f"[INFO] Exported {rows} rows of {self.definition.title} to {self.path}")
+            self.finished.emit(rows, self.path)
+
+
+def start_export(parent, name, date_range=None):
+    """Asks where to save `name` (CSV or XLSX) and exports it in the background with a progress dialog."""
+    definition = export.EXPORTS[name]
+    csv_filter, xlsx_filter = "CSV Files (*.csv)", "Excel Workbook (*.xlsx)"
+    default = f"{definition.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    path, selected = QFileDialog.getSaveFileName(parent, f"{lang_manager.get('export')} - {definition.title}",
+                                                 default, f"{csv_filter};;{xlsx_filter}")
+    if not path:
+        return None
+    if not path.lower().endswith((".csv", ".xlsx")):
+        path += ".xlsx" if selected == xlsx_filter else ".csv"
+
+    dialog = QProgressDialog(f"{lang_manager.get('exporting')} {definition.title}...", lang_manager.get("cancel"),
+                             0, 100, parent)
+    dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    dialog.setMinimumDuration(300)
+    dialog.setAutoClose(False)
+    dialog.setAutoReset(False)
+
+    # The job outlives the dialog's Cancel / close: both are torn down once the worker has stopped
+    job = ExportJob(name, path, date_range, parent=parent)
+    dialog.canceled.connect(job.cancel)
+    job.progress.connect(lambda done, total: dialog.setValue(int(done * 100 / total) if total else 100))
+
+    def done():
+        dialog.close()
+        dialog.deleteLater()
+        job.deleteLater()
+
+    def on_finished(rows, path):
+        done()
+        QMessageBox.information(parent, lang_manager.get("success"),
+                                f"{lang_manager.localize_digits(rows)} rows -> {path}")
+
+    def on_failed(error):
+        done()
+        print(f"[WARNING] Export of {definition.title} failed: {error}")
+        QMessageBox.critical(parent, lang_manager.get("error"),
+                             f"{lang_manager.get('error')}: {error.strip().splitlines()[-1]}")
+
+    job.finished.connect(on_finished)
+    job.failed.connect(on_failed)
+    job.cancelled.connect(done)
+    job.start()
+    return job
+
+
+def export_menu(parent, names, date_range=lambda: None):
+    """Menu with one entry per export in `names`; `date_range()` gives the period to export."""
+    menu = QMenu(parent)
+    for name in names:
+        menu.addAction(export.EXPORTS[name].title,
+                       lambda checked=False, n=name: start_export(parent, n, date_range()))
+    return menu
@@ -0,0 +1,111 @@
+"""
+Read-only table model over a keyset-paginated query (src/database/paging.py).
+
+The view shows the first page as soon as it arrives and asks for the next one (canFetchMore /
+fetchMore) when the user scrolls near the end, so a year-long report holds and paints a few
+hundred rows instead of materialising every sale up front. Pages are fetched on a worker
+thread; a page that arrives after set_query() switched to a new period is dropped.
+
+Columns are (header, fn(row) -> text) pairs over the row dicts the query returns.
+"""
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+from src.database.paging import PAGE_SIZE
+
+
+class PagedTableModel(QAbstractTableModel):
+    # Emitted after each page is appended: number of rows loaded so far, whether more remain
+    page_loaded = pyqtSignal(int, bool)
+
+    def __init__(self, columns, connect, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.connect = connect      # () -> connection context manager, e.g. db_manager.get_pharmacy_connection
+        self.page_size = page_size
+        self.query = None
+        self.rows = []
+        self._exhausted = True
+        self._loading = False
+        self._generation = 0
+
+    # -- Qt model API
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.columns[index.column()][1](self.rows[index.row()])
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.query is not None and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        generation, query = self._generation, self.query
+        after = self.rows[-1]['_key'] if self.rows else None
+
+        def do_fetch():
+            with self.connect() as conn:
+                return query.page(conn, after, self.page_size)
+
+        def on_finished(page):
+            if generation != self._generation:
+                return  # a newer query replaced this one
+            self._loading = False
+            self._exhausted = len(page) < self.page_size
+            if page:
+                self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+                self.rows.extend(page)
+                self.endInsertRows()
+            self.page_loaded.emit(len(self.rows), not self._exhausted)
+
+        def on_error(error):
+            if generation == self._generation:
+                self._loading = False
+                print(f"[WARNING] Page load failed: {error}")
+
+        from src.core.blocking_task_manager import task_manager
+        task_manager.run_task(do_fetch, on_finished=on_finished, on_error=on_error)
+
+    # -- API
+
+    def set_query(self, query):
+        """Replaces the rows with the first page of `query`."""
+        self._generation += 1
+        self.beginResetModel()
+        self.query = query
+        self.rows = []
+        self._exhausted = query is None
+        self._loading = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def row(self, row):
+        return self.rows[row] if 0 <= row < len(self.rows) else None
+
+    def headers(self):
+        return [c[0] for c in self.columns]
+
+    def rows_text(self, conn, query=None):
+        """Every row of `query` (default: the loaded one), not just the loaded pages, as cell text."""
+        query = query or self.query
+        if query is None:
+            return
+        for r in query.iter_rows(conn):
+            yield [fn(r) for _, fn in self.columns]
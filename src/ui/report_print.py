@@ -0,0 +1,59 @@
+"""
+Background PDF printing for report screens (src/utils/report_renderer.py does the drawing).
+
+    print_report(self, db_manager.store_db, "store_full_report", params, render, button=self.full_report_btn)
+
+render(path) runs on a worker thread through task_manager: it opens its own pooled connection,
+builds the report's Sections from queries and calls report_renderer.render_pdf(path, ...).
+`params` must describe the report completely (period / date range, section); together with the
+database's report_cache.token() and the UI language it is the render-cache key, so printing the
+same report again before anything changed just reopens the cached file. The token is only valid
+for the current watcher connection: after a restart or a restore the report is rendered again.
+"""
+from PyQt6.QtWidgets import QMessageBox
+
+from src.core.localization import lang_manager
+from src.database.report_cache import report_cache
+from src.utils import report_renderer
+
+
+def print_report(parent, db_path, name, params, render, button=None):
+    """Renders (or reuses) the report PDF off the UI thread and opens it in the PDF viewer."""
+    from src.core.blocking_task_manager import task_manager
+
+    label = button.text() if button is not None else None
+    if button is not None:
+        button.setEnabled(False)
+        button.setText(lang_manager.get("loading"))
+
+    def restore():
+        if button is not None:
+            try:
+                button.setEnabled(True)
+                button.setText(label)
+            except RuntimeError:
+                pass   # view closed while rendering
+
+    def run():
+        token = report_cache.token(db_path)
+        if token is None:   # unknown data state: render to a fresh file, nothing to reuse
+            key = (name, params, lang_manager.current_lang, object())
+        else:
+            key = (db_path, token, name, params, lang_manager.current_lang)
+        return report_renderer.render_cached(key, render)
+
+    def on_finished(path):
+        restore()
+        print(f"[INFO] Report {name} ready: {path}")
+        try:
+            report_renderer.open_pdf(path)
+        except Exception as e:
+            QMessageBox.information(parent, lang_manager.get("success"), f"{path}\n\n{e}")
+
+    def on_error(error):
+        restore()
+        print(f"[WARNING] Report {name} failed: {error}")
+        QMessageBox.critical(parent, lang_manager.get("error"),
+                             f"{lang_manager.get('error')}: {error.strip().splitlines()[-1]}")
+
+    task_manager.run_task(run, on_finished=on_finished, on_error=on_error)
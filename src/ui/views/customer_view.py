@@ -8,6 +8,7 @@ import qtawesome as qta
 import uuid
 from src.core.localization import lang_manager
 from src.database.db_manager import db_manager
+from src.database import loan_payments
 from src.core.auth import Auth
 from src.ui.table_styles import style_table
 from src.ui.button_styles import style_button
@@ -274,7 +275,7 @@ class CustomerView(QWidget):
                 pay_btn = QPushButton()
                 style_button(pay_btn, variant="success", size="icon")
                 pay_btn.setIcon(qta.icon("fa5s.money-bill-wave", color="white"))
-                pay_btn.clicked.connect(lambda checked, cid=c['id']: self.make_payment(cid))
+                pay_btn.clicked.connect(lambda checked, cid=c['id'], bal=c['balance']: self.make_payment(cid, bal))
                 
                 if self.is_admin:
                     edit_btn = QPushButton()
@@ -361,9 +362,12 @@ class CustomerView(QWidget):
 
             task_manager.run_task(do_delete, on_finished=lambda _: self.load_customers())
 
-    def make_payment(self, cid):
+    def make_payment(self, cid, balance):
         from PyQt6.QtWidgets import QInputDialog
-        amount, ok = QInputDialog.getDouble(self, "Payment", "Enter amount received:", 0, 0, 1000000, 2)
+        if (balance or 0) <= 0:
+            QMessageBox.information(self, "Payment", "This customer has no outstanding balance.")
+            return
+        amount, ok = QInputDialog.getDouble(self, "Payment", "Enter amount received:", 0, 0, balance, 2)
         if ok and amount > 0:
             from src.core.blocking_task_manager import task_manager
             from datetime import datetime
@@ -371,11 +375,8 @@ class CustomerView(QWidget):
             def do_payment():
                 try:
                     with db_manager.get_connection() as conn:
-                        cursor = conn.cursor()
-                        cursor.execute("UPDATE customers SET balance = MAX(0, balance - ?) WHERE id = ?", (amount, cid))
-                        cursor.execute("INSERT INTO customer_payments (customer_id, amount, payment_method, reference_number) VALUES (?, ?, 'CASH', ?)",
-                                     (cid, amount, f"Settle-{datetime.now().strftime('%Y%m%d%H%M')}"))
-                        conn.commit()
+                        loan_payments.receive(conn, loan_payments.STORE, cid, amount,
+                                              reference=f"Settle-{datetime.now().strftime('%Y%m%d%H%M')}")
                     return {"success": True}
                 except Exception as e:
                     return {"success": False, "error": str(e)}
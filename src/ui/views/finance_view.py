@@ -5,10 +5,14 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt6.QtCore import Qt, QDate
 import qtawesome as qta
 from src.database.db_manager import db_manager
+from src.database.date_ranges import period_range
+from src.database import sales_summary
+from src.database.report_cache import report_cache
 from src.core.localization import lang_manager
 from src.core.auth import Auth
 from src.ui.table_styles import style_table
 from src.ui.button_styles import style_button
+from src.ui.dialogs.month_close_dialog import MonthCloseDialog
 from src.ui.theme_manager import theme_manager
 from datetime import datetime, timedelta
 
@@ -95,6 +99,12 @@ class FinanceView(QWidget):
         header_layout.addWidget(period_label)
         header_layout.addWidget(self.period_combo)
 
+        # Month-end close (snapshots behind the historical reports)
+        self.month_close_btn = QPushButton(lang_manager.get("monthly_close"))
+        style_button(self.month_close_btn, variant="warning")
+        self.month_close_btn.clicked.connect(self.open_month_close)
+        header_layout.addWidget(self.month_close_btn)
+
         layout.addWidget(header)
 
         # Professional Tabs with better styling
@@ -376,47 +386,35 @@ class FinanceView(QWidget):
 
     # Removed local apply_theme as it's handled by ThemeManager globally
 
+    def open_month_close(self):
+        dialog = MonthCloseDialog("store", self)
+        dialog.exec()
+
     def on_period_changed(self):
         self.current_period = self.period_combo.currentText().lower().replace(" ", "_")
         self.load_data()
 
     def get_date_filter(self):
-        today = datetime.now()
-        if self.current_period == "daily":
-            start = today.strftime("%Y-%m-%d")
-            return f"DATE(created_at, 'localtime') = '{start}'", f"DATE(expense_date) = '{start}'"
-        elif self.current_period == "weekly":
-            start = (today - timedelta(days=7)).strftime("%Y-%m-%d")
-            return f"DATE(created_at, 'localtime') >= '{start}'", f"DATE(expense_date) >= '{start}'"
-        elif self.current_period == "monthly":
-            start = (today - timedelta(days=30)).strftime("%Y-%m-%d")
-            return f"DATE(created_at, 'localtime') >= '{start}'", f"DATE(expense_date) >= '{start}'"
-        else:
-            return "1=1", "1=1"
+        """Half-open range for the selected period (index-friendly, parameterised)."""
+        return period_range(self.current_period)
 
     def load_data(self):
         from src.core.blocking_task_manager import task_manager
-        sales_filter, expense_filter = self.get_date_filter()
+        date_range = self.get_date_filter()
+        day_filter, day_params = date_range.where_date("day")
+        expense_filter, expense_params = date_range.where_date("e.expense_date")
         
         def fetch_finance_data():
             with db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute(f"SELECT SUM(total_amount) FROM sales WHERE {sales_filter}")
-                total_income = cursor.fetchone()[0] or 0
+                totals = sales_summary.period_totals(cursor, sales_summary.STORE, date_range)
+                total_income = totals["revenue"]
                 
-                cursor.execute(f"SELECT SUM(amount) FROM expenses WHERE {expense_filter}")
+                cursor.execute(f"SELECT SUM(amount) FROM expenses e WHERE {expense_filter}", expense_params)
                 total_expense = cursor.fetchone()[0] or 0
                 
-                sales_filter_items = sales_filter.replace("created_at", "s.created_at")
-                cursor.execute(f"""
-                    SELECT SUM(si.quantity * p.cost_price)
-                    FROM sale_items si
-                    JOIN sales s ON si.sale_id = s.id
-                    JOIN products p ON si.product_id = p.id
-                    WHERE {sales_filter_items}
-                """)
-                cogs = cursor.fetchone()[0] or 0
+                cogs = totals["cogs"]
                 
                 gross_profit = total_income - cogs
                 net_profit = gross_profit - total_expense
@@ -428,17 +426,16 @@ class FinanceView(QWidget):
                     LEFT JOIN users u ON e.user_id = u.id
                     WHERE {expense_filter}
                     ORDER BY e.expense_date DESC
-                """)
+                """, expense_params)
                 expense_rows = [list(r) for r in cursor.fetchall()]
 
                 cursor.execute(f"""
-                    SELECT DATE(created_at, 'localtime') as sale_date, COUNT(*) as count, SUM(total_amount) as total
-                    FROM sales 
-                    WHERE {sales_filter}
-                    GROUP BY sale_date
-                    ORDER BY sale_date DESC
+                    SELECT day, CAST(sales_count AS INTEGER), revenue
+                    FROM daily_sales_summary
+                    WHERE {day_filter} AND sales_count > 0
+                    ORDER BY day DESC
                     LIMIT 50
-                """)
+                """, day_params)
                 sales_rows = [list(r) for r in cursor.fetchall()]
 
                 return {
@@ -468,7 +465,10 @@ class FinanceView(QWidget):
                 self.sales_table.setItem(i, 1, QTableWidgetItem(str(row[1])))
                 self.sales_table.setItem(i, 2, QTableWidgetItem(f"{row[2]:,.2f}"))
 
-        task_manager.run_task(fetch_finance_data, on_finished=on_finished)
+        # Served from the report cache until the store DB changes
+        task_manager.run_task(
+            lambda: report_cache.get_or_compute(db_manager.store_db, "store_finance", (date_range,), fetch_finance_data),
+            on_finished=on_finished)
 
     def load_expense_table(self, cursor, filter_sql):
         # Deprecated: logic combined into load_data
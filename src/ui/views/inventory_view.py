@@ -7,11 +7,13 @@ from PyQt6.QtCore import Qt, QDate
 import qtawesome as qta
 from src.core.localization import lang_manager
 from src.database.db_manager import db_manager
+from src.database import costing
 from src.utils.barcode_util import BarcodeGenerator
 from src.core.auth import Auth
 from datetime import datetime
 from src.ui.table_styles import style_table
 from src.ui.button_styles import style_button
+from src.ui.export_dialog import start_export
 
 class CategoryManagerDialog(QDialog):
     def __init__(self, parent=None):
@@ -536,6 +538,7 @@ class InventoryView(QWidget):
                 if ok and qty_add > 0:
                     cursor.execute("UPDATE inventory SET quantity = quantity + ? WHERE product_id = ?", 
                                  (qty_add, product['id']))
+                    costing.receive(cursor, product['id'], qty_add, product['cost_price'], "SCAN")
                     cursor.execute("INSERT INTO audit_logs (user_id, action, table_name, record_id, details) VALUES (?, ?, ?, ?, ?)",
                                  (self.current_user['id'], 'STOCK_IN', 'inventory', product['id'], f'Added {qty_add} via scan'))
                     conn.commit()
@@ -582,6 +585,7 @@ class InventoryView(QWidget):
                     ))
                     product_id = cursor.lastrowid
                     cursor.execute("INSERT INTO inventory (product_id, quantity) VALUES (?, ?)", (product_id, data['quantity']))
+                    costing.receive(cursor, product_id, data['quantity'], data['cost_price'], "OPENING")
                     conn.commit()
                 self.load_products()
             except Exception as e:
@@ -616,6 +620,8 @@ class InventoryView(QWidget):
                         data['allow_zero_price'], data['internal_notes'], self.current_user['id'], product['id']
                     ))
                     cursor.execute("INSERT OR REPLACE INTO inventory (product_id, quantity) VALUES (?, ?)", (product['id'], data['quantity']))
+                    # A changed quantity is a stock count: new units at the entered cost, missing ones written off
+                    costing.adjust_to(cursor, product['id'], data['quantity'], data['cost_price'])
                     conn.commit()
                 self.load_products()
             except Exception as e:
@@ -641,11 +647,11 @@ class InventoryView(QWidget):
         export_group = QGroupBox("📤 Export Inventory")
         export_layout = QVBoxLayout(export_group)
         
-        export_info = QLabel("Export current inventory data to CSV format")
+        export_info = QLabel("Export current inventory data to CSV or Excel (XLSX) format")
         export_info.setStyleSheet("color: #666; font-size: 12px;")
         export_layout.addWidget(export_info)
         
-        export_btn = QPushButton("Export to CSV")
+        export_btn = QPushButton("Export to CSV / Excel")
         style_button(export_btn, variant="success")
         export_btn.clicked.connect(self.export_inventory)
         export_layout.addWidget(export_btn)
@@ -691,45 +697,8 @@ class InventoryView(QWidget):
         tools_dialog.exec()
     
     def export_inventory(self):
-        """Export inventory to CSV"""
-        import csv
-        from datetime import datetime
-        
-        filename, _ = QFileDialog.getSaveFileName(
-            self, "Export Inventory", 
-            f"inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            "CSV Files (*.csv)"
-        )
-        
-        if filename:
-            try:
-                with db_manager.get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        SELECT p.id, p.barcode, p.name_en, p.brand, p.category_id, 
-                               p.cost_price, p.sale_price, i.quantity, p.min_stock, p.unit
-                        FROM products p
-                        LEFT JOIN inventory i ON p.id = i.product_id
-                        WHERE p.is_active = 1
-                        ORDER BY p.name_en
-                    """)
-                    products = cursor.fetchall()
-                
-                with open(filename, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['ID', 'Barcode', 'Product Name', 'Brand', 'Cost Price', 
-                                   'Sale Price', 'Quantity', 'Min Stock', 'Unit'])
-                    
-                    for p in products:
-                        writer.writerow([
-                            p['id'], p['barcode'], p['name_en'], p['brand'] or '',
-                            p['cost_price'], p['sale_price'], p['quantity'] or 0, 
-                            p['min_stock'], p['unit'] or 'pcs'
-                        ])
-                
-                QMessageBox.information(self, lang_manager.get("success"), lang_manager.get("success"))
-            except Exception as e:
-                QMessageBox.critical(self, lang_manager.get("error"), f"{lang_manager.get('error')}: {str(e)}")
+        """Export inventory to CSV / XLSX (streamed on a worker thread, with progress and cancel)"""
+        start_export(self, "inventory")
     
     def print_labels(self):
         """Generate printable barcode labels"""
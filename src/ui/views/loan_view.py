@@ -6,6 +6,7 @@ import qtawesome as qta
 import os
 from src.core.localization import lang_manager
 from src.database.db_manager import db_manager
+from src.database import loan_payments
 from src.core.auth import Auth
 from src.ui.table_styles import style_table
 from src.ui.button_styles import style_button
@@ -115,50 +116,21 @@ class LoanView(QWidget):
             # Pay Button
             pay_btn = QPushButton("Pay")
             style_button(pay_btn, variant="success")
-            pay_btn.clicked.connect(lambda checked, cid=c['id']: self.make_payment(cid))
+            pay_btn.clicked.connect(lambda checked, cid=c['id'], bal=c['balance']: self.make_payment(cid, bal))
             self.table.setCellWidget(i, 6, pay_btn)
 
-    def make_payment(self, cid):
-        amount, ok = QInputDialog.getDouble(self, "Payment Received", "Enter amount to settle:", min=0.01)
+    def make_payment(self, cid, balance):
+        amount, ok = QInputDialog.getDouble(self, "Payment Received", "Enter amount to settle:", min=0.01, max=balance)
         if ok and amount > 0:
             from src.core.blocking_task_manager import task_manager
             
             def run_payment():
-                remaining = amount
                 try:
                     from datetime import datetime
                     with db_manager.get_connection() as conn:
-                        cursor = conn.cursor()
-                        
-                        # FIFO Loan Settlement Logic
-                        cursor.execute("""
-                            SELECT id, loan_amount, paid_amount 
-                            FROM loans 
-                            WHERE customer_id = ? AND status = 'PENDING' 
-                            ORDER BY created_at ASC
-                        """, (cid,))
-                        pending_loans = cursor.fetchall()
-                        
-                        for loan in pending_loans:
-                            if remaining <= 0: break
-                            loan_id = loan['id']
-                            loan_rem = loan['loan_amount'] - loan['paid_amount']
-                            
-                            if remaining >= loan_rem:
-                                cursor.execute("UPDATE loans SET paid_amount = loan_amount, status = 'PAID' WHERE id = ?", (loan_id,))
-                                remaining -= loan_rem
-                            else:
-                                cursor.execute("UPDATE loans SET paid_amount = paid_amount + ? WHERE id = ?", (remaining, loan_id))
-                                remaining = 0
-
-                        cursor.execute("UPDATE customers SET balance = MAX(0, balance - ?) WHERE id = ?", (amount, cid))
-                        
-                        cursor.execute("""
-                            INSERT INTO customer_payments (customer_id, amount, payment_method, reference_number)
-                            VALUES (?, ?, 'CASH', ?)
-                        """, (cid, amount, f"Settle-{datetime.now().strftime('%Y%m%d%H%M')}") )
-
-                        conn.commit()
+                        # Oldest loans first, one transaction (src/database/loan_payments.py)
+                        loan_payments.receive(conn, loan_payments.STORE, cid, amount,
+                                              reference=f"Settle-{datetime.now().strftime('%Y%m%d%H%M')}")
                     return {"success": True}
                 except Exception as e:
                     return {"success": False, "error": str(e)}
@@ -173,30 +145,9 @@ class LoanView(QWidget):
             task_manager.run_task(run_payment, on_finished=on_finished)
 
     def view_ledger(self, cid, name):
-        from src.core.blocking_task_manager import task_manager
-        
-        def fetch_ledger():
-            try:
-                with db_manager.get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        SELECT 'SALE' as type, s.created_at, s.total_amount as debit, 0 as credit,
-                        (SELECT GROUP_CONCAT(product_name, ', ') FROM sale_items WHERE sale_id = s.id) as details
-                        FROM sales s WHERE customer_id = ? AND payment_type = 'CREDIT'
-                        UNION ALL
-                        SELECT 'PAYMENT' as type, created_at, 0 as debit, amount as credit, 'Cash Payment' as details
-                        FROM customer_payments WHERE customer_id = ?
-                        ORDER BY created_at ASC
-                    """, (cid, cid))
-                    return [dict(row) for row in cursor.fetchall()]
-            except:
-                return []
-
-        def on_finished(transactions):
-            dialog = CustomerLedgerDialog(name, transactions, self)
-            dialog.exec()
-
-        task_manager.run_task(fetch_ledger, on_finished=on_finished)
+        # Paged from the customer ledger; the balance is stored on every entry
+        from src.ui.dialogs.customer_ledger_dialog import CustomerLedgerDialog
+        CustomerLedgerDialog("store", cid, name, self).exec()
 
     def view_kyc(self, cid):
         from src.core.blocking_task_manager import task_manager
@@ -222,43 +173,6 @@ class LoanView(QWidget):
 
         task_manager.run_task(fetch_kyc, on_finished=on_finished)
 
-class CustomerLedgerDialog(QDialog):
-    def __init__(self, name, transactions, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle(f"Financial Ledger: {name}")
-        self.setFixedSize(850, 550)
-        self.transactions = transactions
-        self.init_ui()
-
-    def init_ui(self):
-        layout = QVBoxLayout(self)
-        self.table = QTableWidget(0, 6)
-        self.table.setHorizontalHeaderLabels(["Date", "Action", "Details", "Debit (+)", "Credit (-)", "Balance"])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
-        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
-        
-        balance = 0
-        for i, tx in enumerate(self.transactions):
-            self.table.insertRow(i)
-            debit = tx['debit'] or 0
-            credit = tx['credit'] or 0
-            balance += debit - credit
-            
-            self.table.setItem(i, 0, QTableWidgetItem(lang_manager.localize_digits(str(tx['created_at']))))
-            self.table.setItem(i, 1, QTableWidgetItem(tx['type']))
-            self.table.setItem(i, 2, QTableWidgetItem(tx['details'] or ""))
-            self.table.setItem(i, 3, QTableWidgetItem(lang_manager.localize_digits(f"{debit:.2f}") if debit > 0 else ""))
-            self.table.setItem(i, 4, QTableWidgetItem(lang_manager.localize_digits(f"{credit:.2f}") if credit > 0 else ""))
-            
-            bal_item = QTableWidgetItem(lang_manager.localize_digits(f"{balance:.2f}"))
-            bal_item.setForeground(Qt.GlobalColor.red if balance > 0 else Qt.GlobalColor.darkGreen)
-            self.table.setItem(i, 5, bal_item)
-            
-        layout.addWidget(self.table)
-        close_btn = QPushButton("Close")
-        close_btn.clicked.connect(self.close)
-        layout.addWidget(close_btn)
-
 class KYCViewerDialog(QDialog):
     def __init__(self, customer, parent=None):
         super().__init__(parent)
@@ -7,6 +7,8 @@ import qtawesome as qta
 from src.ui.theme_manager import theme_manager
 from src.core.localization import lang_manager
 from src.database.db_manager import db_manager
+from src.database.report_cache import report_cache
+from src.database import product_stats
 
 class DonutChartWidget(QWidget):
     def __init__(self):
@@ -255,61 +257,45 @@ class PharmacyDashboardView(QWidget):
         self.load_products_data()
 
     def load_products_data(self):
-        # Prevent multiple simultaneous loads - Safely handle deleted C++ objects
-        try:
-            if hasattr(self, '_loading_thread') and self._loading_thread and self._loading_thread.isRunning():
-                return
-        except RuntimeError:
-            self._loading_thread = None
+        # One load at a time; a reload requested meanwhile runs when it finishes
+        if getattr(self, '_stats_loading', False):
+            self._stats_reload = True
+            return
+        self._stats_loading = True
+        self._stats_reload = False
+
+        # Remember selection before clear
+        selected_items = self.product_list.selectedItems()
+        self.last_selected_name = selected_items[0].text() if selected_items else None
 
         self.product_list.clear()
         self.product_list.addItem("Loading statistics...")
 
-        from PyQt6.QtCore import QThread, pyqtSignal
-        class StatsWorker(QThread):
-            data_received = pyqtSignal(list)
-            def run(self):
-                try:
-                    with db_manager.get_pharmacy_connection() as conn:
-                        products = conn.execute("""
-                            SELECT 
-                                p.id, 
-                                p.name_en,
-                                COALESCE(sales.total_sold, 0) as sold_qty,
-                                COALESCE(inv.total_current, 0) as current_qty
-                            FROM pharmacy_products p
-                            LEFT JOIN (
-                                SELECT product_id, SUM(quantity) as total_sold 
-                                FROM pharmacy_sale_items 
-                                GROUP BY product_id
-                            ) sales ON p.id = sales.product_id
-                            LEFT JOIN (
-                                SELECT product_id, SUM(quantity) as total_current 
-                                FROM pharmacy_inventory 
-                                GROUP BY product_id
-                            ) inv ON p.id = inv.product_id
-                            WHERE p.is_active = 1
-                            ORDER BY p.name_en ASC
-                        """).fetchall()
-                        # Convert sqlite3.Row to list of dicts for safe thread passing
-                        self.data_received.emit([dict(p) for p in products])
-                except Exception as e:
-                    print(f"StatsWorker Error: {e}")
-                    self.data_received.emit([])
+        from src.core.blocking_task_manager import task_manager
 
-        # Remember selection before clear
-        selected_items = self.product_list.selectedItems()
-        self.last_selected_name = selected_items[0].text() if selected_items else None
+        def compute():
+            # Running counters (src/database/product_stats.py): one row per product, no history scan
+            with db_manager.get_pharmacy_connection() as conn:
+                return product_stats.load(conn.cursor())
+
+        def run():
+            # Re-queried only when the pharmacy DB changed since the last load
+            return report_cache.get_or_compute(db_manager.pharmacy_db, "pharmacy_product_stats", (), compute)
 
-        self._loading_thread = StatsWorker()
-        self._loading_thread.data_received.connect(self._on_stats_loaded)
-        self._loading_thread.finished.connect(self._cleanup_loading_thread)
-        self._loading_thread.finished.connect(self._loading_thread.deleteLater)
-        self._loading_thread.start()
+        def on_error(error):
+            print(f"[WARNING] Product stats failed: {error}")
+            self._on_stats_done([])
 
-    def _cleanup_loading_thread(self):
-        """Nullify the thread reference after it finishes to prevent RuntimeError."""
-        self._loading_thread = None
+        task_manager.run_task(run, on_finished=self._on_stats_done, on_error=on_error)
+
+    def _on_stats_done(self, products):
+        self._stats_loading = False
+        try:
+            self._on_stats_loaded(products)
+        except RuntimeError:
+            return  # view closed while loading
+        if self._stats_reload:
+            self.load_products_data()
 
     def _on_stats_loaded(self, products):
         self.product_list.clear()
@@ -338,6 +324,7 @@ class PharmacyDashboardView(QWidget):
             
             item = QListWidgetItem(p['name_en'])
             item.setData(Qt.ItemDataRole.UserRole, percentage)
+            item.setToolTip(f"Sold: {sold_qty:g} | This month: {p['period_sold']:g} | On hand: {current_qty:g}")
             self.product_list.addItem(item)
             
             # Restore selection and update chart
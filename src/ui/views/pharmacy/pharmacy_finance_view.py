@@ -7,6 +7,9 @@ import qtawesome as qta
 from src.ui.button_styles import style_button
 from src.ui.table_styles import style_table
 from src.database.db_manager import db_manager
+from src.database.date_ranges import period_range
+from src.database import finance_ledger
+from src.database.report_cache import report_cache
 from src.core.localization import lang_manager
 from src.core.pharmacy_auth import PharmacyAuth as Auth
 
@@ -198,6 +201,13 @@ class PharmacyFinanceView(QWidget):
         form.addRow(lang_manager.get("amount") + ":", self.salary_amount)
         form.addRow(lang_manager.get("type") + ":", self.salary_type)
         form.addRow("", self.assign_btn)
+
+        # Monthly posting of the active salaries as expenses (finance ledger)
+        self.post_salaries_btn = QPushButton(f"Post {QDate.currentDate().toString('yyyy-MM')} Salaries")
+        self.post_salaries_btn.setMinimumWidth(500)
+        style_button(self.post_salaries_btn, variant="warning")
+        self.post_salaries_btn.clicked.connect(self.post_salaries)
+        form.addRow("", self.post_salaries_btn)
         
         layout.addWidget(gb)
         
@@ -365,6 +375,23 @@ class PharmacyFinanceView(QWidget):
         except Exception as e:
             QMessageBox.critical(self, lang_manager.get("error"), f"{lang_manager.get('error')}: {str(e)}")
 
+    def post_salaries(self):
+        month = QDate.currentDate().toString("yyyy-MM")
+        if QMessageBox.question(self, lang_manager.get("confirm"),
+                                f"Post this month's salaries ({month}) as expenses?") != QMessageBox.StandardButton.Yes:
+            return
+        user = Auth.get_current_user()
+        try:
+            with db_manager.get_pharmacy_connection() as conn:
+                posted = finance_ledger.post_salaries(conn.cursor(), month, user['id'] if user else None)
+                conn.commit()
+            print(f"[INFO] Posted {posted} pharmacy salaries for {month}")
+            QMessageBox.information(self, lang_manager.get("success"), f"{posted} salaries posted for {month}")
+            self.load_expenses()
+            self.load_summary()
+        except Exception as e:
+            QMessageBox.critical(self, lang_manager.get("error"), f"{lang_manager.get('error')}: {str(e)}")
+
     def load_salaries(self):
         from src.core.blocking_task_manager import task_manager
         
@@ -537,102 +564,74 @@ class PharmacyFinanceView(QWidget):
 
             def run(self):
                 try:
-                    with db_manager.get_pharmacy_connection() as conn:
-                        # 1. Determine filters
+                    # 1. Determine filters
+                    if lang_manager.get("daily_report") in self.filter_text:
+                        date_range = period_range("daily")
+                        period_name = lang_manager.get("today")
+                        days_count = 1
+                    elif lang_manager.get("weekly_report") in self.filter_text:
+                        date_range = period_range("weekly")
+                        period_name = lang_manager.get("last_7_days")
+                        days_count = 7
+                    elif lang_manager.get("monthly_report") in self.filter_text:
+                        date_range = period_range("this_month")
+                        period_name = lang_manager.get("this_month")
                         days_count = 30
-                        if lang_manager.get("daily_report") in self.filter_text:
-                            time_filter = "date({T}.created_at) = date('now')"
-                            exp_filter = "date({T}.expense_date) = date('now')"
-                            period_name = lang_manager.get("today")
-                            days_count = 1
-                        elif lang_manager.get("weekly_report") in self.filter_text:
-                            time_filter = "date({T}.created_at) >= date('now', '-7 days')"
-                            exp_filter = "date({T}.expense_date) >= date('now', '-7 days')"
-                            period_name = lang_manager.get("last_7_days")
-                            days_count = 7
-                        elif lang_manager.get("monthly_report") in self.filter_text:
-                            time_filter = "date({T}.created_at) >= date('now', 'start of month')"
-                            exp_filter = "date({T}.expense_date) >= date('now', 'start of month')"
-                            period_name = lang_manager.get("this_month")
-                            days_count = 30
-                        else:
-                            time_filter = f"date({{T}}.created_at) BETWEEN '{self.d_from}' AND '{self.d_to}'"
-                            exp_filter = f"date({{T}}.expense_date) BETWEEN '{self.d_from}' AND '{self.d_to}'"
-                            period_name = f"{self.d_from} {lang_manager.get('to')} {self.d_to}"
-                            # Calculate days between manually or just store as string
-                            days_count = 30 # Approximation 
-
-                        # 2. Net Sales (Revenue)
-                        gross_received_sql = f"""
-                            SELECT (
-                                (SELECT COALESCE(SUM(total_amount), 0) FROM pharmacy_sales s WHERE payment_type='CASH' AND {time_filter.format(T='s')}) +
-                                (SELECT COALESCE(SUM(amount), 0) FROM pharmacy_payments p WHERE {time_filter.format(T='p')})
-                            ) as total
-                        """
-                        gross_sales = conn.execute(gross_received_sql).fetchone()[0] or 0
-                        
-                        ret_row = conn.execute(f"SELECT SUM(refund_amount) as total FROM pharmacy_returns r WHERE refund_type='CASH' AND {time_filter.format(T='r')}").fetchone()
-                        returns_total = ret_row['total'] or 0
-                        net_sales = gross_sales - returns_total
-
-                        # 3. Net Cost of Goods (COGS)
-                        cash_cost_sql = f"""
-                            SELECT SUM(si.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price))
-                            FROM pharmacy_sale_items si
-                            JOIN pharmacy_products p ON si.product_id = p.id
-                            JOIN pharmacy_sales s ON si.sale_id = s.id
-                            WHERE s.payment_type='CASH' AND {time_filter.format(T='s')}
-                        """
-                        gross_cost_cash = conn.execute(cash_cost_sql).fetchone()[0] or 0
-                        
-                        credit_payment_cost_sql = f"""
-                            SELECT SUM( p.amount * (
-                                SELECT SUM(si.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), pp.cost_price))
-                                FROM pharmacy_sale_items si
-                                JOIN pharmacy_products pp ON si.product_id = pp.id
-                                WHERE si.sale_id = p.sale_id
-                            ) / CAST(s.total_amount AS REAL) )
-                            FROM pharmacy_payments p
-                            JOIN pharmacy_sales s ON p.sale_id = s.id
-                            WHERE {time_filter.format(T='p')}
-                        """
-                        gross_cost_payments = conn.execute(credit_payment_cost_sql).fetchone()[0] or 0
-                        gross_cost = gross_cost_cash + gross_cost_payments
-
-                        ret_cost_sql = f"""
-                            SELECT SUM(ri.quantity * COALESCE(NULLIF(si.cost_price_at_sale, 0), p.cost_price))
-                            FROM pharmacy_return_items ri
-                            JOIN pharmacy_sale_items si ON ri.sale_item_id = si.id
-                            JOIN pharmacy_products p ON ri.product_id = p.id
-                            JOIN pharmacy_returns r ON ri.return_id = r.id
-                            WHERE r.refund_type='CASH' AND {time_filter.format(T='r')}
-                        """
-                        return_cost = conn.execute(ret_cost_sql).fetchone()[0] or 0
-                        net_cost = gross_cost - return_cost
-                        trading_profit = net_sales - net_cost
-                        
-                        # 4. Expenses & Salaries
-                        full_monthly_salaries = conn.execute("SELECT SUM(amount) as total FROM pharmacy_employee_salary WHERE is_active=1").fetchone()
-                        total_salaries_val = (full_monthly_salaries['total'] or 0) / 30.0 * days_count
-                        
-                        expense_data = conn.execute(f"SELECT SUM(amount) as total FROM pharmacy_expenses e WHERE {exp_filter.format(T='e')}").fetchone()
-                        total_expenses = expense_data['total'] or 0
-                        
-                        self.data_loaded.emit({
-                            'gross_sales': gross_sales,
-                            'returns_total': returns_total,
-                            'net_sales': net_sales,
-                            'gross_cost': gross_cost,
-                            'return_cost': return_cost,
-                            'net_cost': net_cost,
-                            'trading_profit': trading_profit,
-                            'total_salaries': total_salaries_val,
-                            'total_expenses': total_expenses,
-                            'period_name': period_name,
-                            'days_count': days_count
-                        })
+                    else:
+                        date_range = period_range("custom", self.d_from, self.d_to)
+                        period_name = f"{self.d_from} {lang_manager.get('to')} {self.d_to}"
+                        # Calculate days between manually or just store as string
+                        days_count = 30 # Approximation 
+
+                    # Figures are cached until the pharmacy DB changes; the labels are added per call
+                    figures = report_cache.get_or_compute(db_manager.pharmacy_db, "pharmacy_finance_summary",
+                                                          (date_range, days_count),
+                                                          lambda: self.compute(date_range, days_count))
+                    self.data_loaded.emit(dict(figures, period_name=period_name, days_count=days_count))
                 except Exception as e:
                     self.error.emit(str(e))
+                finally:
+                    db_manager.pool.release_thread()  # this thread ends here
+
+            def compute(self, date_range, days_count):
+                with db_manager.get_pharmacy_connection() as conn:
+                    # Grouped sums over the finance ledger (src/database/finance_ledger.py)
+                    ledger = finance_ledger.totals(conn, date_range)
+                    sales = ledger[finance_ledger.SALE]
+                    payments = ledger[finance_ledger.PAYMENT]
+                    returns = ledger[finance_ledger.RETURN]
+
+                    # 2. Net Sales (Revenue): cash sales plus credit payments received
+                    gross_sales = sales['revenue'] + payments['revenue']
+                    returns_total = -returns['revenue']
+                    net_sales = gross_sales - returns_total
+
+                    # 3. Net Cost of Goods (COGS): cash sales plus the cost share settled by each payment
+                    gross_cost = sales['cogs'] + payments['cogs']
+                    return_cost = -returns['cogs']
+                    net_cost = gross_cost - return_cost
+                    trading_profit = net_sales - net_cost
+
+                    # 4. Expenses & Salaries: posted salaries, or an estimate from the active ones until posted
+                    salaries = ledger[finance_ledger.SALARY]
+                    if salaries['entries']:
+                        total_salaries_val = salaries['expense']
+                    else:
+                        full_monthly_salaries = conn.execute("SELECT SUM(amount) as total FROM pharmacy_employee_salary WHERE is_active=1").fetchone()
+                        total_salaries_val = (full_monthly_salaries['total'] or 0) / 30.0 * days_count
+                    total_expenses = ledger[finance_ledger.EXPENSE]['expense']
+
+                    return {
+                        'gross_sales': gross_sales,
+                        'returns_total': returns_total,
+                        'net_sales': net_sales,
+                        'gross_cost': gross_cost,
+                        'return_cost': return_cost,
+                        'net_cost': net_cost,
+                        'trading_profit': trading_profit,
+                        'total_salaries': total_salaries_val,
+                        'total_expenses': total_expenses
+                    }
 
         self._worker = FinanceWorker(filter_text, date_from, date_to)
         self._worker.data_loaded.connect(self._on_summary_loaded)
@@ -18,6 +18,7 @@ from src.ui.views.credentials_view import CredentialsView
 
 from src.ui.views.pharmacy.pharmacy_login_view import PharmacyLoginView
 from src.core.pharmacy_auth import PharmacyAuth
+from src.core.expiry_monitor import expiry_monitor
 
 class PharmacyHub(QWidget):
     def __init__(self):
@@ -67,6 +68,8 @@ class PharmacyHub(QWidget):
         # Others will be added dynamically by switch_module
         
         self.switch_module("pharmacy_dashboard")
+        # Daily expiry snapshot and threshold alerts (no-op when today's run exists)
+        expiry_monitor.start()
 
     def switch_module(self, module_key):
         # Redirect all switches to login if not authenticated
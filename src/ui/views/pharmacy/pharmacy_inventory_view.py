@@ -3,6 +3,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
                              QHeaderView, QMessageBox)
 from PyQt6.QtCore import Qt, QSize, pyqtSignal, QTimer
 from src.database.db_manager import db_manager
+from src.database import pharmacy_search
 from src.core.localization import lang_manager
 from src.ui.table_styles import style_table
 from src.ui.button_styles import style_button
@@ -98,8 +99,8 @@ class PharmacyInventoryView(QWidget):
                     """
                     params = []
                     if search_term:
-                        query += " AND (p.name_en LIKE ? OR p.barcode LIKE ?)"
-                        params = [f"%{search_term}%", f"%{search_term}%"]
+                        match_sql, params = pharmacy_search.where_match(search_term)
+                        query += f" AND {match_sql}"
                     
                     query += " GROUP BY p.id"
                     cursor.execute(query, params)
@@ -6,6 +6,7 @@ from PyQt6.QtGui import QPixmap
 from src.ui.button_styles import style_button
 from src.ui.table_styles import style_table
 from src.database.db_manager import db_manager
+from src.database import loan_payments
 from src.core.localization import lang_manager
 
 class PharmacyLoanView(QWidget):
@@ -101,8 +102,13 @@ class PharmacyLoanView(QWidget):
                 style_button(detail_btn, variant="info", size="small")
                 detail_btn.clicked.connect(lambda ch, cid=row['customer_id'], name=row['customer_name']: self.show_visual_details(cid, name))
 
+                ledger_btn = QPushButton("Statement")
+                style_button(ledger_btn, variant="secondary", size="small")
+                ledger_btn.clicked.connect(lambda ch, cid=row['customer_id'], name=row['customer_name']: self.view_ledger(cid, name))
+
                 act_layout.addWidget(pay_btn)
                 act_layout.addWidget(detail_btn)
+                act_layout.addWidget(ledger_btn)
                 self.table.setCellWidget(i, 5, actions)
             
             # Autofit logic
@@ -115,6 +121,10 @@ class PharmacyLoanView(QWidget):
         task_manager.run_task(do_load, on_finished=on_finished)
 
 
+    def view_ledger(self, customer_id, name):
+        from src.ui.dialogs.customer_ledger_dialog import CustomerLedgerDialog
+        CustomerLedgerDialog("pharmacy", customer_id, name or "", self).exec()
+
     def show_visual_details(self, customer_id, name=None):
         try:
             with db_manager.get_pharmacy_connection() as conn:
@@ -195,26 +205,11 @@ class PharmacyLoanView(QWidget):
         if ok and amount > 0:
             try:
                 with db_manager.get_pharmacy_connection() as conn:
-                    # Update loan balance
-                    new_balance = loan_row['balance'] - amount
-                    status = 'PAID' if new_balance <= 0 else 'PARTIAL'
-                    if new_balance <= 0: status = 'COMPLETED'
-                    
-                    conn.execute("UPDATE pharmacy_loans SET balance=?, status=? WHERE id=?", 
-                                 (new_balance, status, loan_row['id']))
-                    
-                    # Update customer balance
-                    conn.execute("UPDATE pharmacy_customers SET balance = balance - ? WHERE id=?", 
-                                 (amount, loan_row['customer_id']))
-                    
-                    # Record payment in a history table if exists, or just log
-                    conn.execute("""
-                        INSERT INTO pharmacy_payments (loan_id, customer_id, amount, payment_method)
-                        VALUES (?, ?, ?, ?)
-                    """, (loan_row['id'], loan_row['customer_id'], amount, 'CASH'))
-                    
-                    conn.commit()
-                
+                    # This loan first, then the customer's other open loans, oldest first; any excess
+                    # stays on the customer's account as credit (src/database/loan_payments.py)
+                    loan_payments.receive(conn, loan_payments.PHARMACY, loan_row['customer_id'], amount,
+                                          first_loan_id=loan_row['id'])
+
                 QMessageBox.information(self, lang_manager.get("success"), f"{lang_manager.get('payment_received')}: {amount:,.2f} AFN")
                 self.load_loans()
             except Exception as e:
@@ -3,6 +3,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 import qtawesome as qta
 from src.database.db_manager import db_manager
+from src.database import pharmacy_search
 from src.core.localization import lang_manager
 
 class PharmacyPriceCheckView(QWidget):
@@ -62,15 +63,10 @@ class PharmacyPriceCheckView(QWidget):
         def do_load():
             try:
                 with db_manager.get_pharmacy_connection() as conn:
-                    row = conn.execute("""
-                        SELECT p.name_en, p.sale_price, SUM(i.quantity) as total_qty, p.size
-                        FROM pharmacy_products p
-                        LEFT JOIN pharmacy_inventory i ON p.id = i.product_id
-                        WHERE p.barcode = ? OR p.name_en LIKE ?
-                        GROUP BY p.id
-                        LIMIT 1
-                    """, (term, f"%{term}%")).fetchone()
-                    return {"success": True, "row": dict(row) if row else None}
+                    rows = pharmacy_search.search(conn.cursor(), term, limit=1, active_only=False)
+                    row = {"name_en": rows[0]["name_en"], "sale_price": rows[0]["sale_price"],
+                           "total_qty": rows[0]["stock"], "size": rows[0]["size"]} if rows else None
+                    return {"success": True, "row": row}
             except Exception as e:
                 return {"success": False, "error": str(e)}
 
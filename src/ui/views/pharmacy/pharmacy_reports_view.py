@@ -1,17 +1,23 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                             QTableWidget, QTableWidgetItem, QHeaderView, QFrame, QScrollArea, QComboBox, QDateEdit,
-                             QGroupBox, QMessageBox, QSpinBox)
+                             QTableWidget, QTableWidgetItem, QTableView, QHeaderView, QFrame, QScrollArea, QComboBox,
+                             QDateEdit, QGroupBox, QMessageBox, QSpinBox)
 from PyQt6.QtCore import Qt, QDate, QThread, pyqtSignal, QObject, QTimer
-from PyQt6.QtGui import QFont, QColor, QTextDocument, QTextCursor, QTextTable, QTextTableFormat, QTextCharFormat, \
-    QTextLength, QPageSize, QPageLayout, QBrush
-from PyQt6.QtPrintSupport import QPrinter, QPrintDialog, QPrintPreviewDialog
+from PyQt6.QtGui import QFont, QColor, QBrush
 from src.database.db_manager import db_manager
+from src.database.date_ranges import period_range
+from src.database import batch_loader, expiry, sales_summary
+from src.database.report_cache import report_cache
+from src.ui.paged_table_model import PagedTableModel
+from src.core.expiry_monitor import expiry_monitor
 from src.ui.table_styles import style_table
 from src.ui.button_styles import style_button
+from src.ui.export_dialog import export_menu
+from src.ui.report_print import print_report
 from src.ui.theme_manager import theme_manager
 from src.ui.views.pharmacy.pharmacy_month_close_dialog import PharmacyMonthCloseDialog
 from src.core.localization import lang_manager
-from datetime import datetime
+from src.utils import report_renderer
+from datetime import date, datetime, timedelta
 
 # Helper functions moved inside PharmacyReportsView or as standalone if needed, 
 # but for now we'll put the loading logic into a task.
@@ -20,6 +26,8 @@ class PharmacyReportsView(QWidget):
     def __init__(self):
         super().__init__()
         self.is_loading = False  # Flag to prevent multiple simultaneous loads
+        self.report_totals = {}   # aggregates behind the paged grids, for footers and printing
+        self.shown_data = None    # last report result; the paged grids were loaded for it
         
         # Debounce timer for loading data
         self.load_timer = QTimer(self)
@@ -31,6 +39,10 @@ class PharmacyReportsView(QWidget):
         self.load_data()
         theme_manager.theme_changed.connect(self.update_styles)
         self.update_styles()
+        expiry_monitor.buckets_updated.connect(self.show_expiry_buckets)
+        expiry_monitor.threshold_crossed.connect(lambda _: self.load_data())
+        if expiry_monitor.buckets:
+            self.show_expiry_buckets(expiry_monitor.buckets)
 
     def init_ui(self):
         # Main layout with scroll
@@ -92,6 +104,15 @@ class PharmacyReportsView(QWidget):
         header_layout.addWidget(self.date_to)
         header_layout.addWidget(filter_btn)
         header_layout.addWidget(self.month_close_btn)
+
+        # Export (CSV / XLSX, streamed in the background) for the selected period
+        self.export_btn = QPushButton(lang_manager.get("export"))
+        style_button(self.export_btn, variant="info")
+        self.export_btn.setMenu(export_menu(self, [
+            "pharmacy_sales", "pharmacy_sale_items", "pharmacy_returns", "pharmacy_loans", "pharmacy_payments",
+            "pharmacy_expenses", "pharmacy_products", "pharmacy_inventory", "pharmacy_customers",
+        ], lambda: self.selected_range()[0]))
+        header_layout.addWidget(self.export_btn)
         
         layout.addLayout(header_layout)
 
@@ -122,20 +143,27 @@ class PharmacyReportsView(QWidget):
         trans_header.addStretch()
         self.trans_print_btn = QPushButton(lang_manager.get("print_transactions"))
         style_button(self.trans_print_btn, variant="info", size="small")
-        self.trans_print_btn.clicked.connect(lambda: self.print_table_report(lang_manager.get("transaction_details"), self.trans_table))
+        self.trans_print_btn.clicked.connect(lambda: self.print_table_report("trans", self.trans_print_btn))
         trans_header.addWidget(self.trans_print_btn)
 
         trans_layout.addLayout(trans_header)
 
-        self.trans_table = QTableWidget(0, 5)
-        self.trans_table.setHorizontalHeaderLabels([
-            lang_manager.get("invoice_number_short"), lang_manager.get("customer"), 
-            lang_manager.get("quantity"), lang_manager.get("amount"), lang_manager.get("method")
-        ])
+        # Paged grids: rows are fetched page by page as the user scrolls (src/database/paging.py)
+        self.trans_model = PagedTableModel([
+            (lang_manager.get("invoice_number_short"), lambda r: r['invoice_number']),
+            (lang_manager.get("customer"), lambda r: r['customer_name'] or lang_manager.get("walk_in")),
+            (lang_manager.get("quantity"), lambda r: str(int(r['total_items']))),
+            (lang_manager.get("amount"), lambda r: f"{r['total_amount']:,.2f} AFN"),
+            (lang_manager.get("method"), lambda r: lang_manager.get("credit") if r['payment_type'] == 'CREDIT' else lang_manager.get("cash")),
+        ], db_manager.get_pharmacy_connection, parent=self)
+        self.trans_table = QTableView()
+        self.trans_table.setModel(self.trans_model)
         style_table(self.trans_table, variant="premium")
         self.trans_table.setMinimumHeight(350)
-        self.trans_table.cellClicked.connect(self.handle_trans_click)
+        self.trans_table.clicked.connect(self.handle_trans_click)
         trans_layout.addWidget(self.trans_table)
+        self.trans_totals_lbl = self.totals_label()
+        trans_layout.addWidget(self.trans_totals_lbl)
         layout.addWidget(trans_group)
 
         # Returns Breakdown Table (New Request)
@@ -150,21 +178,29 @@ class PharmacyReportsView(QWidget):
         ret_header.addStretch()
         self.ret_print_btn = QPushButton(lang_manager.get("print_returns") or "🖨️ Print Returns")
         style_button(self.ret_print_btn, variant="info", size="small")
-        self.ret_print_btn.clicked.connect(lambda: self.print_table_report(lang_manager.get("returned_items_details"), self.ret_table))
+        self.ret_print_btn.clicked.connect(lambda: self.print_table_report("returns", self.ret_print_btn))
         ret_header.addWidget(self.ret_print_btn)
 
         ret_layout.addLayout(ret_header)
 
-        self.ret_table = QTableWidget(0, 8)
-        self.ret_table.setHorizontalHeaderLabels([
-            lang_manager.get("invoice"), lang_manager.get("customer"), 
-            lang_manager.get("product_name"), lang_manager.get("quantity") + " (Ret)", 
-            lang_manager.get("action"), lang_manager.get("replacement_items") or "Replacement Items",
-            lang_manager.get("amount"), lang_manager.get("method")
-        ])
+        self.ret_model = PagedTableModel([
+            (lang_manager.get("invoice"), lambda r: r['invoice_number']),
+            (lang_manager.get("customer"), lambda r: r['customer_name'] or lang_manager.get("walk_in")),
+            (lang_manager.get("product_name"), lambda r: r['item_name']),
+            (lang_manager.get("quantity") + " (Ret)", lambda r: str(r['qty_returned'])),
+            (lang_manager.get("action"), lambda r: r['action'] or "RETURN"),
+            (lang_manager.get("replacement_items") or "Replacement Items", self.replacement_text),
+            (lang_manager.get("amount"), lambda r: f"{r['qty_returned'] * r['unit_price']:,.2f}"),
+            (lang_manager.get("method"), lambda r: lang_manager.get("cash") if r['refund_type'] == "CASH"
+                else (lang_manager.get("account") or lang_manager.get("credit"))),
+        ], db_manager.get_pharmacy_connection, parent=self)
+        self.ret_table = QTableView()
+        self.ret_table.setModel(self.ret_model)
         style_table(self.ret_table, variant="premium")
         self.ret_table.setMinimumHeight(250)
         ret_layout.addWidget(self.ret_table)
+        self.ret_totals_lbl = self.totals_label()
+        ret_layout.addWidget(self.ret_totals_lbl)
         layout.addWidget(ret_group)
 
         # Loan / Credit Table with Print Button
@@ -179,21 +215,24 @@ class PharmacyReportsView(QWidget):
         loan_header.addStretch()
         self.loan_print_btn = QPushButton(lang_manager.get("print_loans"))
         style_button(self.loan_print_btn, variant="info", size="small")
-        self.loan_print_btn.clicked.connect(lambda: self.print_table_report(lang_manager.get("credit_loan_info"), self.loan_table))
+        self.loan_print_btn.clicked.connect(lambda: self.print_table_report("loans", self.loan_print_btn))
         loan_header.addWidget(self.loan_print_btn)
 
         loan_layout.addLayout(loan_header)
 
-        self.loan_table = QTableWidget(0, 4)
-        self.loan_table.setHorizontalHeaderLabels([
-            lang_manager.get("customer"), lang_manager.get("invoice"), 
-            lang_manager.get("total") + " (" + lang_manager.get("credit") + ")", 
-            lang_manager.get("balance")
-        ])
+        self.loan_model = PagedTableModel([
+            (lang_manager.get("customer"), lambda r: r['customer_name']),
+            (lang_manager.get("invoice"), lambda r: r['invoice_number']),
+            (lang_manager.get("total") + " (" + lang_manager.get("credit") + ")", lambda r: f"{r['total_amount']:,.2f} AFN"),
+            (lang_manager.get("balance"), lambda r: f"{r['balance']:,.2f} AFN"),
+        ], db_manager.get_pharmacy_connection, parent=self)
+        self.loan_table = QTableView()
+        self.loan_table.setModel(self.loan_model)
         style_table(self.loan_table, variant="premium")
         self.loan_table.setMinimumHeight(300)
-        self.loan_table.resizeColumnsToContents()
         loan_layout.addWidget(self.loan_table)
+        self.loan_totals_lbl = self.totals_label()
+        loan_layout.addWidget(self.loan_totals_lbl)
         layout.addWidget(loan_group)
 
         # Low Stock Table with Print Button
@@ -208,7 +247,7 @@ class PharmacyReportsView(QWidget):
         stock_header.addStretch()
         self.stock_print_btn = QPushButton(lang_manager.get("print_stock_report"))
         style_button(self.stock_print_btn, variant="info", size="small")
-        self.stock_print_btn.clicked.connect(lambda: self.print_table_report(lang_manager.get("low_stock_medicines"), self.low_stock_table))
+        self.stock_print_btn.clicked.connect(lambda: self.print_table_report("low_stock", self.stock_print_btn))
         stock_header.addWidget(self.stock_print_btn)
 
         stock_layout.addLayout(stock_header)
@@ -244,11 +283,16 @@ class PharmacyReportsView(QWidget):
 
         self.expiry_print_btn = QPushButton(lang_manager.get("print_expiry_report"))
         style_button(self.expiry_print_btn, variant="info", size="small")
-        self.expiry_print_btn.clicked.connect(lambda: self.print_table_report(lang_manager.get("medicine_expiry_status"), self.expiry_table))
+        self.expiry_print_btn.clicked.connect(lambda: self.print_table_report("expiry", self.expiry_print_btn))
         expiry_header.addWidget(self.expiry_print_btn)
 
         expiry_layout.addLayout(expiry_header)
 
+        # Value at risk per bucket, from the daily expiry run
+        self.expiry_summary_lbl = QLabel("")
+        self.expiry_summary_lbl.setStyleSheet("border:none; background:transparent;")
+        expiry_layout.addWidget(self.expiry_summary_lbl)
+
         self.expiry_table = QTableWidget(0, 5)
         self.expiry_table.setHorizontalHeaderLabels([
             lang_manager.get("medicine"), lang_manager.get("batch_no_short"), 
@@ -323,6 +367,20 @@ class PharmacyReportsView(QWidget):
         """Trigger debounced data load"""
         self.load_timer.start()
 
+    def selected_range(self):
+        """(DateRange, label) of the selected preset or custom range."""
+        filter_text = self.filter_combo.currentText()
+        if lang_manager.get("daily_report") in filter_text:
+            return period_range("daily"), lang_manager.get("today")
+        if lang_manager.get("weekly_report") in filter_text:
+            return period_range("weekly"), lang_manager.get("last_7_days")
+        if lang_manager.get("monthly_report") in filter_text:
+            return period_range("this_month"), lang_manager.get("this_month")
+        # Custom Range
+        d_from = self.date_from.date().toString("yyyy-MM-dd")
+        d_to = self.date_to.date().toString("yyyy-MM-dd")
+        return period_range("custom", d_from, d_to), f"{d_from} {lang_manager.get('to')} {d_to}"
+
     def _do_load_data(self):
         """Actual data loading logic after debounce"""
         if self.is_loading:
@@ -332,136 +390,55 @@ class PharmacyReportsView(QWidget):
         
         self.is_loading = True
         
-        # Determine time filter
-        filter_text = self.filter_combo.currentText()
-        if lang_manager.get("daily_report") in filter_text:
-            time_filter = "date({T}.created_at) = date('now')"
-            self.period_name = lang_manager.get("today")
-        elif lang_manager.get("weekly_report") in filter_text:
-            time_filter = "date({T}.created_at) >= date('now', '-7 days')"
-            self.period_name = lang_manager.get("last_7_days")
-        elif lang_manager.get("monthly_report") in filter_text:
-            time_filter = "date({T}.created_at) >= date('now', 'start of month')"
-            self.period_name = lang_manager.get("this_month")
-        else:
-            # Custom Range
-            d_from = self.date_from.date().toString("yyyy-MM-dd")
-            d_to = self.date_to.date().toString("yyyy-MM-dd")
-            time_filter = f"date({{T}}.created_at) BETWEEN '{d_from}' AND '{d_to}'"
-            self.period_name = f"{d_from} {lang_manager.get('to')} {d_to}"
+        date_range, self.period_name = self.selected_range()
+        s_filter, s_params = date_range.where("s.created_at")
+        sales_q, returns_q, loans_q = batch_loader.pharmacy_report_queries(date_range)
         
         expiry_days = self.expiry_days_spin.value()
         from src.core.blocking_task_manager import task_manager
 
+        def compute():
+            data = {}
+            with db_manager.get_pharmacy_connection() as conn:
+                # 1-3. Sales / returns / loans: the grids page themselves; only totals here
+                data['returns_totals'] = returns_q.aggregate(
+                    conn, "COUNT(*) AS count, COALESCE(SUM(ri.quantity * ri.unit_price), 0) AS amount")
+                data['loans_totals'] = loans_q.aggregate(
+                    conn, "COUNT(*) AS count, COALESCE(SUM(l.total_amount), 0) AS total, COALESCE(SUM(l.balance), 0) AS balance")
+
+                # 4. Low stock
+                low_items = conn.execute("""
+                    SELECT p.name_en, p.min_stock, SUM(i.quantity) as current_qty, MIN(i.expiry_date) as expiry
+                    FROM pharmacy_products p
+                    LEFT JOIN pharmacy_inventory i ON p.id = i.product_id
+                    GROUP BY p.id
+                    HAVING SUM(i.quantity) < p.min_stock
+                    ORDER BY SUM(i.quantity) ASC LIMIT 10
+                """).fetchall()
+                data['low_stock'] = [dict(r) for r in low_items]
+
+                # 5. Expiry (indexed window query, expired batches included)
+                data['expiry'] = expiry.expiring_within(conn, expiry_days)
+
+                # 6. Stats
+                stats = {}
+                totals = sales_summary.period_totals(conn, sales_summary.PHARMACY, date_range)
+                stats['gross_sales'] = totals['cash_revenue'] + totals['payments_received']
+                stats['returned_amount'] = totals['cash_returns_amount']
+                stats['return_count'] = int(totals['returns_count'])
+                stats['total_orders'] = int(totals['sales_count'])
+                data['sales_totals'] = {'count': int(totals['sales_count']), 'amount': totals['revenue'],
+                                        'items': totals['items_sold']}
+                stats['fully_returned_cnt'] = conn.execute(f"SELECT count(*) as cnt FROM pharmacy_sales s WHERE {s_filter} AND s.id IN (SELECT original_sale_id FROM pharmacy_returns GROUP BY original_sale_id HAVING SUM(refund_amount) >= (SELECT total_amount FROM pharmacy_sales WHERE id=original_sale_id))", s_params).fetchone()['cnt'] or 0
+                stats['low_stock_count'] = conn.execute("SELECT COUNT(*) as cnt FROM (SELECT p.id FROM pharmacy_products p LEFT JOIN pharmacy_inventory i ON p.id = i.product_id GROUP BY p.id HAVING SUM(i.quantity) < p.min_stock)").fetchone()['cnt'] or 0
+                data['stats'] = stats
+            return data
+
         def do_load():
             try:
-                data = {}
-                with db_manager.get_pharmacy_connection() as conn:
-                    # 1. Sales
-                    trans_query = f"""
-                        SELECT s.*, c.name as customer_name,
-                               (SELECT COALESCE(SUM(quantity), 0) FROM pharmacy_sale_items WHERE sale_id = s.id) as total_items
-                        FROM pharmacy_sales s
-                        LEFT JOIN pharmacy_customers c ON s.customer_id = c.id
-                        WHERE {time_filter.format(T='s')}
-                        ORDER BY s.created_at DESC
-                    """
-                    data['sales'] = [dict(r) for r in conn.execute(trans_query).fetchall()]
-
-                    # 2. Returns
-                    returns_query = f"""
-                        SELECT 
-                            s.invoice_number,
-                            c.name as customer_name,
-                            p.name_en as item_name,
-                            ri.quantity as qty_returned,
-                            ri.action,
-                            r.refund_amount,
-                            r.refund_type,
-                            r.reason,
-                            ri.unit_price,
-                            ri.id as return_item_id
-                        FROM pharmacy_returns r
-                        JOIN pharmacy_return_items ri ON r.id = ri.return_id
-                        JOIN pharmacy_sales s ON r.original_sale_id = s.id
-                        LEFT JOIN pharmacy_customers c ON s.customer_id = c.id
-                        JOIN pharmacy_products p ON ri.product_id = p.id
-                        WHERE {time_filter.format(T='r')}
-                        ORDER BY r.created_at DESC
-                    """
-                    returns_rows = conn.execute(returns_query).fetchall()
-                    returns_data = []
-                    for row in returns_rows:
-                        ret_dict = dict(row)
-                        if ret_dict['action'] == 'REPLACEMENT':
-                            replacements = conn.execute("""
-                                SELECT product_name, quantity, unit_price, total_price
-                                FROM pharmacy_replacement_items
-                                WHERE return_item_id = ?
-                            """, (ret_dict['return_item_id'],)).fetchall()
-                            ret_dict['replacements'] = [dict(r) for r in replacements]
-                        returns_data.append(ret_dict)
-                    data['returns'] = returns_data
-
-                    # 3. Loans
-                    loans = conn.execute(f"""
-                        SELECT l.*, c.name as customer_name, s.invoice_number
-                        FROM pharmacy_loans l
-                        JOIN pharmacy_customers c ON l.customer_id = c.id
-                        JOIN pharmacy_sales s ON l.sale_id = s.id
-                        WHERE {time_filter.format(T='l')}
-                        ORDER BY l.created_at DESC
-                    """).fetchall()
-                    data['loans'] = [dict(r) for r in loans]
-
-                    # 4. Low stock
-                    low_items = conn.execute("""
-                        SELECT p.name_en, p.min_stock, SUM(i.quantity) as current_qty, MIN(i.expiry_date) as expiry
-                        FROM pharmacy_products p
-                        LEFT JOIN pharmacy_inventory i ON p.id = i.product_id
-                        GROUP BY p.id
-                        HAVING SUM(i.quantity) < p.min_stock
-                        ORDER BY SUM(i.quantity) ASC LIMIT 10
-                    """).fetchall()
-                    data['low_stock'] = [dict(r) for r in low_items]
-
-                    # 5. Expiry
-                    expiry_items_query = """
-                        SELECT p.name_en, i.batch_number, i.expiry_date, i.quantity
-                        FROM pharmacy_inventory i
-                        JOIN pharmacy_products p ON i.product_id = p.id
-                        WHERE i.quantity > 0
-                        ORDER BY i.expiry_date ASC
-                    """
-                    all_inventory = conn.execute(expiry_items_query).fetchall()
-                    today = datetime.now().date()
-                    filtered_expiry_rows = []
-                    for row in all_inventory:
-                        if not row['expiry_date']: continue
-                        try:
-                            exp_date = datetime.strptime(row['expiry_date'], "%Y-%m-%d").date()
-                            days_left = (exp_date - today).days
-                            if days_left <= expiry_days:
-                                filtered_expiry_rows.append({
-                                    'name': row['name_en'],
-                                    'batch': row['batch_number'] or "N/A",
-                                    'expiry': row['expiry_date'],
-                                    'days_left': days_left
-                                })
-                        except: pass
-                    data['expiry'] = filtered_expiry_rows
-
-                    # 6. Stats
-                    stats = {}
-                    sql = f"SELECT ((SELECT COALESCE(SUM(total_amount), 0) FROM pharmacy_sales s WHERE payment_type='CASH' AND {time_filter.format(T='s')}) + (SELECT COALESCE(SUM(amount), 0) FROM pharmacy_payments p WHERE {time_filter.format(T='p')})) as total"
-                    stats['gross_sales'] = conn.execute(sql).fetchone()['total'] or 0
-                    stats['returned_amount'] = conn.execute(f"SELECT SUM(refund_amount) as total FROM pharmacy_returns r WHERE refund_type='CASH' AND {time_filter.format(T='r')}").fetchone()['total'] or 0
-                    stats['return_count'] = conn.execute(f"SELECT COUNT(*) as cnt FROM pharmacy_returns r WHERE {time_filter.format(T='r')}").fetchone()['cnt'] or 0
-                    stats['total_orders'] = conn.execute(f"SELECT COUNT(*) as cnt FROM pharmacy_sales s WHERE {time_filter.format(T='s')}").fetchone()['cnt'] or 0
-                    stats['fully_returned_cnt'] = conn.execute(f"SELECT count(*) as cnt FROM pharmacy_sales s WHERE {time_filter.format(T='s')} AND s.id IN (SELECT original_sale_id FROM pharmacy_returns GROUP BY original_sale_id HAVING SUM(refund_amount) >= (SELECT total_amount FROM pharmacy_sales WHERE id=original_sale_id))").fetchone()['cnt'] or 0
-                    stats['low_stock_count'] = conn.execute("SELECT COUNT(*) as cnt FROM (SELECT p.id FROM pharmacy_products p LEFT JOIN pharmacy_inventory i ON p.id = i.product_id GROUP BY p.id HAVING SUM(i.quantity) < p.min_stock)").fetchone()['cnt'] or 0
-                    data['stats'] = stats
-
+                # Cached until the pharmacy DB changes; today is part of the key for the expiry window
+                data = report_cache.get_or_compute(db_manager.pharmacy_db, "pharmacy_reports",
+                                                   (date_range, expiry_days, date.today()), compute)
                 return {"success": True, "data": data}
             except Exception as e:
                 return {"success": False, "error": str(e)}
@@ -470,12 +447,31 @@ class PharmacyReportsView(QWidget):
             if not result["success"]:
                 self.on_data_error(result["error"])
                 return
+            if result["data"] is not self.shown_data:
+                # A cache hit means neither the data nor the period changed: keep the loaded pages
+                self.shown_data = result["data"]
+                self.trans_model.set_query(sales_q)
+                self.ret_model.set_query(returns_q)
+                self.loan_model.set_query(loans_q)
             self.on_data_loaded(result["data"])
 
         self.complete_report_btn.setEnabled(False)
         self.complete_report_btn.setText(lang_manager.get("loading") or "Loading...")
         task_manager.run_task(do_load, on_finished=on_finished)
 
+    @staticmethod
+    def replacement_text(row):
+        if (row['action'] or "RETURN") == 'REPLACEMENT' and row.get('replacements'):
+            return "\n".join(f"{rep['product_name']} x{rep['quantity']} @ {rep['unit_price']:.2f}"
+                             for rep in row['replacements'])
+        return "-"
+
+    @staticmethod
+    def totals_label():
+        lbl = QLabel("")
+        lbl.setStyleSheet("border:none; background:transparent; font-weight: bold;")
+        return lbl
+
     def _reset_thread_refs(self):
         """Reset thread and worker references when they are destroyed"""
         self.is_loading = False
@@ -498,100 +494,20 @@ class PharmacyReportsView(QWidget):
             
             self.low_stock.value_lbl.setText(str(stats['low_stock_count']))
             
-            # Load Transactions Table
-            self.trans_table.setRowCount(0)
-            trans = data['sales']
-            
-            for i, row in enumerate(trans):
-                self.trans_table.insertRow(i)
-                self.trans_table.setItem(i, 0, QTableWidgetItem(row['invoice_number']))
-                self.table_item(self.trans_table, i, 1, row['customer_name'] or lang_manager.get("walk_in"))
-                
-                # Item count (Already pre-loaded in background)
-                qty = row.get('total_items', 0)
-                self.table_item(self.trans_table, i, 2, str(int(qty)))
-                self.table_item(self.trans_table, i, 3, f"{row['total_amount']:,.2f} AFN")
-                method = lang_manager.get("credit") if row['payment_type'] == 'CREDIT' else lang_manager.get("cash")
-                self.table_item(self.trans_table, i, 4, method)
-            
-            # Add totals row
-            if trans:
-                total_row_idx = len(trans)
-                self.trans_table.insertRow(total_row_idx)
-                
-                total_qty = sum([row.get('total_items', 0) for row in trans])
-                total_amount = sum([row['total_amount'] for row in trans])
-                    
-                total_lbl = QTableWidgetItem(lang_manager.get("total"))
-                total_lbl.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                font = QFont()
-                font.setBold(True)
-                total_lbl.setFont(font)
-                self.trans_table.setItem(total_row_idx, 0, total_lbl)
-                
-                self.trans_table.setItem(total_row_idx, 1, QTableWidgetItem(""))
-                
-                qty_item = QTableWidgetItem(str(int(total_qty)))
-                qty_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                qty_item.setFont(font)
-                self.trans_table.setItem(total_row_idx, 2, qty_item)
-                
-                amt_item = QTableWidgetItem(f"{total_amount:,.2f} AFN")
-                amt_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                amt_item.setFont(font)
-                self.trans_table.setItem(total_row_idx, 3, amt_item)
-                
-                self.trans_table.setItem(total_row_idx, 4, QTableWidgetItem(""))
-                
-            self.trans_table.resizeColumnsToContents()
-            
-            # Load Returns Breakdown with Replacement Details
-            self.ret_table.setRowCount(0)
-            ret_rows = data['returns']
-            
-            for i, row in enumerate(ret_rows):
-                self.ret_table.insertRow(i)
-                self.table_item(self.ret_table, i, 0, row['invoice_number'])
-                self.table_item(self.ret_table, i, 1, row['customer_name'] or lang_manager.get("walk_in"))
-                self.table_item(self.ret_table, i, 2, row['item_name'])
-                self.table_item(self.ret_table, i, 3, str(row['qty_returned']))
-                
-                # Action column
-                action_text = row['action'] or "RETURN"
-                self.table_item(self.ret_table, i, 4, action_text)
-                
-                # Replacement items column
-                if action_text == 'REPLACEMENT' and 'replacements' in row and row['replacements']:
-                    replacement_text = "\n".join([
-                        f"{rep['product_name']} x{rep['quantity']} @ {rep['unit_price']:.2f}"
-                        for rep in row['replacements']
-                    ])
-                    self.table_item(self.ret_table, i, 5, replacement_text)
-                else:
-                    self.table_item(self.ret_table, i, 5, "-")
-                
-                # Amount Info
-                item_refund = row['qty_returned'] * row['unit_price']
-                self.table_item(self.ret_table, i, 6, f"{item_refund:,.2f}")
-                
-                # Method column - show refund_type
-                method_text = row['refund_type'] or "ACCOUNT"
-                if method_text == "CASH":
-                    method_text = lang_manager.get("cash")
-                else:
-                    method_text = lang_manager.get("account") or lang_manager.get("credit")
-                self.table_item(self.ret_table, i, 7, method_text)
-            
-            # Load Loan / Credit Table
-            self.loan_table.setRowCount(0)
-            loans = data['loans']
-            for i, row in enumerate(loans):
-                self.loan_table.insertRow(i)
-                self.table_item(self.loan_table, i, 0, row['customer_name'])
-                self.table_item(self.loan_table, i, 1, row['invoice_number'])
-                self.table_item(self.loan_table, i, 2, f"{row['total_amount']:,.2f} AFN")
-                self.table_item(self.loan_table, i, 3, f"{row['balance']:,.2f} AFN")
-            
+            # Totals for the paged grids (separate aggregates, not summed from loaded pages)
+            self.report_totals = {k: data[k] for k in ('sales_totals', 'returns_totals', 'loans_totals')}
+            t = data['sales_totals']
+            self.trans_totals_lbl.setText(f"{lang_manager.get('total')}: {t['count']} | "
+                                          f"{lang_manager.get('quantity')}: {int(t['items'])} | "
+                                          f"{lang_manager.get('amount')}: {t['amount']:,.2f} AFN")
+            t = data['returns_totals']
+            self.ret_totals_lbl.setText(f"{lang_manager.get('total')}: {t['count']} | "
+                                        f"{lang_manager.get('amount')}: {t['amount']:,.2f} AFN")
+            t = data['loans_totals']
+            self.loan_totals_lbl.setText(f"{lang_manager.get('total')}: {t['count']} | "
+                                         f"{lang_manager.get('credit')}: {t['total']:,.2f} AFN | "
+                                         f"{lang_manager.get('balance')}: {t['balance']:,.2f} AFN")
+
             # Load Low Stock Table
             self.low_stock_table.setRowCount(0)
             low_items = data['low_stock']
@@ -643,7 +559,7 @@ class PharmacyReportsView(QWidget):
                 self.expiry_table.setItem(row_idx, 4, status_item_obj)
             
             # Autofit all tables to content - Optimized to avoid UI hangs
-            for table in [self.trans_table, self.ret_table, self.loan_table, self.low_stock_table, self.expiry_table]:
+            for table in [self.low_stock_table, self.expiry_table]:
                 if table.rowCount() > 0:
                     table.resizeColumnsToContents()
                     if table.horizontalHeader().length() < table.width():
@@ -666,6 +582,16 @@ class PharmacyReportsView(QWidget):
         self.complete_report_btn.setEnabled(True)
         self.complete_report_btn.setText(lang_manager.get("print_complete_pharmacy_report"))
 
+    def show_expiry_buckets(self, buckets):
+        labels = ((expiry.EXPIRED, lang_manager.get("expired")), (expiry.D30, f"≤ 30 {lang_manager.get('days')}"),
+                  (expiry.D60, f"31-60 {lang_manager.get('days')}"), (expiry.D90, f"61-90 {lang_manager.get('days')}"))
+        parts = []
+        for key, label in labels:
+            b = buckets.get(key)
+            if b:
+                parts.append(f"<b>{label}</b>: {b['batches']} ({b['cost_value']:,.2f} AFN)")
+        self.expiry_summary_lbl.setText(" &nbsp;|&nbsp; ".join(parts))
+
     def style_expiry_item(self, item, days_left):
         font = item.font()
 
@@ -694,271 +620,121 @@ class PharmacyReportsView(QWidget):
             item.setFont(font)
         table.setItem(row, col, item)
 
-    def handle_trans_click(self, row, col):
+    def handle_trans_click(self, index):
         """Handle click on transaction table. If Shift is held, show bill."""
         from PyQt6.QtWidgets import QApplication
         modifiers = QApplication.keyboardModifiers()
         if modifiers == Qt.KeyboardModifier.ShiftModifier:
-            # Get invoice number from first column
-            item = self.trans_table.item(row, 0)
-            if not item: return
-            invoice_num = item.text()
-            if invoice_num == "TOTAL": return
+            sale = self.trans_model.row(index.row())
+            if not sale: return
+            invoice_num = sale['invoice_number']
+            is_credit = (sale['payment_type'] == 'CREDIT')
 
-            # Fetch sale ID
-            try:
-                with db_manager.get_pharmacy_connection() as conn:
-                    # Invoice number in table is from column 0
-                    sale = conn.execute("SELECT id, payment_type FROM pharmacy_sales WHERE invoice_number=?", (invoice_num,)).fetchone()
-                    if sale:
-                        sale_id = sale['id']
-                        is_credit = (sale['payment_type'] == 'CREDIT')
-                        
-                        # Generate Bill
-                        from src.utils.thermal_bill_printer import thermal_printer
-                        bill_text = thermal_printer.generate_sales_bill(sale_id, is_credit, is_pharmacy=True)
-                        if bill_text:
-                            # Ask to print
-                            if QMessageBox.question(self, lang_manager.get("reprint_bill"), f"{lang_manager.get('reprint_bill')} {invoice_num}?", 
-                                                  QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes:
-                                thermal_printer.print_bill(bill_text)
-                    else:
-                        QMessageBox.warning(self, lang_manager.get("error"), lang_manager.get("not_found"))
-            except Exception as e:
-                print(f"Error handling click: {e}")
+            # Ask to print; the spooler renders and sends the bill off the UI thread
+            if QMessageBox.question(self, lang_manager.get("reprint_bill"), f"{lang_manager.get('reprint_bill')} {invoice_num}?", 
+                                  QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes:
+                from src.utils.print_spooler import print_spooler
+                print_spooler.submit_sale_bill(sale['id'], is_credit, is_pharmacy=True, label=invoice_num)
 
     def open_month_close(self):
         dialog = PharmacyMonthCloseDialog(self)
         dialog.exec()
 
-    def print_table_report(self, title, table):
-        """Print a table report with preview"""
-        if table.rowCount() == 0:
-            QMessageBox.information(self, lang_manager.get("no_data"), lang_manager.get("no_data"))
-            return
+    # -- Printing: PDFs are built from queries on a worker thread (src/ui/report_print.py),
+    #    with every row of the selected period, not just the loaded pages
+
+    REPORT_SECTIONS = {
+        "trans": "transaction_details",
+        "returns": "returned_items_details",
+        "loans": "credit_loan_info",
+        "low_stock": "low_stock_medicines",
+        "expiry": "medicine_expiry_status",
+    }
 
-        # Create printer
-        printer = QPrinter()
-        printer.setPageOrientation(QPageLayout.Orientation.Portrait)
-        printer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
-
-        # Create print preview dialog
-        preview = QPrintPreviewDialog(printer, self)
-        preview.setWindowTitle(f"Print Preview - {title}")
-        preview.setMinimumSize(800, 600)
-
-        # Connect print function
-        preview.paintRequested.connect(lambda p: self.render_table_document(p, title, table))
-
-        # Show preview
-        preview.exec()
-
-    def render_table_document(self, printer, title, table):
-        """Render table as printable document"""
-        document = QTextDocument()
-        cursor = QTextCursor(document)
-
-        # Title
-        title_format = QTextCharFormat()
-        title_format.setFontPointSize(16)
-        title_format.setFontWeight(QFont.Weight.Bold)
-        cursor.insertText(f"{title}\n", title_format)
-        cursor.insertText("\n")
-
-        # Date and period info
-        info_format = QTextCharFormat()
-        info_format.setFontPointSize(10)
-        period_text = self.filter_combo.currentText()
-        date_from = self.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.date_to.date().toString("yyyy-MM-dd")
-        cursor.insertText(f"{lang_manager.get('report_period')}: {period_text}\n", info_format)
-        cursor.insertText(f"{lang_manager.get('date')}: {date_from} {lang_manager.get('to')} {date_to}\n", info_format)
-        cursor.insertText(f"{lang_manager.get('generated_at')}: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n", info_format)
-        cursor.insertText("\n")
-
-        # Create table
-        rows = table.rowCount()
-        cols = table.columnCount()
-
-        if rows > 0 and cols > 0:
-            # Create table format
-            table_format = QTextTableFormat()
-            table_format.setBorderStyle(QTextTableFormat.BorderStyle.BorderStyle_Solid)
-            table_format.setCellPadding(5)
-            table_format.setCellSpacing(0)
-            table_format.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
-
-            # Insert table
-            text_table = cursor.insertTable(rows + 1, cols, table_format)  # +1 for header
-
-            # Header row
-            header_format = QTextCharFormat()
-            header_format.setFontWeight(QFont.Weight.Bold)
-            header_format.setBackground(QColor("#f0f0f0"))
-
-            for col in range(cols):
-                header_item = table.horizontalHeaderItem(col)
-                if header_item:
-                    cell_cursor = text_table.cellAt(0, col).firstCursorPosition()
-                    cell_cursor.insertText(header_item.text(), header_format)
-
-            # Data rows
-            for row in range(rows):
-                for col in range(cols):
-                    item = table.item(row, col)
-                    if item:
-                        cell_cursor = text_table.cellAt(row + 1, col).firstCursorPosition()
-                        cell_cursor.insertText(item.text())
-
-        # Footer with summary
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertText("\n\n")
-
-        footer_format = QTextCharFormat()
-        footer_format.setFontPointSize(10)
-        footer_format.setFontItalic(True)
-
-        if lang_manager.get("critical_stock_alert") in title or lang_manager.get("low_stock_medicines") in title:
-            low_stock_count = table.rowCount()
-            cursor.insertText(f"{lang_manager.get('total_low_stock_items')}: {low_stock_count}\n", footer_format)
-
-        elif lang_manager.get("transaction_details") in title:
-            total_sales = 0
-            total_items = 0
-            for row in range(table.rowCount()):
-                amount_item = table.item(row, 3)  # Amount column
-                items_item = table.item(row, 2)   # Items column
-                if amount_item and "AFN" in amount_item.text():
-                    try:
-                        amount = float(amount_item.text().replace(',', '').replace(' AFN', ''))
-                        total_sales += amount
-                    except:
-                        pass
-                if items_item:
-                    try:
-                        total_items += int(items_item.text())
-                    except:
-                        pass
-            cursor.insertText(f"{lang_manager.get('total_transactions')}: {table.rowCount()}\n", footer_format)
-            cursor.insertText(f"{lang_manager.get('total_items_sold')}: {total_items}\n", footer_format)
-            cursor.insertText(f"{lang_manager.get('total_sales_amount')}: {total_sales:,.2f} AFN\n", footer_format)
-
-        elif lang_manager.get("credit_loan_info") in title:
-            total_loans = 0
-            total_balance = 0
-            for row in range(table.rowCount()):
-                loan_item = table.item(row, 2)  # Total Loan column
-                balance_item = table.item(row, 3)  # Balance column
-                if loan_item:
-                    try:
-                        total_loans += float(loan_item.text().replace(',', '').replace(' AFN', ''))
-                    except:
-                        pass
-                if balance_item:
-                    try:
-                        total_balance += float(balance_item.text().replace(',', '').replace(' AFN', ''))
-                    except:
-                        pass
-            cursor.insertText(f"{lang_manager.get('total_active_loans')}: {table.rowCount()}\n", footer_format)
-            cursor.insertText(f"{lang_manager.get('total_loan_amount')}: {total_loans:,.2f} AFN\n", footer_format)
-            cursor.insertText(f"{lang_manager.get('total_outstanding_balance')}: {total_balance:,.2f} AFN\n", footer_format)
-
-        elif lang_manager.get("medicine_expiry_status") in title:
-            expired_count = 0
-            for row in range(table.rowCount()):
-                status_item = table.item(row, 4)
-                if status_item and status_item.text() == "EXPIRED":
-                    expired_count += 1
-            cursor.insertText(f"{lang_manager.get('total_items_monitored')}: {table.rowCount()}\n", footer_format)
-            cursor.insertText(f"{lang_manager.get('already_expired_count')}: {expired_count}\n", footer_format)
-            cursor.insertText(f"{lang_manager.get('nearing_expiry')}: {table.rowCount() - expired_count}\n", footer_format)
-
-        # Print the document
-        document.print(printer)
+    def print_table_report(self, section, button=None):
+        """Print one report table as a PDF"""
+        self.print_sections(lang_manager.get(self.REPORT_SECTIONS[section]), [section], button)
 
     def print_full_report(self):
         """Print a comprehensive full pharmacy report"""
-        printer = QPrinter()
-        printer.setPageOrientation(QPageLayout.Orientation.Portrait)
-        printer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
-
-        preview = QPrintPreviewDialog(printer, self)
-        preview.setWindowTitle("Print Preview - Complete Pharmacy Reports Summary")
-        preview.setMinimumSize(1000, 700)
-
-        preview.paintRequested.connect(self.render_full_report)
-        preview.exec()
-
-    def render_full_report(self, printer):
-        """Render complete pharmacy report with all sections"""
-        document = QTextDocument()
-        cursor = QTextCursor(document)
-
-        # Main title
-        title_format = QTextCharFormat()
-        title_format.setFontPointSize(18)
-        title_format.setFontWeight(QFont.Weight.Bold)
-        cursor.insertText(f"{lang_manager.get('complete_pharmacy_reports_summary')}\n", title_format)
-        cursor.insertText("\n")
-
-        # Date info
-        info_format = QTextCharFormat()
-        info_format.setFontPointSize(10)
-        period_text = self.filter_combo.currentText()
-        date_from = self.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.date_to.date().toString("yyyy-MM-dd")
-        cursor.insertText(f"{lang_manager.get('report_period')}: {period_text}\n", info_format)
-        cursor.insertText(f"{lang_manager.get('date')}: {date_from} {lang_manager.get('to')} {date_to}\n", info_format)
-        cursor.insertText(f"{lang_manager.get('generated_at')}: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n", info_format)
-        cursor.insertText("\n")
-
-        # Add each section
-        sections = [
-            (lang_manager.get("transaction_details"), self.trans_table),
-            (lang_manager.get("credit_loan_info"), self.loan_table),
-            (lang_manager.get("low_stock_medicines"), self.low_stock_table),
-            (lang_manager.get("medicine_expiry_status"), self.expiry_table)
-        ]
-
-        for section_title, table in sections:
-            if table.rowCount() > 0:
-                # Section header
-                section_format = QTextCharFormat()
-                section_format.setFontPointSize(14)
-                section_format.setFontWeight(QFont.Weight.Bold)
-                cursor.insertText(f"{section_title}\n", section_format)
-
-                # Create table for this section
-                rows = table.rowCount()
-                cols = table.columnCount()
-
-                table_format = QTextTableFormat()
-                table_format.setBorderStyle(QTextTableFormat.BorderStyle.BorderStyle_Solid)
-                table_format.setCellPadding(3)
-                table_format.setCellSpacing(0)
-                table_format.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
-
-                text_table = cursor.insertTable(rows + 1, cols, table_format)
-
-                # Headers
-                header_format = QTextCharFormat()
-                header_format.setFontWeight(QFont.Weight.Bold)
-                header_format.setBackground(QColor("#f0f0f0"))
-
-                for col in range(cols):
-                    header_item = table.horizontalHeaderItem(col)
-                    if header_item:
-                        cell_cursor = text_table.cellAt(0, col).firstCursorPosition()
-                        cell_cursor.insertText(header_item.text(), header_format)
-
-                # Data
-                for row in range(rows):
-                    for col in range(cols):
-                        item = table.item(row, col)
-                        if item:
-                            cell_cursor = text_table.cellAt(row + 1, col).firstCursorPosition()
-                            cell_cursor.insertText(item.text())
-
-                cursor.insertText("\n\n")
-
-        document.print(printer)
\ No newline at end of file
+        self.print_sections(lang_manager.get('complete_pharmacy_reports_summary'),
+                            ["trans", "loans", "low_stock", "expiry"], self.complete_report_btn)
+
+    def print_sections(self, title, keys, button=None):
+        date_range, period_name = self.selected_range()
+        expiry_days = self.expiry_days_spin.value()
+        date_from = date_range.start_date
+        date_to = date_range.end_date - timedelta(days=1) if date_range.end_date else date.today()
+        info = [f"{lang_manager.get('report_period')}: {period_name}",
+                f"{lang_manager.get('date')}: {date_from} {lang_manager.get('to')} {date_to}",
+                f"{lang_manager.get('generated_at')}: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
+        models = {"trans": self.trans_model, "returns": self.ret_model, "loans": self.loan_model}
+
+        def render(path):
+            with db_manager.get_pharmacy_connection() as conn:
+                sections = [self.report_section(conn, key, date_range, expiry_days, models.get(key))
+                            for key in keys]
+                pages, rows = report_renderer.render_pdf(path, title, info, sections)
+            print(f"[INFO] Rendered {title}: {rows} rows, {pages} pages")
+
+        print_report(self, db_manager.pharmacy_db, "pharmacy_report",
+                     (tuple(keys), date_range, expiry_days, date.today()), render, button)
+
+    @classmethod
+    def report_section(cls, conn, key, date_range, expiry_days, model=None):
+        """Section `key` of the printed report; row generators read from `conn` while the PDF is drawn."""
+        title = lang_manager.get(cls.REPORT_SECTIONS[key])
+
+        if key in ("trans", "returns", "loans"):
+            # Same keyset queries and column formatting as the paged grids, walked to the end
+            query = dict(zip(("trans", "returns", "loans"), batch_loader.pharmacy_report_queries(date_range)))[key]
+            rows = model.rows_text(conn, query)
+            footer = []
+            if key == "trans":
+                totals = sales_summary.period_totals(conn, sales_summary.PHARMACY, date_range)
+                t = {'count': int(totals['sales_count']), 'amount': totals['revenue'], 'items': totals['items_sold']}
+                footer = [f"{lang_manager.get('total_transactions')}: {t['count']}",
+                          f"{lang_manager.get('total_items_sold')}: {int(t['items'])}",
+                          f"{lang_manager.get('total_sales_amount')}: {t['amount']:,.2f} AFN"]
+            elif key == "loans":
+                t = query.aggregate(conn, "COUNT(*) AS count, COALESCE(SUM(l.total_amount), 0) AS total, "
+                                          "COALESCE(SUM(l.balance), 0) AS balance")
+                footer = [f"{lang_manager.get('total_active_loans')}: {t['count']}",
+                          f"{lang_manager.get('total_loan_amount')}: {t['total']:,.2f} AFN",
+                          f"{lang_manager.get('total_outstanding_balance')}: {t['balance']:,.2f} AFN"]
+            return report_renderer.Section(title, model.headers(), rows, footer=footer)
+
+        if key == "low_stock":
+            low_items = conn.execute("""
+                SELECT p.name_en, p.min_stock, SUM(i.quantity) as current_qty, MIN(i.expiry_date) as expiry
+                FROM pharmacy_products p
+                LEFT JOIN pharmacy_inventory i ON p.id = i.product_id
+                GROUP BY p.id
+                HAVING SUM(i.quantity) < p.min_stock
+                ORDER BY SUM(i.quantity) ASC
+            """).fetchall()
+            rows = [[r['name_en'], r['expiry'] or "N/A", f"{r['current_qty'] or 0}", f"{r['min_stock']}"]
+                    for r in low_items]
+            return report_renderer.Section(
+                title, [lang_manager.get("medicine"), lang_manager.get("expiry_date"), lang_manager.get("quantity"),
+                        lang_manager.get("reorder_level")], rows, widths=[4, 1.5, 1, 1],
+                footer=[f"{lang_manager.get('total_low_stock_items')}: {len(rows)}"])
+
+        batches = expiry.expiring_within(conn, expiry_days)
+        rows = []
+        for r in batches:
+            days_left = r['days_left']
+            status = lang_manager.get("active")
+            if days_left <= 0:
+                status = lang_manager.get("expired")
+            elif days_left <= 7:
+                status = lang_manager.get("alert")
+            days_text = f"{days_left} {lang_manager.get('days')}" if days_left >= 0 else lang_manager.get("expired")
+            rows.append([r['name'], r['batch'], r['expiry'], days_text, status])
+        expired_count = sum(1 for r in batches if r['days_left'] <= 0)
+        return report_renderer.Section(
+            title, [lang_manager.get("medicine"), lang_manager.get("batch_no_short"), lang_manager.get("expiry_date"),
+                    lang_manager.get("days_left"), lang_manager.get("status")], rows, widths=[4, 2, 1.5, 1.2, 1.2],
+            footer=[f"{lang_manager.get('total_items_monitored')}: {len(rows)}",
+                    f"{lang_manager.get('already_expired_count')}: {expired_count}",
+                    f"{lang_manager.get('nearing_expiry')}: {len(rows) - expired_count}"])
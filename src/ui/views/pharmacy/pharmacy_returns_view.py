@@ -2,10 +2,11 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
                              QPushButton, QLabel, QHeaderView, QGroupBox, 
                              QFormLayout, QLineEdit, QComboBox, QMessageBox, QTableWidgetItem, 
                              QDoubleSpinBox, QDialog, QDialogButtonBox, QSpinBox)
-from PyQt6.QtCore import Qt, pyqtSignal, QThread, QObject
+from PyQt6.QtCore import Qt, pyqtSignal, QThread, QObject, QTimer
 from src.ui.button_styles import style_button
 from src.ui.table_styles import style_table
 from src.database.db_manager import db_manager
+from src.database import batch_loader, customer_ledger, finance_ledger, pharmacy_search, sales_summary
 from src.core.localization import lang_manager
 
 # InvoiceLoadWorker logic will be moved into load_invoice task
@@ -17,6 +18,13 @@ class ReplacementItemDialog(QDialog):
         self.return_qty = return_qty
         self.unit_price = unit_price
         self.replacement_items = []
+        self._search_seq = 0  # results of an older search are dropped
+
+        # Debounce: search once typing pauses, not on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.filter_products)
         self.init_ui()
         
     def init_ui(self):
@@ -34,7 +42,7 @@ class ReplacementItemDialog(QDialog):
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText(lang_manager.get("search") + " " + lang_manager.get("product") + "...")
-        self.search_input.textChanged.connect(self.filter_products)
+        self.search_input.textChanged.connect(lambda _: self.search_timer.start())
         search_layout.addWidget(self.search_input)
         layout.addLayout(search_layout)
         
@@ -115,13 +123,31 @@ class ReplacementItemDialog(QDialog):
             self.products_table.setCellWidget(i, 4, add_btn)
     
     def filter_products(self):
-        """Filter products based on search text"""
-        search_text = self.search_input.text().lower()
+        """Filter products based on search text (name, generic name, brand or barcode, ranked) in the background"""
+        from src.core.blocking_task_manager import task_manager
+
+        self._search_seq += 1
+        seq = self._search_seq
+        search_text = self.search_input.text().strip()
         if not search_text:
             self.display_products(self.all_products)
-        else:
-            filtered = [p for p in self.all_products if search_text in p['name_en'].lower()]
-            self.display_products(filtered)
+            return
+
+        def search():
+            with db_manager.get_pharmacy_connection() as conn:
+                return [r['id'] for r in pharmacy_search.search(conn.cursor(), search_text, limit=200, in_stock=True)]
+
+        def on_finished(ids):
+            if seq != self._search_seq:
+                return  # superseded by a newer search
+            by_id = {p['id']: p for p in self.all_products}
+            try:
+                self.display_products([by_id[i] for i in ids if i in by_id])
+            except RuntimeError:
+                pass  # dialog closed while searching
+
+        task_manager.run_task(search, on_finished=on_finished,
+                              on_error=lambda e: print(f"[WARNING] Product search failed: {e}"))
     
     def add_item(self, product, row):
         """Add selected item to replacement list"""
@@ -277,27 +303,9 @@ class PharmacyReturnsView(QWidget):
         def do_load():
             try:
                 with db_manager.get_pharmacy_connection() as conn:
-                    sale = conn.execute("""
-                        SELECT s.*, c.name as customer_name FROM pharmacy_sales s
-                        LEFT JOIN pharmacy_customers c ON s.customer_id = c.id
-                        WHERE s.invoice_number = ? OR s.id = ?
-                    """, (sale_id, sale_id)).fetchone()
-                    
+                    sale, items = batch_loader.pharmacy_invoice(conn, sale_id)
                     if not sale: return {"success": False, "error": "not_found"}
-                    
-                    items = conn.execute("""
-                        SELECT si.*, p.name_en FROM pharmacy_sale_items si
-                        JOIN pharmacy_products p ON si.product_id = p.id WHERE si.sale_id = ?
-                    """, (sale['id'],)).fetchall()
-                    
-                    item_data = []
-                    for item in items:
-                        ret_row = conn.execute("SELECT SUM(quantity) as returned_qty FROM pharmacy_return_items WHERE sale_item_id = ?", (item['id'],)).fetchone()
-                        item_dict = dict(item)
-                        item_dict['already_returned'] = ret_row['returned_qty'] or 0
-                        item_data.append(item_dict)
-                    
-                    return {"success": True, "sale": dict(sale), "items": item_data}
+                    return {"success": True, "sale": sale, "items": items}
             except Exception as e:
                 return {"success": False, "error": str(e)}
 
@@ -470,10 +478,16 @@ class PharmacyReturnsView(QWidget):
                     # 5. Customer/Loan updates
                     s_data = conn.execute("SELECT customer_id, payment_type FROM pharmacy_sales WHERE id=?", (sale_item['sale_id'],)).fetchone()
                     if s_data and s_data['customer_id'] and s_data['payment_type'] == 'CREDIT' and actual_refund > 0 and refund_mode == 'ACCOUNT':
-                        conn.execute("UPDATE pharmacy_customers SET balance = balance - ? WHERE id=?", (actual_refund, s_data['customer_id']))
+                        customer_ledger.post(conn.cursor(), customer_ledger.PHARMACY, s_data['customer_id'],
+                                             customer_ledger.RETURN, -actual_refund, return_id, reason_text)
                         conn.execute("UPDATE pharmacy_loans SET balance = balance - ? WHERE sale_id=?", (actual_refund, sale_item['sale_id']))
                         conn.execute("UPDATE pharmacy_loans SET status = 'COMPLETED' WHERE sale_id = ? AND balance <= 0", (sale_item['sale_id'],))
 
+                    cost = sales_summary.record_return(conn.cursor(), sales_summary.PHARMACY, actual_refund,
+                                                       [(sale_item['product_id'], qty, actual_refund, sale_item['cost_price_at_sale'])],
+                                                       refund_mode)
+                    finance_ledger.post_return(conn.cursor(), return_id, actual_refund, cost, refund_mode)
+
                     conn.commit()
                 return {"success": True}
             except Exception as e:
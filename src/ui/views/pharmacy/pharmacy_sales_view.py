@@ -5,10 +5,12 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QColor
 import qtawesome as qta
 from src.database.db_manager import db_manager
+from src.database import checkout, pharmacy_search, sequences
+from src.core.pharmacy_stock import pharmacy_stock
+from src.utils.print_spooler import print_spooler, DONE as PRINT_DONE, FAILED as PRINT_FAILED
 from src.core.localization import lang_manager
 from src.ui.table_styles import style_table
 from src.ui.button_styles import style_button
-from datetime import datetime
 
 class PharmacySalesView(QWidget):
     sale_completed = pyqtSignal()
@@ -16,6 +18,11 @@ class PharmacySalesView(QWidget):
     def __init__(self):
         super().__init__()
         self.cart = []
+        self.cart_id = pharmacy_stock.open_cart(self)  # key of this cart's stock reservations
+        # Logout / mode switch deletes the view with its cart: hand the reserved units back
+        self.destroyed.connect(lambda _=None, cart_id=self.cart_id: pharmacy_stock.release(cart_id))
+        self._print_jobs = set()  # spooler jobs submitted from this view
+        print_spooler.job_status.connect(self.on_print_job_status)
         self.init_ui()
 
     def init_ui(self):
@@ -146,111 +153,102 @@ class PharmacySalesView(QWidget):
 
     # eventFilter removed to fix customer selection issue on Windows 10
 
-    def check_stock_async(self, product_id, batch, quantity, on_finished):
+    def refresh_stock(self, on_done=None):
+        """Reloads the FEFO stock allocator in the background (no-op when inventory is unchanged)."""
         from src.core.blocking_task_manager import task_manager
-        
-        def do_check():
-            try:
-                with db_manager.get_pharmacy_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        SELECT quantity, expiry_date FROM pharmacy_inventory 
-                        WHERE product_id = ? AND batch_number = ?
-                    """, (product_id, batch))
-                    row = cursor.fetchone()
-                    if not row: return False, "Batch not found"
-                    
-                    stock, expiry = row['quantity'], row['expiry_date']
-                    if expiry:
-                        exp_date = datetime.strptime(expiry, "%Y-%m-%d")
-                        if exp_date < datetime.now():
-                            return False, f"Batch Expired on {expiry}"
-                    
-                    if stock < quantity:
-                        return False, f"Insufficient Stock. Available: {stock}"
-                    
-                    return True, "OK"
-            except Exception as e:
-                return False, str(e)
-
-        task_manager.run_task(do_check, on_finished=on_finished)
+        task_manager.run_task(pharmacy_stock.refresh, on_finished=on_done)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_stock()
 
     def handle_search(self):
         search_term = self.barcode_input.text().strip()
         if not search_term: return
-        
+        self.apply_search(search_term)
+
+    def apply_search(self, search_term, retried=False):
+        # Scanned barcode: in-memory lookup. Anything else: best in-stock full-text match
+        # (name, generic name, brand). One stock reload and retry on a miss.
+        product = pharmacy_stock.get(search_term) if pharmacy_stock.loaded else None
+        if product:
+            self.add_to_cart(product)
+            self.barcode_input.clear()
+            return
+
         from src.core.blocking_task_manager import task_manager
-        
+
         def do_search():
             try:
                 with db_manager.get_pharmacy_connection() as conn:
-                    cursor = conn.cursor()
-                    # Fetch product with earliest expiring batch (FIFO)
-                    cursor.execute("""
-                        SELECT p.*, i.quantity as stock, i.batch_number, i.expiry_date 
-                        FROM pharmacy_products p 
-                        JOIN pharmacy_inventory i ON p.id = i.product_id 
-                        WHERE (p.barcode = ? OR p.name_en LIKE ?) 
-                        AND p.is_active = 1 
-                        AND i.quantity > 0
-                        ORDER BY i.expiry_date ASC 
-                        LIMIT 1
-                    """, (search_term, f"%{search_term}%"))
-                    row = cursor.fetchone()
-                    return dict(row) if row else None
+                    rows = pharmacy_search.search(conn.cursor(), search_term, limit=1, in_stock=True)
+                    return rows[0]["id"] if rows else None
             except Exception as e:
                 print(f"Search error: {e}")
                 return None
-        
-        def on_finished(product):
+
+        def on_finished(product_id):
+            product = pharmacy_stock.product(product_id) if product_id is not None else None
             if product:
                 self.add_to_cart(product)
                 self.barcode_input.clear()
+            elif product_id is not None and not retried:
+                self.refresh_stock(lambda _: self.apply_search(search_term, retried=True))
             else:
                 QMessageBox.warning(self, lang_manager.get("not_found"), lang_manager.get("not_found") + " in system.")
-        
-        task_manager.run_task(do_search, on_finished=on_finished)
 
+        if pharmacy_stock.loaded or retried:
+            task_manager.run_task(do_search, on_finished=on_finished)
+        else:
+            self.refresh_stock(lambda _: self.apply_search(search_term, retried=True))
+
+    def stock_issue_message(self, alloc):
+        if alloc.expired_only:
+            return "Only expired batches are left for this product."
+        return f"Insufficient Stock. Available: {alloc.available:g}"
 
     def add_to_cart(self, p):
-        # 1. Existing Item Logic
+        # 1. Existing line: one more unit, allocated FEFO across batches
         for item in self.cart:
-            if item['id'] == p['id'] and item.get('batch') == p.get('batch_number'):
-                new_qty = item['qty'] + 1
-                def on_checked(res):
-                    valid, msg = res
-                    if not valid:
-                        QMessageBox.warning(self, "Stock Issue", msg)
-                        return
-                    item['qty'] = new_qty
-                    self.refresh_table()
-                
-                self.check_stock_async(item['id'], item['batch'], new_qty, on_checked)
+            if item['id'] == p.id:
+                self.set_line_qty(item, item['qty'] + 1)
                 return
 
-        # 2. New Item Logic
-        def on_new_checked(res):
-            valid, msg = res
-            if not valid:
-                 QMessageBox.warning(self, "Stock Issue", msg)
-                 return
-
-            self.cart.append({
-                'id': p['id'],
-                'barcode': p['barcode'],
-                'name': p['name_en'],
-                'size': p.get('size', 'N/A'),
-                'expiry': p.get('expiry_date', 'N/A'),
-                'price': p['sale_price'],
-                'batch': p.get('batch_number'),
-                'cost': p.get('cost_price', 0),
-                'qty': 1,
-                'stock': p.get('stock', 0)  
-            })
+        # 2. New line
+        alloc = pharmacy_stock.reserve(self.cart_id, p.id, 1)
+        if not alloc.ok:
+            QMessageBox.warning(self, "Stock Issue", self.stock_issue_message(alloc))
+            return
+        item = {
+            'id': p.id,
+            'barcode': p.barcode,
+            'name': p.name_en,
+            'size': p.size,
+            'price': p.sale_price,
+            'cost': p.cost_price,
+            'qty': 0,
+        }
+        self.apply_allocation(item, 1, alloc)
+        self.cart.append(item)
+        self.refresh_table()
+
+    def set_line_qty(self, item, new_qty):
+        alloc = pharmacy_stock.reserve(self.cart_id, item['id'], new_qty)
+        if not alloc.ok:
+            QMessageBox.warning(self, "Stock Issue", self.stock_issue_message(alloc))
             self.refresh_table()
+            return False
+        self.apply_allocation(item, new_qty, alloc)
+        self.refresh_table()
+        return True
 
-        self.check_stock_async(p['id'], p.get('batch_number'), 1, on_new_checked)
+    @staticmethod
+    def apply_allocation(item, qty, alloc):
+        item['qty'] = qty
+        item['batches'] = alloc.parts            # [(batch_number, expiry_date, qty)], earliest expiry first
+        item['batch'] = alloc.parts[0][0]
+        item['expiry'] = alloc.parts[0][1]
+        item['remaining'] = alloc.available
 
     def refresh_table(self):
         self.table.setRowCount(0)
@@ -263,14 +261,17 @@ class PharmacySalesView(QWidget):
             self.table.setItem(i, 0, QTableWidgetItem(item['barcode']))
             self.table.setItem(i, 1, QTableWidgetItem(item['name']))
             self.table.setItem(i, 2, QTableWidgetItem(item['size']))
-            self.table.setItem(i, 3, QTableWidgetItem(item.get('expiry', '')))
+            expiry = item.get('expiry', '')
+            if len(item.get('batches', ())) > 1:
+                expiry += f" (+{len(item['batches']) - 1} batch)"  # line split across batches
+            self.table.setItem(i, 3, QTableWidgetItem(expiry))
             self.table.setItem(i, 4, QTableWidgetItem(f"{item['price']:.2f}"))
             
             # Editable Quantity with SpinBox
             qty_spinbox = QSpinBox()
             qty_spinbox.setAlignment(Qt.AlignmentFlag.AlignCenter)
             qty_spinbox.setMinimum(1)
-            qty_spinbox.setMaximum(int(item.get('stock', 999)))  
+            qty_spinbox.setMaximum(int(item['qty'] + item.get('remaining', 0)))
             qty_spinbox.setValue(item['qty'])
             qty_spinbox.setStyleSheet("background-color: #f1f5f9; color: #475569; font-size: 18px; padding: 2px 6px; border: 1px solid #e2e8f0; border-radius: 4px;")
             qty_spinbox.editingFinished.connect(lambda s=qty_spinbox, idx=i: self.update_qty(idx, s.value()))
@@ -280,8 +281,8 @@ class PharmacySalesView(QWidget):
             total_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
             self.table.setItem(i, 6, total_item)
             
-            # Remaining stock display
-            remaining = item.get('stock', 0) - item['qty']
+            # Remaining stock display (unreserved, unexpired units across all batches)
+            remaining = item.get('remaining', 0)
             remaining_item = QTableWidgetItem(str(remaining))
             remaining_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
             if remaining > 10:
@@ -304,22 +305,12 @@ class PharmacySalesView(QWidget):
     
     def update_qty(self, idx, new_qty):
         """Update quantity when spinbox changes"""
-        if idx < len(self.cart):
-            item = self.cart[idx]
-            def on_checked(res):
-                valid, msg = res
-                if not valid:
-                    QMessageBox.warning(self, "Stock Issue", msg)
-                    self.refresh_table()
-                    return
-                item['qty'] = new_qty
-                self.refresh_table()
-            
-            self.check_stock_async(item['id'], item['batch'], new_qty, on_checked)
-
+        if idx < len(self.cart) and new_qty != self.cart[idx]['qty']:
+            self.set_line_qty(self.cart[idx], new_qty)
 
     def remove_item(self, idx):
-        self.cart.pop(idx)
+        item = self.cart.pop(idx)
+        pharmacy_stock.release(self.cart_id, item['id'])
         self.refresh_table()
 
     def process_checkout(self, force_credit=False):
@@ -330,7 +321,6 @@ class PharmacySalesView(QWidget):
         user_id = user['id'] if user else 1
         
         total_amount = sum(item['price'] * item['qty'] for item in self.cart)
-        invoice = f"PHARM-{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
         customer_id = self.customer_combo.currentData()
         payment_method = "CREDIT" if force_credit else self.payment_combo.currentText()
@@ -342,54 +332,22 @@ class PharmacySalesView(QWidget):
         from src.core.blocking_task_manager import task_manager
         
         def do_checkout_heavy():
+            # One sale line per batch the FEFO allocator split each cart line into
+            lines = [checkout.CheckoutLine(item['id'], item['name'], qty, item['price'], barcode=item['barcode'],
+                                           batch=batch, expiry=expiry, unit_cost=item.get('cost', 0))
+                     for item in self.cart for batch, expiry, qty in item['batches']]
             try:
-                with db_manager.get_pharmacy_connection() as conn:
-                    cursor = conn.cursor()
-                    
-                    # 1. Check Loan Limit if CREDIT
-                    if payment_method == "CREDIT":
-                        cust = conn.execute("SELECT balance, loan_limit, loan_enabled FROM pharmacy_customers WHERE id=?", (customer_id,)).fetchone()
-                        if not cust: return {"success": False, "error": "Customer not found"}
-                        if not cust['loan_enabled']: return {"success": False, "error": "Credit sales are disabled for this customer."}
-                        
-                        limit = cust['loan_limit']
-                        if limit > 0:
-                            current_bal = cust['balance']
-                            if (current_bal + total_amount) > limit:
-                                return {"success": False, "limit_exceeded": True, "limit": limit, "balance": current_bal}
-
-                    # 2. Create Sale Header
-                    cursor.execute("""
-                        INSERT INTO pharmacy_sales (invoice_number, user_id, total_amount, customer_id, payment_type)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (invoice, user_id, total_amount, customer_id, payment_method))
-                    sale_id = cursor.lastrowid
-                    
-                    # 3. Process Items and Inventory
-                    for item in self.cart:
-                        cursor.execute("""
-                            INSERT INTO pharmacy_sale_items 
-                            (sale_id, product_id, product_name, batch_number, expiry_date, quantity, unit_price, total_price, cost_price_at_sale)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (sale_id, item['id'], item['name'], item.get('batch'), item.get('expiry'), 
-                              item['qty'], item['price'], item['price']*item['qty'], item.get('cost', 0)))
-                        
-                        cursor.execute("""
-                            UPDATE pharmacy_inventory 
-                            SET quantity = quantity - ? 
-                            WHERE product_id = ? AND batch_number = ?
-                        """, (item['qty'], item['id'], item.get('batch')))
-                    
-                    # 4. Handle Credit/Loan
-                    if payment_method == "CREDIT":
-                        cursor.execute("""
-                            INSERT INTO pharmacy_loans (customer_id, sale_id, total_amount, balance)
-                            VALUES (?, ?, ?, ?)
-                        """, (customer_id, sale_id, total_amount, total_amount))
-                        cursor.execute("UPDATE pharmacy_customers SET balance = balance + ? WHERE id = ?", (total_amount, customer_id))
-
-                    conn.commit()
-                    return {"success": True, "sale_id": sale_id}
+                # Invoice number is allocated from the pharmacy_invoice sequence inside the checkout transaction
+                sale = checkout.checkout(db_manager.get_pharmacy_connection(), checkout.PHARMACY, lines, None,
+                                         user_id, customer_id, payment_method, total_amount,
+                                         terminal=sequences.terminal_name())
+                return {"success": True, "sale_id": sale.sale_id, "invoice": sale.invoice_number}
+            except checkout.CreditLimitError as e:
+                if not e.enabled:
+                    return {"success": False, "error": str(e)}
+                return {"success": False, "limit_exceeded": True, "limit": e.limit, "balance": e.balance}
+            except checkout.InsufficientStockError as e:
+                return {"success": False, "error": str(e), "stock_changed": True}
             except Exception as e:
                 return {"success": False, "error": str(e)}
 
@@ -398,23 +356,45 @@ class PharmacySalesView(QWidget):
                 if result.get("limit_exceeded"):
                     QMessageBox.warning(self, "Limit Exceeded", 
                         f"Transaction denied. \nCustomer Loan Limit: {result['limit']:,.2f}\nCurrent Balance: {result['balance']:,.2f}\nNew Balance would be: {(result['balance']+total_amount):,.2f}")
+                elif result.get("stock_changed"):
+                    # Sold elsewhere since it was reserved: reload and re-allocate the cart
+                    QMessageBox.warning(self, "Stock Issue", result["error"])
+                    self.refresh_stock(lambda _: self.reallocate_cart())
                 else:
                     QMessageBox.critical(self, "Error", f"Transaction Failed: {result['error']}")
                 return
 
             # Success Path
-            sale_id = result["sale_id"]
+            pharmacy_stock.commit(self.cart_id)
+            sale_id, invoice = result["sale_id"], result["invoice"]
             self.print_pharmacy_sale_bill(sale_id, invoice, total_amount, payment_method)
-            self.load_last_bill_number()
+            self.bill_number_display.setText(invoice)
 
             QMessageBox.information(self, "Success", f"Pharmacy Sale Completed!\nInvoice: {invoice}")
             self.cart = []
             self.refresh_table()
+            self.refresh_stock()
             self.sale_completed.emit() 
             self.barcode_input.setFocus()
             
         task_manager.run_task(do_checkout_heavy, on_finished=on_finished)
 
+    def reallocate_cart(self):
+        """Re-reserves every line against freshly loaded stock, trimming lines that no longer fit."""
+        for item in list(self.cart):
+            alloc = pharmacy_stock.reserve(self.cart_id, item['id'], item['qty'])
+            if not alloc.ok:
+                fit = pharmacy_stock.available(item['id']) + sum(q for _, _, q in pharmacy_stock.reservation(self.cart_id, item['id']))
+                alloc = pharmacy_stock.reserve(self.cart_id, item['id'], fit) if fit > 0 else None
+                if alloc is None or not alloc.ok:
+                    pharmacy_stock.release(self.cart_id, item['id'])
+                    self.cart.remove(item)
+                    continue
+                self.apply_allocation(item, fit, alloc)
+            else:
+                self.apply_allocation(item, item['qty'], alloc)
+        self.refresh_table()
+
 
     def load_last_bill_number(self):
         """Load and display last pharmacy bill number for today"""
@@ -423,11 +403,9 @@ class PharmacySalesView(QWidget):
         def do_load():
             try:
                 with db_manager.get_pharmacy_connection() as conn:
-                    # Find the last bill from today
-                    last_bill = conn.execute(
-                        "SELECT invoice_number FROM pharmacy_sales WHERE date(created_at) = date('now') ORDER BY id DESC LIMIT 1"
-                    ).fetchone()
-                    return last_bill['invoice_number'] if last_bill else "no bill"
+                    # Last number issued today (local day), straight from the sequence row
+                    last_bill = sequences.last_issued(conn.cursor(), sequences.PHARMACY_INVOICE, sequences.terminal_name())
+                    return last_bill or "no bill"
             except:
                 return "Error"
 
@@ -462,12 +440,8 @@ class PharmacySalesView(QWidget):
                 )
                 
                 if confirm == QMessageBox.StandardButton.Yes:
-                    from src.utils.thermal_bill_printer import thermal_printer
-                    bill_text = thermal_printer.generate_sales_bill(sale_id, method == "CREDIT", is_pharmacy=True)
-                    if bill_text:
-                        thermal_printer.print_bill(bill_text)
-                    else:
-                        QMessageBox.warning(self, "Error", "Failed to generate bill.")
+                    self._print_jobs.add(print_spooler.submit_sale_bill(sale_id, method == "CREDIT", is_pharmacy=True,
+                                                                        label=invoice_num))
                         
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Reprint failed: {e}")
@@ -482,16 +456,16 @@ class PharmacySalesView(QWidget):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                from src.utils.thermal_bill_printer import thermal_printer
-                bill_text = thermal_printer.generate_sales_bill(sale_id, method == "CREDIT", is_pharmacy=True)
-                
-                if bill_text:
-                    thermal_printer.print_bill(bill_text)
-                else:
-                    QMessageBox.warning(self, "Print Error", "Failed to generate bill.")
-            except Exception as e:
-                QMessageBox.critical(self, "Print Error", f"Failed to print bill: {str(e)}")
+            # Rendered and sent by the spooler thread; failures come back through on_print_job_status
+            self._print_jobs.add(print_spooler.submit_sale_bill(sale_id, method == "CREDIT", is_pharmacy=True,
+                                                                label=invoice_num))
+
+    def on_print_job_status(self, job_id, status, message):
+        if job_id not in self._print_jobs or status not in (PRINT_DONE, PRINT_FAILED):
+            return
+        self._print_jobs.discard(job_id)
+        if status == PRINT_FAILED:
+            QMessageBox.warning(self, "Print Error", f"Failed to print bill: {message}")
 
     def generate_pharmacy_bill_pdf(self, sale_id, invoice_num, total, method):
         """Generate PDF bill for pharmacy sales"""
@@ -429,31 +429,34 @@ class PharmacySettingsView(QWidget):
     def run_backup(self):
         path = QFileDialog.getExistingDirectory(self, "Select Backup Folder")
         if path:
-            try:
-                # Backup pharmacy database
-                import shutil
-                from datetime import datetime
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                source = "faqiritech_pharmacy.db"
-                dest = os.path.join(path, f"pharmacy_backup_{timestamp}.db")
-                shutil.copy2(source, dest)
-                QMessageBox.information(self, "Success", f"Pharmacy backup created at:\n{dest}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Backup failed: {str(e)}")
+            from src.core.blocking_task_manager import task_manager
+
+            def on_finished(result):
+                success, msg = result
+                if success:
+                    QMessageBox.information(self, "Success", "Pharmacy backup created at:\n" + "\n".join(msg))
+                else:
+                    QMessageBox.critical(self, "Error", f"Backup failed: {msg}")
+
+            task_manager.run_task(BackupManager.create_backup, on_finished, None, path, ("pharmacy",))
 
     def run_restore(self):
-        file, _ = QFileDialog.getOpenFileName(self, "Select Backup File", "", "Database Files (*.db)")
+        file, _ = QFileDialog.getOpenFileName(self, "Select Backup File", "", "Database Backups (*.db.gz *.db)")
         if file:
             reply = QMessageBox.question(self, 'Confirm Restore', 
                                        'This will overwrite current pharmacy data. Continue?',
                                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
-                try:
-                    import shutil
-                    shutil.copy2(file, "faqiritech_pharmacy.db")
-                    QMessageBox.information(self, "Success", "Pharmacy database restored. Please restart the app.")
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", f"Restore failed: {str(e)}")
+                from src.core.blocking_task_manager import task_manager
+
+                def on_finished(result):
+                    success, msg = result
+                    if success:
+                        QMessageBox.information(self, "Success", "Pharmacy database restored. Please restart the app.")
+                    else:
+                        QMessageBox.critical(self, "Error", f"Restore failed: {msg}")
+
+                task_manager.run_task(BackupManager.restore_backup, on_finished, None, file, "pharmacy")
 
     def toggle_offline_mode(self, checked):
         local_config.set("offline_mode", checked)
@@ -3,17 +3,21 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QComboBox, QPushButton, QScrollArea, QGridLayout, QLineEdit, QCompleter, QMessageBox)
 from PyQt6.QtCore import Qt, QRectF, QPointF, QStringListModel, QTimer, QVariantAnimation, QThread, pyqtSignal
 
-from PyQt6.QtGui import QPainter, QColor, QPen, QBrush, QFont, QRadialGradient, QConicalGradient, QTextDocument, \
-    QTextCursor, QTextTable, QTextTableFormat, QPageSize, QPageLayout, QTextCharFormat, QTextLength
-from PyQt6.QtPrintSupport import QPrinter, QPrintDialog, QPrintPreviewDialog
+from PyQt6.QtGui import QPainter, QColor, QPen, QBrush, QFont, QRadialGradient, QConicalGradient
 from PyQt6.QtWidgets import QGroupBox
 from src.database.db_manager import db_manager
+from src.database.date_ranges import period_range
+from src.database import batch_loader, sales_summary
+from src.database.report_cache import report_cache
 from src.core.localization import lang_manager
 from datetime import datetime, timedelta
 import qtawesome as qta
 from src.ui.table_styles import style_table
 from src.ui.theme_manager import theme_manager
 from src.ui.button_styles import style_button
+from src.ui.export_dialog import export_menu
+from src.ui.report_print import print_report
+from src.utils import report_renderer
 
 class ReportsWorker(QThread):
     data_loaded = pyqtSignal(dict)
@@ -25,92 +29,85 @@ class ReportsWorker(QThread):
 
     def run(self):
         try:
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Calculate date range based on period
-                if self.period == "daily":
-                    start_date = datetime.now().strftime('%Y-%m-%d')
-                    date_filter = f"DATE(created_at, 'localtime') = '{start_date}'"
-                    period_label = "Today's"
-                elif self.period == "weekly":
-                    start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-                    date_filter = f"DATE(created_at, 'localtime') >= '{start_date}'"
-                    period_label = "This Week's"
-                else:  # monthly
-                    start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-                    date_filter = f"DATE(created_at, 'localtime') >= '{start_date}'"
-                    period_label = "This Month's"
-                
-                # Stats
-                cursor.execute(f"SELECT SUM(total_amount) FROM sales WHERE {date_filter}")
-                sales_val = cursor.fetchone()[0] or 0
-                
-                cursor.execute(f"SELECT COUNT(*) FROM sales WHERE {date_filter}")
-                orders_count = cursor.fetchone()[0] or 0
-                
-                cursor.execute(f"SELECT SUM(si.quantity) FROM sale_items si JOIN sales s ON si.sale_id = s.id WHERE {date_filter.replace('created_at', 's.created_at')}")
-                items_count = cursor.fetchone()[0] or 0
-                
-                cursor.execute("SELECT COUNT(*) FROM inventory i JOIN products p ON i.product_id = p.id WHERE i.quantity <= p.min_stock")
-                low_stock_count = cursor.fetchone()[0] or 0
-                
-                cursor.execute(f"SELECT p.name_en, SUM(si.quantity) as total_qty FROM sale_items si JOIN products p ON si.product_id = p.id JOIN sales s ON si.sale_id = s.id WHERE {date_filter.replace('created_at', 's.created_at')} GROUP BY p.name_en ORDER BY total_qty DESC LIMIT 1")
-                top_product = cursor.fetchone()
-                
-                # Mode
-                cursor.execute("SELECT mode FROM system_settings WHERE id = 1")
-                mode_row = cursor.fetchone()
-                is_online = (dict(mode_row)['mode'] == 'ONLINE') if mode_row else False
-
-                # Tables Data (Small samples for dashboard)
-                cursor.execute("SELECT p.name_en, i.quantity, p.min_stock FROM inventory i JOIN products p ON i.product_id = p.id WHERE i.quantity <= p.min_stock LIMIT 5")
-                stock_data = [list(r) for r in cursor.fetchall()]
-
-                cursor.execute(f"SELECT s.invoice_number, s.created_at, IFNULL(c.name_en, 'Walk-in'), (SELECT COUNT(*) FROM sale_items WHERE sale_id = s.id), s.total_amount, s.payment_type FROM sales s LEFT JOIN customers c ON s.customer_id = c.id WHERE {date_filter.replace('created_at', 's.created_at')} ORDER BY s.created_at DESC LIMIT 5")
-                trans_data = [list(r) for r in cursor.fetchall()]
-
-                cursor.execute(f"SELECT si.product_name, SUM(si.quantity), 0, SUM(si.total_price) FROM sale_items si JOIN sales s ON si.sale_id = s.id WHERE {date_filter.replace('created_at', 's.created_at')} GROUP BY si.product_id ORDER BY SUM(si.quantity) DESC LIMIT 5")
-                sold_summary_data = [list(r) for r in cursor.fetchall()]
-
-                # P/L
-                cursor.execute(f"SELECT SUM(si.total_price), SUM(si.quantity * p.cost_price) FROM sale_items si JOIN products p ON si.product_id = p.id JOIN sales s ON si.sale_id = s.id WHERE {date_filter.replace('created_at', 's.created_at')}")
-                res = cursor.fetchone()
-                raw_revenue = res[0] or 0
-                raw_cost = res[1] or 0
-
-                returns_filter = date_filter.replace("created_at", "sr.created_at")
-                cursor.execute(f"SELECT SUM(sr.refund_amount) FROM sales_returns sr JOIN sales s ON sr.sale_id = s.id WHERE {returns_filter}")
-                returned_revenue = cursor.fetchone()[0] or 0
-
-                cursor.execute(f"SELECT SUM(ri.quantity * p.cost_price) FROM return_items ri JOIN products p ON ri.product_id = p.id JOIN sales_returns sr ON ri.return_id = sr.id JOIN sales s ON sr.sale_id = s.id WHERE {returns_filter}")
-                returned_cost = cursor.fetchone()[0] or 0
-
-                # Returns Table
-                cursor.execute(f"SELECT sr.created_at, s.invoice_number, p.name_en, ri.quantity, ri.refund_price FROM sales_returns sr JOIN sales s ON sr.sale_id = s.id JOIN return_items ri ON ri.return_id = sr.id JOIN products p ON ri.product_id = p.id WHERE {returns_filter} ORDER BY sr.created_at DESC LIMIT 5")
-                returns_table_data = [list(r) for r in cursor.fetchall()]
-
-                result = {
-                    "sales_val": sales_val,
-                    "orders_count": orders_count,
-                    "items_count": items_count,
-                    "low_stock_count": low_stock_count,
-                    "top_product": top_product,
-                    "is_online": is_online,
-                    "stock_data": stock_data,
-                    "trans_data": trans_data,
-                    "sold_summary_data": sold_summary_data,
-                    "raw_revenue": raw_revenue,
-                    "raw_cost": raw_cost,
-                    "returned_revenue": returned_revenue,
-                    "returned_cost": returned_cost,
-                    "returns_table_data": returns_table_data,
-                    "period_label": period_label,
-                    "date_filter": date_filter
-                }
-                self.data_loaded.emit(result)
+            # Calculate date range based on period
+            date_range = period_range(self.period)
+            # Served from the report cache unless the store DB changed since the last refresh
+            result = report_cache.get_or_compute(db_manager.store_db, "store_reports", (self.period, date_range),
+                                                 lambda: self.compute(date_range))
+            self.data_loaded.emit(result)
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            db_manager.pool.release_thread()  # this thread ends here
+
+    def compute(self, date_range):
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+
+            if self.period == "daily":
+                period_label = "Today's"
+            elif self.period == "weekly":
+                period_label = "This Week's"
+            else:  # monthly
+                period_label = "This Month's"
+            returns_filter, r_params = date_range.where("sr.created_at")
+            day_filter, day_params = date_range.where_date("d.day")
+
+            # Stats (from the daily summary rows maintained at checkout/return time)
+            totals = sales_summary.period_totals(cursor, sales_summary.STORE, date_range)
+            sales_val = totals["revenue"]
+            orders_count = int(totals["sales_count"])
+            items_count = totals["items_sold"]
+            
+            cursor.execute("SELECT COUNT(*) FROM inventory i JOIN products p ON i.product_id = p.id WHERE i.quantity <= p.min_stock")
+            low_stock_count = cursor.fetchone()[0] or 0
+            
+            cursor.execute(f"SELECT p.name_en, SUM(d.quantity) as total_qty FROM daily_product_sales d JOIN products p ON d.product_id = p.id WHERE {day_filter} GROUP BY p.name_en ORDER BY total_qty DESC LIMIT 1", day_params)
+            top_product = cursor.fetchone()
+            
+            # Mode
+            cursor.execute("SELECT mode FROM system_settings WHERE id = 1")
+            mode_row = cursor.fetchone()
+            is_online = (dict(mode_row)['mode'] == 'ONLINE') if mode_row else False
+
+            # Tables Data (Small samples for dashboard)
+            cursor.execute("SELECT p.name_en, i.quantity, p.min_stock FROM inventory i JOIN products p ON i.product_id = p.id WHERE i.quantity <= p.min_stock LIMIT 5")
+            stock_data = [list(r) for r in cursor.fetchall()]
+
+            trans_data = batch_loader.recent_store_sales(cursor, date_range, limit=5)
+
+            cursor.execute(f"SELECT IFNULL(p.name_en, d.product_id), SUM(d.quantity), 0, SUM(d.revenue) FROM daily_product_sales d LEFT JOIN products p ON d.product_id = p.id WHERE {day_filter} GROUP BY d.product_id HAVING SUM(d.quantity) > 0 ORDER BY SUM(d.quantity) DESC LIMIT 5", day_params)
+            sold_summary_data = [list(r) for r in cursor.fetchall()]
+
+            # P/L
+            raw_revenue = totals["line_revenue"]
+            raw_cost = totals["cogs"]
+            returned_revenue = totals["returns_amount"]
+            returned_cost = totals["returns_cogs"]
+
+            # Returns Table
+            cursor.execute(f"SELECT sr.created_at, s.invoice_number, p.name_en, ri.quantity, ri.refund_price FROM sales_returns sr JOIN sales s ON sr.sale_id = s.id JOIN return_items ri ON ri.return_id = sr.id JOIN products p ON ri.product_id = p.id WHERE {returns_filter} ORDER BY sr.created_at DESC LIMIT 5", r_params)
+            returns_table_data = [list(r) for r in cursor.fetchall()]
+
+            result = {
+                "sales_val": sales_val,
+                "orders_count": orders_count,
+                "items_count": items_count,
+                "low_stock_count": low_stock_count,
+                "top_product": top_product,
+                "is_online": is_online,
+                "stock_data": stock_data,
+                "trans_data": trans_data,
+                "sold_summary_data": sold_summary_data,
+                "raw_revenue": raw_revenue,
+                "raw_cost": raw_cost,
+                "returned_revenue": returned_revenue,
+                "returned_cost": returned_cost,
+                "returns_table_data": returns_table_data,
+                "period_label": period_label,
+                "date_range": date_range
+            }
+            return result
 
 class StatCard(QFrame):
     def __init__(self, title, value, subtext, icon_name, icon_color):
@@ -286,6 +283,7 @@ class ReportsView(QWidget):
         self.last_clear_date = datetime.now().date()
         self.worker = None
         self.is_loading = False
+        self.shown_data = None  # last result painted; a cache hit returns the same object
         self.init_ui()
         self.load_dashboard_data()
         
@@ -320,6 +318,7 @@ class ReportsView(QWidget):
             self.sold_summary_table.setRowCount(0)
             self.pl_table.setRowCount(0)
             self.returns_table.setRowCount(0)
+            self.shown_data = None
             # Reload fresh data for new day
             self.load_dashboard_data()
     
@@ -363,6 +362,14 @@ class ReportsView(QWidget):
         style_button(self.full_report_btn, variant="success", size="normal")
         self.full_report_btn.clicked.connect(self.print_full_report)
         self.search_card_layout.addWidget(self.full_report_btn)
+
+        # Export (CSV / XLSX, streamed in the background) for the selected period
+        self.export_btn = QPushButton(lang_manager.get("export"))
+        style_button(self.export_btn, variant="info", size="normal")
+        self.export_btn.setMenu(export_menu(self, ["sales", "sale_items", "returns", "loans", "customer_payments",
+                                                   "expenses", "inventory", "customers"],
+                                            lambda: period_range(self.current_period)))
+        self.search_card_layout.addWidget(self.export_btn)
         
         main_vbox.addWidget(self.search_card)
         
@@ -428,7 +435,7 @@ class ReportsView(QWidget):
         stock_header.addStretch()
         self.stock_print_btn = QPushButton("🖨️ Print Report")
         style_button(self.stock_print_btn, variant="info", size="small")
-        self.stock_print_btn.clicked.connect(lambda: self.print_table_report("Low Stock Alert", self.stock_table))
+        self.stock_print_btn.clicked.connect(lambda: self.print_table_report("stock", self.stock_print_btn))
         stock_header.addWidget(self.stock_print_btn)
 
         stock_layout.addLayout(stock_header)
@@ -452,7 +459,7 @@ class ReportsView(QWidget):
         trans_header.addStretch()
         self.trans_print_btn = QPushButton("🖨️ Print Report")
         style_button(self.trans_print_btn, variant="info", size="small")
-        self.trans_print_btn.clicked.connect(lambda: self.print_table_report("Invoice Transactions", self.trans_table))
+        self.trans_print_btn.clicked.connect(lambda: self.print_table_report("trans", self.trans_print_btn))
         trans_header.addWidget(self.trans_print_btn)
 
         trans_layout.addLayout(trans_header)
@@ -483,7 +490,7 @@ class ReportsView(QWidget):
         sold_header.addStretch()
         self.sold_print_btn = QPushButton("🖨️ Print Summary")
         style_button(self.sold_print_btn, variant="info", size="small")
-        self.sold_print_btn.clicked.connect(lambda: self.print_table_report("Sold Items Summary", self.sold_summary_table))
+        self.sold_print_btn.clicked.connect(lambda: self.print_table_report("sold", self.sold_print_btn))
         sold_header.addWidget(self.sold_print_btn)
 
         sc_layout.addLayout(sold_header)
@@ -508,7 +515,7 @@ class ReportsView(QWidget):
         pl_header.addStretch()
         self.pl_print_btn = QPushButton("🖨️ Print Report")
         style_button(self.pl_print_btn, variant="info", size="small")
-        self.pl_print_btn.clicked.connect(lambda: self.print_table_report("Profit & Loss Report", self.pl_table))
+        self.pl_print_btn.clicked.connect(lambda: self.print_table_report("pl", self.pl_print_btn))
         pl_header.addWidget(self.pl_print_btn)
 
         pl_card_layout.addLayout(pl_header)
@@ -609,6 +616,9 @@ class ReportsView(QWidget):
         self.worker.start()
 
     def _on_dashboard_data_loaded(self, d):
+        if d is self.shown_data:
+            return  # unchanged since the last refresh, nothing to repaint
+        self.shown_data = d
         # Update Cards
         self.card_sales.update_data(lang_manager.localize_digits(f"{d['sales_val']:,.0f} AFN"), f"{d['period_label']} Revenue")
         self.card_orders.update_data(lang_manager.localize_digits(f"{d['orders_count']} orders"), 
@@ -625,7 +635,7 @@ class ReportsView(QWidget):
         self.pie_chart.update_data()
         
         # Update Tables
-        self._last_date_filter = d['date_filter']
+        self._last_date_range = d['date_range']
         
         # Stock Table
         self.stock_table.setRowCount(0)
@@ -658,16 +668,7 @@ class ReportsView(QWidget):
             self.sold_summary_table.setItem(i, 3, QTableWidgetItem(lang_manager.localize_digits(f"{row[3]:.2f}")))
 
         # P/L
-        revenue = d['raw_revenue'] - d['returned_revenue']
-        cost = d['raw_cost'] - d['returned_cost']
-        profit = revenue - cost
-        metrics = [
-            ("Total Sales (Net)", revenue),
-            ("Total Cost (Net)", cost),
-            ("Total Returns", d['returned_revenue']),
-            ("Gross Profit", profit),
-            ("Net Margin (%)", (profit/revenue*100) if revenue > 0 else 0)
-        ]
+        metrics = self.pl_metrics(d['raw_revenue'], d['raw_cost'], d['returned_revenue'], d['returned_cost'])
         self.pl_table.setRowCount(0)
         for i, (label, val) in enumerate(metrics):
             self.pl_table.insertRow(i)
@@ -688,209 +689,121 @@ class ReportsView(QWidget):
     def table_item(self, table, row, col, text):
         table.setItem(row, col, QTableWidgetItem(str(text)))
 
-    def print_table_report(self, title, table):
-        """Print a table report with preview"""
-        if table.rowCount() == 0:
-            QMessageBox.information(self, "No Data", "No data available to print.")
-            return
+    @staticmethod
+    def pl_metrics(raw_revenue, raw_cost, returned_revenue, returned_cost):
+        """[(label, value)] rows of the P/L table."""
+        revenue = raw_revenue - returned_revenue
+        cost = raw_cost - returned_cost
+        profit = revenue - cost
+        return [
+            ("Total Sales (Net)", revenue),
+            ("Total Cost (Net)", cost),
+            ("Total Returns", returned_revenue),
+            ("Gross Profit", profit),
+            ("Net Margin (%)", (profit/revenue*100) if revenue > 0 else 0)
+        ]
+
+    # -- Printing: PDFs are built from queries on a worker thread (src/ui/report_print.py),
+    #    with every row of the period, not just what the dashboard tables show
+
+    REPORT_SECTIONS = {
+        "stock": "Low Stock Alert",
+        "trans": "Invoice Transactions",
+        "sold": "Sold Items Summary",
+        "pl": "Profit & Loss Report",
+        "returns": "Returns",
+    }
 
-        # Create printer
-        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-        printer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
-        printer.setPageOrientation(QPageLayout.Orientation.Portrait)
-
-        # Create print preview dialog
-        preview = QPrintPreviewDialog(printer, self)
-        preview.setWindowTitle(f"Print Preview - {title}")
-        preview.setMinimumSize(800, 600)
-
-        # Connect print function
-        preview.paintRequested.connect(lambda p: self.render_table_document(p, title, table))
-
-        # Show preview
-        preview.exec()
-
-    def render_table_document(self, printer, title, table):
-        """Render table as printable document"""
-        document = QTextDocument()
-        cursor = QTextCursor(document)
-
-        # Title
-        title_format = QTextCharFormat()
-        title_format.setFontPointSize(16)
-        title_format.setFontWeight(QFont.Weight.Bold)
-        cursor.insertText(f"{title}\n", title_format)
-        cursor.insertText("\n")
-
-        # Date and period info
-        info_format = QTextCharFormat()
-        info_format.setFontPointSize(10)
-        period_text = self.period_combo.currentText()
-        cursor.insertText(f"Report Period: {period_text}\n", info_format)
-        cursor.insertText(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n", info_format)
-        cursor.insertText("\n")
-
-        # Create table
-        rows = table.rowCount()
-        cols = table.columnCount()
-
-        if rows > 0 and cols > 0:
-            # Create table format
-            table_format = QTextTableFormat()
-            table_format.setBorderStyle(QTextTableFormat.BorderStyle.BorderStyle_Solid)
-            table_format.setCellPadding(5)
-            table_format.setCellSpacing(0)
-            table_format.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
-
-            # Insert table
-            text_table = cursor.insertTable(rows + 1, cols, table_format)  # +1 for header
-
-            # Header row
-            header_format = QTextCharFormat()
-            header_format.setFontWeight(QFont.Weight.Bold)
-            header_format.setBackground(QColor("#f0f0f0"))
-
-            for col in range(cols):
-                header_item = table.horizontalHeaderItem(col)
-                if header_item:
-                    cell_cursor = text_table.cellAt(0, col).firstCursorPosition()
-                    cell_cursor.insertText(header_item.text(), header_format)
-
-            # Data rows
-            for row in range(rows):
-                for col in range(cols):
-                    item = table.item(row, col)
-                    if item:
-                        cell_cursor = text_table.cellAt(row + 1, col).firstCursorPosition()
-                        cell_cursor.insertText(item.text())
-
-        # Footer with summary
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertText("\n\n")
-
-        footer_format = QTextCharFormat()
-        footer_format.setFontPointSize(10)
-        footer_format.setFontItalic(True)
-
-        if "Low Stock" in title and table == self.stock_table:
-            low_stock_count = table.rowCount()
-            cursor.insertText(f"Total Low Stock Items: {low_stock_count}\n", footer_format)
-
-        elif "Invoice Transactions" in title and table == self.trans_table:
-            total_sales = 0
-            for row in range(table.rowCount()):
-                amount_item = table.item(row, 4)  # Amount column
-                if amount_item:
-                    try:
-                        amount = float(amount_item.text().replace(',', ''))
-                        total_sales += amount
-                    except:
-                        pass
-            cursor.insertText(".2f", footer_format)
-
-        elif "Sold Items Summary" in title and table == self.sold_summary_table:
-            total_qty = 0
-            total_sales = 0
-            for row in range(table.rowCount()):
-                qty_item = table.item(row, 1)
-                sales_item = table.item(row, 3)
-                if qty_item:
-                    try:
-                        total_qty += int(qty_item.text())
-                    except:
-                        pass
-                if sales_item:
-                    try:
-                        total_sales += float(sales_item.text().replace(',', ''))
-                    except:
-                        pass
-            cursor.insertText(".2f", footer_format)
-
-        # Print the document
-        document.print(printer)
+    def print_table_report(self, section, button=None):
+        """Print one dashboard table as a PDF"""
+        self.print_sections(self.REPORT_SECTIONS[section], [section], "portrait", button)
 
     def print_full_report(self):
         """Print a comprehensive full report with all tables"""
-        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-        printer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
-        printer.setPageOrientation(QPageLayout.Orientation.Landscape)
-
-        preview = QPrintPreviewDialog(printer, self)
-        preview.setWindowTitle("Print Preview - Complete Reports Summary")
-        preview.setMinimumSize(1000, 700)
-
-        preview.paintRequested.connect(self.render_full_report)
-        preview.exec()
-
-    def render_full_report(self, printer):
-        """Render complete report with all sections"""
-        document = QTextDocument()
-        cursor = QTextCursor(document)
-
-        # Main title
-        title_format = QTextCharFormat()
-        title_format.setFontPointSize(18)
-        title_format.setFontWeight(QFont.Weight.Bold)
-        cursor.insertText("Complete Business Reports Summary\n", title_format)
-        cursor.insertText("\n")
-
-        # Date info
-        info_format = QTextCharFormat()
-        info_format.setFontPointSize(10)
-        cursor.insertText(f"Report Period: {self.period_combo.currentText()}\n", info_format)
-        cursor.insertText(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n", info_format)
-        cursor.insertText("\n")
-
-        # Add each section
-        sections = [
-            ("Low Stock Alert", self.stock_table),
-            ("Invoice Transactions", self.trans_table),
-            ("Sold Items Breakdown", self.sold_summary_table),
-            ("Profit & Loss Overview", self.pl_table)
-        ]
+        self.print_sections("Complete Business Reports Summary", ["stock", "trans", "sold", "pl"], "landscape",
+                            self.full_report_btn)
+
+    def print_sections(self, title, keys, template, button=None):
+        date_range = period_range(self.current_period)
+        info = [f"Report Period: {self.period_combo.currentText()}",
+                f"Date: {date_range.start_date} - {date_range.end_date - timedelta(days=1)}",
+                f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
 
-        for section_title, table in sections:
-            if table.rowCount() > 0:
-                # Section header
-                section_format = QTextCharFormat()
-                section_format.setFontPointSize(14)
-                section_format.setFontWeight(QFont.Weight.Bold)
-                cursor.insertText(f"{section_title}\n", section_format)
-
-                # Create table for this section
-                rows = table.rowCount()
-                cols = table.columnCount()
-
-                table_format = QTextTableFormat()
-                table_format.setBorderStyle(QTextTableFormat.BorderStyle.BorderStyle_Solid)
-                table_format.setCellPadding(3)
-                table_format.setCellSpacing(0)
-                table_format.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
-
-                text_table = cursor.insertTable(rows + 1, cols, table_format)
-
-                # Headers
-                header_format = QTextCharFormat()
-                header_format.setFontWeight(QFont.Weight.Bold)
-                header_format.setBackground(QColor("#f0f0f0"))
-
-                for col in range(cols):
-                    header_item = table.horizontalHeaderItem(col)
-                    if header_item:
-                        cell_cursor = text_table.cellAt(0, col).firstCursorPosition()
-                        cell_cursor.insertText(header_item.text(), header_format)
-
-                # Data
-                for row in range(rows):
-                    for col in range(cols):
-                        item = table.item(row, col)
-                        if item:
-                            cell_cursor = text_table.cellAt(row + 1, col).firstCursorPosition()
-                            cell_cursor.insertText(item.text())
-
-                cursor.insertText("\n\n")
-
-        document.print(printer)
+        def render(path):
+            with db_manager.get_connection() as conn:
+                sections = [self.report_section(conn, key, date_range) for key in keys]
+                pages, rows = report_renderer.render_pdf(path, title, info, sections, template)
+            print(f"[INFO] Rendered {title}: {rows} rows, {pages} pages")
+
+        print_report(self, db_manager.store_db, "store_report", (tuple(keys), date_range), render, button)
+
+    @classmethod
+    def report_section(cls, conn, key, date_range):
+        """Section `key` of the printed report; row generators read from `conn` while the PDF is drawn."""
+        title = cls.REPORT_SECTIONS[key]
+        s_filter, s_params = date_range.where("s.created_at")
+
+        if key == "stock":
+            sql = """SELECT p.name_en, i.quantity, p.min_stock FROM inventory i JOIN products p ON i.product_id = p.id
+                     WHERE i.quantity <= p.min_stock ORDER BY i.quantity ASC, p.name_en"""
+            count = conn.execute(f"SELECT COUNT(*) FROM ({sql})").fetchone()[0]
+            rows = ([r[0], r[1], r[2], "Low"] for r in conn.execute(sql))
+            return report_renderer.Section(title, ["Product", "Current", "Min", "Status"], rows,
+                                           widths=[4, 1, 1, 1], footer=[f"Total Low Stock Items: {count}"])
+
+        if key == "trans":
+            count, amount = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(s.total_amount), 0) FROM sales s "
+                                         f"WHERE {s_filter}", s_params).fetchone()
+
+            def rows():
+                cursor = conn.execute(f"""
+                    SELECT s.id, s.invoice_number, s.created_at, IFNULL(c.name_en, 'Walk-in'), s.total_amount,
+                           s.payment_type
+                    FROM sales s LEFT JOIN customers c ON s.customer_id = c.id
+                    WHERE {s_filter} ORDER BY s.created_at DESC, s.id DESC""", s_params)
+                while True:
+                    chunk = cursor.fetchmany(batch_loader.CHUNK)
+                    if not chunk:
+                        return
+                    item_counts = batch_loader.sale_item_counts(conn, [r[0] for r in chunk], column=None)
+                    for r in chunk:
+                        yield [r[1], r[2], r[3], item_counts.get(r[0], 0), f"{r[4]:,.2f}", "0.00", r[5]]
+
+            return report_renderer.Section(
+                title, ["Inv #", "Time", "Customer", "Sold Items", "Amount", "Discount", "Method"], rows(),
+                widths=[2, 2.2, 3, 1, 1.5, 1, 1.2],
+                footer=[f"Total Transactions: {count}", f"Total Sales: {amount:,.2f} AFN"])
+
+        if key == "sold":
+            day_filter, day_params = date_range.where_date("d.day")
+            sql = f"""SELECT IFNULL(p.name_en, d.product_id), SUM(d.quantity), 0, SUM(d.revenue)
+                      FROM daily_product_sales d LEFT JOIN products p ON d.product_id = p.id
+                      WHERE {day_filter} GROUP BY d.product_id HAVING SUM(d.quantity) > 0
+                      ORDER BY SUM(d.quantity) DESC"""
+            qty, sales = conn.execute(f"SELECT COALESCE(SUM(q), 0), COALESCE(SUM(v), 0) FROM "
+                                      f"(SELECT SUM(d.quantity) AS q, SUM(d.revenue) AS v FROM daily_product_sales d "
+                                      f"WHERE {day_filter} GROUP BY d.product_id HAVING SUM(d.quantity) > 0)",
+                                      day_params).fetchone()
+            rows = ([r[0], r[1], f"{r[2]:.2f}", f"{r[3]:,.2f}"] for r in conn.execute(sql, day_params))
+            return report_renderer.Section(title, ["Product", "Qty Sold", "Total Discount", "Total Sale"], rows,
+                                           widths=[4, 1, 1.2, 1.5],
+                                           footer=[f"Total Quantity: {qty}", f"Total Sales: {sales:,.2f} AFN"])
+
+        if key == "pl":
+            totals = sales_summary.period_totals(conn, sales_summary.STORE, date_range)
+            metrics = cls.pl_metrics(totals["line_revenue"], totals["cogs"], totals["returns_amount"],
+                                     totals["returns_cogs"])
+            rows = [[label, f"{val:,.2f}{'%' if 'Margin' in label else ''}"] for label, val in metrics]
+            return report_renderer.Section(title, ["Metric", "Value (AFN)"], rows, widths=[3, 2])
+
+        r_filter, r_params = date_range.where("sr.created_at")
+        sql = f"""SELECT sr.created_at, s.invoice_number, p.name_en, ri.quantity, ri.refund_price
+                  FROM sales_returns sr JOIN sales s ON sr.sale_id = s.id
+                  JOIN return_items ri ON ri.return_id = sr.id JOIN products p ON ri.product_id = p.id
+                  WHERE {r_filter} ORDER BY sr.created_at DESC"""
+        rows = ([r[0], r[1], r[2], r[3], f"{r[4]:,.2f}"] for r in conn.execute(sql, r_params))
+        return report_renderer.Section(title, ["Date", "Invoice", "Product", "Qty", "Refund"], rows,
+                                       widths=[2.2, 2, 4, 1, 1.5])
 
     def show_invoice_details(self, item):
         """Show popup with sold products for specific invoice"""
@@ -5,6 +5,7 @@ from PyQt6.QtCore import Qt
 import qtawesome as qta
 from src.core.localization import lang_manager
 from src.database.db_manager import db_manager
+from src.database import costing, customer_ledger, sales_summary
 from src.core.auth import Auth
 from src.ui.table_styles import style_table
 from src.ui.button_styles import style_button
@@ -183,20 +184,25 @@ class ReturnsView(QWidget):
                         """, (self.current_sale['id'], self.current_user['id'], ret_reason, total_refund))
                         return_id = cursor.lastrowid
                         
-                        # 2. Create return item
-                        cursor.execute("""
-                            INSERT INTO return_items (return_id, product_id, quantity, refund_price)
-                            VALUES (?, ?, ?, ?)
-                        """, (return_id, item['product_id'], ret_qty, total_refund))
-                        
-                        # 3. Update Inventory
+                        # 2. Back into stock, into the cost layers the units were sold from
+                        unit_cost = costing.restock_return(cursor, item['id'], ret_qty)
                         cursor.execute("UPDATE inventory SET quantity = quantity + ? WHERE product_id = ?", 
                                      (ret_qty, item['product_id']))
+
+                        # 3. Create return item
+                        cursor.execute("""
+                            INSERT INTO return_items (return_id, product_id, quantity, refund_price, sale_item_id, unit_cost)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        """, (return_id, item['product_id'], ret_qty, total_refund, item['id'], unit_cost))
                         
-                        # 4. If Credit sale, update customer balance
-                        if self.current_sale['payment_type'] == 'CREDIT':
-                            cursor.execute("UPDATE customers SET balance = MAX(0, balance - ?) WHERE id = ?",
-                                         (total_refund, self.current_sale['cust_id']))
+                        # 4. If Credit sale, refund to the customer's account
+                        if self.current_sale['payment_type'] == 'CREDIT' and self.current_sale['cust_id']:
+                            customer_ledger.post(cursor, customer_ledger.STORE, self.current_sale['cust_id'],
+                                                 customer_ledger.RETURN, -total_refund, return_id, ret_reason)
+
+                        refund_type = 'ACCOUNT' if self.current_sale['payment_type'] == 'CREDIT' else 'CASH'
+                        sales_summary.record_return(cursor, sales_summary.STORE, total_refund,
+                                                    [(item['product_id'], ret_qty, total_refund, unit_cost)], refund_type)
                         
                         # 5. Audit Log
                         cursor.execute("INSERT INTO audit_logs (user_id, action, table_name, record_id, details) VALUES (?, ?, ?, ?, ?)",
@@ -1,17 +1,20 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, 
-                             QPushButton, QLabel, QFrame, QTableWidget, QTableWidgetItem, 
+                             QPushButton, QLabel, QFrame, QTableView, 
                              QHeaderView, QAbstractItemView, QMessageBox, QDialog, QInputDialog, QCompleter, QTextEdit, QComboBox, QFormLayout)
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QStringListModel
 from PyQt6.QtGui import QImage, QPixmap, QFont
-from datetime import datetime
 import qtawesome as qta
 # import cv2 # Camera feature placeholder
 import numpy as np
 import os
 import time
-import uuid
 from src.core.localization import lang_manager
 from src.database.db_manager import db_manager
+from src.core.product_catalog import product_catalog
+from src.core.product_search import product_search
+from src.ui.cart_model import CartTableModel, RemoveButtonDelegate, COL_NAME, COL_ACTION
+from src.database import checkout, sequences
+from src.utils.print_spooler import print_spooler, DONE as PRINT_DONE, FAILED as PRINT_FAILED
 from src.core.auth import Auth
 from src.ui.button_styles import style_button
 from src.ui.table_styles import style_table
@@ -91,22 +94,34 @@ class CreditKYCDialog(QDialog):
 class SalesView(QWidget):
     def __init__(self):
         super().__init__()
-        self.cart = []
+        self.cart_model = CartTableModel(self)
+        self._print_jobs = set()  # spooler jobs submitted from this view
+        print_spooler.job_status.connect(self.on_print_job_status)
         self.selected_customer_id = 1
-        self.barcode_cache = {}
         self.last_scan_time = 0
         self.current_user = Auth.get_current_user()
         self.completion_map = {}
+        self._last_completion_query = ""
         
         # State for Price Check Hold
         self.is_price_check_mode = False
         self.held_cart_data = None
         
-        self.load_barcode_cache()
+        self.refresh_catalog()
         self.init_ui()
         self.load_customers()
         QTimer.singleShot(100, self.search_input.setFocus)
 
+    @property
+    def cart(self):
+        """Cart lines (dicts with id/barcode/name/price/qty/max_qty), owned by the table model."""
+        return self.cart_model.items
+
+    @cart.setter
+    def cart(self, items):
+        self.cart_model.set_items(list(items))
+        self.update_totals()
+
     def init_ui(self):
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(10, 10, 10, 10)
@@ -130,12 +145,18 @@ class SalesView(QWidget):
         """)
         
         # Live Suggestions
-        self.completer = QCompleter()
-        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        # Ranked results come from the search index, so the completer shows the model unfiltered.
+        self.completer_model = QStringListModel()
+        self.completer = QCompleter(self.completer_model)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
         self.completer.activated.connect(self.handle_completer_activation)
         self.search_input.setCompleter(self.completer)
-        self.search_input.textChanged.connect(self.update_completer)
+        # Debounce: keystrokes (and scanner bursts) within 150ms collapse into one query
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(lambda: self.update_completer(self.search_input.text()))
+        self.search_input.textChanged.connect(lambda _: self.search_timer.start())
         self.search_input.returnPressed.connect(self.handle_barcode_scan)
         
         search_layout.addWidget(QLabel("🔍"))
@@ -175,14 +196,19 @@ class SalesView(QWidget):
         main_layout.addWidget(bill_section)
         
         # 2. Table (Point: "has action/clear button where a specific product can be removed")
-        self.cart_table = QTableWidget(0, 8)
-        self.cart_table.setHorizontalHeaderLabels([
-            "ID", "Barcode", "Product Name", "Price", "Qty", "Stock", "Total", "Action"
-        ])
+        self.cart_table = QTableView()
+        self.cart_table.setModel(self.cart_model)
         style_table(self.cart_table, variant="premium")
-        self.cart_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
-        self.cart_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch) # Name breathes
-        self.cart_table.cellChanged.connect(self.handle_qty_edit)
+        # Fixed-width columns: ResizeToContents would re-measure every row on each scan
+        self.cart_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.cart_table.horizontalHeader().setSectionResizeMode(COL_NAME, QHeaderView.ResizeMode.Stretch) # Name breathes
+        self.remove_delegate = RemoveButtonDelegate(self.cart_table)
+        self.remove_delegate.remove_clicked.connect(self.remove_cart_item)
+        self.cart_table.setItemDelegateForColumn(COL_ACTION, self.remove_delegate)
+        self.cart_model.qty_rejected.connect(lambda title, msg: QMessageBox.warning(self, title, msg))
+        self.cart_model.dataChanged.connect(self.update_totals)
+        self.cart_model.rowsInserted.connect(self.update_totals)
+        self.cart_model.rowsRemoved.connect(self.update_totals)
         main_layout.addWidget(self.cart_table)
 
         # Price Check Stats Card (Hidden by default)
@@ -319,19 +345,17 @@ class SalesView(QWidget):
         self.search_input.setPlaceholderText(lang_manager.get("barcode") + "...")
         self.search_input.setStyleSheet("font-size: 16px; border: none; padding: 0 10px;")
 
-    def load_barcode_cache(self):
+    def refresh_catalog(self, on_done=None):
+        """Pulls product/stock changes into the shared catalog (full load only on first use)."""
         from src.core.blocking_task_manager import task_manager
-        
-        def fetch_products():
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT p.*, i.quantity as stock_qty FROM products p LEFT JOIN inventory i ON p.id = i.product_id WHERE p.is_active = 1")
-                return {row['barcode']: dict(row) for row in cursor.fetchall()}
 
-        def on_loaded(data):
-            self.barcode_cache = data
-            
-        task_manager.run_task(fetch_products, on_finished=on_loaded)
+        def on_finished(changed):
+            if changed:
+                self.cart_model.refresh_stock()
+            if on_done:
+                on_done(changed)
+
+        task_manager.run_task(product_catalog.refresh, on_finished=on_finished)
 
     def load_customers(self):
         from src.core.blocking_task_manager import task_manager
@@ -358,39 +382,49 @@ class SalesView(QWidget):
 
     def handle_barcode_scan(self):
         barcode = self.search_input.text().strip()
-        if not barcode: return
-        
-        if barcode in self.barcode_cache:
-            product = self.barcode_cache[barcode]
-            
-            if self.is_price_check_mode:
-                # We can use the cache here too, or do a targeted fetch
-                name = product['name_en'] or product.get('name_fa', '')
-                price = product['sale_price']
-                stock = product.get('stock_qty', 0)
-                
-                self.product_name_lbl.setText(name)
-                self.price_lbl.setText(f"{price:.2f} AFN")
-                self.quantity_lbl.setText(f"In Stock: {int(stock)}")
-                self.display_card.setStyleSheet("background-color: #e6f7ff; border: 2px solid #91d5ff; border-radius: 8px; padding: 15px;")
-                self.search_input.clear()
-                return
-
-            self.add_to_cart(product, product.get('stock_qty') or 0)
-            print('\a', end='', flush=True)
+        self.search_timer.stop()
         self.search_input.clear()
+        self._last_completion_query = ""
+        if barcode:
+            self.apply_scanned_barcode(barcode)
+
+    def apply_scanned_barcode(self, barcode, retried=False):
+        product = product_catalog.get(barcode)
+        if product is None:
+            if not retried:
+                # Possibly added/re-activated since the last refresh: pull deltas, then try once more
+                self.refresh_catalog(on_done=lambda _: self.apply_scanned_barcode(barcode, retried=True))
+            return
+
+        if self.is_price_check_mode:
+            name = product.name_en or product.name_dr
+            self.product_name_lbl.setText(name)
+            self.price_lbl.setText(f"{product.sale_price:.2f} AFN")
+            self.quantity_lbl.setText(f"In Stock: {int(product.stock)}")
+            self.display_card.setStyleSheet("background-color: #e6f7ff; border: 2px solid #91d5ff; border-radius: 8px; padding: 15px;")
+            return
+
+        self.add_to_cart(product, product.stock)
+        print('\a', end='', flush=True)
 
     def update_completer(self, text):
-        if len(text) < 2: return
+        text = text.strip()
+        if len(text) < 2 or text == self._last_completion_query:
+            return
+        self._last_completion_query = text
+        needle = text.lower()
         suggestions = []
         new_map = {}
-        for bc, p in self.barcode_cache.items():
-            if text.lower() in p['name_en'].lower() or text in bc:
-                display = f"{p['name_en']} ({bc})"
-                suggestions.append(display)
-                new_map[display] = bc
+        for p in product_search.search(text, limit=20):
+            # Show the name the query matched (Pashto/Dari searches would not match name_en)
+            name = next((n for n in (p.name_en, p.name_dr, p.name_ps) if needle in n.lower()), p.name_en)
+            display = f"{name} ({p.barcode})"
+            suggestions.append(display)
+            new_map[display] = p.barcode
         self.completion_map = new_map
-        self.completer.setModel(QStringListModel(suggestions))
+        self.completer_model.setStringList(suggestions)
+        if suggestions and self.search_input.hasFocus():
+            self.completer.complete()
 
     def handle_completer_activation(self, text):
         barcode = self.completion_map.get(text)
@@ -399,114 +433,40 @@ class SalesView(QWidget):
             self.handle_barcode_scan()
 
     def add_to_cart(self, product, stock_qty):
-        for item in self.cart:
-            if item['id'] == product['id']:
-                if item['qty'] + 1 > stock_qty:
-                    QMessageBox.warning(self, lang_manager.get("out_of_stock"), f"{lang_manager.get('remaining')}: {lang_manager.localize_digits(stock_qty)}")
-                    return
-                item['qty'] += 1
-                self.refresh_table()
+        row = self.cart_model.find_row(product.id)
+        if row >= 0:
+            item = self.cart[row]
+            if item['qty'] + 1 > stock_qty:
+                QMessageBox.warning(self, lang_manager.get("out_of_stock"), f"{lang_manager.get('remaining')}: {lang_manager.localize_digits(stock_qty)}")
                 return
+            self.cart_model.increment(row)
+            self.cart_table.scrollTo(self.cart_model.index(row, COL_NAME))
+            return
         
         if stock_qty <= 0:
             QMessageBox.warning(self, lang_manager.get("out_of_stock"), lang_manager.get("out_of_stock"))
             return
 
-        self.cart.append({
-            'id': product['id'],
-            'barcode': product['barcode'],
-            'name': product['name_en'],
-            'price': product['sale_price'],
+        row = self.cart_model.add_line({
+            'id': product.id,
+            'barcode': product.barcode,
+            'name': product.name_en,
+            'price': product.sale_price,
             'qty': 1,
             'max_qty': stock_qty
         })
-        self.refresh_table()
-
-    def handle_qty_edit(self, row, col):
-        if col == 4:
-            try:
-                item = self.cart[row]
-                new_qty = float(self.cart_table.item(row, col).text())
-                
-                if new_qty < 0:
-                    QMessageBox.warning(self, lang_manager.get("invalid_qty"), lang_manager.get("qty_cannot_be_negative"))
-                    self.refresh_table()
-                    return
-                
-                if new_qty > item['max_qty']:
-                    QMessageBox.warning(self, lang_manager.get("insufficient_stock"), f"{lang_manager.get('remaining')}: {lang_manager.localize_digits(item['max_qty'])}")
-                    self.refresh_table()
-                    return
-                
-                item['qty'] = new_qty
-                self.refresh_table()
-            except:
-                self.refresh_table()
+        self.cart_table.scrollTo(self.cart_model.index(row, COL_NAME))
 
     def refresh_table(self):
-        self.cart_table.blockSignals(True)
-        self.cart_table.setRowCount(0)
-        
-        # Batch Fetch Stock instead of one by one in loop
-        if self.cart:
-            p_ids = [str(item['id']) for item in self.cart]
-            stock_map = {}
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(f"SELECT product_id, quantity FROM inventory WHERE product_id IN ({','.join(p_ids)})")
-                stock_map = {row['product_id']: row['quantity'] for row in cursor.fetchall()}
-        
-        for i, item in enumerate(self.cart):
-            current_stock = stock_map.get(item['id'], 0)
-            
-            self.cart_table.insertRow(i)
-            self.cart_table.setItem(i, 0, QTableWidgetItem(str(item['id'])))
-            self.cart_table.setItem(i, 1, QTableWidgetItem(item['barcode']))
-            self.cart_table.setItem(i, 2, QTableWidgetItem(item['name']))
-            self.cart_table.setItem(i, 3, QTableWidgetItem(lang_manager.localize_digits(f"{item['price']:.2f}")))
-            qty_item = QTableWidgetItem(lang_manager.localize_digits(str(item['qty'])))
-            qty_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.cart_table.setItem(i, 4, qty_item)
-            
-            stock_item = QTableWidgetItem(lang_manager.localize_digits(str(int(current_stock))))
-            stock_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            if current_stock > 10:
-                stock_item.setForeground(Qt.GlobalColor.darkGreen)
-            elif current_stock > 5:
-                stock_item.setForeground(QColor(255, 140, 0))  # Orange
-            else:
-                stock_item.setForeground(Qt.GlobalColor.red)
-            self.cart_table.setItem(i, 5, stock_item)
-            
-            total_item = QTableWidgetItem(lang_manager.localize_digits(f"{(item['price'] * item['qty']):.2f}"))
-            total_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-            self.cart_table.setItem(i, 6, total_item)
-            
-            remove_btn = QPushButton()
-            remove_btn.setIcon(qta.icon("fa5s.times", color="white"))
-            style_button(remove_btn, variant="danger", size="icon")
-            remove_btn.clicked.connect(lambda checked, r=i: self.remove_cart_item(r))
-            
-            container = QFrame()
-            container.setStyleSheet("background: none; border: none;")
-            c_layout = QHBoxLayout(container)
-            c_layout.setContentsMargins(2, 2, 2, 2)
-            c_layout.addWidget(remove_btn)
-            c_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.cart_table.setCellWidget(i, 7, container)
-            
-        self.cart_table.resizeColumnsToContents()
-        self.cart_table.resizeRowsToContents()
-        self.cart_table.blockSignals(False)
+        """Re-reads stock for every line (after a catalog refresh) and updates the total."""
+        self.cart_model.refresh_stock()
         self.update_totals()
 
     def remove_cart_item(self, row):
-        if 0 <= row < len(self.cart):
-            self.cart.pop(row)
-            self.refresh_table()
+        self.cart_model.remove_row(row)
 
-    def update_totals(self):
-        subtotal = sum(item['price'] * item['qty'] for item in self.cart)
+    def update_totals(self, *_):
+        subtotal = self.cart_model.subtotal()
         discount = 0
         try:
             discount = float(self.discount_input.text() or 0)
@@ -547,29 +507,18 @@ class SalesView(QWidget):
                         if not cust['home_address'] or not cust['photo'] or not cust['id_card_photo']:
                             return {"success": False, "error": "KYC_REQUIRED", "customer_name": cust['name_en']}
 
-                invoice_num = f"INV-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                with db_manager.get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        INSERT INTO sales (invoice_number, user_id, customer_id, total_amount, payment_type, uuid)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (invoice_num, self.current_user['id'], self.selected_customer_id, total, method, str(uuid.uuid4())))
-                    sale_id = cursor.lastrowid
-                    
-                    for item in self.cart:
-                        cursor.execute("""
-                            INSERT INTO sale_items (sale_id, product_id, barcode, product_name, quantity, unit_price, total_price, uuid)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (sale_id, item['id'], item['barcode'], item['name'], item['qty'], item['price'], item['price']*item['qty'], str(uuid.uuid4())))
-                        cursor.execute("UPDATE inventory SET quantity = quantity - ? WHERE product_id = ?", (item['qty'], item['id']))
-                    
-                    if method == "CREDIT":
-                        cursor.execute("UPDATE customers SET balance = balance + ? WHERE id = ?", (total, self.selected_customer_id))
-                        cursor.execute("INSERT INTO loans (customer_id, sale_id, loan_amount, status) VALUES (?, ?, ?, 'PENDING')",
-                                     (self.selected_customer_id, sale_id, total))
-                    
-                    conn.commit()
-                return {"success": True, "sale_id": sale_id, "invoice_num": invoice_num, "total": total, "method": method}
+                lines = [checkout.CheckoutLine(item['id'], item['name'], item['qty'], item['price'], barcode=item['barcode'])
+                         for item in self.cart]
+                # Invoice number is allocated from the sales_invoice sequence inside the checkout transaction
+                sale = checkout.checkout(db_manager.get_connection(), checkout.STORE, lines, None,
+                                         self.current_user['id'], self.selected_customer_id, method, total,
+                                         terminal=sequences.terminal_name())
+                return {"success": True, "sale_id": sale.sale_id, "invoice_num": sale.invoice_number, "total": total,
+                        "method": method, "next_invoice": sale.next_invoice}
+            except checkout.InsufficientStockError as e:
+                return {"success": False, "error": str(e), "type": "warning", "stock_changed": True}
+            except checkout.CheckoutError as e:
+                return {"success": False, "error": str(e), "type": "warning"}
             except Exception as e:
                 return {"success": False, "error": str(e)}
 
@@ -590,6 +539,8 @@ class SalesView(QWidget):
                         self.process_payment(method) # Retry after KYC
                     return
                 
+                if result.get("stock_changed"):
+                    self.refresh_catalog()  # another terminal sold it: show current stock in the cart
                 if result.get("type") == "warning":
                     QMessageBox.warning(self, lang_manager.get("checkout"), result["error"])
                 else:
@@ -598,9 +549,10 @@ class SalesView(QWidget):
 
             # Success
             self.print_sale_bill(result["sale_id"], result["invoice_num"], result["total"], result["method"])
-            self.load_next_bill_number()
+            self.bill_number_display.setText(result["next_invoice"])
             QMessageBox.information(self, lang_manager.get("success"), f"{lang_manager.get('sale_completed')}: {result['invoice_num']}")
             self.clear_cart()
+            self.refresh_catalog()
 
         task_manager.run_task(run_checkout, on_finished=on_finished)
 
@@ -622,39 +574,23 @@ class SalesView(QWidget):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                # Use thermal printer for exact format from demand.txt
-                from src.utils.thermal_bill_printer import thermal_printer
-                bill_text = thermal_printer.generate_sales_bill(sale_id, method == "CREDIT")
-                
-                if bill_text:
-                    thermal_printer.print_bill(bill_text)
-                    QMessageBox.information(self, lang_manager.get("success"), lang_manager.get("bill_printed_successfully"))
-                else:
-                    QMessageBox.warning(self, lang_manager.get("print_error"), lang_manager.get("failed_to_generate_bill"))
-            except Exception as e:
-                QMessageBox.critical(self, lang_manager.get("print_error"), f"{lang_manager.get('failed_to_print_bill')}: {str(e)}")
+            # Rendered and sent by the spooler thread; failures come back through on_print_job_status
+            self._print_jobs.add(print_spooler.submit_sale_bill(sale_id, method == "CREDIT", label=invoice_num))
+
+    def on_print_job_status(self, job_id, status, message):
+        if job_id not in self._print_jobs or status not in (PRINT_DONE, PRINT_FAILED):
+            return
+        self._print_jobs.discard(job_id)
+        if status == PRINT_FAILED:
+            QMessageBox.warning(self, lang_manager.get("print_error"), f"{lang_manager.get('failed_to_print_bill')}: {message}")
     
     def load_next_bill_number(self):
+        """Shows the number the next sale on this terminal will get (after a sale the checkout result carries it)."""
         from src.core.blocking_task_manager import task_manager
-        
+
         def fetch_next():
-            try:
-                with db_manager.get_connection() as conn:
-                    last_bill = conn.execute("SELECT invoice_number FROM sales ORDER BY id DESC LIMIT 1").fetchone()
-                    
-                    next_id = 1
-                    if last_bill:
-                        try:
-                            # Try to extract the trailing number from INV-YYYYMMDD-XXXX
-                            parts = last_bill['invoice_number'].split('-')
-                            if len(parts) >= 3:
-                                next_id = int(parts[-1]) + 1
-                        except: pass
-                    
-                    return f"INV-{datetime.now().strftime('%Y%m%d')}-{next_id:04d}"
-            except:
-                return "INV-0001"
+            with db_manager.get_connection() as conn:
+                return sequences.peek(conn.cursor(), sequences.SALES_INVOICE, sequences.terminal_name())
 
         def on_finished(next_bill):
             self.bill_number_display.setText(next_bill)
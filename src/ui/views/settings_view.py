@@ -9,6 +9,7 @@ from src.core.localization import lang_manager
 from src.utils.backup import BackupManager
 from src.ui.theme_manager import theme_manager
 from src.database.db_manager import db_manager
+from src.database import costing, customer_ledger, period_close, sales_summary
 from src.ui.button_styles import style_button
 from src.core.supabase_manager import supabase_manager
 from src.core.local_config import local_config
@@ -302,6 +303,25 @@ class SettingsView(QWidget):
             autostart_layout.addWidget(auto_note)
             layout.addWidget(autostart_card)
 
+        # Inventory Costing Section (src/database/costing.py)
+        costing_card, costing_layout = self.create_card("Inventory Costing", "fa5s.layer-group")
+        self.costing_combo = QComboBox()
+        self.costing_combo.addItem("FIFO (first in, first out)", costing.FIFO)
+        self.costing_combo.addItem("Weighted Average", costing.AVERAGE)
+        try:
+            with db_manager.get_connection() as conn:
+                current = costing.method(conn.cursor())
+            self.costing_combo.setCurrentIndex(max(self.costing_combo.findData(current), 0))
+        except Exception as e:
+            print(f"[WARNING] Could not read costing method: {e}")
+        self.costing_combo.currentIndexChanged.connect(self.change_costing_method)
+        costing_layout.addWidget(self.costing_combo)
+
+        costing_note = QLabel("Sales are costed from the stock they were taken from. A change applies to sales from now on.")
+        costing_note.setStyleSheet("color: #6b7280; font-style: italic; font-size: 12px;")
+        costing_layout.addWidget(costing_note)
+        layout.addWidget(costing_card)
+
         # System Maintenance Section
         maint_card, maint_layout = self.create_card("System Maintenance", "fa5s.tools")
 
@@ -554,6 +574,16 @@ class SettingsView(QWidget):
         lang_manager.set_language(lang)
         QMessageBox.information(self, "Language Changed", "Please restart the application for language changes to take full effect.")
 
+    def change_costing_method(self, index):
+        new_method = self.costing_combo.itemData(index)
+        try:
+            with db_manager.get_connection() as conn:
+                costing.set_method(conn.cursor(), new_method)
+                conn.commit()
+            print(f"[INFO] Costing method set to {new_method}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not change costing method: {e}")
+
     def run_vacuum(self):
         with db_manager.get_connection() as conn:
             conn.execute("VACUUM")
@@ -562,7 +592,7 @@ class SettingsView(QWidget):
     def system_reset(self):
         # Multiple confirmations as per spec safety
         reply1 = QMessageBox.critical(self, "SYSTEM RESET", 
-                                    "WARNING: This will delete ALL sales, loans, and audit data. Products and Users will remain. Continue?",
+                                    "WARNING: This will delete ALL sales, loans, closed-month snapshots and audit data. Products and Users will remain. Continue?",
                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply1 == QMessageBox.StandardButton.Yes:
             reply2 = QMessageBox.warning(self, "FINAL CONFIRMATION", 
@@ -575,10 +605,15 @@ class SettingsView(QWidget):
                         cursor.execute("DELETE FROM sales")
                         cursor.execute("DELETE FROM sale_items")
                         cursor.execute("DELETE FROM loans")
+                        cursor.execute("DELETE FROM loan_payment_allocations")
                         cursor.execute("DELETE FROM cash_transactions")
                         cursor.execute("DELETE FROM audit_logs")
-                        cursor.execute("UPDATE customers SET balance = 0")
+                        customer_ledger.clear(cursor, customer_ledger.STORE)
                         cursor.execute("UPDATE inventory SET quantity = 0")
+                        costing.clear(cursor)
+                        sales_summary.clear(cursor, sales_summary.STORE)
+                        # Closed-month snapshots would keep reporting the deleted sales
+                        period_close.clear(cursor, period_close.STORE)
                         conn.commit()
                     QMessageBox.information(self, "Success", "System has been reset to initial state.")
                 except Exception as e:
@@ -594,24 +629,35 @@ class SettingsView(QWidget):
     def run_backup(self):
         path = QFileDialog.getExistingDirectory(self, "Select Backup Folder")
         if path:
-            success, msg = BackupManager.create_backup(path)
-            if success:
-                QMessageBox.information(self, "Success", f"Backup created at: {msg}")
-            else:
-                QMessageBox.critical(self, "Error", msg)
+            from src.core.blocking_task_manager import task_manager
+
+            def on_finished(result):
+                success, msg = result
+                if success:
+                    QMessageBox.information(self, "Success", "Backup created at:\n" + "\n".join(msg))
+                else:
+                    QMessageBox.critical(self, "Error", msg)
+
+            task_manager.run_task(BackupManager.create_backup, on_finished, None, path)
 
     def run_restore(self):
-        file, _ = QFileDialog.getOpenFileName(self, "Select Backup File", "", "Database Files (*.db)")
+        file, _ = QFileDialog.getOpenFileName(self, "Select Backup File", "", "Database Backups (*.db.gz *.db)")
         if file:
             reply = QMessageBox.question(self, 'Confirm Restore', 
                                        'This will overwrite current data. Continue?',
                                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
-                success, msg = BackupManager.restore_backup(file)
-                if success:
-                    QMessageBox.information(self, "Success", "Database restored. Please restart the app.")
-                else:
-                    QMessageBox.critical(self, "Error", msg)
+                from src.core.blocking_task_manager import task_manager
+
+                def on_finished(result):
+                    success, msg = result
+                    if success:
+                        QMessageBox.information(self, "Success", "Database restored. Please restart the app.")
+                    else:
+                        QMessageBox.critical(self, "Error", msg)
+
+                task_manager.run_task(BackupManager.restore_backup, on_finished, None, file)
+
     def open_system_qr_folder(self):
         import subprocess
         import platform
@@ -1,29 +1,172 @@
-import shutil
+import gzip
+import hashlib
 import os
+import shutil
+import sqlite3
+import tempfile
 from datetime import datetime
-from src.database.db_manager import db_manager
+
+# Online backup throttling: copy this many pages per step and yield between steps so
+# checkout writes are never blocked for the whole copy.
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _db_targets(databases):
+    """Maps 'store'/'pharmacy' names to live database file paths."""
+    from src.database.db_manager import db_manager
+    paths = {"store": db_manager.store_db, "pharmacy": db_manager.pharmacy_db}
+    return [(name, paths[name]) for name in databases]
+
 
 class BackupManager:
     @staticmethod
-    def create_backup(destination_dir):
-        if not os.path.exists(destination_dir):
-            os.makedirs(destination_dir)
-            
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"pos_backup_{timestamp}.db"
-        dest_path = os.path.join(destination_dir, backup_name)
-        
+    def backup_database(source_path, dest_path, pages=PAGES_PER_STEP, sleep=STEP_SLEEP, progress=None):
+        """
+        Consistent online copy of a live (WAL) database using the SQLite backup API,
+        gzip-compressed to dest_path with a '<dest_path>.sha256' checksum next to it.
+        progress(remaining, total) is called after every step.
+        """
+        fd, tmp_path = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(dest_path) or None)
+        os.close(fd)
+        try:
+            src = sqlite3.connect(source_path)
+            dst = sqlite3.connect(tmp_path)
+            try:
+                src.backup(dst, pages=pages, sleep=sleep,
+                           progress=(lambda status, remaining, total: progress(remaining, total)) if progress else None)
+            finally:
+                dst.close()
+                src.close()
+
+            with open(tmp_path, "rb") as f_in, gzip.open(dest_path, "wb", compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        digest = _sha256(dest_path)
+        with open(dest_path + ".sha256", "w") as f:
+            f.write(f"{digest}  {os.path.basename(dest_path)}\n")
+        return dest_path
+
+    @staticmethod
+    def create_backup(destination_dir, databases=("store", "pharmacy"), progress=None):
+        """Backs up the selected databases into destination_dir. Returns (success, paths | error)."""
         try:
-            shutil.copy2(db_manager.db_path, dest_path)
-            return True, dest_path
+            os.makedirs(destination_dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            created = []
+            for name, db_path in _db_targets(databases):
+                if not os.path.exists(db_path):
+                    continue
+                base = os.path.splitext(os.path.basename(db_path))[0]
+                dest_path = os.path.join(destination_dir, f"{base}_{timestamp}.db.gz")
+                BackupManager.backup_database(db_path, dest_path, progress=progress)
+                created.append(dest_path)
+            return True, created
         except Exception as e:
             return False, str(e)
 
     @staticmethod
-    def restore_backup(backup_path):
+    def verify_backup(backup_path):
+        """Checks the sidecar checksum (if any) and SQLite integrity. Returns (ok, message)."""
+        checksum_file = backup_path + ".sha256"
+        if os.path.exists(checksum_file):
+            with open(checksum_file) as f:
+                expected = f.read().split()[0]
+            if _sha256(backup_path) != expected:
+                return False, "Checksum mismatch: backup file is corrupted."
+
+        fd, tmp_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
         try:
-            # Simple restore by copying back
-            shutil.copy2(backup_path, db_manager.db_path)
-            return True, "Database restored successfully"
+            BackupManager._expand(backup_path, tmp_path)
+            conn = sqlite3.connect(tmp_path)
+            try:
+                result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            finally:
+                conn.close()
+        except Exception as e:
+            return False, f"Backup is not a readable database: {e}"
+        finally:
+            os.remove(tmp_path)
+        if result != "ok":
+            return False, f"Integrity check failed: {result}"
+        return True, "Backup verified"
+
+    @staticmethod
+    def restore_backup(backup_path, database=None):
+        """
+        Verifies the backup, then copies it into the live database through the backup API
+        (safe with WAL, unlike copying files over). database defaults to the one named in the file.
+        """
+        if database is None:
+            database = "pharmacy" if "pharmacy" in os.path.basename(backup_path).lower() else "store"
+        ok, msg = BackupManager.verify_backup(backup_path)
+        if not ok:
+            return False, msg
+
+        from src.database.db_manager import db_manager
+        (_, live_path), = _db_targets((database,))
+        fd, tmp_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            BackupManager._expand(backup_path, tmp_path)
+            db_manager.close_connections()
+            src = sqlite3.connect(tmp_path)
+            dst = sqlite3.connect(live_path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            return True, f"{database.title()} database restored successfully"
         except Exception as e:
             return False, str(e)
+        finally:
+            os.remove(tmp_path)
+
+    @staticmethod
+    def _expand(backup_path, dest_path):
+        """Writes the plain database for backup_path (gzip or legacy uncompressed .db) to dest_path."""
+        opener = gzip.open if backup_path.endswith(".gz") else open
+        with opener(backup_path, "rb") as f_in, open(dest_path, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
+    @staticmethod
+    def apply_retention(backup_dir, keep_last=5):
+        """Keeps the newest keep_last backups per database in backup_dir."""
+        groups = {}
+        for f in os.listdir(backup_dir):
+            if f.endswith(".db.gz") or f.endswith(".db"):
+                # '<db name>_<YYYYmmdd>_<HHMMSS>.db[.gz]'
+                groups.setdefault(f.rsplit("_", 2)[0], []).append(f)
+        removed = 0
+        for files in groups.values():
+            for f in sorted(files)[:-keep_last]:
+                for path in (os.path.join(backup_dir, f), os.path.join(backup_dir, f + ".sha256")):
+                    if os.path.exists(path):
+                        os.remove(path)
+                removed += 1
+        return removed
+
+    @staticmethod
+    def auto_backup(backup_dir, keep_last=5):
+        """Background auto-backup of both databases with retention. Never call from the UI thread."""
+        success, result = BackupManager.create_backup(backup_dir)
+        if not success:
+            print(f"Auto-backup failed: {result}")
+        try:
+            BackupManager.apply_retention(backup_dir, keep_last)
+        except OSError as e:
+            print(f"Auto-backup cleanup failed: {e}")
+        return success
@@ -0,0 +1,356 @@
+"""
+Print Spooler - receipts are printed off the UI thread
+
+Views submit a job (submit_sale_bill / submit_text) and return immediately; one worker thread
+renders the bill (thermal_bill_printer) and hands it to the printer backend. Jobs live in a small
+SQLite queue (print_spool.db in the app data directory), so receipts still waiting when the app
+closes are printed on the next start. A failed send is retried with exponential backoff; after
+MAX_ATTEMPTS the job is marked FAILED and, for the system printer, the receipt is opened for
+preview as before.
+
+Every status change is emitted as job_status(job_id, status, message), delivered on the UI thread.
+
+Backends:
+  SystemPrinterBackend - default printer via os.startfile / lp / lpr (what print_bill always did)
+  FilePrinterBackend   - writes each receipt to a directory (tests, "print to file")
+  SocketPrinterBackend - raw TCP, e.g. a network thermal printer on port 9100
+
+    python -m src.utils.print_spooler selftest   # spooler against a local fake socket printer
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+QUEUED = "QUEUED"
+PRINTING = "PRINTING"
+RETRY = "RETRY"
+DONE = "DONE"
+FAILED = "FAILED"
+
+MAX_ATTEMPTS = 5
+BASE_DELAY = 2.0     # seconds before the first retry, doubled each time ...
+MAX_DELAY = 60.0     # ... up to this
+KEEP_DONE_DAYS = 7
+
+
+class SystemPrinterBackend:
+    """The OS default printer, through ThermalBillPrinter's file + lp/lpr/startfile path."""
+    name = "system"
+
+    def send(self, job_id, text):
+        from src.utils.thermal_bill_printer import thermal_printer
+        path = thermal_printer.save_bill(text, name=f"bill_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job_id}")
+        thermal_printer._send_to_printer(path, preview_on_failure=False)
+
+    def give_up(self, job_id, text):
+        from src.utils.thermal_bill_printer import thermal_printer
+        thermal_printer.preview_file(thermal_printer.save_bill(text, name=f"bill_failed_{job_id}"))
+
+
+class FilePrinterBackend:
+    """Writes every job to `directory` as job_<id>.txt."""
+    name = "file"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, job_id, text):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"job_{job_id}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def give_up(self, job_id, text):
+        pass
+
+
+class SocketPrinterBackend:
+    """Raw TCP printing (JetDirect / port 9100), as most network receipt printers accept."""
+    name = "socket"
+
+    def __init__(self, host, port=9100, timeout=5.0, encoding="utf-8"):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.encoding = encoding
+
+    def send(self, job_id, text):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            sock.sendall(text.encode(self.encoding, errors="replace"))
+
+    def give_up(self, job_id, text):
+        pass
+
+
+class FakeSocketPrinter:
+    """
+    Local TCP listener standing in for a network printer; collects each job in `received`.
+    set_online(False) closes the listener so connections are refused, as with a printer that is
+    switched off, to exercise retries.
+    """
+
+    def __init__(self, online=True):
+        self.received = []
+        self.host, self.port = "127.0.0.1", 0
+        self._server = None
+        self._listen()
+        if not online:
+            self.set_online(False)
+
+    def _listen(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, self.port))
+        server.listen(5)
+        self.port = server.getsockname()[1]
+        self._server = server
+        threading.Thread(target=self._serve, args=(server,), daemon=True).start()
+
+    def _serve(self, server):
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn:
+                chunks = []
+                while True:
+                    data = conn.recv(65536)
+                    if not data:
+                        break
+                    chunks.append(data)
+                self.received.append(b"".join(chunks).decode("utf-8", errors="replace"))
+
+    def set_online(self, online):
+        if online and self._server is None:
+            self._listen()
+        elif not online and self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def close(self):
+        self.set_online(False)
+
+
+def _render(kind, payload):
+    if kind == "text":
+        return payload["text"]
+    if kind == "sale_bill":
+        from src.utils.thermal_bill_printer import thermal_printer
+        return thermal_printer.generate_sales_bill(payload["sale_id"], payload.get("is_credit", False),
+                                                   is_pharmacy=payload.get("is_pharmacy", False))
+    raise ValueError(f"Unknown print job kind: {kind}")
+
+
+class PrintSpooler(QObject):
+    job_status = pyqtSignal(int, str, str)  # job id, status, message
+
+    def __init__(self, db_path=None, backend=None):
+        super().__init__()
+        self.db_path = db_path
+        self.backend = backend or SystemPrinterBackend()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._conn = None
+
+    # -- queue storage (the worker and submitters share one connection, guarded by _cond)
+
+    def _db(self):
+        if self._conn is None:
+            if self.db_path is None:
+                from src.core.local_config import LocalConfig
+                self.db_path = os.path.join(LocalConfig.get_data_dir(), "print_spool.db")
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS print_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL,
+                    label TEXT, status TEXT NOT NULL DEFAULT 'QUEUED', attempts INTEGER DEFAULT 0,
+                    next_attempt REAL DEFAULT 0, last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_print_jobs_pending ON print_jobs(status, next_attempt)")
+            # A job caught mid-print by a crash/close is sent again
+            self._conn.execute("UPDATE print_jobs SET status = 'QUEUED' WHERE status = ?", (PRINTING,))
+            cutoff = (datetime.utcnow() - timedelta(days=KEEP_DONE_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+            self._conn.execute("DELETE FROM print_jobs WHERE status = ? AND updated_at < ?", (DONE, cutoff))
+        return self._conn
+
+    def _set(self, job_id, status, **fields):
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        sql = f"UPDATE print_jobs SET status = ?, updated_at = CURRENT_TIMESTAMP{', ' + cols if cols else ''} WHERE id = ?"
+        self._db().execute(sql, (status, *fields.values(), job_id))
+
+    # -- public API (any thread)
+
+    def submit_sale_bill(self, sale_id, is_credit=False, is_pharmacy=False, label=None):
+        payload = {"sale_id": sale_id, "is_credit": bool(is_credit), "is_pharmacy": bool(is_pharmacy)}
+        return self._submit("sale_bill", payload, label or f"Sale #{sale_id}")
+
+    def submit_text(self, text, label=None):
+        return self._submit("text", {"text": text}, label)
+
+    def retry(self, job_id):
+        """Puts a FAILED job back in the queue."""
+        with self._cond:
+            self._set(job_id, QUEUED, attempts=0, next_attempt=0)
+            self._cond.notify()
+        self._ensure_worker()
+        self.job_status.emit(job_id, QUEUED, "")
+
+    def jobs(self, limit=50):
+        with self._cond:
+            return [dict(r) for r in self._db().execute(
+                "SELECT id, kind, label, status, attempts, last_error, created_at FROM print_jobs ORDER BY id DESC LIMIT ?",
+                (limit,))]
+
+    def pending_count(self):
+        with self._cond:
+            return self._db().execute("SELECT COUNT(*) FROM print_jobs WHERE status IN (?, ?, ?)",
+                                      (QUEUED, RETRY, PRINTING)).fetchone()[0]
+
+    def set_backend(self, backend):
+        with self._cond:
+            self.backend = backend
+
+    def start(self):
+        """Starts the worker (also done lazily by the first submit); resumes jobs left from last run."""
+        with self._cond:
+            self._db()
+        self._ensure_worker()
+
+    def stop(self, timeout=5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def wait_idle(self, timeout=30.0):
+        """Blocks until no job is queued or printing (tests / shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.pending_count() == 0
+
+    # -- worker
+
+    def _submit(self, kind, payload, label):
+        with self._cond:
+            cur = self._db().execute("INSERT INTO print_jobs (kind, payload, label) VALUES (?, ?, ?)",
+                                     (kind, json.dumps(payload), label))
+            job_id = cur.lastrowid
+            self._cond.notify()
+        self._ensure_worker()
+        self.job_status.emit(job_id, QUEUED, label or "")
+        return job_id
+
+    def _ensure_worker(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="PrintSpooler", daemon=True)
+            self._thread.start()
+
+    def _next_job(self):
+        """Claims the next due job, or returns the seconds until one is due (None when the queue is empty)."""
+        db = self._db()
+        row = db.execute("""
+            SELECT id, kind, payload, attempts, next_attempt FROM print_jobs
+            WHERE status IN (?, ?) ORDER BY next_attempt, id LIMIT 1
+        """, (QUEUED, RETRY)).fetchone()
+        if row is None:
+            return None, None
+        wait = row["next_attempt"] - time.time()
+        if wait > 0:
+            return None, wait
+        self._set(row["id"], PRINTING)
+        return row, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                job, wait = self._next_job()
+                if job is None:
+                    self._cond.wait(wait)
+                    continue
+                backend = self.backend
+            self.job_status.emit(job["id"], PRINTING, "")
+            self._process(job, backend)
+
+    def _process(self, job, backend):
+        job_id, attempts = job["id"], job["attempts"] + 1
+        text = None
+        try:
+            text = _render(job["kind"], json.loads(job["payload"]))
+            if not text:
+                raise ValueError("Empty receipt")
+            backend.send(job_id, text)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            with self._cond:
+                if attempts >= MAX_ATTEMPTS or text is None:
+                    # Rendering errors (sale missing, ...) will not fix themselves: fail right away
+                    self._set(job_id, FAILED, attempts=attempts, last_error=error)
+                    status = FAILED
+                else:
+                    delay = min(MAX_DELAY, BASE_DELAY * 2 ** (attempts - 1))
+                    self._set(job_id, RETRY, attempts=attempts, last_error=error, next_attempt=time.time() + delay)
+                    status = RETRY
+            print(f"[WARNING] Print job {job_id} attempt {attempts} failed: {error}")
+            if status == FAILED and text is not None:
+                try:
+                    backend.give_up(job_id, text)
+                except Exception as e2:
+                    print(f"[WARNING] Print job {job_id} fallback failed: {e2}")
+            self.job_status.emit(job_id, status, error)
+            return
+        with self._cond:
+            self._set(job_id, DONE, attempts=attempts, last_error=None)
+        self.job_status.emit(job_id, DONE, "")
+
+
+print_spooler = PrintSpooler()
+
+
+def _selftest():
+    import tempfile
+    global BASE_DELAY
+    BASE_DELAY = 0.2
+    printer = FakeSocketPrinter(online=False)
+    spool_dir = tempfile.mkdtemp(prefix="print_spool_")
+    spooler = PrintSpooler(os.path.join(spool_dir, "spool.db"), SocketPrinterBackend(printer.host, printer.port))
+
+    t0 = time.perf_counter()
+    ids = [spooler.submit_text(f"RECEIPT {i}\n", label=f"test {i}") for i in range(3)]
+    submit_ms = (time.perf_counter() - t0) * 1000
+    time.sleep(0.5)  # a couple of refused attempts, then the printer comes back
+    printer.set_online(True)
+    ok = spooler.wait_idle(15)
+    spooler.stop()
+    printer.close()
+    print(f"Submitted {len(ids)} jobs in {submit_ms:.1f} ms; all printed: {ok}")
+    print(f"Printer received: {printer.received}")
+    for job in reversed(spooler.jobs()):
+        print(f"  job {job['id']}: {job['status']} after {job['attempts']} attempt(s) {job['last_error'] or ''}")
+    return ok and len(printer.received) == len(ids)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2 or sys.argv[1] != "selftest":
+        print("usage: python -m src.utils.print_spooler selftest")
+        sys.exit(2)
+    sys.exit(0 if _selftest() else 1)
@@ -0,0 +1,345 @@
+"""
+PDF report renderer (reportlab).
+
+Reports are built from query results, not from the widgets showing them: a report is a title,
+a few info lines and a list of Sections, each with headers and an iterable of rows (cell text).
+Rows are drawn straight onto the canvas as they are consumed, so a section can be a generator
+over a cursor: no row list is ever built, memory only grows with the compressed page streams
+reportlab keeps until save() (about 3 KB per page).
+
+    sections = [Section("Invoice Transactions", ["Inv #", "Amount"], rows, widths=[1, 1],
+                        footer=["Total: 1,250.00 AFN"])]
+    render_pdf(path, "Complete Report", ["Report Period: Daily"], sections, template="landscape")
+
+Pagination is done here: rows that do not fit start a new page, the section's header row is
+repeated on it, and every page gets a "Page N of M" footer (M is a form filled in at the end).
+Cell text is cut to its column width.
+
+Rendered files are cached on disk (render_cached): the caller passes a key that describes the
+report completely - including report_cache.token() of the database it reads - and gets the
+same file back until the data changes. The token changes with every watcher connection, so
+files left by an earlier run are never served again; they age out through _prune().
+"""
+import hashlib
+import os
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+CACHE_FILES = 20
+
+# TrueType fonts with Arabic-script glyphs for non-ASCII text (customer / product names in Pashto
+# and Dari); the first pair found is embedded. ASCII text always uses the built-in Helvetica,
+# which needs no embedding and is several times faster to measure and encode.
+FONT_CANDIDATES = [
+    ("C:/Windows/Fonts/tahoma.ttf", "C:/Windows/Fonts/tahomabd.ttf"),
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/Library/Fonts/Arial Unicode.ttf", "/Library/Fonts/Arial Unicode.ttf"),
+]
+_fonts = None
+
+
+def fonts():
+    """(regular, bold) font names for non-ASCII text, registering the TrueType pair on first use."""
+    global _fonts
+    if _fonts is None:
+        _fonts = ("Helvetica", "Helvetica-Bold")
+        for regular, bold in FONT_CANDIDATES:
+            if os.path.exists(regular) and os.path.exists(bold):
+                try:
+                    pdfmetrics.registerFont(TTFont("Report", regular))
+                    pdfmetrics.registerFont(TTFont("Report-Bold", bold))
+                    _fonts = ("Report", "Report-Bold")
+                    break
+                except Exception as e:
+                    print(f"[WARNING] Could not load report font {regular}: {e}")
+    return _fonts
+
+
+class ReportTemplate:
+    """Page size, margins and type sizes of a report."""
+
+    def __init__(self, pagesize, margin=12 * mm, font_size=8, row_height=13, title_size=16,
+                 section_size=12, header_fill="#f0f0f0", grid="#bbbbbb"):
+        self.pagesize = pagesize
+        self.margin = margin
+        self.font_size = font_size
+        self.row_height = row_height
+        self.title_size = title_size
+        self.section_size = section_size
+        self.header_fill = colors.HexColor(header_fill)
+        self.grid = colors.HexColor(grid)
+
+
+TEMPLATES = {
+    "portrait": ReportTemplate(A4),
+    "landscape": ReportTemplate(landscape(A4)),
+}
+
+
+class Section:
+    """
+    One table of a report. `rows` is any iterable of cell sequences (a generator is consumed
+    once); `widths` are relative column widths (equal by default); `footer` lines are printed
+    under the table.
+    """
+
+    def __init__(self, title, headers, rows, widths=None, footer=()):
+        self.title = title
+        self.headers = list(headers)
+        self.rows = rows
+        self.widths = list(widths) if widths else [1] * len(self.headers)
+        self.footer = list(footer)
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return str(value).replace("\n", " / ")
+
+
+class _PdfWriter:
+    PAD = 3
+
+    def __init__(self, path, title, template):
+        self.t = template
+        regular, bold = fonts()
+        self.fonts = {False: ("Helvetica", regular), True: ("Helvetica-Bold", bold)}
+        self.char_widths = {}   # font -> {char: width at size 1}
+        self.title = title
+        self.width, self.height = template.pagesize
+        self.left = template.margin
+        self.right = self.width - template.margin
+        self.top = self.height - template.margin
+        self.bottom = template.margin + 14   # page footer below
+        self.page = 0
+        self.y = self.top
+        self.generated = datetime.now().strftime('%Y-%m-%d %H:%M')
+
+        self.c = canvas.Canvas(path, pagesize=template.pagesize, pageCompression=1)
+        self.c.setTitle(title)
+        self.new_page()
+
+    # -- pages
+
+    def new_page(self):
+        if self.page:
+            self.c.showPage()
+        self.page += 1
+        self.y = self.top
+        c = self.c
+        c.setFillColor(colors.grey)
+        footer_y = self.t.margin
+        self.draw(self.left, footer_y, f"{self.title} - {self.generated}", 7)
+        label = f"Page {self.page} of "
+        x = self.right - 24 - pdfmetrics.stringWidth(label, "Helvetica", 7)
+        self.draw(x, footer_y, label, 7)
+        c.saveState()
+        c.translate(x + pdfmetrics.stringWidth(label, "Helvetica", 7), footer_y)
+        c.doForm("page_count")   # drawn once the total is known
+        c.restoreState()
+        c.setFillColor(colors.black)
+
+    def ensure(self, height):
+        """Starts a new page unless `height` points fit above the bottom margin. True if it did."""
+        if self.y - height < self.bottom:
+            self.new_page()
+            return True
+        return False
+
+    # -- text
+
+    def font_for(self, text, bold=False):
+        return self.fonts[bold][0 if text.isascii() else 1]
+
+    def text_width(self, text, font, size):
+        widths = self.char_widths.setdefault(font, {})
+        total = 0.0
+        for ch in text:
+            w = widths.get(ch)
+            if w is None:
+                w = widths[ch] = pdfmetrics.stringWidth(ch, font, 1)
+            total += w
+        return total * size
+
+    def fit(self, text, width, size, bold=False):
+        """(text cut to `width` with "...", font to draw it in)."""
+        font = self.font_for(text, bold)
+        width -= 2 * self.PAD
+        if self.text_width(text, font, size) <= width:
+            return text, font
+        width -= self.text_width("...", font, size)
+        widths = self.char_widths[font]
+        used = 0.0
+        for i, ch in enumerate(text):
+            used += widths[ch] * size
+            if used > width:
+                return text[:i] + "...", font
+        return text, font
+
+    def draw(self, x, y, text, size, bold=False, width=None):
+        text, font = self.fit(text, width or (self.right - x), size, bold)
+        self.c.setFont(font, size)
+        self.c.drawString(x, y, text)
+
+    def line(self, text, size, bold=False, gap=4):
+        self.ensure(size + gap)
+        self.y -= size + gap
+        self.draw(self.left, self.y, _text(text), size, bold)
+
+    # -- tables
+
+    def section(self, section):
+        t = self.t
+        total = float(sum(section.widths)) or 1.0
+        span = self.right - self.left
+        col_w = [span * w / total for w in section.widths]
+        xs = [self.left]
+        for w in col_w:
+            xs.append(xs[-1] + w)
+        cells = list(zip([x + self.PAD for x in xs], col_w))
+
+        # Title plus header and first row stay together
+        self.ensure(t.section_size + 8 + 2 * t.row_height)
+        self.line(section.title, t.section_size, bold=True, gap=8)
+        self.y -= 4
+        block_top = self.draw_header(section, xs, col_w)
+
+        c = self.c
+        size = t.font_size
+        offset = (t.row_height - size) / 2 + 1
+        rows = 0
+        for row in section.rows:
+            if self.y - t.row_height < self.bottom:
+                self.close_block(xs, block_top)
+                self.new_page()
+                block_top = self.draw_header(section, xs, col_w)
+            self.y -= t.row_height
+            # One text object per row: a drawString per cell costs several times as much
+            text = c.beginText()
+            current = None
+            for (x, w), value in zip(cells, row):
+                value, font = self.fit(_text(value), w, size)
+                if font != current:
+                    text.setFont(font, size)
+                    current = font
+                text.setTextOrigin(x, self.y + offset)
+                text.textOut(value)
+            c.drawText(text)
+            c.line(self.left, self.y, self.right, self.y)
+            rows += 1
+        self.close_block(xs, block_top)
+
+        if not rows:
+            self.line("-", size)
+        for line in section.footer:
+            self.line(line, size + 1, gap=3)
+        self.y -= 10
+        return rows
+
+    def draw_header(self, section, xs, col_w):
+        t, c = self.t, self.c
+        top = self.y
+        self.y -= t.row_height + 2
+        c.setFillColor(t.header_fill)
+        c.rect(self.left, self.y, self.right - self.left, t.row_height + 2, stroke=0, fill=1)
+        c.setFillColor(colors.black)
+        base = self.y + (t.row_height + 2 - t.font_size) / 2 + 1
+        for i, header in enumerate(section.headers):
+            self.draw(xs[i] + self.PAD, base, _text(header), t.font_size, bold=True, width=col_w[i])
+        c.setStrokeColor(t.grid)
+        c.line(self.left, top, self.right, top)
+        c.line(self.left, self.y, self.right, self.y)
+        return top
+
+    def close_block(self, xs, block_top):
+        """Column rules of the table part on this page."""
+        self.c.setStrokeColor(self.t.grid)
+        for x in xs:
+            self.c.line(x, block_top, x, self.y)
+
+    def finish(self):
+        c = self.c
+        c.beginForm("page_count")
+        c.setFillColor(colors.grey)
+        c.setFont("Helvetica", 7)
+        c.drawString(0, 0, str(self.page))
+        c.endForm()
+        c.save()
+
+
+def render_pdf(path, title, info_lines, sections, template="portrait"):
+    """Writes the report to `path`; returns (pages, rows drawn)."""
+    template = TEMPLATES[template] if isinstance(template, str) else template
+    writer = _PdfWriter(path, title, template)
+    writer.line(title, template.title_size, bold=True, gap=0)
+    writer.y -= 6
+    for text in info_lines:
+        writer.line(text, 9, gap=3)
+    writer.y -= 10
+    rows = sum(writer.section(s) for s in sections)
+    writer.finish()
+    return writer.page, rows
+
+
+# -- render cache
+
+def cache_dir():
+    from src.core.local_config import LocalConfig
+    path = os.path.join(LocalConfig.get_data_dir(), "report_pdfs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def render_cached(key, render, directory=None):
+    """
+    Path of the PDF for `key` (any repr-stable value), calling render(path) only when it has not
+    been rendered yet. The file is written under a temporary name and renamed, so a failed or
+    interrupted render never leaves a truncated PDF behind for the next lookup.
+    """
+    directory = directory or cache_dir()
+    name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:24] + ".pdf"
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        os.utime(path)   # keep recently opened reports when pruning
+        return path
+
+    part = path + ".part"
+    try:
+        render(part)
+        os.replace(part, path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    _prune(directory)
+    return path
+
+
+def _prune(directory, keep=CACHE_FILES):
+    files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".pdf")]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for old in files[keep:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass   # open in a viewer on Windows; pruned next time
+
+
+def open_pdf(path):
+    """Opens the PDF in the system viewer (to preview / print)."""
+    import platform
+    import subprocess
+
+    if platform.system() == "Darwin":  # macOS
+        subprocess.run(['open', path])
+    elif platform.system() == "Windows":
+        os.startfile(path)
+    else:  # Linux
+        subprocess.run(['xdg-open', path])
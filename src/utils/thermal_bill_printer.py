@@ -389,7 +389,11 @@ class ThermalBillPrinter:
     # ============================================================
     # ✅ AUTO-PRINT: send to default printer (no opening file)
     # ============================================================
-    def _send_to_printer(self, filepath):
+    def _send_to_printer(self, filepath, preview_on_failure=True):
+        """
+        Sends the file to the default printer. With preview_on_failure=False a failed print raises
+        instead of opening the file (the print spooler retries and falls back itself).
+        """
         system = platform.system()
 
         # Windows: print using default associated app/printer
@@ -399,6 +403,8 @@ class ThermalBillPrinter:
                 os.startfile(filepath, "print")
                 return
             except Exception as e:
+                if not preview_on_failure:
+                    raise
                 print(f"Windows print failed: {e}")
                 os.startfile(filepath) # Fallback to open
                 return
@@ -415,27 +421,39 @@ class ThermalBillPrinter:
             subprocess.run(["lpr", filepath], check=True, capture_output=True)
             return
         except Exception as e:
+            if not preview_on_failure:
+                raise
             # FALLBACK: If hardware print fails (e.g. no printer), open the file for viewing
             print(f"Direct print failed ({e}), falling back to preview.")
-            try:
-                if system == "Darwin":
-                    subprocess.run(['open', filepath])
-                elif system == "Linux":
-                    subprocess.run(['xdg-open', filepath])
-            except:
-                pass # Last resort: do nothing if even open fails
+            self.preview_file(filepath)
+
+    def preview_file(self, filepath):
+        """Opens the receipt file in the system viewer."""
+        system = platform.system()
+        try:
+            if system == "Windows":
+                os.startfile(filepath)
+            elif system == "Darwin":
+                subprocess.run(['open', filepath])
+            elif system == "Linux":
+                subprocess.run(['xdg-open', filepath])
+        except:
+            pass # Last resort: do nothing if even open fails
+
+    def save_bill(self, bill_text, name=None):
+        """Writes the receipt text under data/receipts and returns the file path."""
+        bills_dir = os.path.join("data", "receipts")
+        os.makedirs(bills_dir, exist_ok=True)
+        name = name or f"bill_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        filename = os.path.join(bills_dir, f"{name}.txt")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(bill_text)
+        return filename
 
     def print_bill(self, bill_text):
         """Auto-print the bill (still writes a temp file, but prints it immediately)"""
         try:
-            bills_dir = os.path.join("data", "receipts")
-            os.makedirs(bills_dir, exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(bills_dir, f"bill_{timestamp}.txt")
-
-            # Write receipt text
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(bill_text)
+            filename = self.save_bill(bill_text)
 
             # Auto-print
             self._send_to_printer(filename)
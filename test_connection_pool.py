@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Connection pool tests (src/database/connection_pool.py).
+
+Runs against throwaway database files, never the app databases:
+
+    python -m pytest -q test_connection_pool.py
+    python test_connection_pool.py
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+sys.path.append('.')
+
+from src.database.connection_pool import ConnectionPool
+
+
+def _db_path(tmp_dir, name="pool.db"):
+    path = os.path.join(tmp_dir, name)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS t (v INTEGER)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _in_thread(fn):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn()))
+    thread.start()
+    thread.join()
+    return result.get("value")
+
+
+def test_hit_miss_counting():
+    with tempfile.TemporaryDirectory() as tmp:
+        a, b = _db_path(tmp, "a.db"), _db_path(tmp, "b.db")
+        pool = ConnectionPool()
+        first = pool.acquire(a)
+        assert pool.acquire(a) is first
+        pool.acquire(b)
+        other = _in_thread(lambda: pool.acquire(a))
+        assert other is not first
+
+        stats = pool.stats()
+        assert (stats["hits"], stats["misses"], stats["open"]) == (1, 3, 3)
+        assert stats["hit_rate"] == 0.25
+        pool.close_all()
+
+
+def test_eviction_beyond_max_open():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [_db_path(tmp, f"{i}.db") for i in range(3)]
+        pool = ConnectionPool(max_open=2)
+        for path in paths:
+            pool.acquire(path)
+        stats = pool.stats()
+        assert (stats["evictions"], stats["open"]) == (1, 2)
+        pool.acquire(paths[0])  # the oldest was evicted: a miss again
+        assert pool.stats()["misses"] == 4
+        pool.close_all()
+
+
+def test_health_check_reopens_closed_connection():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _db_path(tmp)
+        pool = ConnectionPool()
+        conn = pool.acquire(path)
+        conn.close()
+        fresh = pool.acquire(path)
+        assert fresh is not conn
+        assert fresh.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        stats = pool.stats()
+        assert (stats["health_failures"], stats["misses"], stats["hits"]) == (1, 2, 0)
+        pool.close_all()
+
+
+def test_close_all_leaves_other_threads_connections_open():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _db_path(tmp)
+        pool = ConnectionPool()
+        acquired, closed, done = threading.Event(), threading.Event(), threading.Event()
+        held = {}
+
+        def worker():
+            held["conn"] = pool.acquire(path)
+            acquired.set()
+            closed.wait(5)
+            # Mid-work on another thread: its connection must still be usable
+            held["count"] = held["conn"].execute("SELECT COUNT(*) FROM t").fetchone()[0]
+            held["again"] = pool.acquire(path)
+            done.set()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        acquired.wait(5)
+        mine = pool.acquire(path)
+        pool.close_all()
+        closed.set()
+        done.wait(5)
+        thread.join()
+
+        assert held["count"] == 0
+        assert held["again"] is not held["conn"]  # dropped from the pool, reopened on next acquire
+        try:
+            mine.execute("SELECT 1")
+            raise AssertionError("the calling thread's connection should be closed")
+        except sqlite3.ProgrammingError:
+            pass
+        held["conn"].close()
+        pool.close_all()
+
+
+def test_release_thread():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _db_path(tmp)
+        pool = ConnectionPool()
+        other = _in_thread(lambda: pool.acquire(path))
+        conn = pool.acquire(path)
+        pool.release_thread()
+        assert pool.stats()["open"] == 1  # only the other thread's
+        assert pool.acquire(path) is not conn
+        other.close()
+        pool.close_all()
+
+
+def test_nested_with_shares_one_transaction():
+    """Documented behaviour: the inner block's exit commits the outer block's writes, with a warning."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _db_path(tmp)
+        pool = ConnectionPool()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            try:
+                with pool.acquire(path) as outer:
+                    outer.execute("INSERT INTO t (v) VALUES (1)")
+                    with pool.acquire(path) as inner:
+                        assert inner is outer
+                    raise RuntimeError("outer block fails after the inner one committed")
+            except RuntimeError:
+                pass
+        assert "nested acquire()" in out.getvalue()
+        check = sqlite3.connect(path)
+        assert check.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+        check.close()
+        pool.close_all()
+
+
+def test_no_warning_outside_a_transaction():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _db_path(tmp)
+        pool = ConnectionPool()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            with pool.acquire(path) as conn:
+                conn.execute("INSERT INTO t (v) VALUES (1)")
+            with pool.acquire(path) as conn:
+                conn.execute("SELECT COUNT(*) FROM t")
+        assert out.getvalue() == ""
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    tests = [fn for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n{len(tests)} connection pool tests passed")